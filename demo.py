@@ -1,24 +1,9 @@
 import json
-import pandas as pd
 from src.pyipums.parse_xml import read_ipums_ddi
+from src.pyipums.read_data import read_ipums_micro
 from ipumspy import readers, ddi
 
 
-def read_ipums_micro(ddi, data_file_path, n_max=None):
-    # Read the fixed-width data file using the extracted column information
-    df = pd.read_fwf(
-        data_file_path,
-        dtypes=ddi["column_dtypes"],
-        colspecs=ddi["column_specs"],
-        header=None,
-        names=ddi["columns"],
-        nrows=n_max,
-        compression="gzip",
-    )
-
-    return df
-
-
 def main():
     # Example usage
     ddi_file_path = "./usa_00003.xml"
@@ -1,5 +1,5 @@
 import os
-from setuptools import setup
+from setuptools import find_packages, setup
 
 
 def get_long_description():
@@ -19,7 +19,9 @@ setup(
     long_description=get_long_description(),
     long_description_content_type="text/markdown",
     license="MIT",
-    packages=["pyipums"],
+    packages=find_packages("src"),
+    package_dir={"": "src"},
+    entry_points={"console_scripts": ["pyipums=pyipums.cli:main"]},
     keywords="ipums census ACS",
     python_requires=">=3.8",
     version="0.0.3",
@@ -0,0 +1,62 @@
+"""
+PyIPUMS is a library for working with data from IPUMS.
+
+Attributes are resolved lazily (PEP 562): ``import pyipums`` loads nothing
+until a name is used, and heavy dependencies such as pandas or matplotlib are
+only imported by the submodules that need them.
+"""
+import importlib
+
+_LAZY_ATTRIBUTES = {
+    "read_ipums_ddi": "parse_xml",
+    "Codebook": "codebook",
+    "read_ipums_micro": "read_data",
+    "iter_ipums_micro": "read_data",
+    "IpumsAcsCleaner": "clean_data",
+    "IpumsAsecCleaner": "clean_data",
+    "map_codes": "clean_data",
+    "pt": "tabulate",
+    "PreviewSession": "preview",
+    "IpumsDataset": "dataset",
+    "StageProfiler": "profiling",
+}
+_SUBMODULES = {
+    "arrow_backend",
+    "benchmarks",
+    "catalog",
+    "clean_data",
+    "cli",
+    "codebook",
+    "columnar",
+    "dataset",
+    "grouping",
+    "hierarchical",
+    "households",
+    "inequality",
+    "parse_xml",
+    "planner",
+    "plotdata",
+    "plotting",
+    "preview",
+    "profiling",
+    "read_data",
+    "remote",
+    "shared",
+    "sqlexport",
+    "tabulate",
+    "validation",
+    "variance",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(f".{_LAZY_ATTRIBUTES[name]}", __name__)
+        return getattr(module, name)
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | _SUBMODULES)
@@ -0,0 +1,285 @@
+"""
+Apache Arrow implementation of the cleaners and tabulation helpers, selected
+with ``backend="arrow"``. Columns stay in Arrow buffers (labels are Arrow
+strings rather than Python objects) and every step is a pyarrow.compute
+kernel. Outputs match the pandas backend once converted with
+``Table.to_pandas()``.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .clean_data import (
+    ACS_EDUC_ATTAINMENT,
+    AGE_BUCKETS,
+    ASEC_EDUC_ATTAINMENT,
+    INCOME_COLUMN,
+    IpumsAcsCleaner,
+    IpumsAsecCleaner,
+    IpumsCleaner,
+    income_bucket_columns,
+)
+from .codebook import Codebook, as_codebook
+from .profiling import Observer
+
+INVALID_INCOME = 999999
+
+
+def to_arrow(data, columns: Optional[Sequence[str]] = None) -> pa.Table:
+    if isinstance(data, pa.Table):
+        return data if columns is None else data.select(list(columns))
+    if columns is not None:
+        data = data[list(columns)]
+    return pa.Table.from_pandas(data, preserve_index=False)
+
+
+def _numpy_type(values) -> np.dtype:
+    return np.dtype(values.type.to_pandas_dtype())
+
+
+def _cast(values, dtype) -> pa.ChunkedArray:
+    return pc.cast(values, pa.from_numpy_dtype(np.dtype(dtype)))
+
+
+def _result_type(*columns) -> np.dtype:
+    # the dtype NumPy (and so pandas) would give this arithmetic
+    return np.result_type(*[_numpy_type(c) for c in columns])
+
+
+def map_codes(ddi: Codebook, table: pa.Table, xvar: str) -> pa.ChunkedArray:
+    """Category labels for ``table[xvar]`` as Arrow strings, null when unlabeled."""
+    var = as_codebook(ddi)[xvar]
+    values = table[xvar]
+    if not len(var.code_values):
+        return pa.chunked_array([pa.nulls(len(values), pa.string())])
+    codes = var.code_values
+    if codes.dtype.kind in "iuf":
+        dtype = np.result_type(codes.dtype, _numpy_type(values))
+        code_set = pa.array(codes.astype(dtype))
+        values = _cast(values, dtype)
+    else:
+        code_set = pa.array(codes.tolist(), pa.string())
+    labels = pa.array(var.code_labels.tolist(), pa.string())
+    return pc.take(labels, pc.index_in(values, value_set=code_set))
+
+
+def map_dict(values, mapping: Dict[str, str], default: str) -> pa.ChunkedArray:
+    keys = pa.array(list(mapping), pa.string())
+    mapped = pc.take(
+        pa.array(list(mapping.values()), pa.string()),
+        pc.index_in(values, value_set=keys),
+    )
+    return pc.fill_null(mapped, default)
+
+
+def hispanic_or_not(hispanic) -> pa.ChunkedArray:
+    not_hispanic = pc.fill_null(pc.equal(hispanic, "Not Hispanic"), False)
+    return pc.if_else(not_hispanic, "Not Hispanic", "Hispanic")
+
+
+class ArrowCleaner(IpumsCleaner):
+    """
+    Runs a cleaner's stages against a ``pyarrow.Table``. Tables are
+    immutable, so each derived column produces a new table that shares every
+    other column with the input; the input is never modified.
+    """
+
+    def __init__(
+        self,
+        df,
+        ddi_codebook: Codebook,
+        observer: Optional[Observer] = None,
+    ):
+        super().__init__(to_arrow(df), ddi_codebook, observer, backend="arrow")
+
+    def _map_codes(self, xvar: str) -> pa.ChunkedArray:
+        return map_codes(self.ddi_codebook, self.df, xvar)
+
+    def set_column(self, name: str, values):
+        if not isinstance(values, (pa.Array, pa.ChunkedArray)):
+            values = pa.array(values)
+        if name in self.df.column_names:
+            index = self.df.column_names.index(name)
+            self.df = self.df.set_column(index, name, values)
+        else:
+            self.df = self.df.append_column(name, values)
+
+    def clean_data(self) -> pa.Table:
+        for stage in self.STAGES:
+            self.run_stage(getattr(self, stage))
+        return self.df
+
+
+class ArrowAcsCleaner(ArrowCleaner):
+    STAGES = IpumsAcsCleaner.STAGES
+    LABELS = [
+        ("Sex", "SEX"),
+        ("State", "STATEFIP"),
+        ("Occupation", "OCC2010"),
+        ("Education", "EDUCD"),
+        ("Degree", "DEGFIELDD"),
+        ("Industry", "IND1990"),
+        ("Hispanic", "HISPAN"),
+        ("Language Spoken", "LANGUAGE"),
+        ("Labor Force", "LABFORCE"),
+        ("Speak English", "SPEAKENG"),
+    ]
+
+    def clean_variables(self):
+        for name, xvar in self.LABELS:
+            self.set_column(name, self.map_codes(xvar))
+        self.set_column("Hispanic or Not", hispanic_or_not(self.df["Hispanic"]))
+        self.set_column("Race", self.map_codes("RACE"))
+        self.set_column("Birthplace", self.map_codes("BPL"))
+
+    def clean_educ_attainment(self):
+        self.set_column(
+            "Educational Attainment",
+            map_dict(self.df["Education"], ACS_EDUC_ATTAINMENT, "None"),
+        )
+
+
+class ArrowAsecCleaner(ArrowCleaner):
+    STAGES = IpumsAsecCleaner.STAGES
+    LABELS = [
+        ("Occupation", "OCC2010"),
+        ("Education", "EDUC"),
+        ("Birthplace", "BPL"),
+        ("Marital_Status", "MARST"),
+        ("Nativity", "NATIVITY"),
+        ("Class_of_worker", "CLASSWKR"),
+        ("Hispanic", "HISPAN"),
+        ("Labor Force", "LABFORCE"),
+    ]
+
+    def clean_variables(self):
+        for name, xvar in self.LABELS:
+            self.set_column(name, self.map_codes(xvar))
+        self.set_column("Hispanic or Not", hispanic_or_not(self.df["Hispanic"]))
+        self.set_column("Asian", self.map_codes("ASIAN"))
+        self.set_column("Race", self.map_codes("RACE"))
+        self.set_column("Veteran_Status", self.map_codes("VETSTAT"))
+        age = _cast(self.df["AGE"], np.float64)
+        self.set_column("Age", age)
+        self.set_column("Age Bucket", age_buckets(age))
+
+    def clean_cps_income(self):
+        for col in [c for c in self.df.column_names if INCOME_COLUMN in c]:
+            values = self.df[col]
+            if not pa.types.is_integer(values.type) and not pa.types.is_floating(
+                values.type
+            ):
+                continue
+            invalid = pc.equal(_cast(values, np.float64), float(INVALID_INCOME))
+            # like Series.replace, the column is only upcast when a value matches
+            if pc.any(invalid).as_py():
+                values = pc.if_else(invalid, None, _cast(values, np.float64))
+                self.set_column(col, values)
+        self.set_column("INCTOT", _cast(self.df["INCTOT"], np.float64))
+
+    def clean_educ_attainment(self):
+        self.set_column(
+            "Educational Attainment",
+            map_dict(self.df["Education"], ASEC_EDUC_ATTAINMENT, "None"),
+        )
+
+    def clean_wages(self):
+        for bucket, columns in income_bucket_columns().items():
+            self.set_column(
+                f"{bucket} Income", row_sum([self.df[c] for c in columns])
+            )
+
+        inctot = self.df["INCTOT"]
+        for bucket in ["Investment", "Government", "Wage"]:
+            share = pc.if_else(
+                pc.equal(inctot, 0),
+                0.0,
+                pc.divide(_cast(self.df[f"{bucket} Income"], np.float64), inctot),
+            )
+            share = pc.max_element_wise(share, 0.0, skip_nulls=False)
+            share = pc.min_element_wise(share, 1.0, skip_nulls=False)
+            self.set_column(f"{bucket} Income as Percent of Total Income", share)
+
+        weight = self.df["ASECWT"]
+        self.set_column("Total Income", inctot)
+        self.set_column("Weighted Total Income", multiply(inctot, weight))
+        for bucket in ["Government", "Investment", "Wage"]:
+            self.set_column(
+                f"Weighted {bucket} Income",
+                multiply(self.df[f"{bucket} Income"], weight),
+            )
+        for bucket in ["Government", "Investment", "Wage"]:
+            name = f"{bucket} Income as Percent of Total Income"
+            self.set_column(f"Weighted {name}", multiply(self.df[name], weight))
+
+
+def age_buckets(age) -> pa.DictionaryArray:
+    bounds = [(None, 15), (15, 24), (25, 54), (55, 64), (65, None)]
+    index = pa.nulls(len(age), pa.int8())
+    for i, (low, high) in reversed(list(enumerate(bounds))):
+        inside = None
+        if low is not None:
+            inside = pc.greater_equal(age, low)
+        if high is not None:
+            below = pc.less(age, high) if low is None else pc.less_equal(age, high)
+            inside = below if inside is None else pc.and_(inside, below)
+        index = pc.if_else(pc.fill_null(inside, False), pa.scalar(i, pa.int8()), index)
+    if isinstance(index, pa.ChunkedArray):
+        index = index.combine_chunks()
+    categories = pa.array(AGE_BUCKETS, pa.string())
+    return pa.DictionaryArray.from_arrays(index, categories, ordered=True)
+
+
+def row_sum(columns: List) -> pa.ChunkedArray:
+    # DataFrame.sum(axis=1): missing values count as zero, in NumPy's sum dtype
+    dtype = np.zeros((1, len(columns)), dtype=_result_type(*columns)).sum(axis=1).dtype
+    total = None
+    for values in columns:
+        values = pc.fill_null(_cast(values, dtype), 0)
+        total = values if total is None else pc.add(total, values)
+    return total
+
+
+def multiply(left, right) -> pa.ChunkedArray:
+    dtype = _result_type(left, right)
+    return pc.multiply(_cast(left, dtype), _cast(right, dtype))
+
+
+def group_sums(
+    data, xvar: str, weight_columns: Sequence[str] = ()
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sorted non-missing codes of ``xvar`` with their row counts and the sums of
+    each weight column (missing weights count as zero), via one hash group-by.
+    """
+    table = to_arrow(data, [xvar] + list(weight_columns))
+    table = table.filter(pc.is_valid(table[xvar]))
+    for i, col in enumerate(weight_columns, start=1):
+        table = table.set_column(i, col, _cast(table[col], np.float64))
+    aggregations = [(xvar, "count")] + [(col, "sum") for col in weight_columns]
+    grouped = table.group_by(xvar).aggregate(aggregations).sort_by(xvar)
+    codes = grouped[xvar].to_numpy()
+    counts = grouped[f"{xvar}_count"].to_numpy().astype(np.int64)
+    sums = np.empty((len(codes), len(weight_columns)))
+    for i, col in enumerate(weight_columns):
+        sums[:, i] = pc.fill_null(grouped[f"{col}_sum"], 0.0).to_numpy()
+    return codes, counts, sums
+
+
+def weighted_sums(
+    data, gvar: str, xvar: str, wvar: str
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sorted groups of ``gvar`` with the sums of ``xvar * wvar`` and ``wvar``."""
+    table = to_arrow(data, [gvar, xvar, wvar])
+    weights = _cast(table[wvar], np.float64)
+    table = pa.table(
+        {
+            gvar: table[gvar],
+            "xweight": pc.multiply(_cast(table[xvar], np.float64), weights),
+            "weight": weights,
+        }
+    )
+    codes, _, sums = group_sums(table, gvar, ["xweight", "weight"])
+    return codes, sums[:, 0], sums[:, 1]
@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from ..catalog import DdiCatalog
+from ..parse_xml import read_ipums_ddi
+
+CODEBOOKS = [
+    "tests/metadata_acs.xml",
+    "tests/metadata_cps.xml",
+    "tests/metadata_example.xml",
+]
+LOOKUP_VARIABLE = "DEGFIELDD"
+
+
+def copy_codebooks(directory: str, n_codebooks: int) -> List[str]:
+    """``n_codebooks`` copies of the test codebooks, as an archive would hold."""
+    paths = []
+    for i in range(n_codebooks):
+        source = CODEBOOKS[i % len(CODEBOOKS)]
+        path = os.path.join(directory, f"extract_{i:04d}.xml")
+        shutil.copyfile(source, path)
+        paths.append(path)
+    return paths
+
+
+def _timed(function, repeat: int = 1):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+
+def bench_catalog(
+    n_codebooks: int = 60,
+    jobs: int = 1,
+    repeat: int = 3,
+    workdir: Optional[str] = None,
+) -> Dict:
+    """
+    Build a catalog of ``n_codebooks`` DDIs, update it with nothing changed
+    and with one new codebook, and time a variable lookup and a label search
+    (best of ``repeat``) against parsing every XML to find the variable.
+    """
+    with tempfile.TemporaryDirectory(dir=workdir) as tmpdir:
+        archive = os.path.join(tmpdir, "ddi")
+        os.mkdir(archive)
+        paths = copy_codebooks(archive, n_codebooks)
+        with DdiCatalog(os.path.join(tmpdir, "catalog.sqlite")) as catalog:
+            _, build_seconds = _timed(lambda: catalog.update(archive, jobs=jobs))
+            _, noop_seconds = _timed(lambda: catalog.update(archive, jobs=jobs))
+            shutil.copyfile(paths[0], os.path.join(archive, "extract_new.xml"))
+            changes, incremental_seconds = _timed(
+                lambda: catalog.update(archive, jobs=jobs)
+            )
+            found, lookup_seconds = _timed(
+                lambda: catalog.find_variable(LOOKUP_VARIABLE), repeat
+            )
+            _, search_seconds = _timed(
+                lambda: catalog.search("field of degree"), repeat
+            )
+        expected, parse_seconds = _timed(
+            lambda: [p for p in paths if LOOKUP_VARIABLE in read_ipums_ddi(p)]
+        )
+    assert len(changes["added"]) == 1
+    assert len(found) == len(expected) + 1
+    return {
+        "benchmark": "ddi_catalog",
+        "n_codebooks": n_codebooks,
+        "jobs": jobs,
+        "build_seconds": build_seconds,
+        "noop_update_seconds": noop_seconds,
+        "incremental_update_seconds": incremental_seconds,
+        "lookup_seconds": lookup_seconds,
+        "search_seconds": search_seconds,
+        "parse_all_seconds": parse_seconds,
+        "speedup": parse_seconds / lookup_seconds,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--codebooks", type=int, default=60)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(bench_catalog(args.codebooks, args.jobs, args.repeat), indent=2))
@@ -0,0 +1,98 @@
+import argparse
+import json
+import time
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from ..households import DEFAULT_KEYS, household_rollup
+from .synthetic import MAX_PERSONS
+
+AGGREGATIONS = {
+    "Household Income": ("INCTOT", "sum"),
+    "Persons": ("PERNUM", "size"),
+    "Oldest": ("AGE", "max"),
+}
+
+
+def synthetic_persons(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Person rows in contiguous households of 1 to MAX_PERSONS persons."""
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(1, MAX_PERSONS + 1, size=n_rows)
+    sizes = sizes[: np.searchsorted(np.cumsum(sizes), n_rows) + 1]
+    sizes[-1] -= sizes.sum() - n_rows
+    starts = np.repeat(np.cumsum(sizes) - sizes, sizes)
+    return pd.DataFrame(
+        {
+            "YEAR": np.full(n_rows, 2021, dtype=np.uint16),
+            "SERIAL": np.repeat(np.arange(1, len(sizes) + 1, dtype=np.uint32), sizes),
+            "PERNUM": (np.arange(n_rows) - starts + 1).astype(np.uint8),
+            "AGE": rng.integers(0, 96, size=n_rows).astype(np.uint8),
+            "INCTOT": rng.lognormal(10, 1, size=n_rows).round(),
+        }
+    )
+
+
+def _best(function, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return result, min(timings)
+
+
+def _transform(grouped) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            name: grouped[column].transform(how)
+            for name, (column, how) in AGGREGATIONS.items()
+        }
+    )
+
+
+def bench_household_rollup(
+    n_rows: int = 3_000_000, seed: int = 0, repeat: int = 3
+) -> Dict:
+    """
+    Best-of-``repeat`` times for household totals, sizes and maxima, one row
+    per household and broadcast back to person rows, by segmented reduction
+    and by ``groupby().agg``/``groupby().transform``.
+    """
+    df = synthetic_persons(n_rows, seed)
+    keys = list(DEFAULT_KEYS)
+    result = {
+        "benchmark": "household_rollup",
+        "n_rows": n_rows,
+        "n_households": int(df["SERIAL"].iloc[-1]),
+    }
+    for mode, broadcast in (("households", False), ("persons", True)):
+        rollup, rollup_seconds = _best(
+            lambda: household_rollup(df, AGGREGATIONS, broadcast=broadcast), repeat
+        )
+        if broadcast:
+            expected, groupby_seconds = _best(
+                lambda: _transform(df.groupby(keys, sort=False)),
+                repeat,
+            )
+        else:
+            expected, groupby_seconds = _best(
+                lambda: df.groupby(keys, sort=False).agg(**AGGREGATIONS).reset_index(),
+                repeat,
+            )
+        pd.testing.assert_frame_equal(rollup, expected, check_dtype=False)
+        result[mode] = {
+            "rollup_seconds": rollup_seconds,
+            "groupby_seconds": groupby_seconds,
+            "speedup": groupby_seconds / rollup_seconds,
+        }
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(bench_household_rollup(args.rows, repeat=args.repeat), indent=2))
@@ -0,0 +1,68 @@
+import argparse
+import json
+import subprocess
+import sys
+from typing import Dict, Optional
+
+# Modules a short-lived worker that only parses and reads extracts should
+# never pay for
+HEAVY_MODULES = (
+    "pandas",
+    "ipumspy",
+    "pyarrow",
+    "matplotlib",
+    "seaborn",
+    "plotly",
+    "IPython",
+)
+
+
+def import_times(module: str, cwd: Optional[str] = None) -> Dict[str, int]:
+    """
+    Cumulative import time in microseconds of every module loaded by
+    ``import module``, measured in a fresh interpreter with ``-X importtime``.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=cwd,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def heavy_imports(times: Dict[str, int]) -> Dict[str, int]:
+    return {
+        name: us for name, us in times.items() if name.split(".")[0] in HEAVY_MODULES
+    }
+
+
+def bench_imports(module: str, cwd: Optional[str] = None) -> Dict:
+    times = import_times(module, cwd)
+    return {
+        "benchmark": "import",
+        "module": module,
+        "seconds": times[module] / 1e6,
+        "n_modules": len(times),
+        "heavy_modules": sorted(
+            name for name in heavy_imports(times) if "." not in name
+        ),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "modules",
+        nargs="*",
+        default=["pyipums", "pyipums.parse_xml", "pyipums.read_data"],
+    )
+    args = parser.parse_args()
+    print(json.dumps([bench_imports(m) for m in args.modules], indent=2))
@@ -0,0 +1,359 @@
+"""
+End-to-end benchmarks over synthetic extracts:
+
+    python -m pyipums.benchmarks.suite --rows 100000 --output before.json
+    python -m pyipums.benchmarks.suite --rows 100000 --compare before.json
+
+Each dataset pairs a DDI codebook with the cleaner for that survey; every
+stage is timed ``repeat`` times and the fastest run is reported.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .. import clean_data
+from ..parse_xml import read_ipums_ddi
+from ..read_data import read_ipums_micro
+from ..sqlexport import LABELS_TABLE, connect, export_sql
+from ..tabulate import pt
+from .synthetic import (
+    MAX_PERSONS,
+    rectangular_ddi,
+    write_synthetic_extract,
+    write_synthetic_hierarchical,
+)
+
+DEFAULT_DATASETS = {
+    "cps": ("tests/metadata_cps.xml", "IpumsAsecCleaner"),
+    "acs": ("tests/metadata_acs.xml", "IpumsAcsCleaner"),
+}
+HIERARCHICAL_DDI = "tests/metadata_hierarchical.xml"
+WEIGHT_VARIABLES = ["ASECWT", "PERWT", "WTFINL"]
+TABULATE_VARIABLE = "STATEFIP"
+SQL_FILTER = ("SEX", 2)
+# slower than this ratio against the baseline is flagged as a regression
+REGRESSION_THRESHOLD = 1.1
+
+
+def _git_commit(cwd: Optional[str] = None) -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def environment() -> Dict:
+    return {
+        "commit": _git_commit(os.path.dirname(os.path.abspath(__file__))),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def time_call(
+    func: Callable, repeat: int = 3, setup: Optional[Callable] = None
+) -> List[float]:
+    """Wall times of ``repeat`` calls; ``setup()`` runs untimed before each."""
+    timings = []
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _result(name: str, dataset: str, n_rows: int, timings: List[float]) -> Dict:
+    best = min(timings)
+    return {
+        "benchmark": name,
+        "dataset": dataset,
+        "n_rows": n_rows,
+        "seconds": best,
+        "timings": timings,
+        "rows_per_second": n_rows / best if best else None,
+    }
+
+
+def bench_dataset(
+    name: str,
+    ddi_file_path: str,
+    cleaner_name: str,
+    n_rows: int,
+    workdir: str,
+    repeat: int = 3,
+    seed: int = 0,
+    backends: Sequence[str] = ("pandas",),
+    sql_engines: Sequence[str] = ("sqlite",),
+) -> List[Dict]:
+    ddi = read_ipums_ddi(ddi_file_path)
+    n_variables = len(ddi["columns"])
+    data_file_path = os.path.join(workdir, f"{name}.dat.gz")
+    write_synthetic_extract(ddi, data_file_path, n_rows, seed)
+
+    results = [
+        _result(
+            "read_ipums_ddi",
+            name,
+            n_variables,
+            time_call(lambda: read_ipums_ddi(ddi_file_path), repeat),
+        )
+    ]
+    df = read_ipums_micro(ddi, data_file_path)
+    results.append(
+        _result(
+            "read_ipums_micro",
+            name,
+            n_rows,
+            time_call(lambda: read_ipums_micro(ddi, data_file_path), repeat),
+        )
+    )
+
+    cleaner = getattr(clean_data, cleaner_name)
+    wvar = next((w for w in WEIGHT_VARIABLES if w in df.columns), None)
+    for backend in backends:
+        suffix = "" if backend == "pandas" else f"[{backend}]"
+        if backend == "arrow":
+            from ..arrow_backend import to_arrow
+
+            # Arrow tables are immutable, so no per-run copy is needed
+            data, setup = to_arrow(df), None
+        else:
+            data, setup = df, df.copy
+
+        def clean(frame=data):
+            return cleaner(frame, ddi["codebook"], backend=backend).clean_data()
+
+        results.append(
+            _result(
+                f"{cleaner_name}.clean_data{suffix}",
+                name,
+                n_rows,
+                time_call(clean, repeat, setup=setup),
+            )
+        )
+        results.append(
+            _result(
+                f"pt{suffix}",
+                name,
+                n_rows,
+                time_call(
+                    lambda: pt(
+                        ddi["codebook"], data, TABULATE_VARIABLE, wvar, backend=backend
+                    ),
+                    repeat,
+                ),
+            )
+        )
+    cleaned = cleaner(df.copy(), ddi["codebook"]).clean_data()
+    for engine in sql_engines:
+        results.extend(
+            bench_sql(name, ddi, cleaned, workdir, engine, wvar, repeat)
+        )
+    return results
+
+
+def bench_sql(
+    name: str,
+    ddi: Dict,
+    cleaned: pd.DataFrame,
+    workdir: str,
+    engine: str = "sqlite",
+    wvar: Optional[str] = None,
+    repeat: int = 3,
+) -> List[Dict]:
+    """
+    Load a cleaned extract into ``engine`` and time two typical queries:
+    a count by state joined to the label lookup, and a weighted total
+    filtered on an indexed key.
+    """
+    suffix = ".duckdb" if engine == "duckdb" else ".sqlite"
+    path = os.path.join(workdir, f"{name}{suffix}")
+    n_rows = len(cleaned)
+
+    def fresh():
+        if os.path.exists(path):
+            os.remove(path)
+        return path
+
+    results = [
+        _result(
+            f"export_sql[{engine}]",
+            name,
+            n_rows,
+            time_call(
+                lambda target: export_sql(
+                    cleaned, target, "persons", ddi=ddi, engine=engine
+                ),
+                repeat,
+                setup=fresh,
+            ),
+        )
+    ]
+    by_state = (
+        f"SELECT l.label, COUNT(*) FROM persons p JOIN {LABELS_TABLE} l "
+        f"ON l.variable = '{TABULATE_VARIABLE}' AND l.code = p.{TABULATE_VARIABLE} "
+        "GROUP BY l.label"
+    )
+    total = f"SUM({wvar})" if wvar else "COUNT(*)"
+    variable, code = SQL_FILTER
+    filtered = f"SELECT {total} FROM persons WHERE {variable} = {code}"
+    connection = connect(path, engine)
+    try:
+        for query, sql in [("count_by_state", by_state), ("filtered_total", filtered)]:
+            results.append(
+                _result(
+                    f"sql.{query}[{engine}]",
+                    name,
+                    n_rows,
+                    time_call(lambda: connection.execute(sql).fetchall(), repeat),
+                )
+            )
+    finally:
+        connection.close()
+    return results
+
+
+def bench_hierarchical(
+    ddi_file_path: str,
+    n_rows: int,
+    workdir: str,
+    repeat: int = 3,
+    seed: int = 0,
+) -> List[Dict]:
+    """
+    Read about ``n_rows`` persons from a hierarchical extract and from the
+    same data rectangularized, reporting each file's size next to its time.
+    """
+    ddi = read_ipums_ddi(ddi_file_path)
+    rectangular = rectangular_ddi(ddi)
+    paths = {
+        "hierarchical": os.path.join(workdir, "hierarchical.dat.gz"),
+        "rectangular": os.path.join(workdir, "rectangular.dat.gz"),
+    }
+    # household sizes average (1 + MAX_PERSONS) / 2
+    n_households = max(2 * n_rows // (1 + MAX_PERSONS), 1)
+    write_synthetic_hierarchical(
+        ddi, paths["hierarchical"], n_households, seed, paths["rectangular"]
+    )
+    n_persons = len(read_ipums_micro(ddi, paths["hierarchical"]))
+
+    results = []
+    for layout, layout_ddi in [("hierarchical", ddi), ("rectangular", rectangular)]:
+        path = paths[layout]
+        result = _result(
+            f"read_ipums_micro[{layout}]",
+            "hierarchical",
+            n_persons,
+            time_call(lambda: read_ipums_micro(layout_ddi, path), repeat),
+        )
+        result["file_bytes"] = os.path.getsize(path)
+        results.append(result)
+    return results
+
+
+def run_suite(
+    n_rows: int = 100_000,
+    repeat: int = 3,
+    seed: int = 0,
+    datasets: Optional[Dict] = None,
+    workdir: Optional[str] = None,
+    backends: Sequence[str] = ("pandas",),
+    hierarchical: Optional[str] = None,
+    sql_engines: Sequence[str] = ("sqlite",),
+) -> Dict:
+    """
+    ``hierarchical`` is a hierarchical DDI to also benchmark reading;
+    ``sql_engines`` are loaded with each cleaned extract and queried.
+    """
+    datasets = DEFAULT_DATASETS if datasets is None else datasets
+    results = []
+    with tempfile.TemporaryDirectory(dir=workdir) as tmpdir:
+        for name, (ddi_file_path, cleaner_name) in datasets.items():
+            results.extend(
+                bench_dataset(
+                    name,
+                    ddi_file_path,
+                    cleaner_name,
+                    n_rows,
+                    tmpdir,
+                    repeat,
+                    seed,
+                    backends,
+                    sql_engines,
+                )
+            )
+        if hierarchical:
+            results.extend(bench_hierarchical(hierarchical, n_rows, tmpdir, repeat, seed))
+    return {"environment": environment(), "results": results}
+
+
+def compare_results(baseline: Dict, current: Dict) -> pd.DataFrame:
+    """Side-by-side best times; ``ratio`` above 1 means ``current`` is slower."""
+    key = ["dataset", "benchmark"]
+    before = pd.DataFrame(baseline["results"])[key + ["seconds"]]
+    after = pd.DataFrame(current["results"])[key + ["seconds"]]
+    out = before.merge(after, on=key, how="outer", suffixes=("_baseline", "_current"))
+    out["ratio"] = out["seconds_current"] / out["seconds_baseline"]
+    out["regression"] = out["ratio"] > REGRESSION_THRESHOLD
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file to save the results to")
+    parser.add_argument("--compare", help="baseline JSON results to compare against")
+    parser.add_argument(
+        "--backends", default="pandas", help="comma separated, e.g. pandas,arrow"
+    )
+    parser.add_argument(
+        "--sql-engines", default="sqlite", help="comma separated, e.g. sqlite,duckdb"
+    )
+    parser.add_argument(
+        "--hierarchical",
+        default=HIERARCHICAL_DDI,
+        help="hierarchical DDI to benchmark against its rectangularized layout",
+    )
+    parser.add_argument(
+        "--no-hierarchical", dest="hierarchical", action="store_const", const=None
+    )
+    args = parser.parse_args()
+
+    suite = run_suite(
+        args.rows,
+        args.repeat,
+        args.seed,
+        backends=args.backends.split(","),
+        hierarchical=args.hierarchical,
+        sql_engines=[e for e in args.sql_engines.split(",") if e],
+    )
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(suite, fp, indent=2)
+    if args.compare:
+        with open(args.compare) as fp:
+            print(compare_results(json.load(fp), suite).to_string(index=False))
+    else:
+        print(json.dumps(suite, indent=2))
@@ -0,0 +1,264 @@
+import argparse
+import gzip
+from typing import Dict, Optional
+
+import numpy as np
+
+from ..codebook import Codebook, parse_code
+from ..hierarchical import HOUSEHOLD, PERSON, is_hierarchical, rectype_columns
+from ..parse_xml import RECTANGULAR, read_ipums_ddi
+from ..read_data import DEFAULT_CHUNKSIZE, NEWLINE, ZERO
+
+# random values for variables without categories stay within int64 and
+# within the sizes a real extract would hold
+MAX_RANDOM_DIGITS = 9
+# household sizes in synthetic hierarchical extracts are 1..MAX_PERSONS
+MAX_PERSONS = 5
+LETTERS = np.frombuffer(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ", dtype=np.uint8)
+
+
+def _format_code(value: str, width: int, decimals: int, character: bool):
+    if character:
+        text = value.rjust(width)
+    else:
+        code = parse_code(value)
+        if isinstance(code, str):
+            return None
+        scaled = int(round(code * 10**decimals))
+        if scaled < 0:
+            text = "-" + str(-scaled).zfill(width - 1)
+        else:
+            text = str(scaled).zfill(width)
+    return text.encode() if len(text) == width else None
+
+
+def category_fields(var_dict: Dict, width: int) -> Optional[np.ndarray]:
+    """
+    The variable's catgry codes formatted as ``width``-byte fields, as a 2-D
+    uint8 array with one row per code, or None when it lists no usable codes.
+    """
+    character = var_dict.get("data_type") == "character"
+    fields = []
+    for meta in var_dict.get("field_metadata", []):
+        if "category_value" not in meta:
+            continue
+        field = _format_code(
+            meta["category_value"], width, var_dict.get("decimals", 0), character
+        )
+        if field is not None:
+            fields.append(field)
+    if not fields:
+        return None
+    return np.frombuffer(b"".join(fields), dtype=np.uint8).reshape(-1, width)
+
+
+def format_digits(values: np.ndarray, width: int) -> np.ndarray:
+    """Non-negative integers as zero-padded ``width``-digit ASCII fields."""
+    values = np.array(values, dtype=np.int64)
+    out = np.full((len(values), width), ZERO, dtype=np.uint8)
+    for j in range(width):
+        out[:, width - 1 - j] = ZERO + values % 10
+        values //= 10
+    return out
+
+
+def random_digits(rng: np.random.Generator, n_rows: int, width: int) -> np.ndarray:
+    digits = min(width, MAX_RANDOM_DIGITS)
+    return format_digits(rng.integers(0, 10**digits, size=n_rows), width)
+
+
+def synthetic_records(
+    ddi: Dict, n_rows: int, rng: np.random.Generator, categories: Dict = None
+) -> np.ndarray:
+    """
+    ``n_rows`` newline-terminated fixed-width records as a 2-D uint8 array.
+    Variables with catgry codes draw uniformly from them; others get random
+    digits (or letters for character variables) filling their width.
+    """
+    categories = categories if categories is not None else {}
+    record_length = max(end for _, end in ddi["column_specs"])
+    records = np.full((n_rows, record_length + 1), ZERO, dtype=np.uint8)
+    records[:, -1] = NEWLINE
+    for col, (start, end) in zip(ddi["columns"], ddi["column_specs"]):
+        width = end - start
+        if col not in categories:
+            categories[col] = category_fields(ddi[col], width)
+        fields = categories[col]
+        if fields is not None:
+            records[:, start:end] = fields[rng.integers(0, len(fields), size=n_rows)]
+        elif ddi[col].get("data_type") == "character":
+            records[:, start:end] = LETTERS[rng.integers(0, 26, size=(n_rows, width))]
+        else:
+            records[:, start:end] = random_digits(rng, n_rows, width)
+    return records
+
+
+def write_synthetic_extract(
+    ddi: Dict,
+    data_file_path: str,
+    n_rows: int,
+    seed: int = 0,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> int:
+    """
+    Write a synthetic extract shaped by any DDI codebook, gzipped when the
+    path ends in ``.gz``. Returns the number of bytes of records written.
+    """
+    rng = np.random.default_rng(seed)
+    categories = {}
+    opener = gzip.open if str(data_file_path).endswith(".gz") else open
+    n_bytes = 0
+    with opener(data_file_path, "wb") as fp:
+        for start in range(0, n_rows, chunksize):
+            records = synthetic_records(
+                ddi, min(chunksize, n_rows - start), rng, categories
+            )
+            fp.write(records.tobytes())
+            n_bytes += records.size
+    return n_bytes
+
+
+def record_layout(ddi: Dict, rectype: str) -> Dict:
+    """The variables and positions of one record type of a hierarchical DDI."""
+    specs = dict(zip(ddi["columns"], ddi["column_specs"]))
+    columns = rectype_columns(ddi, rectype)
+    layout = {col: ddi[col] for col in columns}
+    layout.update(columns=columns, column_specs=[specs[col] for col in columns])
+    return layout
+
+
+def rectangular_ddi(ddi: Dict) -> Dict:
+    """
+    The rectangularized counterpart of a hierarchical DDI: each person record
+    followed by its household's own variables, one record per person.
+    """
+    person = record_layout(ddi, PERSON)
+    household = record_layout(ddi, HOUSEHOLD)
+    position = max(end for _, end in person["column_specs"])
+    columns, specs = [], []
+    for col, spec in zip(person["columns"], person["column_specs"]):
+        if col != ddi["rectype_idvar"]:
+            columns.append(col)
+            specs.append(spec)
+    for col, (start, end) in zip(household["columns"], household["column_specs"]):
+        if col not in person:
+            columns.append(col)
+            specs.append((position, position + end - start))
+            position += end - start
+    order = {col: i for i, col in enumerate(ddi["columns"])}
+    columns, specs = zip(*sorted(zip(columns, specs), key=lambda c: order[c[0]]))
+    columns, specs = list(columns), list(specs)
+    out = {col: ddi[col] for col in columns}
+    out.update(
+        file_metadata=ddi.get("file_metadata", {}),
+        file_type=RECTANGULAR,
+        rectypes=[],
+        rectype_idvar=None,
+        rectype_keyvars=[],
+        columns=columns,
+        column_specs=specs,
+        dtypes={col: ddi["dtypes"][col] for col in columns},
+    )
+    out["codebook"] = Codebook.from_ddi_dict(out)
+    return out
+
+
+def _spec(layout: Dict, col: str):
+    return layout["column_specs"][layout["columns"].index(col)]
+
+
+def _set_field(records: np.ndarray, layout: Dict, col: str, fields):
+    start, end = _spec(layout, col)
+    records[:, start:end] = fields
+
+
+def write_synthetic_hierarchical(
+    ddi: Dict,
+    data_file_path: str,
+    n_households: int,
+    seed: int = 0,
+    rectangular_path: Optional[str] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> int:
+    """
+    Write a hierarchical extract of ``n_households`` households, each record
+    followed by 1 to MAX_PERSONS person records sharing its key variables.
+    ``rectangular_path`` also writes the same persons in the layout of
+    ``rectangular_ddi(ddi)``. Returns the bytes of hierarchical records.
+    """
+    if not is_hierarchical(ddi):
+        raise ValueError("write_synthetic_hierarchical needs a hierarchical DDI")
+    rng = np.random.default_rng(seed)
+    household, person = record_layout(ddi, HOUSEHOLD), record_layout(ddi, PERSON)
+    rectangular = rectangular_ddi(ddi)
+    idvar, serial = ddi["rectype_idvar"], ddi["rectype_keyvars"][-1]
+    shared = [c for c in person["columns"] if c in household and c != idvar]
+    household_only = [c for c in household["columns"] if c not in person]
+    categories = {HOUSEHOLD: {}, PERSON: {}}
+    serial_start, serial_end = _spec(household, serial)
+
+    opener = gzip.open if str(data_file_path).endswith(".gz") else open
+    rect_fp = None
+    if rectangular_path is not None:
+        rect_opener = gzip.open if str(rectangular_path).endswith(".gz") else open
+        rect_fp = rect_opener(rectangular_path, "wb")
+    n_bytes = 0
+    try:
+        with opener(data_file_path, "wb") as fp:
+            for first in range(0, n_households, chunksize):
+                n = min(chunksize, n_households - first)
+                h = synthetic_records(household, n, rng, categories[HOUSEHOLD])
+                _set_field(h, household, idvar, ord(HOUSEHOLD))
+                serials = np.arange(first + 1, first + n + 1)
+                _set_field(
+                    h, household, serial, format_digits(serials, serial_end - serial_start)
+                )
+
+                sizes = rng.integers(1, MAX_PERSONS + 1, size=n)
+                owner = np.repeat(np.arange(n), sizes)
+                firsts = np.cumsum(sizes) - sizes
+                rank = np.arange(len(owner)) - np.repeat(firsts, sizes)
+                p = synthetic_records(person, len(owner), rng, categories[PERSON])
+                _set_field(p, person, idvar, ord(PERSON))
+                for col in shared:
+                    start, end = _spec(household, col)
+                    _set_field(p, person, col, h[owner, start:end])
+                if "PERNUM" in person:
+                    start, end = _spec(person, "PERNUM")
+                    _set_field(p, person, "PERNUM", format_digits(rank + 1, end - start))
+
+                # interleave each household record with its persons
+                h_width, p_width = h.shape[1], p.shape[1]
+                h_start = np.arange(n) * h_width + firsts * p_width
+                p_start = np.repeat(h_start + h_width, sizes) + rank * p_width
+                out = np.empty(h.size + p.size, dtype=np.uint8)
+                out[h_start[:, None] + np.arange(h_width)] = h
+                out[p_start[:, None] + np.arange(p_width)] = p
+                fp.write(out.tobytes())
+                n_bytes += out.size
+
+                if rect_fp is not None:
+                    length = max(end for _, end in rectangular["column_specs"])
+                    r = np.full((len(owner), length + 1), ZERO, dtype=np.uint8)
+                    r[:, : p_width - 1] = p[:, :-1]
+                    r[:, -1] = NEWLINE
+                    for col in household_only:
+                        start, end = _spec(household, col)
+                        _set_field(r, rectangular, col, h[owner, start:end])
+                    rect_fp.write(r.tobytes())
+    finally:
+        if rect_fp is not None:
+            rect_fp.close()
+    return n_bytes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic fixed-width extract from a DDI codebook."
+    )
+    parser.add_argument("ddi")
+    parser.add_argument("output", help="data file to write (.dat or .dat.gz)")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_synthetic_extract(read_ipums_ddi(args.ddi), args.output, args.rows, args.seed)
@@ -0,0 +1,54 @@
+import argparse
+import json
+import time
+from typing import Dict
+
+import numpy as np
+
+from ..grouping import GroupIndex
+from ..variance import replicate_se, replicate_totals
+
+
+def bench_replicate_totals(
+    n_rows: int = 3_000_000,
+    n_replicates: int = 80,
+    n_groups: int = 51,
+    seed: int = 0,
+) -> Dict:
+    """
+    Time grouped totals, means and SDR standard errors over a synthetic
+    rows x (1 + n_replicates) weight matrix, the size of a full ACS year.
+    """
+    rng = np.random.default_rng(seed)
+    # ACS weights are whole numbers, so float32 holds them exactly
+    weights = rng.integers(1, 500, size=(n_rows, n_replicates + 1)).astype(np.float32)
+    values = rng.lognormal(10, 1, size=n_rows)
+    group_values = rng.integers(0, n_groups, size=n_rows)
+
+    start = time.perf_counter()
+    groups = GroupIndex(group_values)
+    totals, counts = replicate_totals([values, None], weights, groups)
+    replicate_se(totals)
+    replicate_se(totals / counts)
+    elapsed = time.perf_counter() - start
+    return {
+        "benchmark": "replicate_totals",
+        "n_rows": n_rows,
+        "n_weights": n_replicates + 1,
+        "n_groups": n_groups,
+        "seconds": elapsed,
+        "rows_per_second": n_rows / elapsed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--replicates", type=int, default=80)
+    parser.add_argument("--groups", type=int, default=51)
+    args = parser.parse_args()
+    print(
+        json.dumps(
+            bench_replicate_totals(args.rows, args.replicates, args.groups), indent=2
+        )
+    )
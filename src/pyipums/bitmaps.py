@@ -0,0 +1,175 @@
+"""
+Bitmap indexes over low-cardinality categorical variables (SEX, RACE, HISPAN,
+LABFORCE, MARST, EDUC, ...). A columnar directory converted with
+``bitmap_columns`` holds, next to each indexed column, one packed bitset per
+code present, so predicates on those columns resolve to row ids with bitwise
+AND/OR before any column is read:
+
+    index = BitmapIndex("usa_00003/")
+    filters = [("HISPAN", "!=", 0), ("LABFORCE", "==", 2)]
+    index.count(filters, weight="PERWT")
+    index.counts("SEX", weight="PERWT", filters=filters)
+"""
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .columnar import read_column, read_manifest
+from .zonemaps import evaluate, normalize_filters
+
+# bitmap_candidates picks variables with at most this many DDI categories
+AUTO_BITMAP_CODES = 32
+MAX_BITMAP_CODES = 256
+NEGATED_OPERATORS = {"!=": "==", "not in": "in"}
+# set bits in every byte value
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(1)
+
+
+def bitmap_candidates(
+    ddi: Dict,
+    columns: Optional[List[str]] = None,
+    max_codes: int = AUTO_BITMAP_CODES,
+) -> List[str]:
+    """Integer-coded discrete variables with at most ``max_codes`` categories."""
+    out = []
+    for name in ddi["columns"] if columns is None else columns:
+        var = ddi[name]
+        n_codes = sum("category_value" in c for c in var.get("field_metadata", []))
+        if (
+            var.get("field_type") == "discrete"
+            and np.dtype(ddi["dtypes"][name]).kind in "iu"
+            and 1 < n_codes <= max_codes
+        ):
+            out.append(name)
+    return out
+
+
+def bitmap_file(column_file: str) -> str:
+    return column_file.rsplit(".", 1)[0] + ".bitmap"
+
+
+def build_bitmaps(name: str, values: np.ndarray, dictionary: bool = False):
+    """
+    The codes present in an integer (or dictionary coded) column and a
+    ``(codes, ceil(rows / 8))`` array holding each code's rows as a bitset.
+    A float column is an integer one promoted for its blank fields: its NaN
+    rows are in no code's bitmap, as missing dictionary values (-1) are not.
+    """
+    if values.dtype.kind == "f":
+        present = values[~np.isnan(values)]
+    elif values.dtype.kind in "iu":
+        present = values[values >= 0] if dictionary else values
+    else:
+        raise ValueError(f"{name} is {values.dtype}; bitmap indexes need integer codes")
+    codes = np.unique(present)
+    if len(codes) > MAX_BITMAP_CODES:
+        raise ValueError(
+            f"{name} has {len(codes)} codes; bitmap indexes are for variables "
+            f"with at most {MAX_BITMAP_CODES}"
+        )
+    bits = np.empty((len(codes), -(-len(values) // 8)), dtype=np.uint8)
+    for i, code in enumerate(codes):
+        bits[i] = np.packbits(values == code, bitorder="little")
+    return codes, bits
+
+
+class BitmapIndex:
+    """The bitmap indexes of a columnar directory, memory-mapped on first use."""
+
+    def __init__(self, path: str, manifest: Optional[Dict] = None):
+        self.path = path
+        self.manifest = manifest or read_manifest(path)
+        self.n_rows = self.manifest["n_rows"]
+        self._bitmaps = {}
+        every_row = np.ones(self.n_rows, dtype=bool)
+        self._every_row = np.packbits(every_row, bitorder="little")
+
+    @property
+    def columns(self) -> List[str]:
+        return [n for n, spec in self.manifest["columns"].items() if "bitmap" in spec]
+
+    def _column(self, name: str):
+        """The values each bitmap of ``name`` stands for, and the bitmaps."""
+        if name not in self._bitmaps:
+            spec = self.manifest["columns"][name]
+            if "bitmap" not in spec:
+                raise KeyError(f"{name} has no bitmap index")
+            codes = spec["bitmap"]["codes"]
+            file_path = os.path.join(self.path, spec["bitmap"]["file"])
+            shape = (len(codes), len(self._every_row))
+            if codes and self.n_rows:
+                bits = np.memmap(file_path, dtype=np.uint8, mode="r", shape=shape)
+            else:
+                bits = np.zeros(shape, dtype=np.uint8)
+            if spec["kind"] == "dictionary":
+                values = np.array([spec["categories"][c] for c in codes], dtype=object)
+            else:
+                values = np.array(codes, dtype=spec["dtype"])
+            self._bitmaps[name] = (values, bits)
+        return self._bitmaps[name]
+
+    def bits(self, name: str, op: str, value) -> np.ndarray:
+        """
+        Packed rows where ``name op value`` holds: the OR of the bitmaps of
+        every matching code. Negations complement the bitmaps of the excluded
+        codes, so rows with missing values match them, as they do unindexed.
+        """
+        values, bits = self._column(name)
+        negated = op in NEGATED_OPERATORS
+        matching = evaluate(values, NEGATED_OPERATORS.get(op, op), value)
+        if matching.any():
+            out = np.bitwise_or.reduce(bits[matching], axis=0)
+        else:
+            out = np.zeros_like(self._every_row)
+        return out ^ self._every_row if negated else out
+
+    def select_bits(self, filters) -> np.ndarray:
+        """Packed rows matching ``filters``, which must all be on indexed columns."""
+        out = np.zeros_like(self._every_row)
+        for conjunction in normalize_filters(filters):
+            matched = self._every_row
+            for name, op, value in conjunction:
+                matched = matched & self.bits(name, op, value)
+            out |= matched
+        return out
+
+    def mask(self, filters) -> np.ndarray:
+        """``select_bits`` as one boolean per row."""
+        bits = self.select_bits(filters)
+        return np.unpackbits(bits, count=self.n_rows, bitorder="little").view(bool)
+
+    def rows(self, filters) -> np.ndarray:
+        return np.flatnonzero(self.mask(filters))
+
+    def _total(self, bits: np.ndarray, weights: Optional[np.ndarray]):
+        if weights is None:
+            return int(POPCOUNT[bits].sum())
+        mask = np.unpackbits(bits, count=self.n_rows, bitorder="little").view(bool)
+        return float(weights[mask].sum(dtype=np.float64))
+
+    def _weights(self, weight: Optional[str]) -> Optional[np.ndarray]:
+        if weight is None:
+            return None
+        return read_column(self.path, weight, self.manifest)
+
+    def count(self, filters=None, weight: Optional[str] = None):
+        """Rows, or their total ``weight``, matching ``filters``."""
+        bits = self._every_row if not filters else self.select_bits(filters)
+        return self._total(bits, self._weights(weight))
+
+    def counts(
+        self, name: str, weight: Optional[str] = None, filters=None
+    ) -> pd.Series:
+        """
+        Row counts, or totals of ``weight``, for each code of the indexed
+        column ``name`` among the rows matching ``filters``, computed from
+        the bitmaps without reading ``name`` itself.
+        """
+        values, bits = self._column(name)
+        selected = self._every_row if not filters else self.select_bits(filters)
+        weights = self._weights(weight)
+        totals = [self._total(code_bits & selected, weights) for code_bits in bits]
+        index = pd.Index(values, name=name)
+        return pd.Series(totals, index=index, name=weight or "count")
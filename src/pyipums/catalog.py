@@ -0,0 +1,476 @@
+"""
+A SQLite index over an archive of DDI codebooks, so finding the extracts
+holding a variable or comparing its categories across years doesn't parse
+every XML again:
+
+    catalog = DdiCatalog("codebooks.sqlite")
+    catalog.update("extracts/", jobs=8)    # parses only new or changed XMLs
+    catalog.find_variable("DEGFIELDD")     # extracts holding it, with positions
+    catalog.search("field of degree")      # variables by label or description
+    catalog.category_diff("DEGFIELDD", "usa_00003.xml", "usa_00005.xml")
+
+Codebooks are parsed on a process pool (parsing is pure Python) and written
+in one transaction per update. A codebook is parsed again only when its size
+or modification time changes, and codebooks whose files are gone are dropped.
+"""
+import glob
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Dict, Iterable, List, Union
+
+from .codebook import Codebook, VariableInfo, labelled_categories, parse_code
+from .parse_xml import read_ipums_ddi
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+SCHEMA_VERSION = 1
+SEARCH_LIMIT = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS extracts (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    codebook_id TEXT,
+    title TEXT,
+    file_name TEXT,
+    file_type TEXT,
+    n_variables INTEGER NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS variables (
+    id INTEGER PRIMARY KEY,
+    extract_id INTEGER NOT NULL REFERENCES extracts(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    label TEXT,
+    description TEXT,
+    concept TEXT,
+    field_type TEXT,
+    data_type TEXT,
+    start INTEGER,
+    "end" INTEGER,
+    decimals INTEGER,
+    dtype TEXT,
+    rectypes TEXT,
+    UNIQUE (extract_id, name)
+);
+CREATE INDEX IF NOT EXISTS variables_name ON variables(name);
+CREATE TABLE IF NOT EXISTS categories (
+    variable_id INTEGER NOT NULL REFERENCES variables(id) ON DELETE CASCADE,
+    code TEXT NOT NULL,
+    value,
+    label TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS categories_variable ON categories(variable_id);
+"""
+# label search; rowids are variables.id
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS variable_search
+USING fts5(name, label, description)
+"""
+
+VARIABLE_COLUMNS = [
+    "name",
+    "label",
+    "description",
+    "concept",
+    "field_type",
+    "data_type",
+    "start",
+    "end",
+    "decimals",
+    "dtype",
+]
+
+
+def codebook_entry(ddi_file_path: str) -> Dict:
+    """
+    The rows a codebook adds to the catalog, as plain data so it can be
+    returned from a worker process.
+    """
+    stat = os.stat(ddi_file_path)
+    ddi = read_ipums_ddi(ddi_file_path)
+    metadata = ddi["file_metadata"]
+    variables = []
+    for position, (name, (start, end)) in enumerate(
+        zip(ddi["columns"], ddi["column_specs"])
+    ):
+        var_dict = ddi[name]
+        categories = labelled_categories(var_dict)
+        variables.append(
+            {
+                "position": position,
+                "name": name,
+                "label": var_dict.get("label"),
+                "description": var_dict.get("description"),
+                "concept": var_dict.get("concept"),
+                "field_type": var_dict.get("field_type"),
+                "data_type": var_dict.get("data_type"),
+                "start": start,
+                "end": end,
+                "decimals": var_dict.get("decimals", 0),
+                "dtype": var_dict.get("dtype"),
+                "rectypes": " ".join(var_dict.get("rectypes", [])),
+                "categories": categories,
+            }
+        )
+    return {
+        "path": ddi_file_path,
+        "name": os.path.basename(ddi_file_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "codebook_id": metadata.get("codebook_id"),
+        "title": metadata.get("titl"),
+        "file_name": metadata.get("fileName"),
+        "file_type": ddi.get("file_type"),
+        "metadata": json.dumps(
+            {
+                **metadata,
+                "rectypes": ddi.get("rectypes", []),
+                "rectype_idvar": ddi.get("rectype_idvar"),
+                "rectype_keyvars": ddi.get("rectype_keyvars", []),
+            }
+        ),
+        "variables": variables,
+    }
+
+
+def find_codebooks(paths: Union[str, Iterable[str]]) -> List[str]:
+    """Absolute paths of the given XMLs and of every ``*.xml`` below directories."""
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found += glob.glob(os.path.join(path, "**", "*.xml"), recursive=True)
+        else:
+            found.append(path)
+    return sorted({os.path.abspath(path) for path in found})
+
+
+def _match_query(text: str) -> str:
+    # every word must appear; quoting keeps FTS5 operators out of user text
+    words = text.replace('"', " ").split()
+    return " ".join(f'"{word}"' for word in words)
+
+
+class DdiCatalog:
+    """
+    Variables, labels, categories, column positions and file metadata of
+    many DDI codebooks, in a SQLite file (or in memory by default).
+    Extracts are referred to by path, file name or codebook ID.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise ValueError(
+                f"{path} has catalog schema {version}, not {SCHEMA_VERSION}"
+            )
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        try:
+            with self.connection:
+                self.connection.execute(SEARCH_SCHEMA)
+            self.full_text = True
+        except sqlite3.OperationalError:  # SQLite built without FTS5
+            self.full_text = False
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self) -> "DdiCatalog":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM extracts").fetchone()[0]
+
+    def __repr__(self) -> str:
+        return f"DdiCatalog({self.path!r}, {len(self)} extracts)"
+
+    def _query(self, sql: str, params=()) -> "pd.DataFrame":
+        import pandas as pd
+
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def update(
+        self,
+        paths: Union[str, Iterable[str]],
+        jobs: int = 1,
+        prune: bool = True,
+    ) -> Dict[str, List[str]]:
+        """
+        Add the codebooks under ``paths`` (XML files or directories searched
+        recursively) that are new or changed since they were indexed, parsing
+        them on ``jobs`` processes. With ``prune``, indexed codebooks whose
+        files are gone are removed. Returns the paths added, updated, removed
+        and left unchanged.
+        """
+        found = find_codebooks(paths)
+        indexed = {
+            path: (extract_id, size, mtime_ns)
+            for extract_id, path, size, mtime_ns in self.connection.execute(
+                "SELECT id, path, size, mtime_ns FROM extracts"
+            )
+        }
+        changes = {"added": [], "updated": [], "removed": [], "unchanged": []}
+        stale = []
+        for path in found:
+            stat = os.stat(path)
+            if path not in indexed:
+                changes["added"].append(path)
+            elif indexed[path][1:] != (stat.st_size, stat.st_mtime_ns):
+                changes["updated"].append(path)
+            else:
+                changes["unchanged"].append(path)
+                continue
+            stale.append(path)
+
+        if prune:
+            changes["removed"] = [
+                path for path in indexed if not os.path.exists(path)
+            ]
+
+        if jobs > 1 and len(stale) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                entries = list(pool.map(codebook_entry, stale, chunksize=4))
+        else:
+            entries = [codebook_entry(path) for path in stale]
+
+        with self.connection:
+            for path in changes["updated"] + changes["removed"]:
+                self._delete(indexed[path][0])
+            for entry in entries:
+                self._insert(entry)
+        return changes
+
+    def _delete(self, extract_id: int):
+        if self.full_text:
+            self.connection.execute(
+                "DELETE FROM variable_search WHERE rowid IN "
+                "(SELECT id FROM variables WHERE extract_id = ?)",
+                (extract_id,),
+            )
+        self.connection.execute("DELETE FROM extracts WHERE id = ?", (extract_id,))
+
+    def _insert(self, entry: Dict):
+        cursor = self.connection.execute(
+            "INSERT INTO extracts (path, name, size, mtime_ns, codebook_id, title, "
+            "file_name, file_type, n_variables, metadata) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                entry["path"],
+                entry["name"],
+                entry["size"],
+                entry["mtime_ns"],
+                entry["codebook_id"],
+                entry["title"],
+                entry["file_name"],
+                entry["file_type"],
+                len(entry["variables"]),
+                entry["metadata"],
+            ),
+        )
+        extract_id = cursor.lastrowid
+        # variable ids are assigned here so each table takes one executemany
+        first_id = self.connection.execute(
+            "SELECT IFNULL(MAX(id), 0) + 1 FROM variables"
+        ).fetchone()[0]
+        variables = list(enumerate(entry["variables"], first_id))
+        columns = ["position", *VARIABLE_COLUMNS, "rectypes"]
+        self.connection.executemany(
+            "INSERT INTO variables (id, extract_id, "
+            + ", ".join(f'"{column}"' for column in columns)
+            + ") VALUES (?, ?"
+            + ", ?" * len(columns)
+            + ")",
+            [
+                (variable_id, extract_id, *(var[column] for column in columns))
+                for variable_id, var in variables
+            ],
+        )
+        self.connection.executemany(
+            "INSERT INTO categories (variable_id, code, value, label) "
+            "VALUES (?, ?, ?, ?)",
+            [
+                (variable_id, code, parse_code(code), label)
+                for variable_id, var in variables
+                for code, label in var["categories"]
+            ],
+        )
+        if self.full_text:
+            self.connection.executemany(
+                "INSERT INTO variable_search (rowid, name, label, description) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (variable_id, var["name"], var["label"], var["description"])
+                    for variable_id, var in variables
+                ],
+            )
+
+    def _extract_id(self, extract: str) -> int:
+        rows = self.connection.execute(
+            "SELECT id FROM extracts WHERE path = ? OR name = ? OR codebook_id = ?",
+            (os.path.abspath(extract), extract, extract),
+        ).fetchall()
+        if not rows:
+            raise KeyError(f"{extract!r} is not in the catalog")
+        if len(rows) > 1:
+            raise ValueError(f"{extract!r} names {len(rows)} extracts; use its path")
+        return rows[0][0]
+
+    def extracts(self) -> "pd.DataFrame":
+        return self._query(
+            "SELECT path, name, codebook_id, title, file_name, file_type, "
+            "n_variables FROM extracts ORDER BY path"
+        )
+
+    def find_variable(self, name: str) -> "pd.DataFrame":
+        """The extracts holding variable ``name``, with its layout in each."""
+        return self._query(
+            'SELECT e.path, e.name AS extract, v.label, v.start, v."end", '
+            "v.decimals, v.dtype, "
+            "(SELECT COUNT(*) FROM categories c WHERE c.variable_id = v.id) "
+            "AS n_categories "
+            "FROM variables v JOIN extracts e ON e.id = v.extract_id "
+            "WHERE v.name = ? ORDER BY e.path",
+            (name,),
+        )
+
+    def search(self, text: str, limit: int = SEARCH_LIMIT) -> "pd.DataFrame":
+        """
+        Variables whose name, label or description hold every word of
+        ``text``, best matches first, with the number of extracts holding
+        each one.
+        """
+        if self.full_text:
+            matches = (
+                "SELECT rowid AS id, rank FROM variable_search "
+                "WHERE variable_search MATCH ?"
+            )
+            params = (_match_query(text),)
+        else:
+            words = text.lower().split()
+            document = "lower(name || ' ' || ifnull(label, '') || ' ' || "
+            document += "ifnull(description, ''))"
+            matches = "SELECT id, 0 AS rank FROM variables WHERE " + " AND ".join(
+                [f"{document} LIKE ?"] * len(words)
+            )
+            params = tuple(f"%{word}%" for word in words)
+        if not params or not params[0]:
+            raise ValueError("Search text is empty")
+        return self._query(
+            "SELECT v.name, v.label, COUNT(*) AS n_extracts "
+            f"FROM ({matches}) m JOIN variables v ON v.id = m.id "
+            "GROUP BY v.name, v.label ORDER BY MIN(m.rank), v.name LIMIT ?",
+            params + (limit,),
+        )
+
+    def _variable_id(self, name: str, extract: str) -> int:
+        row = self.connection.execute(
+            "SELECT id FROM variables WHERE extract_id = ? AND name = ?",
+            (self._extract_id(extract), name),
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"{name!r} is not in {extract!r}")
+        return row[0]
+
+    def categories(self, name: str, extract: str) -> "pd.DataFrame":
+        """The labelled codes of ``name`` in ``extract``, in codebook order."""
+        return self._query(
+            "SELECT code, value, label FROM categories WHERE variable_id = ? "
+            "ORDER BY rowid",
+            (self._variable_id(name, extract),),
+        )
+
+    def category_diff(self, name: str, old: str, new: str) -> "pd.DataFrame":
+        """
+        The codes of ``name`` added, removed or relabelled from extract
+        ``old`` to extract ``new``, sorted by code.
+        """
+        import pandas as pd
+
+        before = self.categories(name, old).set_index("value")["label"]
+        after = self.categories(name, new).set_index("value")["label"]
+        diff = pd.concat(
+            [before.rename("old_label"), after.rename("new_label")], axis=1
+        )
+        change = pd.Series(None, index=diff.index, dtype=object)
+        change[diff["old_label"].isna()] = "added"
+        change[diff["new_label"].isna()] = "removed"
+        relabelled = diff["old_label"].notna() & diff["new_label"].notna()
+        change[relabelled & (diff["old_label"] != diff["new_label"])] = "relabelled"
+        diff["change"] = change
+        diff = diff[change.notna()]
+        diff.index.name = "code"
+        return diff.sort_index(key=lambda codes: codes.map(repr)).reset_index()
+
+    def category_history(self, name: str) -> "pd.DataFrame":
+        """``name``'s label for each code (rows) in each extract (columns)."""
+        history = self._query(
+            "SELECT e.name AS extract, c.value AS code, c.label "
+            "FROM categories c JOIN variables v ON v.id = c.variable_id "
+            "JOIN extracts e ON e.id = v.extract_id WHERE v.name = ? "
+            "ORDER BY e.path, c.rowid",
+            (name,),
+        )
+        table = history.pivot(index="code", columns="extract", values="label")
+        return table[list(dict.fromkeys(history["extract"]))]
+
+    def codebook(self, extract: str) -> Codebook:
+        """``extract``'s Codebook, rebuilt from the catalog without its XML."""
+        extract_id = self._extract_id(extract)
+        metadata = json.loads(
+            self.connection.execute(
+                "SELECT metadata FROM extracts WHERE id = ?", (extract_id,)
+            ).fetchone()[0]
+        )
+        categories = {}
+        for variable_id, value, label in self.connection.execute(
+            "SELECT c.variable_id, c.value, c.label FROM categories c "
+            "JOIN variables v ON v.id = c.variable_id WHERE v.extract_id = ? "
+            "ORDER BY c.rowid",
+            (extract_id,),
+        ):
+            categories.setdefault(variable_id, []).append((value, label))
+        columns = ", ".join(f'"{column}"' for column in VARIABLE_COLUMNS)
+        variables = [
+            VariableInfo(
+                row[1],
+                categories.get(row[0], []),
+                **dict(zip(VARIABLE_COLUMNS[1:], row[2:])),
+            )
+            for row in self.connection.execute(
+                f"SELECT id, {columns} FROM variables WHERE extract_id = ? "
+                "ORDER BY position",
+                (extract_id,),
+            )
+        ]
+        file_metadata = {
+            key: value
+            for key, value in metadata.items()
+            if key not in ("rectypes", "rectype_idvar", "rectype_keyvars")
+        }
+        return Codebook(variables, file_metadata)
+
+
+def build_catalog(
+    catalog_path: str, paths: Union[str, Iterable[str]], jobs: int = 1
+) -> DdiCatalog:
+    """Open (or create) the catalog at ``catalog_path`` and bring it up to date."""
+    catalog = DdiCatalog(catalog_path)
+    catalog.update(paths, jobs=jobs)
+    return catalog
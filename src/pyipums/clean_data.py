@@ -1,6 +1,11 @@
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Sequence
+
 import pandas as pd
 import numpy as np
-from ipumspy import readers, ddi
+
+from .codebook import Codebook, as_codebook
+from .profiling import Observer, observe
 
 INCOME_COLUMN = "INC"
 EDUC_LT_HS = "Less than High School Diploma"
@@ -28,6 +33,32 @@ ASEC_EDUC_ATTAINMENT = {
     "Professional school degree": EDUC_GRAD,
 }
 
+AGE_BUCKETS = ["<15", "15-24", "25-54", "55-64", "65+"]
+ASEC_INCOME_BUCKETS = {
+    "INCSS": "Government",
+    "INCWELFR": "Government",
+    "INCRETIR": "Investment",
+    "INCSSI": "Government",
+    "INCINT": "Investment",
+    "INCUNEMP": "Government",
+    "INCWKCOM": "Wage",
+    "INCVET": "Government",
+    "INCSURV": "Government",
+    "INCDISAB": "Government",
+    "INCDIVID": "Investment",
+    "INCRENT": "Investment",
+    "INCEDUC": "Government",
+    "INCCHILD": "Government",
+    "INCASIST": "Government",
+    "INCOTHER": "Unknown",
+    "INCRANN": "Investment",
+    "INCPENS": "Wage",
+    "INCWAGE": "Wage",
+    "INCBUS": "Wage",
+    "INCFARM": "Wage",
+}
+BACKENDS = ("pandas", "arrow")
+
 ACS_EDUC_ATTAINMENT = {
     'Regular high school diploma': EDUC_HS,
     "Bachelor's degree": EDUC_BS,
@@ -57,32 +88,162 @@ ACS_EDUC_ATTAINMENT = {
 }
 
 
-def map_codes(ddi: ddi.Codebook, xdf: pd.DataFrame, xvar: str):
-    g = {v: k for k, v in ddi.get_variable_info(xvar).codes.items()}
-    res = xdf[xvar].apply(lambda x: g.get(x, None))
-    return res
+def map_codes(ddi: Codebook, xdf: pd.DataFrame, xvar: str):
+    labels = as_codebook(ddi)[xvar].map_labels(xdf[xvar].to_numpy())
+    return pd.Series(labels, index=xdf.index, name=xvar)
+
+
+def income_bucket_columns() -> Dict[str, List[str]]:
+    """ASEC income bucket -> the income columns summed into it."""
+    column_to_bucket_map = {}
+    for bucket in set([ASEC_INCOME_BUCKETS[k] for k in ASEC_INCOME_BUCKETS]):
+        for k in ASEC_INCOME_BUCKETS:
+            if ASEC_INCOME_BUCKETS[k] == bucket:
+                if bucket not in column_to_bucket_map:
+                    column_to_bucket_map[bucket] = [f"{k}"]
+                else:
+                    column_to_bucket_map[bucket].append(f"{k}")
+    return column_to_bucket_map
+
+
+def column_views(df: pd.DataFrame, columns: Sequence[str]) -> pd.DataFrame:
+    """A new frame over ``columns`` of ``df`` that shares their data."""
+    return pd.concat([df[col] for col in columns], axis=1, copy=False)
+
+
+def copy_on_write():
+    # pandas >= 1.5 copies a shared column the first time it is written to
+    if "mode.copy_on_write" in pd.options.mode.__dir__():
+        return pd.option_context("mode.copy_on_write", True)
+    return nullcontext()
+
+
+class IpumsCleaner:
+    """
+    Shared plumbing for the survey cleaners. With an ``observer`` (see
+    pyipums.profiling) every stage run through ``run_stage`` and every
+    ``map_codes`` call is timed and reported; without one they run directly.
+
+    By default the cleaners add their columns to ``df`` in place. With
+    ``inplace=False`` the input is left untouched and ``clean_data`` returns
+    a new frame of the derived columns plus the raw ones they are built from
+    (``input_columns``). The raw columns share memory with ``df`` under
+    copy-on-write, so no copy of the full extract is made.
+
+    ``backend="arrow"`` runs the same stages on an Apache Arrow table (see
+    pyipums.arrow_backend) and returns a ``pyarrow.Table``; ``df`` may then
+    be a DataFrame or a Table.
+    """
+
+    INPUT_COLUMNS: List[str] = []
+    # the columns ``clean_data`` adds, for sizing chunks (see pyipums.planner)
+    DERIVED_COLUMNS: List[str] = []
+    STAGES: List[str] = []
+    ARROW_CLEANER: Optional[str] = None
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        ddi_codebook: Codebook,
+        observer: Optional[Observer] = None,
+        inplace: bool = True,
+        backend: str = "pandas",
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+        self.backend = backend
+        self.inplace = inplace
+        if inplace or backend != "pandas":
+            self.df = df
+        else:
+            self.df = column_views(df, self.input_columns(df.columns))
+        self.ddi_codebook = as_codebook(ddi_codebook)
+        self.observer = observer
 
-class IpumsAcsCleaner:
-    def __init__(self, df: pd.DataFrame, ddi_codebook: ddi.Codebook):
-        self.df = df
-        self.ddi_codebook = ddi_codebook
+    def input_columns(self, columns: Sequence[str]) -> List[str]:
+        return [col for col in self.INPUT_COLUMNS if col in columns]
+
+    def run_stage(self, stage):
+        with nullcontext() if self.inplace else copy_on_write():
+            if self.observer is None:
+                return stage()
+            memory = getattr(self.observer, "memory", None)
+            with observe(
+                self.observer, stage.__name__, "stage", len(self.df), memory
+            ):
+                return stage()
+
+    def map_codes(self, xvar: str) -> pd.Series:
+        if self.observer is None:
+            return self._map_codes(xvar)
+        memory = getattr(self.observer, "memory", None)
+        with observe(self.observer, xvar, "map_codes", len(self.df), memory):
+            return self._map_codes(xvar)
+
+    def _map_codes(self, xvar: str) -> pd.Series:
+        return map_codes(self.ddi_codebook, self.df, xvar)
+
+    def clean_data(self):
+        if self.backend == "arrow":
+            from . import arrow_backend
+
+            cleaner = getattr(arrow_backend, self.ARROW_CLEANER)
+            return cleaner(self.df, self.ddi_codebook, self.observer).clean_data()
+        for stage in self.STAGES:
+            self.run_stage(getattr(self, stage))
+        return self.df
+
+
+class IpumsAcsCleaner(IpumsCleaner):
+    INPUT_COLUMNS = [
+        "SEX",
+        "STATEFIP",
+        "OCC2010",
+        "EDUCD",
+        "DEGFIELDD",
+        "IND1990",
+        "HISPAN",
+        "LANGUAGE",
+        "LABFORCE",
+        "SPEAKENG",
+        "RACE",
+        "BPL",
+    ]
+    DERIVED_COLUMNS = [
+        "Sex",
+        "State",
+        "Occupation",
+        "Education",
+        "Degree",
+        "Industry",
+        "Hispanic",
+        "Language Spoken",
+        "Labor Force",
+        "Speak English",
+        "Hispanic or Not",
+        "Race",
+        "Birthplace",
+        "Educational Attainment",
+    ]
+    STAGES = ["clean_variables", "clean_educ_attainment"]
+    ARROW_CLEANER = "ArrowAcsCleaner"
 
     def clean_variables(self):
-        self.df["Sex"] = map_codes(self.ddi_codebook, self.df, "SEX")
-        self.df["State"] = map_codes(self.ddi_codebook, self.df, "STATEFIP")
-        self.df["Occupation"] = map_codes(self.ddi_codebook, self.df, "OCC2010")
-        self.df["Education"] = map_codes(self.ddi_codebook, self.df, "EDUCD")
-        self.df["Degree"] = map_codes(self.ddi_codebook, self.df, "DEGFIELDD")
-        self.df["Industry"] = map_codes(self.ddi_codebook, self.df, "IND1990")
-        self.df["Hispanic"] = map_codes(self.ddi_codebook, self.df, "HISPAN")
-        self.df["Language Spoken"] = map_codes(self.ddi_codebook, self.df, "LANGUAGE")
-        self.df["Labor Force"] = map_codes(self.ddi_codebook, self.df, "LABFORCE")
-        self.df["Speak English"] = map_codes(self.ddi_codebook, self.df, "SPEAKENG")
+        self.df["Sex"] = self.map_codes("SEX")
+        self.df["State"] = self.map_codes("STATEFIP")
+        self.df["Occupation"] = self.map_codes("OCC2010")
+        self.df["Education"] = self.map_codes("EDUCD")
+        self.df["Degree"] = self.map_codes("DEGFIELDD")
+        self.df["Industry"] = self.map_codes("IND1990")
+        self.df["Hispanic"] = self.map_codes("HISPAN")
+        self.df["Language Spoken"] = self.map_codes("LANGUAGE")
+        self.df["Labor Force"] = self.map_codes("LABFORCE")
+        self.df["Speak English"] = self.map_codes("SPEAKENG")
         self.df["Hispanic or Not"] = np.where(
             self.df["Hispanic"] != "Not Hispanic", "Hispanic", "Not Hispanic"
         )
-        self.df["Race"] = map_codes(self.ddi_codebook, self.df, "RACE")
-        self.df["Birthplace"] = map_codes(self.ddi_codebook, self.df, "BPL")
+        self.df["Race"] = self.map_codes("RACE")
+        self.df["Birthplace"] = self.map_codes("BPL")
 
 
     def clean_educ_attainment(self):
@@ -90,15 +251,69 @@ class IpumsAcsCleaner:
             self.df["Education"].apply(lambda x: ACS_EDUC_ATTAINMENT.get(x)).astype(str)
         )
 
-    def clean_data(self):
-        self.clean_variables()
-        self.clean_educ_attainment()
-        return self.df
 
-class IpumsAsecCleaner:
-    def __init__(self, df: pd.DataFrame, ddi_codebook: ddi.Codebook):
-        self.df = df
-        self.ddi_codebook = ddi_codebook
+class IpumsAsecCleaner(IpumsCleaner):
+    INPUT_COLUMNS = [
+        "OCC2010",
+        "EDUC",
+        "BPL",
+        "MARST",
+        "NATIVITY",
+        "CLASSWKR",
+        "HISPAN",
+        "LABFORCE",
+        "ASIAN",
+        "RACE",
+        "VETSTAT",
+        "AGE",
+        "ASECWT",
+    ]
+    DERIVED_COLUMNS = [
+        "Occupation",
+        "Education",
+        "Birthplace",
+        "Marital_Status",
+        "Nativity",
+        "Class_of_worker",
+        "Hispanic",
+        "Labor Force",
+        "Hispanic or Not",
+        "Asian",
+        "Race",
+        "Veteran_Status",
+        "Age",
+        "Age Bucket",
+        "Educational Attainment",
+        "Government Income",
+        "Investment Income",
+        "Unknown Income",
+        "Wage Income",
+        "Investment Income as Percent of Total Income",
+        "Government Income as Percent of Total Income",
+        "Wage Income as Percent of Total Income",
+        "Total Income",
+        "Weighted Total Income",
+        "Weighted Government Income",
+        "Weighted Investment Income",
+        "Weighted Wage Income",
+        "Weighted Government Income as Percent of Total Income",
+        "Weighted Investment Income as Percent of Total Income",
+        "Weighted Wage Income as Percent of Total Income",
+    ]
+    STAGES = [
+        "clean_variables",
+        "clean_cps_income",
+        "clean_educ_attainment",
+        "clean_wages",
+    ]
+    ARROW_CLEANER = "ArrowAsecCleaner"
+
+    def input_columns(self, columns: Sequence[str]) -> List[str]:
+        # every income column is cleaned, not only those summed in clean_wages
+        income = [col for col in columns if INCOME_COLUMN in col]
+        return super().input_columns(columns) + [
+            col for col in income if col not in self.INPUT_COLUMNS
+        ]
 
     def clean_cps_income(self):
         invalid_cols = [col for col in self.df.columns if INCOME_COLUMN in col]
@@ -117,20 +332,20 @@ class IpumsAsecCleaner:
         )
 
     def clean_variables(self):
-        self.df["Occupation"] = map_codes(self.ddi_codebook, self.df, "OCC2010")
-        self.df["Education"] = map_codes(self.ddi_codebook, self.df, "EDUC")
-        self.df["Birthplace"] = map_codes(self.ddi_codebook, self.df, "BPL")
-        self.df["Marital_Status"] = map_codes(self.ddi_codebook, self.df, "MARST")
-        self.df["Nativity"] = map_codes(self.ddi_codebook, self.df, "NATIVITY")
-        self.df["Class_of_worker"] = map_codes(self.ddi_codebook, self.df, "CLASSWKR")
-        self.df["Hispanic"] = map_codes(self.ddi_codebook, self.df, "HISPAN")
-        self.df["Labor Force"] = map_codes(self.ddi_codebook, self.df, "LABFORCE")
+        self.df["Occupation"] = self.map_codes("OCC2010")
+        self.df["Education"] = self.map_codes("EDUC")
+        self.df["Birthplace"] = self.map_codes("BPL")
+        self.df["Marital_Status"] = self.map_codes("MARST")
+        self.df["Nativity"] = self.map_codes("NATIVITY")
+        self.df["Class_of_worker"] = self.map_codes("CLASSWKR")
+        self.df["Hispanic"] = self.map_codes("HISPAN")
+        self.df["Labor Force"] = self.map_codes("LABFORCE")
         self.df["Hispanic or Not"] = np.where(
             self.df["Hispanic"] != "Not Hispanic", "Hispanic", "Not Hispanic"
         )
-        self.df["Asian"] = map_codes(self.ddi_codebook, self.df, "ASIAN")
-        self.df["Race"] = map_codes(self.ddi_codebook, self.df, "RACE")
-        self.df["Veteran_Status"] = map_codes(self.ddi_codebook, self.df, "VETSTAT")
+        self.df["Asian"] = self.map_codes("ASIAN")
+        self.df["Race"] = self.map_codes("RACE")
+        self.df["Veteran_Status"] = self.map_codes("VETSTAT")
         self.df["Age"] = self.df["AGE"].astype(float)
         self.df["Age Bucket"] = ""
         self.df.loc[(self.df["Age"] < 15), "Age Bucket"] = "<15"
@@ -147,43 +362,12 @@ class IpumsAsecCleaner:
         self.df["Age Bucket"] = pd.CategoricalIndex(
             self.df["Age Bucket"],
             ordered=True,
-            categories=["<15", "15-24", "25-54", "55-64", "65+"],
+            categories=AGE_BUCKETS,
         )
 
     def clean_wages(self):
         # Aggregating Wages
-        income_buckets = {
-            "INCSS": "Government",
-            "INCWELFR": "Government",
-            "INCRETIR": "Investment",
-            "INCSSI": "Government",
-            "INCINT": "Investment",
-            "INCUNEMP": "Government",
-            "INCWKCOM": "Wage",
-            "INCVET": "Government",
-            "INCSURV": "Government",
-            "INCDISAB": "Government",
-            "INCDIVID": "Investment",
-            "INCRENT": "Investment",
-            "INCEDUC": "Government",
-            "INCCHILD": "Government",
-            "INCASIST": "Government",
-            "INCOTHER": "Unknown",
-            "INCRANN": "Investment",
-            "INCPENS": "Wage",
-            "INCWAGE": "Wage",
-            "INCBUS": "Wage",
-            "INCFARM": "Wage",
-        }
-
-        column_to_bucket_map = {}
-        for bucket in set([income_buckets[k] for k in income_buckets]):
-            for k in income_buckets:
-                if income_buckets[k] == bucket:
-                    if bucket not in column_to_bucket_map:
-                        column_to_bucket_map[bucket] = [f"{k}"]
-                    else:
-                        column_to_bucket_map[bucket].append(f"{k}")
+        column_to_bucket_map = income_bucket_columns()
 
         for k in column_to_bucket_map:
             self.df[f"{k} Income"] = self.df[column_to_bucket_map[k]].sum(axis=1)
@@ -252,10 +436,3 @@ class IpumsAsecCleaner:
         self.df["Weighted Wage Income as Percent of Total Income"] = (
             self.df["Wage Income as Percent of Total Income"] * self.df["ASECWT"]
         )
-
-    def clean_data(self):
-        self.clean_variables()
-        self.clean_cps_income()
-        self.clean_educ_attainment()
-        self.clean_wages()
-        return self.df
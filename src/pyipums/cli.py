@@ -0,0 +1,453 @@
+"""
+Command line entry point for batch jobs over IPUMS extracts:
+
+    pyipums convert usa_00003.xml usa_00003.dat.gz usa_00003/
+    pyipums clean acs usa_00003.xml usa_00003/ cleaned.parquet
+    pyipums clean acs usa_00003.xml usa_00003.dat.gz out.parquet --memory-budget 4G
+    pyipums tabulate usa_00003.xml usa_00003/ STATEFIP --weight PERWT
+    pyipums validate usa_00003.xml usa_00003.dat.gz
+
+Every command reports rows/s, MB/s and peak memory on stderr.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .read_data import DEFAULT_CHUNKSIZE
+from .validation import SAMPLE_ROWS
+
+FILTER_PATTERN = re.compile(
+    r"^\s*(\w+)\s*(==|!=|<=|>=|<|>|=|not in\b|in\b)\s*(.+?)\s*$"
+)
+
+CLEANERS = {
+    "acs": "IpumsAcsCleaner",
+    "asec": "IpumsAsecCleaner",
+}
+
+
+def peak_memory_bytes() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _path_bytes(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+        )
+    return os.path.getsize(path)
+
+
+def input_bytes(ddi: Dict, data_path: str, n_rows: int) -> int:
+    # fixed-width throughput is measured over the uncompressed records
+    from .columnar import is_columnar
+
+    if is_columnar(data_path) or str(data_path).endswith(".parquet"):
+        return _path_bytes(data_path)
+    record_length = max(end for _, end in ddi["column_specs"])
+    return n_rows * (record_length + 1)
+
+
+def run_stats(command: str, n_rows: int, n_bytes: int, seconds: float) -> Dict:
+    seconds = max(seconds, 1e-9)
+    return {
+        "command": command,
+        "rows": n_rows,
+        "seconds": round(seconds, 4),
+        "rows_per_second": round(n_rows / seconds, 1),
+        "mb_per_second": round(n_bytes / 1e6 / seconds, 2),
+        "peak_memory_mb": (
+            None if peak_memory_bytes() is None else round(peak_memory_bytes() / 1e6, 1)
+        ),
+    }
+
+
+def format_stats(stats: Dict) -> str:
+    peak = stats["peak_memory_mb"]
+    text = (
+        f"{stats['command']}: {stats['rows']:,} rows in {stats['seconds']:.2f}s "
+        f"({stats['rows_per_second']:,.0f} rows/s, {stats['mb_per_second']:,.1f} MB/s"
+        f"), peak memory {'n/a' if peak is None else f'{peak:,.1f} MB'}"
+    )
+    if "blocks_skipped" in stats:
+        text += (
+            f", skipped {stats['blocks_skipped']:,} of {stats['blocks']:,} blocks"
+            f" ({stats['bytes_skipped'] / 1e6:,.1f} MB)"
+        )
+    return text
+
+
+def _columns(value: Optional[str]) -> Optional[List[str]]:
+    if not value:
+        return None
+    return [col.strip() for col in value.split(",") if col.strip()]
+
+
+def _scalar(text: str):
+    text = text.strip()
+    for parse in (int, float):
+        try:
+            return parse(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_filter(text: str) -> Tuple:
+    """``"AGE >= 25"`` or ``"STATEFIP in 6,36"`` as a filter predicate."""
+    match = FILTER_PATTERN.match(text)
+    if match is None:
+        raise argparse.ArgumentTypeError(f"cannot parse filter {text!r}")
+    name, op, value = match.groups()
+    if op in ("in", "not in"):
+        return name, op, [_scalar(v) for v in value.split(",") if v.strip()]
+    return name, op, _scalar(value)
+
+
+def load_frame(
+    ddi: Dict,
+    data_path: str,
+    columns: Optional[List[str]] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    jobs: int = 1,
+    filters: Optional[List[Tuple]] = None,
+    stats: Optional[Dict] = None,
+):
+    """
+    Read a fixed-width extract, a converted columnar directory or Parquet,
+    keeping the rows matching ``filters``. Columnar directories skip the
+    blocks their zone maps rule out and report them in ``stats``.
+    """
+    from .columnar import is_columnar, read_columnar
+
+    if is_columnar(data_path):
+        return read_columnar(data_path, columns, filters=filters, stats=stats)
+    if str(data_path).endswith(".parquet"):
+        import pandas as pd
+
+        return pd.read_parquet(data_path, columns=columns, filters=filters or None)
+    from .read_data import read_ipums_micro
+    from .zonemaps import filter_columns, filter_mask
+
+    read = columns
+    if columns is not None and filters:
+        read = columns + [c for c in filter_columns(filters) if c not in columns]
+    df = read_ipums_micro(ddi, data_path, columns=read, chunksize=chunksize, jobs=jobs)
+    if filters:
+        df = df[filter_mask(df, filters)].reset_index(drop=True)
+    return df if read is columns else df[columns]
+
+
+def write_frame(df, output: str, file_metadata: Optional[Dict] = None):
+    """Write by extension: .parquet, .csv[.gz], otherwise a columnar directory."""
+    if output.endswith(".parquet"):
+        df.to_parquet(output, index=False)
+    elif output.endswith((".csv", ".csv.gz")):
+        df.to_csv(output, index=False)
+    else:
+        from .columnar import write_columnar
+
+        write_columnar(df, output, file_metadata)
+
+
+def convert(args) -> Dict:
+    from .columnar import convert_extract, is_columnar, refresh_extract
+    from .parse_xml import read_ipums_ddi
+
+    ddi = read_ipums_ddi(args.ddi)
+    start = time.perf_counter()
+    refresh = args.refresh and is_columnar(args.output)
+    options = {
+        "columns": _columns(args.columns),
+        "chunksize": args.chunksize,
+        "jobs": args.jobs,
+    }
+    if refresh:
+        result = refresh_extract(ddi, args.data, args.output, **options)
+    else:
+        bitmap_columns = _columns(args.bitmap_index)
+        if bitmap_columns == ["auto"]:
+            from .bitmaps import bitmap_candidates
+
+            bitmap_columns = bitmap_candidates(ddi, options["columns"])
+        result = convert_extract(
+            ddi,
+            args.data,
+            args.output,
+            cluster_by=_columns(args.cluster_by),
+            bitmap_columns=bitmap_columns,
+            **options,
+        )
+    n_rows = result["n_rows"]
+    if refresh:
+        print(
+            f"refresh: {len(result['rewritten'])} columns decoded, "
+            f"{len(result['reused'])} reused",
+            file=sys.stderr,
+        )
+    return run_stats(
+        "refresh" if refresh else "convert",
+        n_rows,
+        input_bytes(ddi, args.data, n_rows),
+        time.perf_counter() - start,
+    )
+
+
+def plan_clean(ddi: Dict, args):
+    from .columnar import is_columnar
+    from .planner import plan_execution
+
+    if is_columnar(args.data) or str(args.data).endswith(".parquet"):
+        raise ValueError("--memory-budget plans reads of fixed-width extracts only")
+    return plan_execution(
+        ddi,
+        args.data,
+        _columns(args.columns),
+        CLEANERS[args.survey],
+        args.memory_budget,
+        args.cores,
+    )
+
+
+def clean(args) -> Dict:
+    from . import clean_data
+    from .parse_xml import read_ipums_ddi
+    from .profiling import StageProfiler
+
+    ddi = read_ipums_ddi(args.ddi)
+    cleaner = getattr(clean_data, CLEANERS[args.survey])
+    profiler = StageProfiler(memory="rss") if args.profile else None
+    start = time.perf_counter()
+    scan = {}
+    chunksize, jobs, plan = args.chunksize, args.jobs, None
+    if args.memory_budget:
+        plan = plan_clean(ddi, args)
+        chunksize, jobs = plan.chunksize, plan.jobs
+        print(f"plan: {plan.describe()}", file=sys.stderr)
+    whole_frame = args.filter or args.profile or args.backend != "pandas"
+    if plan is not None and not whole_frame:
+        from .planner import read_planned
+
+        # chunks are decoded and cleaned together, plan.workers at a time
+        df, _ = read_planned(ddi, args.data, plan)
+        scan["planned_peak_mb"] = round(plan.estimated_peak / 1e6, 1)
+    else:
+        df = load_frame(
+            ddi,
+            args.data,
+            _columns(args.columns),
+            chunksize,
+            jobs,
+            args.filter,
+            scan,
+        )
+        df = cleaner(
+            df, ddi["codebook"], observer=profiler, backend=args.backend
+        ).clean_data()
+    if profiler is not None:
+        print(profiler.report(), file=sys.stderr)
+    if args.backend == "arrow" and args.output.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        pq.write_table(df, args.output)
+    else:
+        if args.backend == "arrow":
+            df = df.to_pandas()
+        write_frame(df, args.output, ddi.get("file_metadata"))
+    stats = run_stats(
+        f"clean {args.survey}",
+        len(df),
+        input_bytes(ddi, args.data, len(df)),
+        time.perf_counter() - start,
+    )
+    return {**stats, **scan}
+
+
+def tabulate(args) -> Dict:
+    from .parse_xml import read_ipums_ddi
+    from .tabulate import pt
+    from .variance import replicate_weight_columns
+
+    ddi = read_ipums_ddi(args.ddi)
+    repwts = None
+    if args.repwts:
+        repwts = replicate_weight_columns(ddi["columns"], args.repwts)
+    columns = [args.xvar] + [c for c in [args.weight] if c] + (repwts or [])
+
+    start = time.perf_counter()
+    scan = {}
+    df = load_frame(
+        ddi, args.data, columns, args.chunksize, args.jobs, args.filter, scan
+    )
+    table = pt(
+        ddi["codebook"], df, args.xvar, args.weight, repwts, args.method, args.backend
+    )
+    if args.output:
+        table.to_csv(args.output, index=False)
+    else:
+        table.to_csv(sys.stdout, index=False)
+    stats = run_stats(
+        "tabulate",
+        len(df),
+        input_bytes(ddi, args.data, len(df)),
+        time.perf_counter() - start,
+    )
+    return {**stats, **scan}
+
+
+def validate(args) -> Dict:
+    from .parse_xml import read_ipums_ddi
+    from .read_data import iter_ipums_micro
+    from .validation import ConformanceReport
+
+    ddi = read_ipums_ddi(args.ddi)
+    columns = _columns(args.columns)
+    report = ConformanceReport(ddi, samples=args.samples)
+    start = time.perf_counter()
+    # the frames are only decoded for the checks made along the way
+    for _ in iter_ipums_micro(
+        ddi,
+        args.data,
+        columns,
+        chunksize=args.chunksize,
+        jobs=args.jobs,
+        validate=report,
+    ):
+        pass
+    summary = report.summary()
+    summary.to_csv(args.output if args.output else sys.stdout)
+    stats = run_stats(
+        "validate",
+        report.n_rows,
+        input_bytes(ddi, args.data, report.n_rows),
+        time.perf_counter() - start,
+    )
+    return {**stats, "violations": report.n_violations}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="pyipums", description="Convert, clean and tabulate IPUMS extracts."
+    )
+    # every subcommand takes these; one that doesn't apply is ignored, like
+    # --columns by tabulate or --chunksize for columnar and Parquet input
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--columns", help="comma separated variables to read")
+    common.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    common.add_argument(
+        "--jobs", type=int, default=1, help="threads used to decode columns"
+    )
+    common.add_argument("--stats", help="also write the run statistics to this JSON file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser(
+        "convert",
+        parents=[common],
+        help="convert a fixed-width extract to a columnar directory or .parquet",
+    )
+    p.add_argument("ddi", help="DDI codebook (.xml)")
+    p.add_argument("data", help="fixed-width data file (.dat or .dat.gz)")
+    p.add_argument("output", help="output directory, or a .parquet file")
+    p.add_argument(
+        "--refresh",
+        action="store_true",
+        help="update an existing output directory, decoding only changed columns",
+    )
+    p.add_argument(
+        "--cluster-by", help="comma separated variables to sort the rows by"
+    )
+    p.add_argument(
+        "--bitmap-index",
+        help="comma separated variables to index, or 'auto' for the DDI's "
+        "low-cardinality categorical variables",
+    )
+    p.set_defaults(func=convert)
+
+    p = commands.add_parser(
+        "clean", parents=[common], help="run the ACS or CPS ASEC cleaner"
+    )
+    p.add_argument("survey", choices=sorted(CLEANERS))
+    p.add_argument("ddi", help="DDI codebook (.xml)")
+    p.add_argument("data", help="fixed-width file, columnar directory or .parquet")
+    p.add_argument("output", help="output directory, .parquet or .csv[.gz] file")
+    p.add_argument(
+        "--profile", action="store_true", help="print per-stage timings and RSS deltas"
+    )
+    p.add_argument("--backend", default="pandas", choices=["pandas", "arrow"])
+    p.add_argument(
+        "--filter",
+        action="append",
+        type=parse_filter,
+        help='keep rows matching e.g. "AGE >= 25" or "STATEFIP in 6,36"; repeatable',
+    )
+    p.add_argument(
+        "--memory-budget",
+        help='e.g. "4G": pick --chunksize, --jobs and the chunks cleaned at once '
+        "to stay within it",
+    )
+    p.add_argument(
+        "--cores", type=int, help="cores for --memory-budget plans (default: all)"
+    )
+    p.set_defaults(func=clean)
+
+    p = commands.add_parser(
+        "tabulate", parents=[common], help="weighted frequency table as CSV"
+    )
+    p.add_argument("ddi", help="DDI codebook (.xml)")
+    p.add_argument("data", help="fixed-width file, columnar directory or .parquet")
+    p.add_argument("xvar", help="variable to tabulate")
+    p.add_argument("--weight", help="weight variable, e.g. PERWT or ASECWT")
+    p.add_argument(
+        "--repwts", help="replicate weight prefix for standard errors, e.g. REPWTP"
+    )
+    p.add_argument("--method", default="sdr", choices=["sdr", "jk1"])
+    p.add_argument("--backend", default="pandas", choices=["pandas", "arrow"])
+    p.add_argument("--output", help="CSV file to write instead of stdout")
+    p.add_argument(
+        "--filter",
+        action="append",
+        type=parse_filter,
+        help='keep rows matching e.g. "AGE >= 25" or "STATEFIP in 6,36"; repeatable',
+    )
+    p.set_defaults(func=tabulate)
+
+    p = commands.add_parser(
+        "validate",
+        parents=[common],
+        help="count values outside each variable's DDI categories or format",
+    )
+    p.add_argument("ddi", help="DDI codebook (.xml)")
+    p.add_argument("data", help="fixed-width data file (.dat or .dat.gz)")
+    p.add_argument(
+        "--samples",
+        type=int,
+        default=SAMPLE_ROWS,
+        help="row offsets to list per variable",
+    )
+    p.add_argument("--output", help="CSV file to write instead of stdout")
+    p.set_defaults(func=validate)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    stats = args.func(args)
+    print(format_stats(stats), file=sys.stderr)
+    if args.stats:
+        with open(args.stats, "w") as fp:
+            json.dump(stats, fp, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+# NumPy is imported where the code arrays are first needed, so parsing a
+# codebook needs nothing beyond the standard library
+
+Code = Union[int, float, str]
+
+
+def parse_code(value: str) -> Code:
+    # catValu is text such as "01" or "9999999"; keep non-numeric codes as-is
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            pass
+    return value
+
+
+def labelled_categories(var_dict: Dict) -> List[Tuple[str, str]]:
+    """
+    The ``(catValu text, label)`` pairs of a parsed DDI variable. Some
+    variables list bare codes with empty labels; they carry no label and are
+    left out.
+    """
+    return [
+        (meta["category_value"], meta["category_label"])
+        for meta in var_dict.get("field_metadata", [])
+        if meta.get("category_label")
+    ]
+
+
+class VariableInfo:
+    """
+    One codebook variable. ``codes`` maps label -> code like ipumspy's
+    VariableDescription; ``code_values``/``code_labels`` hold the same
+    categories sorted by code for vectorized lookups.
+    """
+
+    __slots__ = (
+        "name",
+        "label",
+        "description",
+        "concept",
+        "field_type",
+        "data_type",
+        "start",
+        "end",
+        "decimals",
+        "dtype",
+        "codes",
+        "labels_by_code",
+        "_code_values",
+        "_code_labels",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        categories: List,
+        label: Optional[str] = None,
+        description: Optional[str] = None,
+        concept: Optional[str] = None,
+        field_type: Optional[str] = None,
+        data_type: Optional[str] = None,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        decimals: int = 0,
+        dtype: Optional[str] = None,
+    ):
+        self.name = name
+        self.label = label
+        self.description = description
+        self.concept = concept
+        self.field_type = field_type
+        self.data_type = data_type
+        self.start = start
+        self.end = end
+        self.decimals = decimals
+        self.dtype = dtype
+        self.codes = {}
+        self.labels_by_code = {}
+        for code, code_label in categories:
+            self.codes[code_label] = code
+            self.labels_by_code[code] = code_label
+
+        self._code_values = None
+        self._code_labels = None
+
+    def _build_code_arrays(self):
+        import numpy as np
+
+        codes = list(self.labels_by_code)
+        code_labels = np.array(list(self.labels_by_code.values()), dtype=object)
+        if codes and all(isinstance(c, (int, float)) for c in codes):
+            values = np.array(codes)
+            order = np.argsort(values, kind="stable")
+            self._code_values = values[order]
+            self._code_labels = code_labels[order]
+        else:
+            self._code_values = np.array(codes, dtype=object)
+            self._code_labels = code_labels
+
+    @property
+    def code_values(self):
+        if self._code_values is None:
+            self._build_code_arrays()
+        return self._code_values
+
+    @property
+    def code_labels(self):
+        if self._code_labels is None:
+            self._build_code_arrays()
+        return self._code_labels
+
+    def __repr__(self) -> str:
+        return f"VariableInfo({self.name!r}, {len(self.codes)} categories)"
+
+    def label_for(self, code: Code) -> Optional[str]:
+        return self.labels_by_code.get(code)
+
+    def code_for(self, label: str) -> Optional[Code]:
+        return self.codes.get(label)
+
+    def map_labels(self, values):
+        """
+        Category labels for an array of codes, ``None`` where a code has no
+        label. Numeric codes are matched with a binary search over the sorted
+        code array rather than a Python-level dict lookup per row.
+        """
+        import numpy as np
+
+        values = np.asarray(values)
+        out = np.full(len(values), None, dtype=object)
+        if not len(self.code_values):
+            return out
+        if self.code_values.dtype.kind in "iuf" and values.dtype.kind in "iuf":
+            pos = np.searchsorted(self.code_values, values)
+            np.minimum(pos, len(self.code_values) - 1, out=pos)
+            found = self.code_values[pos] == values
+            out[found] = self.code_labels[pos[found]]
+            return out
+        for i, value in enumerate(values):
+            out[i] = self.labels_by_code.get(value)
+        return out
+
+
+class Codebook:
+    """
+    Indexed view of a parsed DDI codebook with O(1) variable lookups by name.
+    ``get_variable_info`` mirrors ipumspy's Codebook so either can be passed
+    to the cleaners and tabulation helpers.
+    """
+
+    __slots__ = ("file_metadata", "variables")
+
+    def __init__(self, variables: List[VariableInfo], file_metadata: Dict = None):
+        self.file_metadata = file_metadata or {}
+        self.variables = {var.name: var for var in variables}
+
+    def __getitem__(self, name: str) -> VariableInfo:
+        return self.variables[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.variables
+
+    def __iter__(self) -> Iterator[VariableInfo]:
+        return iter(self.variables.values())
+
+    def __len__(self) -> int:
+        return len(self.variables)
+
+    def get_variable_info(self, name: str) -> VariableInfo:
+        return self.variables[name]
+
+    def label_for(self, name: str, code: Code) -> Optional[str]:
+        return self.variables[name].label_for(code)
+
+    def code_for(self, name: str, label: str) -> Optional[Code]:
+        return self.variables[name].code_for(label)
+
+    @classmethod
+    def from_ddi_dict(cls, ddi_dict: Dict) -> "Codebook":
+        variables = []
+        for name, (start, end) in zip(ddi_dict["columns"], ddi_dict["column_specs"]):
+            var_dict = ddi_dict[name]
+            categories = [
+                (parse_code(value), label)
+                for value, label in labelled_categories(var_dict)
+            ]
+            variables.append(
+                VariableInfo(
+                    name,
+                    categories,
+                    label=var_dict.get("label"),
+                    description=var_dict.get("description"),
+                    concept=var_dict.get("concept"),
+                    field_type=var_dict.get("field_type"),
+                    data_type=var_dict.get("data_type"),
+                    start=start,
+                    end=end,
+                    decimals=var_dict.get("decimals", 0),
+                    dtype=var_dict.get("dtype"),
+                )
+            )
+        return cls(variables, ddi_dict.get("file_metadata"))
+
+    @classmethod
+    def from_ipumspy(cls, ipumspy_codebook) -> "Codebook":
+        variables = [
+            VariableInfo(
+                var.name,
+                [(code, lbl) for lbl, code in var.codes.items() if lbl],
+                label=var.label,
+                description=var.description,
+                concept=var.concept,
+                data_type=var.vartype,
+                start=var.start,
+                end=var.end,
+                decimals=var.shift or 0,
+            )
+            for var in ipumspy_codebook.data_description
+        ]
+        return cls(variables)
+
+
+def as_codebook(ddi) -> Codebook:
+    """Accept a pyipums Codebook, a read_ipums_ddi dict or an ipumspy Codebook."""
+    if isinstance(ddi, Codebook):
+        return ddi
+    if isinstance(ddi, dict):
+        if ddi.get("codebook") is not None:
+            return ddi["codebook"]
+        return Codebook.from_ddi_dict(ddi)
+    return Codebook.from_ipumspy(ddi)
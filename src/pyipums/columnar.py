@@ -0,0 +1,735 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .read_data import (
+    DEFAULT_CHUNKSIZE,
+    decode_records,
+    iter_ipums_micro,
+    iter_record_chunks,
+)
+from .zonemaps import (
+    DEFAULT_BLOCK_ROWS,
+    block_may_match,
+    build_zone_map,
+    evaluate,
+    filter_columns,
+    n_blocks,
+    normalize_filters,
+)
+
+MANIFEST_FILE = "manifest.json"
+FORMAT_NAME = "pyipums-columnar"
+FORMAT_VERSION = 1
+CHECKSUM_BYTES = 16
+VERIFY_BLOCK_SIZE = 2**20
+
+
+def _column_file(index: int, name: str) -> str:
+    return f"{index:04d}_{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}.bin"
+
+
+def _checksum(data: bytes = b""):
+    return hashlib.blake2b(data, digest_size=CHECKSUM_BYTES)
+
+
+def _digest(value) -> str:
+    return _checksum(json.dumps(value, sort_keys=True).encode()).hexdigest()
+
+
+def column_fingerprint(ddi: Dict, name: str) -> Dict:
+    """
+    Fingerprints of what a column's stored values depend on in the codebook
+    (``spec``: width, implied decimals, type and dtype, but not its position)
+    and of its value labels (``categories``).
+    """
+    start, end = ddi["column_specs"][ddi["columns"].index(name)]
+    var = ddi[name]
+    spec = {
+        "width": end - start,
+        "decimals": var.get("decimals") or 0,
+        "data_type": var.get("data_type"),
+        "dtype": ddi.get("dtypes", {}).get(name),
+    }
+    categories = [
+        [category["category_value"], category["category_label"]]
+        for category in var.get("field_metadata", [])
+        if "category_value" in category
+    ]
+    return {"spec": _digest(spec), "categories": _digest(categories)}
+
+
+def ddi_fingerprint(ddi: Dict) -> str:
+    return _digest(
+        [
+            ddi["columns"],
+            [list(spec) for spec in ddi["column_specs"]],
+            [column_fingerprint(ddi, col) for col in ddi["columns"]],
+        ]
+    )
+
+
+def _update_field_checksums(checksums: Dict, records: np.ndarray, ddi: Dict):
+    for name, checksum in checksums.items():
+        start, end = ddi["column_specs"][ddi["columns"].index(name)]
+        checksum.update(np.ascontiguousarray(records[:, start:end]).tobytes())
+
+
+def file_checksum(file_path: str) -> str:
+    checksum = _checksum()
+    with open(file_path, "rb") as fp:
+        for block in iter(lambda: fp.read(VERIFY_BLOCK_SIZE), b""):
+            checksum.update(block)
+    return checksum.hexdigest()
+
+
+def write_manifest(path: str, manifest: Dict):
+    # readers never see a half-written manifest
+    tmp_path = os.path.join(path, MANIFEST_FILE + ".tmp")
+    with open(tmp_path, "w") as fp:
+        json.dump(manifest, fp, indent=2)
+    os.replace(tmp_path, os.path.join(path, MANIFEST_FILE))
+
+
+def read_manifest(path: str) -> Dict:
+    with open(os.path.join(path, MANIFEST_FILE)) as fp:
+        manifest = json.load(fp)
+    if manifest.get("format") != FORMAT_NAME:
+        raise ValueError(f"{path} is not a {FORMAT_NAME} directory")
+    return manifest
+
+
+def is_columnar(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+
+class ColumnarWriter:
+    """
+    Append DataFrame chunks to a directory holding one raw binary file per
+    column plus a JSON manifest. Numeric columns are stored as-is so they can
+    be memory-mapped back; text and categorical columns are dictionary
+    encoded as int32 codes (-1 for missing) with their categories in the
+    manifest. Each column's checksum is recorded so cached output can be
+    verified, along with any ``sources`` provenance set before closing.
+
+    On closing, rows are sorted by the ``cluster_by`` columns when given, a
+    zone map is recorded for every ``block_rows`` rows of each column and the
+    ``bitmap_columns`` get bitmap indexes (see ``pyipums.bitmaps``).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        file_metadata: Optional[Dict] = None,
+        ddi_fingerprint: Optional[str] = None,
+        block_rows: Optional[int] = DEFAULT_BLOCK_ROWS,
+        cluster_by: Optional[List[str]] = None,
+        bitmap_columns: Optional[List[str]] = None,
+    ):
+        self.path = path
+        self.file_metadata = file_metadata or {}
+        self.ddi_fingerprint = ddi_fingerprint
+        self.block_rows = block_rows
+        self.cluster_by = list(cluster_by or [])
+        self.bitmap_columns = list(bitmap_columns or [])
+        self.n_rows = 0
+        self.columns = {}
+        self.sources = {}
+        self._files = {}
+        self._checksums = {}
+        self._categories = {}
+        os.makedirs(path, exist_ok=True)
+
+    def _open(self, name: str, kind: str, dtype: str, categorical: bool = False):
+        index = len(self.columns)
+        spec = {"file": _column_file(index, name), "kind": kind, "dtype": dtype}
+        if kind == "dictionary":
+            spec["categorical"] = categorical
+            self._categories[name] = {}
+        self.columns[name] = spec
+        self._files[name] = open(os.path.join(self.path, spec["file"]), "wb")
+        self._checksums[name] = _checksum()
+        return spec
+
+    def _dictionary_codes(self, name: str, values: pd.Series) -> np.ndarray:
+        codes, uniques = pd.factorize(values)
+        lookup = self._categories[name]
+        remap = np.array(
+            [lookup.setdefault(u, len(lookup)) for u in uniques] + [-1],
+            dtype=np.int32,
+        )
+        # factorize marks missing values -1, which indexes the trailing -1
+        return remap[codes]
+
+    def append(self, df: pd.DataFrame):
+        if self.columns and list(df.columns) != list(self.columns):
+            raise ValueError("chunk columns do not match the columns already written")
+        for name in df.columns:
+            values = df[name]
+            spec = self.columns.get(name)
+            if spec is None:
+                if values.dtype.kind in "biuf":
+                    spec = self._open(name, "numeric", values.dtype.str)
+                else:
+                    categorical = isinstance(values.dtype, pd.CategoricalDtype)
+                    spec = self._open(name, "dictionary", "<i4", categorical)
+
+            if spec["kind"] == "numeric":
+                dtype = np.promote_types(spec["dtype"], values.dtype)
+                if dtype != np.dtype(spec["dtype"]):
+                    self._promote(name, dtype)
+                array = values.to_numpy().astype(spec["dtype"], copy=False)
+            else:
+                array = self._dictionary_codes(name, values)
+            data = np.ascontiguousarray(array).tobytes()
+            self._files[name].write(data)
+            self._checksums[name].update(data)
+        self.n_rows += len(df)
+
+    def _promote(self, name: str, dtype: np.dtype):
+        # a chunk with blank fields decodes to floats; rewrite the rows
+        # written so far so that the column keeps a single dtype
+        self._files[name].close()
+        values = self._load(name).astype(dtype)
+        spec = self.columns[name]
+        spec["dtype"] = dtype.str
+        file_path = os.path.join(self.path, spec["file"])
+        values.tofile(file_path)
+        self._checksums[name] = _checksum(memoryview(values))
+        self._files[name] = open(file_path, "ab")
+
+    def _load(self, name: str) -> np.ndarray:
+        spec = self.columns[name]
+        return np.fromfile(os.path.join(self.path, spec["file"]), dtype=spec["dtype"])
+
+    def _sort_key(self, name: str) -> np.ndarray:
+        values = self._load(name)
+        if self.columns[name]["kind"] == "numeric":
+            return values
+        # order dictionary codes by their values, missing (-1) last
+        categories = np.array(list(self._categories[name]) + [None], dtype=object)
+        try:
+            order = np.argsort(categories[:-1], kind="stable")
+        except TypeError:
+            order = np.arange(len(categories) - 1)
+        ranks = np.empty(len(categories), dtype=np.intp)
+        ranks[order] = np.arange(len(order))
+        ranks[-1] = len(order)
+        return ranks[values]
+
+    def _finish_columns(self):
+        from .bitmaps import bitmap_file, build_bitmaps
+
+        unknown = [
+            name
+            for name in self.cluster_by + self.bitmap_columns
+            if name not in self.columns
+        ]
+        if unknown and self.n_rows:
+            raise KeyError(f"{unknown} were not written")
+        order = None
+        if self.cluster_by and self.n_rows:
+            # lexsort sorts on its last key first, and is stable
+            order = np.lexsort([self._sort_key(n) for n in reversed(self.cluster_by)])
+        if order is None and not self.block_rows and not self.bitmap_columns:
+            return
+        for name, spec in self.columns.items():
+            values = self._load(name)
+            if order is not None:
+                values = values[order]
+                values.tofile(os.path.join(self.path, spec["file"]))
+                self._checksums[name] = _checksum(memoryview(values))
+            if self.block_rows:
+                spec["zones"] = build_zone_map(
+                    values, self.block_rows, spec["kind"] == "dictionary"
+                )
+            if name in self.bitmap_columns:
+                codes, bits = build_bitmaps(name, values, spec["kind"] == "dictionary")
+                spec["bitmap"] = {
+                    "file": bitmap_file(spec["file"]),
+                    "codes": codes.tolist(),
+                }
+                bits.tofile(os.path.join(self.path, spec["bitmap"]["file"]))
+
+    def close(self) -> Dict:
+        for fp in self._files.values():
+            fp.close()
+        self._finish_columns()
+        for name, checksum in self._checksums.items():
+            self.columns[name]["checksum"] = checksum.hexdigest()
+        for name, lookup in self._categories.items():
+            self.columns[name]["categories"] = [
+                v.item() if isinstance(v, np.generic) else v for v in lookup
+            ]
+        for name, source in self.sources.items():
+            self.columns[name]["source"] = source
+        manifest = {
+            "format": FORMAT_NAME,
+            "version": FORMAT_VERSION,
+            "n_rows": self.n_rows,
+            "columns": self.columns,
+            "file_metadata": self.file_metadata,
+        }
+        if self.block_rows:
+            manifest["block_rows"] = self.block_rows
+        if self.cluster_by:
+            manifest["cluster_by"] = self.cluster_by
+        if self.ddi_fingerprint is not None:
+            manifest["ddi_fingerprint"] = self.ddi_fingerprint
+        write_manifest(self.path, manifest)
+        return manifest
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_columnar(
+    df: pd.DataFrame,
+    path: str,
+    file_metadata: Optional[Dict] = None,
+    cluster_by: Optional[List[str]] = None,
+):
+    with ColumnarWriter(path, file_metadata, cluster_by=cluster_by) as writer:
+        writer.append(df)
+
+
+def read_column(path: str, name: str, manifest: Optional[Dict] = None, mmap: bool = True):
+    manifest = manifest or read_manifest(path)
+    spec = manifest["columns"][name]
+    file_path = os.path.join(path, spec["file"])
+    dtype = np.dtype(spec["dtype"])
+    if mmap and manifest["n_rows"]:
+        values = np.memmap(file_path, dtype=dtype, mode="r", shape=(manifest["n_rows"],))
+    else:
+        values = np.fromfile(file_path, dtype=dtype)
+
+    if spec["kind"] == "dictionary":
+        categories = pd.Index(spec["categories"], dtype=object)
+        values = pd.Categorical.from_codes(np.asarray(values), categories=categories)
+        if not spec.get("categorical"):
+            values = values.to_numpy(dtype=object, na_value=None)
+    return values
+
+
+def _block_rows(blocks: np.ndarray, block_rows: int, n_rows: int) -> np.ndarray:
+    if not len(blocks):
+        return np.empty(0, dtype=np.intp)
+    rows = (blocks[:, None] * block_rows + np.arange(block_rows)).ravel()
+    return rows[rows < n_rows]
+
+
+def select_rows(
+    path: str,
+    filters,
+    manifest: Optional[Dict] = None,
+    mmap: bool = True,
+    stats: Optional[Dict] = None,
+) -> np.ndarray:
+    """
+    Row numbers matching ``filters``. Predicates on columns with a bitmap
+    index resolve to rows by bitwise AND/OR without reading any column; for
+    the other predicates, blocks whose zone maps rule them out are skipped
+    and the filter columns are read only at the remaining candidate rows.
+    ``stats`` receives the ``blocks`` count, ``blocks_skipped`` (neither
+    scanned nor holding a match) and the ``rows_skipped`` in those blocks.
+    """
+    manifest = manifest or read_manifest(path)
+    n_rows = manifest["n_rows"]
+    size = manifest.get("block_rows") or max(n_rows, 1)
+    count = n_blocks(n_rows, size)
+    indexed_columns = [
+        name for name, spec in manifest["columns"].items() if "bitmap" in spec
+    ]
+    if indexed_columns:
+        from .bitmaps import BitmapIndex
+
+        index = BitmapIndex(path, manifest)
+
+    matched = np.zeros(n_rows, dtype=bool)
+    scanned = np.zeros(count, dtype=bool)
+    for conjunction in normalize_filters(filters):
+        indexed = [p for p in conjunction if p[0] in indexed_columns]
+        rest = [p for p in conjunction if p[0] not in indexed_columns]
+        candidates = index.mask([indexed]) if indexed else None
+        if not rest:
+            matched |= candidates
+            continue
+        may = np.ones(count, dtype=bool)
+        for name, op, value in rest:
+            may &= block_may_match(manifest["columns"][name], count, op, value)
+        rows = _block_rows(np.flatnonzero(may), size, n_rows)
+        if candidates is not None:
+            rows = rows[candidates[rows]]
+        scanned[rows // size] = True
+        selected = np.ones(len(rows), dtype=bool)
+        for name, op, value in rest:
+            values = np.asarray(read_column(path, name, manifest, mmap)[rows])
+            selected &= evaluate(values, op, value)
+        matched[rows[selected]] = True
+
+    rows = np.flatnonzero(matched)
+    if stats is not None:
+        scanned[rows // size] = True
+        lengths = np.minimum(size, n_rows - np.arange(count) * size)
+        stats.update(
+            {
+                "blocks": count,
+                "blocks_skipped": int(count - scanned.sum()),
+                "rows_skipped": int(lengths[~scanned].sum()),
+            }
+        )
+    return rows
+
+
+def read_columnar(
+    path: str,
+    columns: Optional[List[str]] = None,
+    mmap: bool = True,
+    filters=None,
+    stats: Optional[Dict] = None,
+) -> pd.DataFrame:
+    """
+    Read a columnar directory, optionally only the rows matching pyarrow-style
+    ``filters`` (see ``pyipums.zonemaps``). ``stats`` receives the blocks
+    skipped and the ``bytes_skipped`` of the columns read.
+    """
+    manifest = read_manifest(path)
+    if columns is None:
+        columns = list(manifest["columns"])
+    if not filters:
+        return pd.DataFrame(
+            {name: read_column(path, name, manifest, mmap) for name in columns},
+            columns=columns,
+        )
+    scan = {}
+    rows = select_rows(path, filters, manifest, mmap, scan)
+    df = pd.DataFrame(
+        {name: read_column(path, name, manifest, mmap)[rows] for name in columns},
+        columns=columns,
+    )
+    if stats is not None:
+        read = set(columns) | set(filter_columns(filters))
+        row_bytes = sum(
+            np.dtype(manifest["columns"][name]["dtype"]).itemsize for name in read
+        )
+        scan["bytes_skipped"] = scan["rows_skipped"] * row_bytes
+        stats.update(scan)
+    return df
+
+
+def _decoded_chunks(
+    ddi: Dict,
+    data_file_path: str,
+    columns: List[str],
+    chunksize: int,
+    jobs: int,
+    checksums: Dict,
+) -> Iterator[Tuple[int, Optional[pd.DataFrame]]]:
+    """
+    Record counts and decoded ``columns`` of a rectangular extract, chunk by
+    chunk, checksumming the raw field bytes of the columns in ``checksums``.
+    """
+    for records in iter_record_chunks(data_file_path, chunksize):
+        _update_field_checksums(checksums, records, ddi)
+        frame = decode_records(records, ddi, columns, jobs=jobs) if columns else None
+        yield len(records), frame
+
+
+def _sources(ddi: Dict, checksums: Dict) -> Dict:
+    return {
+        name: {**column_fingerprint(ddi, name), "bytes": checksum.hexdigest()}
+        for name, checksum in checksums.items()
+    }
+
+
+def convert_extract(
+    ddi: Dict,
+    data_file_path: str,
+    path: str,
+    columns: Optional[List[str]] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    jobs: int = 1,
+    cluster_by: Optional[List[str]] = None,
+    block_rows: Optional[int] = DEFAULT_BLOCK_ROWS,
+    bitmap_columns: Optional[List[str]] = None,
+) -> Dict:
+    """
+    Stream a fixed-width extract into ``path``: a columnar directory, or a
+    Parquet file when ``path`` ends in ``.parquet`` (requires pyarrow).
+    Columnar directories of rectangular extracts record each column's
+    codebook fingerprint and raw field checksum for ``refresh_extract``,
+    and zone maps of every ``block_rows`` rows, sorted by ``cluster_by``,
+    with bitmap indexes on ``bitmap_columns`` (e.g. from
+    ``pyipums.bitmaps.bitmap_candidates``).
+    """
+    from .hierarchical import is_hierarchical
+
+    checksums = {}
+    if is_hierarchical(ddi):
+        chunks = iter_ipums_micro(
+            ddi, data_file_path, columns, chunksize=chunksize, jobs=jobs
+        )
+    else:
+        columns = ddi["columns"] if columns is None else columns
+        checksums = {name: _checksum() for name in columns}
+        chunks = (
+            frame
+            for _, frame in _decoded_chunks(
+                ddi, data_file_path, columns, chunksize, jobs, checksums
+            )
+        )
+    if str(path).endswith(".parquet"):
+        if cluster_by or bitmap_columns:
+            raise ValueError(
+                "cluster_by and bitmap_columns apply to columnar directories"
+            )
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        n_rows, writer = 0, None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                else:
+                    # blank fields turn a chunk's integers into floats with
+                    # NaN, which Arrow stores as nulls of the first dtype
+                    table = table.cast(writer.schema)
+                writer.write_table(table)
+                n_rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return {"n_rows": n_rows}
+
+    with ColumnarWriter(
+        path,
+        ddi.get("file_metadata"),
+        ddi_fingerprint(ddi),
+        block_rows,
+        cluster_by,
+        bitmap_columns,
+    ) as writer:
+        for chunk in chunks:
+            writer.append(chunk)
+        writer.sources = _sources(ddi, checksums)
+    return {"n_rows": writer.n_rows}
+
+
+def verify_columnar(
+    path: str, columns: Optional[List[str]] = None
+) -> Dict[str, Optional[bool]]:
+    """
+    Whether each column file still matches the checksum recorded when it was
+    written; None for output written before checksums were recorded.
+    """
+    manifest = read_manifest(path)
+    if columns is None:
+        columns = list(manifest["columns"])
+    out = {}
+    for name in columns:
+        spec = manifest["columns"][name]
+        file_path = os.path.join(path, spec["file"])
+        if "checksum" not in spec:
+            out[name] = None
+        elif not os.path.isfile(file_path):
+            out[name] = False
+        else:
+            out[name] = file_checksum(file_path) == spec["checksum"]
+    return out
+
+
+def codebook_changes(
+    manifest: Dict, ddi: Dict, columns: Optional[List[str]] = None
+) -> Dict[str, str]:
+    """
+    How ``ddi`` differs from the codebook a columnar directory was converted
+    with, for the columns that changed: "added" (not converted yet),
+    "removed" (gone from ``ddi``), "spec" (decoded differently), "categories"
+    (only the value labels changed) or "unknown" (no fingerprint stored).
+    """
+    if columns is None:
+        columns = ddi["columns"]
+    changes = {}
+    for name, spec in manifest["columns"].items():
+        if name not in ddi["columns"]:
+            changes[name] = "removed"
+    for name in columns:
+        spec = manifest["columns"].get(name)
+        if spec is None:
+            changes[name] = "added"
+            continue
+        source = spec.get("source")
+        fingerprint = column_fingerprint(ddi, name)
+        if source is None:
+            changes[name] = "unknown"
+        elif source["spec"] != fingerprint["spec"]:
+            changes[name] = "spec"
+        elif source["categories"] != fingerprint["categories"]:
+            changes[name] = "categories"
+    return changes
+
+
+def _spec_files(spec: Dict) -> List[str]:
+    return [spec["file"]] + ([spec["bitmap"]["file"]] if "bitmap" in spec else [])
+
+
+def _column_index(spec: Dict) -> int:
+    return int(spec["file"].split("_", 1)[0])
+
+
+def refresh_extract(
+    ddi: Dict,
+    data_file_path: str,
+    path: str,
+    columns: Optional[List[str]] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    jobs: int = 1,
+    verify: bool = True,
+) -> Dict:
+    """
+    Update a columnar directory for a re-issued extract (a revised DDI and
+    data file), decoding again only the columns whose codebook spec or raw
+    field bytes changed, or whose cached file fails its checksum; the other
+    files are kept as they are. ``columns`` defaults to the converted
+    columns still in ``ddi``.
+
+    One pass over the data checksums every field and decodes the columns the
+    codebook alone shows to be stale; a second pass runs only when the field
+    checksums find columns whose data changed. The new manifest replaces the
+    old one in a single rename, after which stale files are deleted.
+
+    Returns the ``n_rows`` and the columns "reused", "rewritten" (with the
+    reason: "added", "spec", "unknown", "checksum" or "data"), "relabelled"
+    (new value labels only) and "removed".
+    """
+    from .bitmaps import bitmap_file
+    from .hierarchical import is_hierarchical
+
+    if is_hierarchical(ddi):
+        raise ValueError(
+            "Only rectangular extracts can be refreshed; convert hierarchical "
+            "extracts again with convert_extract"
+        )
+    manifest = read_manifest(path)
+    if manifest.get("cluster_by"):
+        raise ValueError(
+            "Clustered output changes row order with the data; convert it again"
+        )
+    block_rows = manifest.get("block_rows")
+    indexed = [name for name, spec in manifest["columns"].items() if "bitmap" in spec]
+    if columns is None:
+        columns = [name for name in manifest["columns"] if name in ddi["columns"]]
+    changes = codebook_changes(manifest, ddi, columns)
+    cached = [name for name in columns if name in manifest["columns"]]
+    intact = verify_columnar(path, cached) if verify else {}
+
+    stale = {}
+    for name in columns:
+        if changes.get(name) in ("added", "spec", "unknown"):
+            stale[name] = changes[name]
+        elif verify and not intact[name]:
+            stale[name] = "checksum"
+
+    checksums = {name: _checksum() for name in columns}
+    staging = tempfile.mkdtemp(prefix=".refresh-", dir=path)
+    try:
+        staged, n_rows = {}, 0
+        first = os.path.join(staging, "codebook")
+        bitmap_columns = [name for name in stale if name in indexed]
+        with ColumnarWriter(
+            first, block_rows=block_rows, bitmap_columns=bitmap_columns
+        ) as writer:
+            for n_records, frame in _decoded_chunks(
+                ddi, data_file_path, list(stale), chunksize, jobs, checksums
+            ):
+                n_rows += n_records
+                if frame is not None:
+                    writer.append(frame)
+        staged.update({name: (first, spec) for name, spec in writer.columns.items()})
+
+        sources = _sources(ddi, checksums)
+        for name in columns:
+            if name not in stale and (
+                n_rows != manifest["n_rows"]
+                or manifest["columns"][name]["source"]["bytes"]
+                != sources[name]["bytes"]
+            ):
+                stale[name] = "data"
+        changed_data = [name for name in stale if name not in staged]
+        if changed_data:
+            second = os.path.join(staging, "data")
+            bitmap_columns = [name for name in changed_data if name in indexed]
+            with ColumnarWriter(
+                second, block_rows=block_rows, bitmap_columns=bitmap_columns
+            ) as writer:
+                for _, frame in _decoded_chunks(
+                    ddi, data_file_path, changed_data, chunksize, jobs, {}
+                ):
+                    writer.append(frame)
+            staged.update(
+                {name: (second, spec) for name, spec in writer.columns.items()}
+            )
+
+        # new files never overwrite one the old manifest still points to
+        indexes = [_column_index(spec) for spec in manifest["columns"].values()]
+        next_index = max(indexes, default=-1) + 1
+        out = {}
+        for name in columns:
+            if name in stale:
+                directory, staged_spec = staged[name]
+                spec = dict(staged_spec, file=_column_file(next_index, name))
+                next_index += 1
+                moves = [(staged_spec["file"], spec["file"])]
+                if "bitmap" in staged_spec:
+                    bitmap = dict(staged_spec["bitmap"], file=bitmap_file(spec["file"]))
+                    moves.append((staged_spec["bitmap"]["file"], bitmap["file"]))
+                    spec["bitmap"] = bitmap
+                for source, target in moves:
+                    os.replace(
+                        os.path.join(directory, source), os.path.join(path, target)
+                    )
+            else:
+                spec = dict(manifest["columns"][name])
+            spec["source"] = sources[name]
+            out[name] = spec
+        refreshed = {
+            "format": FORMAT_NAME,
+            "version": FORMAT_VERSION,
+            "n_rows": n_rows,
+            "columns": out,
+            "file_metadata": ddi.get("file_metadata") or {},
+        }
+        if block_rows:
+            refreshed["block_rows"] = block_rows
+        refreshed["ddi_fingerprint"] = ddi_fingerprint(ddi)
+        write_manifest(path, refreshed)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    kept = {name for spec in out.values() for name in _spec_files(spec)}
+    for spec in manifest["columns"].values():
+        for name in _spec_files(spec):
+            file_path = os.path.join(path, name)
+            if name not in kept and os.path.isfile(file_path):
+                os.remove(file_path)
+    return {
+        "n_rows": n_rows,
+        "reused": [name for name in columns if name not in stale],
+        "rewritten": stale,
+        "relabelled": [
+            name for name in columns if changes.get(name) == "categories"
+        ],
+        "removed": [name for name in manifest["columns"] if name not in columns],
+    }
@@ -0,0 +1,478 @@
+"""
+Multi-extract datasets: a directory of IPUMS extracts (typically one per
+year, each a DDI codebook plus its fixed-width data file) read as one table.
+
+    dataset = IpumsDataset("extracts/")
+    df = dataset.load(["YEAR", "STATEFIP", "PERWT"], years=[2019, 2021], jobs=4)
+
+Variables, dtypes and category labels are reconciled across the codebooks.
+Each extract is decoded on its own thread straight into one preallocated
+array per column, so the result is never concatenated (a column is copied
+once only when blank fields turn its integers into floats), and the
+partition key (YEAR by default) prunes extracts before they are decoded.
+"""
+import glob
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+
+from .codebook import Codebook, VariableInfo
+from .parse_xml import read_ipums_ddi
+from .read_data import (
+    DEFAULT_CHUNKSIZE,
+    decode_column,
+    iter_record_buffers,
+    iter_record_chunks,
+    open_data_file,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+PARTITION_KEY = "YEAR"
+DATA_SUFFIXES = (".dat.gz", ".dat")
+HOW = ("intersection", "union")
+
+
+def find_data_file(ddi_file_path: str, file_metadata: Dict) -> Optional[str]:
+    """
+    The data file next to a DDI: ``<stem>.dat.gz`` or ``<stem>.dat``, else
+    the ``fileName`` the codebook describes (IPUMS ships it gzipped).
+    """
+    directory = os.path.dirname(ddi_file_path)
+    stem = os.path.splitext(os.path.basename(ddi_file_path))[0]
+    candidates = [stem + suffix for suffix in DATA_SUFFIXES]
+    if file_metadata.get("fileName"):
+        candidates += [file_metadata["fileName"] + ".gz", file_metadata["fileName"]]
+    for name in candidates:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class Extract:
+    """One parsed DDI and its data file, with row counts per partition value."""
+
+    __slots__ = ("ddi", "data_file_path", "ddi_file_path", "partition_counts")
+
+    def __init__(
+        self, ddi: Dict, data_file_path: str, ddi_file_path: Optional[str] = None
+    ):
+        self.ddi = ddi
+        self.data_file_path = data_file_path
+        self.ddi_file_path = ddi_file_path
+        self.partition_counts: Optional[Dict[Any, int]] = None
+
+    def __repr__(self) -> str:
+        return f"Extract({self.name!r}, {len(self.columns)} variables)"
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.data_file_path)
+
+    @property
+    def columns(self) -> List[str]:
+        return self.ddi["columns"]
+
+    @property
+    def codebook(self) -> Codebook:
+        return self.ddi["codebook"]
+
+    @classmethod
+    def from_files(
+        cls, ddi_file_path: str, data_file_path: Optional[str] = None
+    ) -> "Extract":
+        ddi = read_ipums_ddi(ddi_file_path)
+        if data_file_path is None:
+            data_file_path = find_data_file(ddi_file_path, ddi["file_metadata"])
+        if data_file_path is None:
+            raise FileNotFoundError(f"No data file found for {ddi_file_path}")
+        return cls(ddi, data_file_path, ddi_file_path)
+
+
+def discover_extracts(directory: str) -> List[Extract]:
+    """Every ``*.xml`` codebook in ``directory`` paired with its data file."""
+    ddi_file_paths = sorted(glob.glob(os.path.join(directory, "*.xml")))
+    if not ddi_file_paths:
+        raise FileNotFoundError(f"No DDI codebooks found in {directory}")
+    return [Extract.from_files(path) for path in ddi_file_paths]
+
+
+def merge_codebooks(codebooks: Sequence[Codebook]) -> Codebook:
+    """
+    One codebook covering every variable. Category codes are the union across
+    codebooks; where a code's label changed, the later codebook wins.
+    """
+    merged: Dict[str, VariableInfo] = {}
+    for codebook in codebooks:
+        for var in codebook:
+            previous = merged.get(var.name)
+            labels = dict(previous.labels_by_code) if previous is not None else {}
+            labels.update(var.labels_by_code)
+            merged[var.name] = VariableInfo(
+                var.name,
+                list(labels.items()),
+                label=var.label,
+                description=var.description,
+                concept=var.concept,
+                field_type=var.field_type,
+                data_type=var.data_type,
+                start=var.start,
+                end=var.end,
+                decimals=var.decimals,
+                dtype=var.dtype,
+            )
+    return Codebook(list(merged.values()))
+
+
+def _column_dtype(ddi: Dict, col: str, compact: bool) -> np.dtype:
+    if ddi[col].get("data_type") == "character":
+        return np.dtype(object)
+    if compact and ddi.get("dtypes", {}).get(col):
+        return np.dtype(ddi["dtypes"][col])
+    return np.dtype(np.float64 if ddi[col].get("decimals", 0) else np.int64)
+
+
+def reconcile_dtypes(
+    ddis: Sequence[Dict], columns: Sequence[str], compact: bool = True
+) -> Dict[str, np.dtype]:
+    """
+    A dtype per column that holds every extract's values: the common type of
+    the per-extract dtypes, and a float when some extract lacks an integer
+    column so its rows can be NaN.
+    """
+    dtypes = {}
+    for col in columns:
+        found = [
+            _column_dtype(ddi, col, compact) for ddi in ddis if col in ddi["columns"]
+        ]
+        if not found:
+            raise KeyError(f"{col} is not in any extract")
+        if any(dtype.kind == "O" for dtype in found):
+            dtypes[col] = np.dtype(object)
+            continue
+        dtype = np.result_type(*found)
+        if len(found) < len(ddis) and dtype.kind in "iub":
+            dtype = np.result_type(dtype, np.float32)
+        dtypes[col] = dtype
+    return dtypes
+
+
+def scan_partitions(
+    extract: Extract,
+    partition_key: str = PARTITION_KEY,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> Dict[Any, int]:
+    """
+    Row counts per partition value, decoding only the partition column.
+    Extracts without the partition variable are one partition keyed ``None``.
+    """
+    counts: Counter = Counter()
+    for records in iter_record_chunks(extract.data_file_path, chunksize):
+        _count_partitions(counts, records, extract, partition_key)
+    return _sorted_counts(counts)
+
+
+def count_records(data_file_path: str, chunksize: int = DEFAULT_CHUNKSIZE) -> int:
+    """
+    Records in a fixed-width data file, without decoding any: from the size
+    of an uncompressed local file whose records all have the first one's
+    length, otherwise by counting newlines.
+    """
+    from .remote import is_url
+
+    if not is_url(data_file_path) and not str(data_file_path).endswith(".gz"):
+        size = os.path.getsize(data_file_path)
+        with open_data_file(data_file_path) as fp:
+            line = len(fp.readline())
+        if line and size % line == 0:
+            return size // line
+    return sum(
+        buf.count(b"\n") for buf in iter_record_buffers(data_file_path, chunksize)
+    )
+
+
+def _count_partitions(
+    counts: Counter,
+    records: np.ndarray,
+    extract: Extract,
+    partition_key: str,
+    keys: Optional[np.ndarray] = None,
+):
+    if partition_key not in extract.columns:
+        counts[None] += len(records)
+        return
+    if keys is None:
+        keys = decode_column(records, extract.ddi, partition_key)
+    values, n = np.unique(keys, return_counts=True)
+    counts.update(dict(zip(values.tolist(), n.tolist())))
+
+
+def _sorted_counts(counts: Counter) -> Dict[Any, int]:
+    return dict(sorted(counts.items(), key=lambda item: (item[0] is None, item[0])))
+
+
+class IpumsDataset:
+    """
+    Several extracts read as one table. Pass a directory of DDI/data pairs or
+    a list of ``Extract`` objects. Partition row counts come from a one-time
+    scan of the partition column, cached on the dataset, which lets ``load``
+    size its output up front and skip extracts with no selected years.
+    """
+
+    def __init__(
+        self,
+        extracts: Union[str, Iterable[Extract]],
+        partition_key: str = PARTITION_KEY,
+        chunksize: int = DEFAULT_CHUNKSIZE,
+    ):
+        if isinstance(extracts, (str, os.PathLike)):
+            extracts = discover_extracts(str(extracts))
+        self.extracts: List[Extract] = list(extracts)
+        if not self.extracts:
+            raise ValueError("A dataset needs at least one extract")
+        self.partition_key = partition_key
+        self.chunksize = chunksize
+        self._codebook: Optional[Codebook] = None
+
+    def __repr__(self) -> str:
+        return f"IpumsDataset({len(self.extracts)} extracts)"
+
+    def variables(self, how: str = "intersection") -> List[str]:
+        """Variables in every extract, or in any of them with ``how="union"``."""
+        if how not in HOW:
+            raise ValueError(f"Unknown how {how!r}, expected one of {HOW}")
+        columns = list(self.extracts[0].columns)
+        for extract in self.extracts[1:]:
+            present = set(extract.columns)
+            if how == "intersection":
+                columns = [c for c in columns if c in present]
+            else:
+                seen = set(columns)
+                columns += [c for c in extract.columns if c not in seen]
+        return columns
+
+    @property
+    def codebook(self) -> Codebook:
+        if self._codebook is None:
+            ordered = sorted(self.extracts, key=self._first_partition)
+            self._codebook = merge_codebooks([e.codebook for e in ordered])
+        return self._codebook
+
+    def category_conflicts(self) -> "pd.DataFrame":
+        """Codes whose label differs between extracts, one row per extract."""
+        import pandas as pd
+
+        labels: Dict[Tuple[str, Any], Dict[str, str]] = {}
+        for extract in self.extracts:
+            for var in extract.codebook:
+                for code, label in var.labels_by_code.items():
+                    labels.setdefault((var.name, code), {})[extract.name] = label
+        rows = [
+            (name, code, extract_name, label)
+            for (name, code), by_extract in labels.items()
+            if len(set(by_extract.values())) > 1
+            for extract_name, label in by_extract.items()
+        ]
+        return pd.DataFrame(rows, columns=["variable", "code", "extract", "label"])
+
+    def scan(self, jobs: int = 1) -> "IpumsDataset":
+        """Count rows per partition value in every extract not yet scanned."""
+        pending = [e for e in self.extracts if e.partition_counts is None]
+
+        def count(extract):
+            return scan_partitions(extract, self.partition_key, self.chunksize)
+
+        with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+            for extract, counts in zip(pending, pool.map(count, pending)):
+                extract.partition_counts = counts
+        return self
+
+    def partitions(self) -> Dict[Any, int]:
+        """Total rows per partition value across the extracts."""
+        totals: Counter = Counter()
+        for extract in self.scan().extracts:
+            totals.update(extract.partition_counts)
+        return dict(sorted(totals.items(), key=lambda item: (item[0] is None, item[0])))
+
+    def _first_partition(self, extract: Extract):
+        # codebook precedence follows the data: later years override labels
+        self.scan()
+        values = [v for v in extract.partition_counts if v is not None]
+        return min(values) if values else float("inf")
+
+    def _selected(
+        self, years: Optional[Set], jobs: int = 1
+    ) -> List[Tuple[Extract, int]]:
+        self.scan(jobs)
+        selected = []
+        for extract in self.extracts:
+            counts = extract.partition_counts
+            n_rows = sum(
+                n for value, n in counts.items() if years is None or value in years
+            )
+            if n_rows:
+                selected.append((extract, n_rows))
+        return selected
+
+    def _fill(
+        self,
+        extract: Extract,
+        offset: int,
+        n_rows: int,
+        out: Dict[str, np.ndarray],
+        years: Optional[Set],
+        missing: Dict[str, List[np.ndarray]],
+    ):
+        ddi = extract.ddi
+        present = [col for col in out if col in extract.columns]
+        # a full load of an unscanned extract counts its partitions as it goes
+        counts = Counter() if extract.partition_counts is None else None
+        prune = years is not None and not set(extract.partition_counts) <= years
+        position = offset
+        for records in iter_record_chunks(extract.data_file_path, self.chunksize):
+            if prune:
+                keys = decode_column(records, ddi, self.partition_key)
+                records = records[np.isin(keys, list(years))]
+            n = len(records)
+            if position + n > offset + n_rows:
+                break
+            for col in present:
+                values = decode_column(records, ddi, col)
+                if counts is not None and col == self.partition_key:
+                    _count_partitions(counts, records, extract, col, values)
+                if values.dtype.kind == "f" and out[col].dtype.kind in "iu":
+                    # blank fields: keep their rows to set NaN once every
+                    # extract is read and the column can be promoted
+                    blank = np.isnan(values)
+                    rows = np.flatnonzero(blank) + position
+                    missing.setdefault(col, []).append(rows)
+                    values = np.where(blank, 0, values)
+                out[col][position : position + n] = values
+            if counts is not None and self.partition_key not in present:
+                _count_partitions(counts, records, extract, self.partition_key)
+            position += n
+        if position != offset + n_rows:
+            raise ValueError(f"{extract.name} changed since its partitions were scanned")
+        if counts is not None:
+            extract.partition_counts = _sorted_counts(counts)
+
+    def _read(
+        self,
+        selected: List[Tuple[Extract, int]],
+        columns: List[str],
+        dtypes: Dict[str, np.dtype],
+        years: Optional[Set],
+        jobs: int = 1,
+    ) -> "pd.DataFrame":
+        import pandas as pd
+
+        offsets = np.concatenate([[0], np.cumsum([n for _, n in selected])])
+        total = int(offsets[-1])
+        out = {}
+        for col in columns:
+            dtype = dtypes[col]
+            if all(col in extract.columns for extract, _ in selected):
+                out[col] = np.empty(total, dtype=dtype)
+            else:
+                out[col] = np.full(total, None if dtype.kind == "O" else np.nan, dtype)
+
+        missing = {}
+
+        def fill(i):
+            extract, n_rows = selected[i]
+            self._fill(extract, int(offsets[i]), n_rows, out, years, missing)
+
+        with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+            list(pool.map(fill, range(len(selected))))
+        for col, rows in missing.items():
+            out[col] = out[col].astype(np.promote_types(out[col].dtype, np.float32))
+            out[col][np.concatenate(rows)] = np.nan
+        return pd.DataFrame(out, columns=columns, copy=False)
+
+    def _counted(self, jobs: int = 1) -> List[Tuple[Extract, int]]:
+        # every row of every extract: only their record counts are needed
+        def count(extract):
+            if extract.partition_counts is not None:
+                return sum(extract.partition_counts.values())
+            return count_records(extract.data_file_path, self.chunksize)
+
+        with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+            counts = list(pool.map(count, self.extracts))
+        return [(e, n) for e, n in zip(self.extracts, counts) if n]
+
+    def load(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        years: Optional[Iterable] = None,
+        jobs: int = 1,
+        compact: bool = True,
+        how: str = "intersection",
+    ) -> "pd.DataFrame":
+        """
+        Read ``columns`` (default: the variables shared by every extract, or
+        all of them with ``how="union"``) for the selected ``years`` of the
+        partition key. Rows keep extract order; a variable an extract lacks
+        is NaN (or None) in its rows. ``jobs`` extracts decode in parallel.
+        Loading every year of extracts not yet scanned skips the scan: output
+        is sized from their record counts (from the file size when it is
+        uncompressed) and the partitions are counted while decoding.
+        """
+        columns = self.variables(how) if columns is None else list(columns)
+        years = None if years is None else set(years)
+        dtypes = reconcile_dtypes([e.ddi for e in self.extracts], columns, compact)
+        if years is None and any(e.partition_counts is None for e in self.extracts):
+            selected = self._counted(jobs)
+        else:
+            selected = self._selected(years, jobs)
+        return self._read(selected, columns, dtypes, years, jobs)
+
+    def iter_partitions(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        years: Optional[Iterable] = None,
+        compact: bool = True,
+        how: str = "intersection",
+    ) -> Iterator[Tuple[Any, "pd.DataFrame"]]:
+        """
+        Lazily yield ``(value, frame)`` per partition value, reading one
+        extract at a time. Frames use the dtypes ``load`` would, so they can
+        be processed independently and combined later.
+        """
+        columns = self.variables(how) if columns is None else list(columns)
+        years = None if years is None else set(years)
+        dtypes = reconcile_dtypes([e.ddi for e in self.extracts], columns, compact)
+        for extract, n_rows in self._selected(years):
+            values = [
+                v for v in extract.partition_counts if years is None or v in years
+            ]
+            if len(values) == 1:
+                yield values[0], self._read(
+                    [(extract, n_rows)], columns, dtypes, years
+                )
+                continue
+            # an extract spanning several years is read once and split
+            key = self.partition_key
+            read_columns = columns if key in columns else columns + [key]
+            if key not in dtypes:
+                dtypes[key] = _column_dtype(extract.ddi, key, compact)
+            df = self._read([(extract, n_rows)], read_columns, dtypes, years)
+            for value in values:
+                part = df.loc[df[key] == value, columns]
+                yield value, part.reset_index(drop=True)
@@ -0,0 +1,97 @@
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def _as_weights(weights) -> np.ndarray:
+    w = np.asarray(weights, dtype=float)
+    # groupby().sum() skips missing weights, so bincount should too
+    if np.isnan(w).any():
+        w = np.nan_to_num(w, nan=0.0)
+    return w
+
+
+class GroupIndex:
+    """
+    Factorized integer codes for a grouping column.
+
+    The column is hashed once; counts, top-k selection and row masks are then
+    computed on the codes with ``np.bincount`` and fancy indexing. Missing keys
+    get code -1 and, like ``groupby``, never belong to a group.
+    """
+
+    def __init__(self, values, sort: bool = False):
+        codes, uniques = pd.factorize(values, sort=sort)
+        self.codes = codes
+        self.uniques = uniques
+        self.n_groups = len(uniques)
+
+    def counts(self, weights=None) -> np.ndarray:
+        # shift by one so missing keys (-1) land in a slot we drop
+        w = None if weights is None else _as_weights(weights)
+        return np.bincount(self.codes + 1, weights=w, minlength=self.n_groups + 1)[1:]
+
+    def top_k(self, k: int, weights=None) -> np.ndarray:
+        counts = self.counts(weights)
+        return np.argsort(-counts, kind="stable")[:k]
+
+    def mask(self, group_codes) -> np.ndarray:
+        keep = np.zeros(self.n_groups + 1, dtype=bool)
+        keep[np.asarray(group_codes, dtype=np.intp) + 1] = True
+        return keep[self.codes + 1]
+
+    def indices(self, group_codes) -> np.ndarray:
+        return np.flatnonzero(self.mask(group_codes))
+
+    def labels(self, group_codes) -> np.ndarray:
+        return np.asarray(self.uniques)[group_codes]
+
+
+def top_k_mask(values, k: int, weights=None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Boolean row mask selecting the ``k`` most frequent (or heaviest, when
+    ``weights`` is given) groups of ``values``, along with their labels.
+    """
+    groups = GroupIndex(values)
+    top = groups.top_k(k, weights)
+    return groups.mask(top), groups.labels(top)
+
+
+def top_k_subset(
+    xdf: pd.DataFrame,
+    groupbyvar: str,
+    k: Optional[int] = None,
+    xvar: Optional[str] = None,
+    max_percentile: float = 1.0,
+    weights=None,
+) -> pd.DataFrame:
+    """
+    Restrict ``xdf`` to its top ``k`` groups of ``groupbyvar`` and, when
+    ``xvar`` is given, to rows below its ``max_percentile`` quantile. Both
+    filters are combined into a single mask so the frame is taken only once.
+    """
+    mask = None
+    if k is not None:
+        groups = GroupIndex(xdf[groupbyvar])
+        mask = groups.mask(groups.top_k(k, weights))
+        logger.info(
+            "reducing records from %d to %d and groups from %d to %d",
+            xdf.shape[0],
+            mask.sum(),
+            groups.n_groups,
+            k,
+        )
+
+    if xvar is not None:
+        values = xdf[xvar].to_numpy(dtype=float)
+        kept = values if mask is None else values[mask]
+        below = values < np.nanquantile(kept, max_percentile)
+        mask = below if mask is None else mask & below
+
+    if mask is None:
+        return xdf
+    return xdf[mask]
@@ -0,0 +1,249 @@
+"""
+Hierarchical extracts interleave household (H) records with the person (P)
+records that follow them, each record type with its own field layout:
+
+    H2021202101000000010000012300061
+    P2021202101000000010001000045672...
+    P2021202101000000010002000039121...
+
+One vectorized pass over the record-type field routes every record in a
+chunk to its type's decoder, and persons are joined to their household's
+attributes on the key variables (SERIAL) to give the rectangular layout.
+"""
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from .parse_xml import HIERARCHICAL
+from .read_data import (
+    DEFAULT_CHUNKSIZE,
+    NEWLINE,
+    SPACE,
+    decode_records,
+    gather_records,
+    iter_record_buffers,
+    record_starts,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+HOUSEHOLD = "H"
+PERSON = "P"
+# packed key digits must fit in an int64
+MAX_KEY_DIGITS = 18
+
+
+def is_hierarchical(ddi: Dict) -> bool:
+    return ddi.get("file_type") == HIERARCHICAL
+
+
+def rectype_columns(ddi: Dict, rectype: str) -> List[str]:
+    """Variables stored on ``rectype`` records, including the shared ones."""
+    return [col for col in ddi["columns"] if rectype in ddi[col]["rectypes"]]
+
+
+def record_length(ddi: Dict, rectype: str) -> int:
+    specs = dict(zip(ddi["columns"], ddi["column_specs"]))
+    return max(specs[col][1] for col in rectype_columns(ddi, rectype))
+
+
+def record_types(raw: np.ndarray, starts: np.ndarray, ddi: Dict) -> np.ndarray:
+    """The record-type field of the records starting at ``starts``, as bytes."""
+    start, end = ddi["column_specs"][ddi["columns"].index(ddi["rectype_idvar"])]
+    field = raw[starts[:, None] + np.arange(start, end)]
+    types = field.view(f"S{end - start}").ravel()
+    return np.char.strip(types) if end - start > 1 else types
+
+
+def split_record_types(
+    raw: np.ndarray, ends: np.ndarray, ddi: Dict
+) -> Dict[str, np.ndarray]:
+    """
+    Route the records of a buffer by type: one gather reads every record's
+    type field, then each type's records (which share a length) are copied
+    out as their own 2-D array, in file order and without padding.
+    """
+    starts = record_starts(ends)
+    types = record_types(raw, starts, ddi)
+    out = {}
+    for rectype in ddi["rectypes"]:
+        selected = types == rectype.encode()
+        if selected.any():
+            out[rectype] = gather_records(raw, starts[selected], ends[selected])
+        else:
+            out[rectype] = np.empty((0, record_length(ddi, rectype)), np.uint8)
+    return out
+
+
+def iter_rectype_chunks(
+    data_file_path: str,
+    ddi: Dict,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    n_max: Optional[int] = None,
+) -> Iterator[Dict[str, np.ndarray]]:
+    """Chunks of about ``chunksize`` records, split by record type."""
+    n_read = 0
+    for buf in iter_record_buffers(data_file_path, chunksize):
+        raw = np.frombuffer(buf, dtype=np.uint8)
+        ends = np.flatnonzero(raw == NEWLINE)
+        if n_max is not None:
+            ends = ends[: n_max - n_read]
+        n_read += len(ends)
+        if len(ends):
+            yield split_record_types(raw, ends, ddi)
+        if n_max is not None and n_read >= n_max:
+            break
+
+
+def join_key(df: "pd.DataFrame", ddi: Dict) -> np.ndarray:
+    """
+    One integer per row from the key variables: SERIAL alone, or e.g.
+    SAMPLE and SERIAL packed side by side as decimal digits.
+    """
+    keys = ddi["rectype_keyvars"]
+    if len(keys) == 1:
+        return df[keys[0]].to_numpy()
+    specs = dict(zip(ddi["columns"], ddi["column_specs"]))
+    widths = [specs[k][1] - specs[k][0] for k in keys]
+    if sum(widths) > MAX_KEY_DIGITS:
+        raise ValueError(f"Key variables {keys} are too wide to combine")
+    key = np.zeros(len(df), dtype=np.int64)
+    for col, width in zip(keys, widths):
+        key = key * 10**width + df[col].to_numpy().astype(np.int64)
+    return key
+
+
+def attach_households(
+    persons: "pd.DataFrame",
+    households: "pd.DataFrame",
+    ddi: Dict,
+    columns: Optional[List[str]] = None,
+) -> "pd.DataFrame":
+    """
+    Person rows with the household variables of the household sharing their
+    key. The households are sorted once and every person is located with a
+    binary search; persons without a household get missing values.
+    """
+    import pandas as pd
+
+    household_key = join_key(households, ddi)
+    person_key = join_key(persons, ddi)
+    order = np.argsort(household_key, kind="stable")
+    sorted_key = household_key[order]
+    position = np.searchsorted(sorted_key, person_key)
+    np.minimum(position, max(len(sorted_key) - 1, 0), out=position)
+    if len(sorted_key):
+        found = sorted_key[position] == person_key
+        rows = order[position]
+    else:
+        found = np.zeros(len(persons), dtype=bool)
+        rows = np.zeros(len(persons), dtype=np.intp)
+
+    if columns is None:
+        columns = list(persons.columns) + [
+            c for c in households.columns if c not in persons.columns
+        ]
+    out = {}
+    for col in columns:
+        if col in persons.columns:
+            out[col] = persons[col].to_numpy()
+        elif found.all():
+            out[col] = households[col].to_numpy()[rows]
+        else:
+            out[col] = pd.api.extensions.take(
+                households[col].to_numpy(), np.where(found, rows, -1), allow_fill=True
+            )
+    return pd.DataFrame(out, columns=columns, copy=False)
+
+
+def _prepend(record: np.ndarray, records: np.ndarray) -> np.ndarray:
+    if records.shape[1] == len(record):
+        return np.concatenate([record[None, :], records])
+    width = max(len(record), records.shape[1])
+    out = np.full((len(records) + 1, width), SPACE, dtype=np.uint8)
+    out[0, : len(record)] = record
+    out[1:, : records.shape[1]] = records
+    return out
+
+
+def _split_columns(ddi: Dict, columns: Optional[List[str]]):
+    """Columns to decode from person and household records, and the output."""
+    if columns is None:
+        columns = [c for c in ddi["columns"] if c != ddi["rectype_idvar"]]
+    keys = ddi["rectype_keyvars"]
+    person_vars = set(rectype_columns(ddi, PERSON))
+    household_vars = set(rectype_columns(ddi, HOUSEHOLD))
+    unknown = [c for c in columns if c not in person_vars | household_vars]
+    if unknown:
+        raise KeyError(f"{unknown} are not household or person variables")
+    person_columns = [c for c in columns if c in person_vars]
+    household_columns = [c for c in columns if c not in person_vars]
+    person_columns += [k for k in keys if k not in person_columns]
+    household_columns += [k for k in keys if k not in household_columns]
+    return person_columns, household_columns, columns
+
+
+def iter_hierarchical_micro(
+    ddi: Dict,
+    data_file_path: str,
+    columns: Optional[List[str]] = None,
+    n_max: Optional[int] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    compact: bool = True,
+    jobs: int = 1,
+) -> Iterator["pd.DataFrame"]:
+    """
+    Person-level chunks of a hierarchical extract with household variables
+    attached, i.e. the rectangular layout. ``n_max`` counts input records.
+    The last household of each chunk is carried into the next so persons
+    split from their household by a chunk boundary still find it.
+    """
+    person_columns, household_columns, columns = _split_columns(ddi, columns)
+    carried = None
+    for records in iter_rectype_chunks(data_file_path, ddi, chunksize, n_max):
+        household_records = records[HOUSEHOLD]
+        if carried is not None:
+            household_records = _prepend(carried, household_records)
+        if len(records[HOUSEHOLD]):
+            carried = records[HOUSEHOLD][-1].copy()
+        households = decode_records(
+            household_records, ddi, household_columns, compact, jobs
+        )
+        persons = decode_records(records[PERSON], ddi, person_columns, compact, jobs)
+        yield attach_households(persons, households, ddi, columns)
+
+
+def read_ipums_hierarchical(
+    ddi: Dict,
+    data_file_path: str,
+    columns: Optional[List[str]] = None,
+    n_max: Optional[int] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    compact: bool = True,
+    jobs: int = 1,
+) -> Dict[str, "pd.DataFrame"]:
+    """
+    Each record type as its own frame, e.g. ``{"H": households, "P": persons}``,
+    with the variables (of ``columns``, default all) stored on that type.
+    """
+    import pandas as pd
+
+    selected = ddi["columns"] if columns is None else columns
+    layouts = {
+        rectype: [c for c in rectype_columns(ddi, rectype) if c in selected]
+        for rectype in ddi["rectypes"]
+    }
+    chunks = {rectype: [] for rectype in ddi["rectypes"]}
+    for records in iter_rectype_chunks(data_file_path, ddi, chunksize, n_max):
+        for rectype, typed in records.items():
+            chunks[rectype].append(
+                decode_records(typed, ddi, layouts[rectype], compact, jobs)
+            )
+    out = {}
+    for rectype, frames in chunks.items():
+        if not frames:
+            empty = np.empty((0, record_length(ddi, rectype)), np.uint8)
+            frames = [decode_records(empty, ddi, layouts[rectype], compact)]
+        out[rectype] = pd.concat(frames, ignore_index=True)
+    return out
@@ -0,0 +1,148 @@
+"""
+Household rollups over person records. IPUMS writes the persons of a
+household next to each other, so households are runs of rows sharing their
+key (YEAR and SERIAL) and can be found with one comparison of each row to
+the previous one. Totals, counts and maxima are then segmented reductions
+(``np.add.reduceat`` and friends) and go back to person rows with
+``np.repeat``, without hashing the keys as ``groupby`` does:
+
+    household_rollup(df, {"INCOME": ("INCTOT", "sum"), "OLDEST": ("AGE", "max")})
+"""
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_KEYS = ("YEAR", "SERIAL")
+# single-year extracts may leave YEAR out; SERIAL is always required
+OPTIONAL_KEYS = ("YEAR",)
+REDUCTIONS = ("sum", "count", "size", "mean", "min", "max", "first")
+
+
+class HouseholdSegments:
+    """
+    The runs of consecutive rows of ``df`` sharing their ``keys``. With
+    ``check``, a household split into several runs (rows not grouped by
+    household) raises instead of being reduced in pieces. Missing keys never
+    compare equal, so each such row is a household of its own. A key that is
+    not a column raises KeyError, unless it is one of the ``OPTIONAL_KEYS``.
+    """
+
+    def __init__(
+        self, df: pd.DataFrame, keys: Sequence[str] = DEFAULT_KEYS, check: bool = True
+    ):
+        absent = [key for key in keys if key not in df.columns]
+        required = [key for key in absent if key not in OPTIONAL_KEYS]
+        if required:
+            raise KeyError(f"Household keys {required} are not columns of the frame")
+        keys = [key for key in keys if key not in absent]
+        if not keys:
+            raise KeyError("None of the household keys are columns of the frame")
+        self.keys = keys
+        self.n_rows = len(df)
+        changed = np.zeros(self.n_rows, dtype=bool)
+        changed[:1] = True
+        key_values = [df[key].to_numpy() for key in keys]
+        for values in key_values:
+            changed[1:] |= values[1:] != values[:-1]
+        self.starts = np.flatnonzero(changed)
+        self.sizes = np.diff(np.append(self.starts, self.n_rows))
+        self.key_values = {
+            key: values[self.starts] for key, values in zip(keys, key_values)
+        }
+        if check:
+            self._check_contiguous()
+
+    @property
+    def n_households(self) -> int:
+        return len(self.starts)
+
+    def _check_contiguous(self):
+        # sorting the household keys is cheap next to hashing every person
+        keys = [self.key_values[key] for key in reversed(self.keys)]
+        order = np.lexsort(keys)
+        repeated = np.ones(max(self.n_households - 1, 0), dtype=bool)
+        for values in keys:
+            ordered = values[order]
+            repeated &= ordered[1:] == ordered[:-1]
+        if repeated.any():
+            raise ValueError(
+                f"Rows are not grouped by {self.keys}; sort them by household first"
+            )
+
+    def reduce(self, values, how: str = "sum") -> np.ndarray:
+        """
+        One value per household. Like ``groupby``, missing values are
+        skipped: ``count`` counts the others and ``size`` counts every row.
+        """
+        if how not in REDUCTIONS:
+            raise ValueError(f"Unknown reduction {how!r}; use one of {REDUCTIONS}")
+        if how == "size":
+            return self.sizes
+        values = np.asarray(values)
+        missing = pd.isna(values) if values.dtype.kind in "fOM" else None
+        if how == "first" and missing is not None and missing.any():
+            # the first present value of each household, missing if there is none
+            present = np.append(np.flatnonzero(~missing), self.n_rows)
+            rows = present[np.searchsorted(present, self.starts)]
+            rows = np.where(rows < self.starts + self.sizes, rows, self.starts)
+            return values[rows]
+        if how == "first" or not self.n_rows:
+            return values[self.starts]
+        if how == "count" and missing is None:
+            return self.sizes
+        if how == "count":
+            return np.add.reduceat(~missing, self.starts, dtype=np.int64)
+        if values.dtype.kind == "b":
+            values = values.astype(np.int64)
+        if how in ("min", "max"):
+            # fmin/fmax skip NaN unless a whole household is missing
+            reduction = {"min": np.fmin, "max": np.fmax}[how]
+            return reduction.reduceat(values, self.starts)
+
+        # sums accumulate in 64 bits so narrow dtypes such as uint8 don't wrap
+        dtype = np.float64 if values.dtype.kind == "f" else np.int64
+        if values.dtype.kind == "u":
+            dtype = np.uint64
+        if missing is not None and missing.any():
+            values = np.where(missing, 0, values)
+        totals = np.add.reduceat(values, self.starts, dtype=dtype)
+        if how == "sum":
+            return totals
+        if missing is None:
+            counts = self.sizes
+        else:
+            counts = np.add.reduceat(~missing, self.starts, dtype=np.int64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return totals / counts
+
+    def broadcast(self, household_values) -> np.ndarray:
+        """Repeat one value per household onto each of its person rows."""
+        return np.repeat(np.asarray(household_values), self.sizes)
+
+    def household_numbers(self) -> np.ndarray:
+        """Each row's household as 0, 1, 2, ... in order of appearance."""
+        return self.broadcast(np.arange(self.n_households))
+
+
+def household_rollup(
+    df: pd.DataFrame,
+    aggregations: Dict[str, Tuple[str, str]],
+    keys: Sequence[str] = DEFAULT_KEYS,
+    broadcast: bool = False,
+    check: bool = True,
+) -> pd.DataFrame:
+    """
+    Household attributes from named ``(column, reduction)`` pairs, as with
+    ``groupby(keys, sort=False).agg(**aggregations)``: one row per household
+    with its keys, or with ``broadcast`` one row per person aligned to ``df``.
+    """
+    segments = HouseholdSegments(df, keys, check)
+    out = {}
+    for name, (column, how) in aggregations.items():
+        values = segments.reduce(df[column].to_numpy(), how)
+        out[name] = segments.broadcast(values) if broadcast else values
+    if broadcast:
+        return pd.DataFrame(out, index=df.index, columns=list(aggregations))
+    columns = segments.keys + list(aggregations)
+    return pd.DataFrame({**segments.key_values, **out}, columns=columns)
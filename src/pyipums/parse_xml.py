@@ -1,18 +1,38 @@
 import xml.etree.ElementTree as ET
 from typing import Dict, Tuple
 
+from .codebook import Codebook, parse_code
+
 # Handle namespaces
 DEFAULT_NAMESPACE = "{ddi:codebook:2_5}"
 NAMESPACES = {"ddi": "ddi:codebook:2_5"}
 TITLE_XPATH = "ddi:docDscr/ddi:citation/ddi:titlStmt/"
 FILE_TEXT_XPATH = "ddi:fileDscr/ddi:fileTxt/"
 VARIABLES_XPATH = "ddi:dataDscr/ddi:var"
+FILE_STRUCTURE_XPATH = FILE_TEXT_XPATH + "ddi:fileStrc"
+RECORD_GROUP_XPATH = "ddi:recGrp"
+RECTANGULAR = "rectangular"
+HIERARCHICAL = "hierarchical"
 
 type_dict = {
     "discrete": str,
     "contin": float,
 }
 
+# Narrowest NumPy integer holding every value of a field that is at most
+# this many characters wide, e.g. a 2-digit code fits in uint8 (<= 99)
+UNSIGNED_INT_DTYPES = [(2, "uint8"), (4, "uint16"), (9, "uint32"), (19, "uint64")]
+SIGNED_INT_DTYPES = [(2, "int8"), (4, "int16"), (9, "int32"), (18, "int64")]
+# Largest value of each unsigned dtype, for sizing by the largest code
+UNSIGNED_INT_MAX = [(2**8 - 1, "uint8"), (2**16 - 1, "uint16"), (2**32 - 1, "uint32")]
+# A discrete variable whose catgry codes fill at least this share of
+# 0..largest code, and reach its full width, lists every value it takes
+# (AGE 0..135 of 3 digits); other lists only label a few special values
+# (RENTGRS 0..200 of 5 digits, YRMARR 0 of 4 digits)
+DENSE_CODE_SHARE = 0.9
+# float32 round-trips any decimal with up to 6 significant digits
+FLOAT32_MAX_DIGITS = 6
+
 
 def _to_int(x: str) -> int:
     assert isinstance(x, str)
@@ -25,6 +45,54 @@ def remove_namespace(x: str) -> str:
         return x.replace(DEFAULT_NAMESPACE, "")
 
 
+def _largest_dense_code(var_dict: Dict, width: int):
+    codes = {
+        parse_code(category["category_value"])
+        for category in var_dict.get("field_metadata", [])
+        if category.get("category_value")
+    }
+    if not codes or not all(isinstance(code, int) for code in codes):
+        return None
+    largest = max(codes)
+    full_width = 10 ** (width - 1) <= largest < 10**width
+    if full_width and len(codes) >= DENSE_CODE_SHARE * (largest + 1):
+        return largest
+    return None
+
+
+def infer_dtype(var_dict: Dict) -> str:
+    """
+    Narrowest exact NumPy dtype for a variable, from its width and implied
+    decimals. Continuous variables (incomes, taxes) and categorical variables
+    with negative codes keep a sign bit; other categorical codes are unsigned,
+    sized by their largest code when the codes cover the whole value range
+    (AGE is 3 digits wide but uint8).
+    """
+    if var_dict.get("data_type") == "character":
+        return "object"
+    width = var_dict["location_width"]
+    if var_dict.get("decimals"):
+        return "float32" if width <= FLOAT32_MAX_DIGITS else "float64"
+
+    negative_codes = any(
+        (category.get("category_value") or "").startswith("-")
+        for category in var_dict.get("field_metadata", [])
+    )
+    if var_dict["field_type"] == "discrete" and not negative_codes:
+        largest = _largest_dense_code(var_dict, width)
+        if largest is not None:
+            for max_value, dtype in UNSIGNED_INT_MAX:
+                if largest <= max_value:
+                    return dtype
+        int_dtypes = UNSIGNED_INT_DTYPES
+    else:
+        int_dtypes = SIGNED_INT_DTYPES
+    for max_width, dtype in int_dtypes:
+        if width <= max_width:
+            return dtype
+    return "float64"
+
+
 def get_file_metadata(xml_object, metadata: Dict = {}) -> Dict:
     # Extract the data file information
     metadata = {"codebook_id": xml_object.get("ID")}
@@ -39,15 +107,39 @@ def get_file_metadata(xml_object, metadata: Dict = {}) -> Dict:
     return metadata
 
 
+def get_file_structure(xml_object) -> Dict:
+    """
+    Rectangular or hierarchical layout. Hierarchical extracts list their
+    record types, the variable holding each record's type (RECTYPE) and the
+    variables linking person records to their household (SERIAL).
+    """
+    element = xml_object.find(FILE_STRUCTURE_XPATH, namespaces=NAMESPACES)
+    if element is None:
+        file_type, groups = RECTANGULAR, []
+    else:
+        file_type = element.get("type", RECTANGULAR)
+        groups = element.findall(RECORD_GROUP_XPATH, namespaces=NAMESPACES)
+    return {
+        "file_type": file_type,
+        "rectypes": [group.get("rectype") for group in groups],
+        "rectype_idvar": groups[0].get("recidvar") if groups else None,
+        "rectype_keyvars": (groups[0].get("keyvar") or "").split() if groups else [],
+    }
+
+
 def get_field_metadata(xml_object, out_dict: Dict = {}) -> Dict:
     # Extract variable information
     var_elements = xml_object.findall(VARIABLES_XPATH, namespaces=NAMESPACES)
     column_metadata, col_dtypes, col_specs = [], [], []
+    dtypes = {}
     for var_elem in var_elements:
         var_dict = {
             "name": var_elem.get("ID"),
             "field_type": var_elem.get("intrvl"),
             "files": var_elem.get("files"),
+            "decimals": _to_int(var_elem.get("dcml") or "0"),
+            # record types holding the variable; empty in rectangular extracts
+            "rectypes": (var_elem.get("rectype") or "").split(),
         }
         field_metadata = []
         # now get child stuff
@@ -91,6 +183,7 @@ def get_field_metadata(xml_object, out_dict: Dict = {}) -> Dict:
                 )
 
         var_dict["field_metadata"] = field_metadata
+        var_dict["dtype"] = infer_dtype(var_dict)
 
         out_dict[var_dict["name"]] = var_dict
         column_metadata.append((var_dict["name"], var_dict["field_type"]))
@@ -99,12 +192,14 @@ def get_field_metadata(xml_object, out_dict: Dict = {}) -> Dict:
             (var_dict["location_start_pos"] - 1, var_dict["location_end_pos"])
         )
         col_dtypes.append(type_dict[var_dict["field_type"]])
+        dtypes[var_dict["name"]] = var_dict["dtype"]
 
     out_dict["column_metadata"] = column_metadata
     out_dict["columns"] = [r[0] for r in column_metadata]
     out_dict["column_types"] = [r[1] for r in column_metadata]
     out_dict["column_specs"] = col_specs
     out_dict["column_dtypes"] = col_dtypes
+    out_dict["dtypes"] = dtypes
     return out_dict
 
 
@@ -134,6 +229,8 @@ def read_ipums_ddi(file_path: str) -> Dict:
     # The codebook element is the root
     codebook = tree.getroot()
     ddi_dict["file_metadata"] = get_file_metadata(codebook)
+    ddi_dict.update(get_file_structure(codebook))
     ddi_dict = get_field_metadata(codebook, ddi_dict)
+    ddi_dict["codebook"] = Codebook.from_ddi_dict(ddi_dict)
 
     return ddi_dict
@@ -0,0 +1,374 @@
+"""
+Chunk sizes and parallelism for reading and cleaning an extract, chosen from
+a memory budget and a core count rather than by hand:
+
+    plan = plan_execution(ddi, "usa_00003.dat.gz", cleaner="IpumsAcsCleaner",
+                          memory_budget="4G", cores=8)
+    df, report = read_planned(ddi, "usa_00003.dat.gz", plan)
+
+Memory per row is estimated from the DDI: the fixed-width record (read
+through a few buffer copies), every decoded column at the dtype it is read
+into (text as Python strings), the columns the cleaner derives
+(``DERIVED_COLUMNS``) and the scratch arrays of each decoding thread.
+``workers`` chunks are decoded and cleaned at once, each on ``jobs``
+threads. ``read_planned`` logs the plan and the peak memory actually used.
+"""
+import logging
+import math
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .dataset import _column_dtype
+from .profiling import PeakMemory
+from .read_data import decode_records, iter_record_chunks
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# chunks smaller than this spend more time on per-chunk overhead than decoding
+MIN_CHUNKSIZE = 5_000
+# and larger ones decode no faster
+MAX_CHUNKSIZE = 1_000_000
+# share of the available memory planned for when no budget is given
+DEFAULT_BUDGET_SHARE = 0.5
+# headroom for pandas temporaries the estimates leave out
+SAFETY_FACTOR = 1.25
+# a gzipped read joins the carried-over partial record to the next block
+# and slices off the complete records: three copies of a chunk at worst
+READ_COPIES = 3
+POINTER_BYTES = 8
+# a derived column is a float64 or object column, mostly of shared label
+# strings; a few build a string per row
+DERIVED_BYTES = 16
+STR_BYTES = sys.getsizeof("")
+UNITS = {"": 1, "K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+BYTES_PATTERN = re.compile(r"^\s*([\d.]+)\s*([KMGT]?)i?B?\s*$", re.IGNORECASE)
+
+
+def parse_bytes(value) -> int:
+    """A byte count from an int or a size such as "512M", "4G" or "1.5GiB"."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = BYTES_PATTERN.match(str(value))
+    if match is None:
+        raise ValueError(f"Cannot parse memory size {value!r}")
+    number, unit = match.groups()
+    return int(float(number) * UNITS[unit.upper()])
+
+
+def available_memory() -> Optional[int]:
+    """Memory available to new allocations in bytes, where /proc is available."""
+    try:
+        with open("/proc/meminfo") as fp:
+            for line in fp:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, IndexError, ValueError):
+        return None
+    return None
+
+
+def column_bytes(ddi: Dict, col: str, compact: bool = True) -> int:
+    """Bytes per row of ``col`` once decoded."""
+    dtype = _column_dtype(ddi, col, compact)
+    if dtype.kind == "O":
+        start, end = ddi["column_specs"][ddi["columns"].index(col)]
+        return POINTER_BYTES + STR_BYTES + (end - start)
+    return dtype.itemsize
+
+
+def decode_scratch_bytes(ddi: Dict, columns: List[str]) -> int:
+    """
+    Bytes per row one decoding thread holds at most: the widest numeric
+    field as int64 digits plus its masks, and the running int64 values.
+    """
+    widths = [
+        end - start
+        for col, (start, end) in zip(ddi["columns"], ddi["column_specs"])
+        if col in columns
+    ]
+    return (8 + 2) * max(widths, default=0) + 3 * 8
+
+
+def estimate_row_bytes(
+    ddi: Dict,
+    columns: Optional[List[str]] = None,
+    cleaner: Optional[str] = None,
+    compact: bool = True,
+) -> Dict[str, int]:
+    """
+    Bytes per row of the fixed-width record, the decoded columns, the
+    columns ``cleaner`` (a class name from pyipums.clean_data) adds, and one
+    decoding thread's scratch arrays.
+    """
+    columns = ddi["columns"] if columns is None else columns
+    derived = 0
+    if cleaner is not None:
+        from . import clean_data
+
+        derived = DERIVED_BYTES * len(getattr(clean_data, cleaner).DERIVED_COLUMNS)
+    return {
+        "record": max(end for _, end in ddi["column_specs"]) + 1,
+        "decoded": sum(column_bytes(ddi, col, compact) for col in columns),
+        "derived": derived,
+        "scratch": decode_scratch_bytes(ddi, columns),
+    }
+
+
+def estimate_rows(ddi: Dict, data_file_path: str) -> Optional[int]:
+    """
+    Records in a local fixed-width file, from its size or, gzipped, from the
+    uncompressed size in its trailer (modulo 4 GiB, so only trusted when it
+    exceeds the compressed size). None when it can't be told.
+    """
+    if not os.path.exists(data_file_path):
+        return None
+    size = os.path.getsize(data_file_path)
+    if str(data_file_path).endswith(".gz"):
+        if size < 4:
+            return None
+        with open(data_file_path, "rb") as fp:
+            fp.seek(-4, os.SEEK_END)
+            uncompressed = int.from_bytes(fp.read(4), "little")
+        if uncompressed < size:
+            return None
+        size = uncompressed
+    return size // (max(end for _, end in ddi["column_specs"]) + 1)
+
+
+class ExecutionPlan(NamedTuple):
+    chunksize: int
+    workers: int
+    jobs: int
+    n_rows: Optional[int]
+    columns: Optional[List[str]]
+    cleaner: Optional[str]
+    compact: bool
+    keep: bool
+    row_bytes: Dict[str, int]
+    chunk_bytes: int
+    result_bytes: int
+    estimated_peak: int
+    memory_budget: int
+    cores: int
+
+    def describe(self) -> str:
+        rows = "unknown" if self.n_rows is None else f"{self.n_rows:,}"
+        return (
+            f"{self.workers} chunks of {self.chunksize:,} rows at once, "
+            f"{self.jobs} decoding threads each; {rows} rows, estimated peak "
+            f"{self.estimated_peak / 1e6:,.1f} MB of {self.memory_budget / 1e6:,.1f} MB"
+        )
+
+
+def _chunk_row_bytes(row_bytes: Dict[str, int], jobs: int) -> float:
+    # the decoded columns are copied once more when gathered into a frame,
+    # and again when a cleaner's writes consolidate its blocks
+    return SAFETY_FACTOR * (
+        READ_COPIES * row_bytes["record"]
+        + 2 * row_bytes["decoded"]
+        + row_bytes["derived"]
+        + jobs * row_bytes["scratch"]
+    )
+
+
+def plan_execution(
+    ddi: Dict,
+    data_file_path: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    cleaner: Optional[str] = None,
+    memory_budget=None,
+    cores: Optional[int] = None,
+    keep: bool = True,
+    compact: bool = True,
+    n_rows: Optional[int] = None,
+) -> ExecutionPlan:
+    """
+    Pick the chunk size, the chunks processed at once (``workers``) and the
+    decoding threads per chunk (``jobs``) that keep reading, and cleaning
+    with ``cleaner``, within ``memory_budget`` (bytes or e.g. "4G"; by
+    default half the available memory) on ``cores`` cores. With ``keep``
+    the cleaned frame is held whole, so it must fit with room for the final
+    concatenation; otherwise the chunks are assumed to be consumed as they
+    come. ``n_rows`` defaults to an estimate from the data file.
+    Raises ValueError when the budget can't be met.
+    """
+    if memory_budget is None:
+        available = available_memory()
+        if available is None:
+            raise ValueError("Cannot tell the available memory; pass memory_budget")
+        memory_budget = int(available * DEFAULT_BUDGET_SHARE)
+    memory_budget = parse_bytes(memory_budget)
+    cores = max(cores or os.cpu_count() or 1, 1)
+    if n_rows is None and data_file_path is not None:
+        n_rows = estimate_rows(ddi, data_file_path)
+    row_bytes = estimate_row_bytes(ddi, columns, cleaner, compact)
+    n_columns = len(ddi["columns"] if columns is None else columns)
+
+    result_bytes = 0
+    if keep and n_rows is not None:
+        result_bytes = int(
+            SAFETY_FACTOR * n_rows * (row_bytes["decoded"] + row_bytes["derived"])
+        )
+        # the chunks and their concatenation are both alive at the end
+        if 2 * result_bytes > memory_budget:
+            raise ValueError(
+                f"Holding {n_rows:,} rows needs about {2 * result_bytes / 1e6:,.1f} "
+                f"MB, over the {memory_budget / 1e6:,.1f} MB budget; read fewer "
+                "columns or stream the chunks with keep=False"
+            )
+    streaming_budget = memory_budget - result_bytes
+
+    max_workers = cores
+    if n_rows is not None:
+        max_workers = min(max_workers, max(math.ceil(n_rows / MIN_CHUNKSIZE), 1))
+    for workers in range(max_workers, 0, -1):
+        jobs = max(min(cores // workers, n_columns), 1)
+        per_row = _chunk_row_bytes(row_bytes, jobs)
+        # with a pool, the reader fills the next chunk while the workers run
+        read_ahead = READ_COPIES * row_bytes["record"] if workers > 1 else 0
+        chunksize = int(streaming_budget / (workers * per_row + read_ahead))
+        chunksize = min(chunksize, MAX_CHUNKSIZE)
+        if n_rows is not None:
+            chunksize = min(chunksize, max(math.ceil(n_rows / workers), 1))
+        smallest = MIN_CHUNKSIZE if n_rows is None else min(MIN_CHUNKSIZE, n_rows)
+        if chunksize >= max(smallest, 1) or (workers == 1 and chunksize >= 1):
+            break
+    else:
+        raise ValueError(
+            f"A {memory_budget / 1e6:,.1f} MB budget can't fit a single row "
+            f"of {per_row:,.0f} bytes"
+        )
+    chunk_bytes = int(chunksize * per_row)
+    estimated_peak = max(
+        result_bytes + workers * chunk_bytes + chunksize * read_ahead,
+        2 * result_bytes,
+    )
+    return ExecutionPlan(
+        chunksize,
+        workers,
+        jobs,
+        n_rows,
+        columns,
+        cleaner,
+        compact,
+        keep,
+        row_bytes,
+        chunk_bytes,
+        result_bytes,
+        estimated_peak,
+        memory_budget,
+        cores,
+    )
+
+
+def _process(records, ddi: Dict, plan: ExecutionPlan, cleaner) -> "pd.DataFrame":
+    df = decode_records(records, ddi, plan.columns, plan.compact, plan.jobs)
+    if cleaner is not None:
+        df = cleaner(df, ddi["codebook"]).clean_data()
+    return df
+
+
+def iter_planned(
+    ddi: Dict,
+    data_file_path: str,
+    plan: ExecutionPlan,
+    on_chunk=None,
+) -> Iterator["pd.DataFrame"]:
+    """
+    The extract's chunks, decoded and cleaned as ``plan`` says, in file
+    order. At most ``plan.workers`` chunks are in flight; ``on_chunk`` is
+    called as each is handed over.
+    """
+    from .hierarchical import is_hierarchical
+
+    if is_hierarchical(ddi):
+        raise ValueError("Planned reads of hierarchical extracts are not supported")
+    cleaner = None
+    if plan.cleaner is not None:
+        from . import clean_data
+
+        cleaner = getattr(clean_data, plan.cleaner)
+    chunks = iter_record_chunks(data_file_path, plan.chunksize)
+    if plan.workers == 1:
+        for records in chunks:
+            yield _process(records, ddi, plan, cleaner)
+            if on_chunk is not None:
+                on_chunk()
+        return
+    with ThreadPoolExecutor(max_workers=plan.workers) as pool:
+        pending = deque()
+        for records in chunks:
+            pending.append(pool.submit(_process, records, ddi, plan, cleaner))
+            # drop the reference so finished chunks' records can be freed
+            del records
+            if len(pending) >= plan.workers:
+                yield pending.popleft().result()
+                if on_chunk is not None:
+                    on_chunk()
+        while pending:
+            yield pending.popleft().result()
+            if on_chunk is not None:
+                on_chunk()
+
+
+def read_planned(
+    ddi: Dict,
+    data_file_path: str,
+    plan: Optional[ExecutionPlan] = None,
+    memory: str = "rss",
+    **options,
+) -> Tuple["pd.DataFrame", Dict]:
+    """
+    Read, and clean, the whole extract as ``plan`` says (by default one made
+    by ``plan_execution`` from ``options``), measuring the peak memory with
+    ``memory`` ("rss" or "tracemalloc"). Returns the frame and a report of
+    the plan next to the rows, seconds and peak memory of the run.
+    """
+    import pandas as pd
+
+    if plan is None:
+        plan = plan_execution(ddi, data_file_path, **options)
+    if not plan.keep:
+        raise ValueError("read_planned holds the whole extract; plan with keep=True")
+    logger.info("plan for %s: %s", data_file_path, plan.describe())
+    start = time.perf_counter()
+    with PeakMemory(memory) as peak:
+        chunks = list(iter_planned(ddi, data_file_path, plan, peak.sample))
+        if chunks:
+            df = pd.concat(chunks, ignore_index=True)
+        else:
+            record_length = max(end for _, end in ddi["column_specs"])
+            empty = np.empty((0, record_length), dtype=np.uint8)
+            df = decode_records(empty, ddi, plan.columns, plan.compact)
+        del chunks
+    seconds = time.perf_counter() - start
+    report = {
+        "chunksize": plan.chunksize,
+        "workers": plan.workers,
+        "jobs": plan.jobs,
+        "estimated_rows": plan.n_rows,
+        "rows": len(df),
+        "seconds": seconds,
+        "memory_budget": plan.memory_budget,
+        "estimated_peak": plan.estimated_peak,
+        "peak_memory": peak.peak,
+    }
+    logger.info(
+        "read %s rows of %s in %.2fs, peak memory %s (estimated %.1f MB)",
+        f"{len(df):,}",
+        data_file_path,
+        seconds,
+        "n/a" if peak.peak is None else f"{peak.peak / 1e6:,.1f} MB",
+        plan.estimated_peak / 1e6,
+    )
+    return df, report
@@ -0,0 +1,346 @@
+"""
+The compute stage of the ``pyipums.plotting`` helpers. Each function reduces
+the microdata to the few small arrays a plot draws (ECDF steps, density
+curves, a frequency table) and is memoized in a bounded LRU cache keyed by a
+fingerprint of the columns it reads plus its statistical arguments, so
+re-rendering a plot with other colors, legends or titles never goes back to
+the microdata. Nothing here imports matplotlib:
+
+    curves = ecdf_data(df, "State", "Total Income", "ASECWT", k=5)
+    curves["California"]  # (x, cumulative share of weight)
+"""
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .grouping import top_k_subset
+from .inequality import WeightedDistribution
+from .tabulate import pt, weighted_mean_by
+
+DEFAULT_CACHE_SIZE = 32
+# the most steps kept for an ECDF curve; more than a figure can show
+ECDF_POINTS = 1024
+# seaborn's kdeplot default
+DENSITY_GRIDSIZE = 200
+# fine bins the weights are spread over before smoothing
+DENSITY_BINS = 4096
+# kernel tails beyond this many bandwidths are dropped
+KERNEL_REACH = 5
+TOP_CATEGORIES = 30
+
+Curves = Dict[Hashable, Tuple[np.ndarray, np.ndarray]]
+
+
+class PlotDataCache:
+    """
+    The ``maxsize`` most recently used plot data. Cached values are shared
+    between callers, so renderers must not modify them.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def get(self, key, compute: Callable):
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        self.misses += 1
+        value = compute()
+        self._entries[key] = value
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+
+PLOT_CACHE = PlotDataCache()
+
+
+def _column_digest(values: pd.Series) -> bytes:
+    digest = hashlib.blake2b(f"{values.dtype}:{len(values)}".encode(), digest_size=16)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        digest.update(repr(values.cat.categories.tolist()).encode())
+        data = values.cat.codes.to_numpy()
+    elif values.dtype.kind in "biufmM":
+        data = values.to_numpy()
+    else:
+        # text has no buffer of its own to hash
+        data = pd.util.hash_pandas_object(values, index=False).to_numpy()
+    digest.update(np.ascontiguousarray(data).view(np.uint8))
+    return digest.digest()
+
+
+def frame_fingerprint(df: pd.DataFrame, columns: Sequence[Optional[str]]) -> str:
+    """
+    A digest of the contents of ``columns`` (None entries are skipped). One
+    pass over each column's raw values, which is much cheaper than the
+    statistics it stands for.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for column in columns:
+        if column is None:
+            continue
+        digest.update(str(column).encode())
+        digest.update(_column_digest(df[column]))
+    return digest.hexdigest()
+
+
+def _cached(cache: Optional[PlotDataCache], key: Tuple, compute: Callable):
+    if cache is None:
+        return compute()
+    return cache.get(key, compute)
+
+
+def _read_only(*arrays: np.ndarray) -> Tuple[np.ndarray, ...]:
+    for array in arrays:
+        array.flags.writeable = False
+    return arrays
+
+
+def _distributions(
+    xdf: pd.DataFrame, groupbyvar: str, xvar: str, wvar: str, k, max_percentile
+) -> Tuple[WeightedDistribution, List]:
+    subset = top_k_subset(xdf, groupbyvar, k=k, xvar=xvar, max_percentile=max_percentile)
+    dist = WeightedDistribution.from_frame(subset, xvar, wvar, groupbyvar)
+    # curves follow the groups' order of appearance, like seaborn's hue
+    order = [label for label in pd.unique(subset[groupbyvar]) if label in dist.index]
+    return dist, order
+
+
+def _group_rows(dist: WeightedDistribution, label) -> Tuple[int, slice]:
+    position = dist.index.get_loc(label)
+    return position, slice(dist.starts[position], dist.ends[position])
+
+
+def _ecdf_curves(xdf, groupbyvar, xvar, wvar, k, max_percentile, points) -> Curves:
+    dist, order = _distributions(xdf, groupbyvar, xvar, wvar, k, max_percentile)
+    curves = {}
+    for label in order:
+        position, rows = _group_rows(dist, label)
+        if rows.start == rows.stop:
+            continue
+        x = dist.values[rows]
+        weight = dist.cum_weights[rows] - dist.weight_offsets[position]
+        y = weight / dist.group_weights[position]
+        # the top of each step, then at most ``points`` evenly spaced steps
+        top = np.append(x[1:] != x[:-1], True)
+        x, y = x[top], y[top]
+        if len(x) > points:
+            keep = np.linspace(0, len(x) - 1, points).round().astype(np.intp)
+            x, y = x[np.unique(keep)], y[np.unique(keep)]
+        curves[label] = _read_only(x, y)
+    return curves
+
+
+def ecdf_data(
+    xdf: pd.DataFrame,
+    groupbyvar: str,
+    xvar: str,
+    wvar: str,
+    k: Optional[int] = None,
+    max_percentile: float = 1.0,
+    points: int = ECDF_POINTS,
+    cache: Optional[PlotDataCache] = PLOT_CACHE,
+) -> Curves:
+    """
+    The weighted ECDF of ``xvar`` for each group of ``groupbyvar`` (the top
+    ``k`` groups, below the ``max_percentile`` quantile) as (values, share of
+    the group's weight at or below them) step arrays.
+    """
+    key = (
+        "ecdf",
+        frame_fingerprint(xdf, [groupbyvar, xvar, wvar]),
+        groupbyvar,
+        xvar,
+        wvar,
+        k,
+        max_percentile,
+        points,
+    )
+    return _cached(
+        cache,
+        key,
+        lambda: _ecdf_curves(xdf, groupbyvar, xvar, wvar, k, max_percentile, points),
+    )
+
+
+def weighted_kde(
+    x: np.ndarray,
+    weights: np.ndarray,
+    gridsize: int = DENSITY_GRIDSIZE,
+    bins: int = DENSITY_BINS,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Weighted Gaussian kernel density of sorted ``x`` on ``gridsize`` points
+    from its minimum to its maximum, with the Scott's rule bandwidth that
+    seaborn's kdeplot uses. The weights are spread linearly over ``bins``
+    fine bins and smoothed with an FFT convolution, so the cost doesn't grow
+    with rows times grid points. Constant data has no density.
+    """
+    low, high = x[0], x[-1]
+    total = weights.sum()
+    mean = (weights * x).sum() / total
+    squared = (weights * weights).sum()
+    # the unbiased weighted variance of np.cov(x, aweights=weights)
+    variance = (weights * (x - mean) ** 2).sum() / (total - squared / total)
+    bandwidth = np.sqrt(variance) * (total * total / squared) ** -0.2
+    if not high > low or not bandwidth > 0:
+        return np.empty(0), np.empty(0)
+
+    step = (high - low) / (bins - 1)
+    position = (x - low) / step
+    left = np.minimum(position.astype(np.intp), bins - 2)
+    right_share = position - left
+    counts = np.bincount(left, weights * (1 - right_share), minlength=bins)
+    counts += np.bincount(left + 1, weights * right_share, minlength=bins)
+
+    reach = min(int(np.ceil(KERNEL_REACH * bandwidth / step)), bins - 1)
+    kernel = np.exp(-0.5 * (np.arange(-reach, reach + 1) * step / bandwidth) ** 2)
+    size = 1 << (bins + 2 * reach).bit_length()
+    smoothed = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)
+    density = np.maximum(smoothed[reach : reach + bins], 0)
+    density /= total * bandwidth * np.sqrt(2 * np.pi)
+    grid = np.linspace(low, high, gridsize)
+    return grid, np.interp(grid, low + step * np.arange(bins), density)
+
+
+def _density_curves(xdf, groupbyvar, xvar, wvar, k, max_percentile, gridsize) -> Curves:
+    dist, order = _distributions(xdf, groupbyvar, xvar, wvar, k, max_percentile)
+    curves = {}
+    for label in order:
+        _, rows = _group_rows(dist, label)
+        if rows.stop - rows.start < 2:
+            continue
+        grid, density = weighted_kde(dist.values[rows], dist.weights[rows], gridsize)
+        if len(grid):
+            curves[label] = _read_only(grid, density)
+    return curves
+
+
+def density_data(
+    xdf: pd.DataFrame,
+    groupbyvar: str,
+    xvar: str,
+    wvar: str,
+    k: Optional[int] = None,
+    max_percentile: float = 1.0,
+    gridsize: int = DENSITY_GRIDSIZE,
+    cache: Optional[PlotDataCache] = PLOT_CACHE,
+) -> Curves:
+    """
+    The weighted density of ``xvar`` for each group of ``groupbyvar``, each
+    normalized on its own, as (grid, density) arrays over the group's range.
+    """
+    key = (
+        "density",
+        frame_fingerprint(xdf, [groupbyvar, xvar, wvar]),
+        groupbyvar,
+        xvar,
+        wvar,
+        k,
+        max_percentile,
+        gridsize,
+    )
+    return _cached(
+        cache,
+        key,
+        lambda: _density_curves(
+            xdf, groupbyvar, xvar, wvar, k, max_percentile, gridsize
+        ),
+    )
+
+
+def group_means(
+    xdf: pd.DataFrame,
+    groupbyvar: str,
+    xvar: str,
+    wvar: str,
+    k: Optional[int] = None,
+    max_percentile: float = 1.0,
+    cache: Optional[PlotDataCache] = PLOT_CACHE,
+) -> pd.DataFrame:
+    """``weighted_mean_by`` of the groups a density plot draws."""
+    key = (
+        "means",
+        frame_fingerprint(xdf, [groupbyvar, xvar, wvar]),
+        groupbyvar,
+        xvar,
+        wvar,
+        k,
+        max_percentile,
+    )
+
+    def compute():
+        subset = top_k_subset(
+            xdf, groupbyvar, k=k, xvar=xvar, max_percentile=max_percentile
+        )
+        return weighted_mean_by(subset, groupbyvar, xvar, wvar)
+
+    return _cached(cache, key, compute)
+
+
+def _labels_key(ddi, xvar: str):
+    if not ddi:
+        return None
+    codes = ddi.get_variable_info(xvar).codes
+    return repr(sorted(codes.items(), key=repr))
+
+
+def tabulation_data(
+    ddi,
+    df: pd.DataFrame,
+    xvar: str,
+    wvar: str,
+    repwts: Optional[List[str]] = None,
+    method: str = "sdr",
+    top: int = TOP_CATEGORIES,
+    cache: Optional[PlotDataCache] = PLOT_CACHE,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    ``pt`` with percentages (and their standard errors) scaled to 100, and
+    the ``top`` largest categories in ascending order for a bar plot.
+    """
+    key = (
+        "tabulation",
+        frame_fingerprint(df, [xvar, wvar] + list(repwts or [])),
+        _labels_key(ddi, xvar),
+        xvar,
+        wvar,
+        tuple(repwts or ()),
+        method,
+        top,
+    )
+
+    def compute():
+        table = pt(ddi, df, xvar, wvar, repwts=repwts, method=method)
+        table["Percent"] = (table["Percent"] * 100.0).round(2)
+        columns = ["Percent", xvar]
+        if "Percent_se" in table.columns:
+            table["Percent_se"] = table["Percent_se"] * 100.0
+            columns.append("Percent_se")
+        bars = (
+            table[columns]
+            .sort_values(by="Percent", ascending=False)
+            .reset_index(drop=True)
+            .loc[0:top]
+            .sort_values(by="Percent")
+        )
+        return table, bars
+
+    return _cached(cache, key, compute)
@@ -0,0 +1,276 @@
+import matplotlib as mpl
+import seaborn as sns
+from matplotlib import pyplot as plt
+
+from .plotdata import density_data, ecdf_data, group_means, tabulation_data
+
+
+def set_notebook_style():
+    plt.rcParams["figure.figsize"] = 12, 8  # Set figure size for the notebook
+    sns.set(style="whitegrid")  # set seaborn whitegrid theme
+
+
+# the render stage: draw the arrays from pyipums.plotdata, one color per group
+
+
+def _draw_ecdf(ax, curves, colors):
+    return [
+        ax.step(x, y, where="post", color=colors[group], alpha=0.8)[0]
+        for group, (x, y) in curves.items()
+    ]
+
+
+def _draw_density(ax, curves, colors):
+    handles = []
+    for group, (grid, density) in curves.items():
+        handles.append(ax.plot(grid, density, color=colors[group])[0])
+        ax.fill_between(grid, density, color=colors[group], alpha=0.2)
+    return handles
+
+
+def cdf_plot_by_x(
+    ddi_codebook,
+    xdf,
+    groupbyvar,
+    xvar,
+    wvar,
+    k=None,
+    bbox=(0.5, -0.1),
+    legend_ncol=3,
+    max_percentile=1.0,
+):
+    curves = ecdf_data(xdf, groupbyvar, xvar, wvar, k=k, max_percentile=max_percentile)
+    fig, ax = plt.subplots(1, 1, figsize=(16, 8))
+    groups = list(curves)
+    pal = sns.color_palette("bright", len(groups))
+    handles = _draw_ecdf(ax, curves, dict(zip(groups, pal)))
+    ax.set(title=f"Cumulative Distribution of Total Income by {groupbyvar}")
+    label = (
+        ddi_codebook.get_variable_info(xvar.replace("_2", ""))
+        .label.title()
+        .replace("'S", "'s")
+    )
+    ax.set_xlabel(f"{label}")
+    ax.set_ylabel(f"Cumulative Percent of ASEC Data")
+    ax.get_yaxis().set_major_formatter(mpl.ticker.StrMethodFormatter("{x:,.2f}"))
+    ax.get_xaxis().set_major_formatter(mpl.ticker.StrMethodFormatter("${x:,.0f}"))
+    fig.legend(
+        handles, groups, loc="lower center", bbox_to_anchor=bbox, ncol=legend_ncol
+    )
+    fig.show()
+
+
+def den_cdf_plot_by_x(
+    ddi_codebook,
+    xdf,
+    groupbyvar,
+    xvar,
+    wvar,
+    k=None,
+    bbox=(0.5, -0.1),
+    legend_ncol=3,
+    max_percentile=1.0,
+    den_title=None,
+):
+    density = density_data(
+        xdf, groupbyvar, xvar, wvar, k=k, max_percentile=max_percentile
+    )
+    curves = ecdf_data(xdf, groupbyvar, xvar, wvar, k=k, max_percentile=max_percentile)
+    fig, (ax1, ax) = plt.subplots(1, 2, figsize=(16, 8))
+    if den_title is None:
+        den_title = f"Estimated Density Function of Total Income by {groupbyvar}"
+    groups = list(curves)
+    pal = sns.color_palette("bright", len(groups))
+    colors = dict(zip(groups, pal))
+
+    _draw_density(ax1, density, colors)
+    ax1.set(title=den_title)
+    try:
+        label = (
+            ddi_codebook.get_variable_info(xvar.replace("_2", ""))
+            .label.title()
+            .replace("'S", "'s")
+        )
+    except:
+        label = xvar
+    ax1.set_xlabel(f"{label}")
+    ax1.set_ylabel(f"Percent of ASEC Data")
+    ax1.get_yaxis().set_major_formatter(mpl.ticker.StrMethodFormatter("{x:,.2f}"))
+    ax1.get_xaxis().set_major_formatter(mpl.ticker.StrMethodFormatter("${x:,.0f}"))
+
+    handles = _draw_ecdf(ax, curves, colors)
+    ax.set(title=f"Cumulative Distribution of Total Income by {groupbyvar}")
+    label = (
+        ddi_codebook.get_variable_info(xvar.replace("_2", ""))
+        .label.title()
+        .replace("'S", "'s")
+    )
+    ax.set_xlabel(f"{label}")
+    ax.set_ylabel(f"Cumulative Percent of ASEC Data")
+    ax.get_yaxis().set_major_formatter(mpl.ticker.StrMethodFormatter("{x:,.3f}"))
+    ax.get_xaxis().set_major_formatter(mpl.ticker.StrMethodFormatter("${x:,.0f}"))
+    fig.legend(
+        handles, groups, loc="lower center", bbox_to_anchor=bbox, ncol=legend_ncol
+    )
+    fig.show()
+
+
+def denbyplot(df, colname, byvar, weightvar, ddi_codebook=None):
+    f, ax = plt.subplots(1, figsize=(12, 8))
+    groups = df[byvar].unique()
+    labels = []
+    for i, g in enumerate(groups):
+        f = (df[colname].isnull() == False) & (df[byvar] == g)
+        ax = df[f][f"{colname}_2"].plot(
+            weight=df[f][weightvar], kind="density", grid=True
+        )
+        ax.set_xticklabels(["${:,}".format(int(x)) for x in ax.get_xticks().tolist()])
+        #     ax.set_xlim([0, 1e6])
+        try:
+            label = (
+                ddi_codebook.get_variable_info(colname.replace("_2", ""))
+                .label.title()
+                .replace("'S", "'s")
+            )
+        except:
+            label = colname
+        labels.append(label)
+        ax.set_xlabel(f"{label}")
+
+    box = ax.get_position()
+    ax.set_position([box.x0, box.y0 + box.height * 0.1, box.width, box.height * 0.9])
+
+    # Put a legend below current axis
+    ax.set_ylabel(f"Percentage of ASEC Data")
+    ax.legend(
+        labels,
+        loc="upper center",
+        bbox_to_anchor=(0.5, -0.1),
+        fancybox=True,
+        shadow=True,
+        ncol=2,
+    )
+    plt.show()
+
+
+def clean_dollars(x: str) -> str:
+    y = x.split(", ")
+    left = round(float(y[0].replace("(", "")))
+    right = round(float(y[1].replace("]", "")))
+    output = f"(\${left:,}, \${right:,}]"
+    return output
+
+
+def ptbarplot(
+    ddi,
+    df,
+    xvar,
+    wvar,
+    color="blue",
+    out=False,
+    xlabel="Percent of ASEC Sample",
+    ylabel=None,
+    title=None,
+    repwts=None,
+    method="sdr",
+):
+    x, y = tabulation_data(ddi, df, xvar, wvar, repwts=repwts, method=method)
+    if not ylabel:
+        try:
+            ylabel = ddi.get_variable_info(xvar).label.title()
+        except:
+            ylabel = xvar
+    error_bars = "Percent_se" in y.columns
+    ax = y.plot.barh(
+        x=xvar,
+        y="Percent",
+        xerr=y["Percent_se"].to_numpy() if error_bars else None,
+        color=color,
+        figsize=(12, 8),
+    )
+
+    for container in ax.containers:
+        ax.bar_label(container, fmt="%.2f%%", padding=2)
+
+    if title:
+        plt.title(title) 
+    plt.legend(loc="lower right")
+    plt.ylabel(ylabel)
+    plt.xlabel(xlabel)
+    plt.show()
+    if out:
+        return x.copy()
+
+
+def ptbarplot2(ddi, df, xvar, wvar, color="blue", out=False, xlabel="Percent of ASEC Sample"):
+    x, y = tabulation_data(ddi, df, xvar, wvar)
+    try:
+        ylabel = ddi.get_variable_info(xvar).label.title()
+    except:
+        ylabel = xvar
+    y = y[["Percent", xvar]]
+    ax = y.plot.barh(x=xvar, color=color, figsize=(12, 8))
+
+    for container in ax.containers:
+        ax.bar_label(container, fmt="%.2f%%", padding=2)
+
+    plt.legend(loc="lower right")
+    plt.ylabel(ylabel)
+    plt.xlabel(xlabel)
+    plt.show()
+    if out:
+        return x.copy()
+
+
+def den_plot_by_x(
+    ddi_codebook,
+    xdf,
+    groupbyvar,
+    xvar,
+    wvar,
+    k=None,
+    bbox=(0.5, -0.1),
+    legend_ncol=3,
+    max_percentile=1.0,
+    addvline=False,
+    den_title=None,
+    format_axis_dollars=True,
+):
+    curves = density_data(
+        xdf, groupbyvar, xvar, wvar, k=k, max_percentile=max_percentile
+    )
+    fig, ax1 = plt.subplots(1, 1, figsize=(14, 8))
+    if den_title is None:
+        den_title = f"Estimated Density Function of Total Income by {groupbyvar}"
+    groups = list(curves)
+    if addvline:
+        x = group_means(xdf, groupbyvar, xvar, wvar, k=k, max_percentile=max_percentile)
+        groups = x.index.tolist()
+    pal = sns.color_palette("bright", len(groups))
+    colors = dict(zip(groups, pal))
+
+    handles = _draw_density(ax1, curves, colors)
+    ax1.set(title=den_title)
+    ax1.legend(handles, list(curves), title=groupbyvar)
+
+    try:
+        label = (
+            ddi_codebook.get_variable_info(xvar.replace("_2", ""))
+            .label.title()
+            .replace("'S", "'s")
+        )
+    except:
+        label = xvar
+
+    ax1.set_xlabel(f"{label}")
+    ax1.set_ylabel(f"Percent of ASEC Data")
+    if format_axis_dollars:
+        ax1.get_yaxis().set_major_formatter(mpl.ticker.StrMethodFormatter("{x:,.5f}"))
+        ax1.get_xaxis().set_major_formatter(mpl.ticker.StrMethodFormatter("${x:,.0f}"))
+    if addvline:
+        from IPython.display import display
+
+        display(x[["final"]].rename({"final": xvar}, axis=1))
+        for group, xval in x["final"].items():
+            ax1.axvline(x=xval, ymin=0, color=colors[group], ymax=1, linestyle="--")
+    fig.show()
@@ -0,0 +1,225 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .grouping import _as_weights
+from .read_data import (
+    DEFAULT_CHUNKSIZE,
+    decode_records,
+    iter_record_chunks,
+    read_ipums_micro,
+)
+from .tabulate import pt
+
+PREVIEW_WEIGHT = "PREVIEW_WT"
+PREVIEW_REPWT_PREFIX = "PREVIEW_REPWT"
+PREVIEW_METHOD = "jk1"
+DEFAULT_PREVIEW_SIZE = 1000
+DEFAULT_PREVIEW_REPLICATES = 20
+
+
+def _stratum_ranks(strata: np.ndarray) -> np.ndarray:
+    # position of each row within its run of equal (already sorted) strata
+    starts = np.flatnonzero(np.r_[True, strata[1:] != strata[:-1]])
+    run_lengths = np.diff(np.r_[starts, len(strata)])
+    return np.arange(len(strata)) - np.repeat(starts, run_lengths)
+
+
+def _largest_keys_per_stratum(keys: np.ndarray, strata: np.ndarray, n: int):
+    order = np.lexsort((-keys, strata))
+    return order[_stratum_ranks(strata[order]) < n]
+
+
+def _preview_weights(
+    sample: pd.DataFrame,
+    strata: np.ndarray,
+    stratum_totals: Dict,
+    weight_column: str,
+    n_replicates: int,
+):
+    values, inverse, n_h = np.unique(strata, return_inverse=True, return_counts=True)
+    totals = np.array([stratum_totals[v] for v in values])
+    weights = (totals / n_h)[inverse]
+    sample[weight_column] = weights
+
+    # delete-a-group jackknife: rows are dealt into random groups within each
+    # stratum, and the rest of the stratum is scaled up to keep its total
+    groups = _stratum_ranks(strata) % n_replicates
+    dropped = np.bincount(
+        inverse * n_replicates + groups, minlength=len(values) * n_replicates
+    ).reshape(len(values), n_replicates)
+    remaining = n_h[:, None] - dropped
+    scale = np.where(remaining > 0, n_h[:, None] / np.maximum(remaining, 1), 1.0)
+    for r in range(n_replicates):
+        deleted = (groups == r) & (remaining[inverse, r] > 0)
+        sample[f"{PREVIEW_REPWT_PREFIX}{r + 1}"] = np.where(
+            deleted, 0.0, weights * scale[inverse, r]
+        )
+
+
+def sample_ipums_micro(
+    ddi: Dict,
+    data_file_path: str,
+    n: int = DEFAULT_PREVIEW_SIZE,
+    strata: Optional[str] = None,
+    wvar: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+    seed: int = 0,
+    n_replicates: int = DEFAULT_PREVIEW_REPLICATES,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> pd.DataFrame:
+    """
+    Reproducible weighted reservoir sample of up to ``n`` records per stratum,
+    streamed from the fixed-width data file without materializing it.
+
+    Records are keyed by ``log(u) / weight`` (Efraimidis-Spirakis), so keeping
+    the largest ``n`` keys of each stratum draws records with probability
+    proportional to ``wvar``. Each sampled record then stands for
+    ``W_h / n_h`` persons, where ``W_h`` is the stratum's total weight seen
+    while streaming; this replaces ``wvar`` (or fills PREVIEW_WT when the
+    sample is unweighted). PREVIEW_REPWT1..n_replicates hold jackknife
+    replicate weights for sampling errors (method "jk1").
+    """
+    if n_replicates < 2:
+        raise ValueError("n_replicates must be at least 2")
+    rng = np.random.default_rng(seed)
+    key_columns = [c for c in (strata, wvar) if c]
+    kept_records, kept_keys, kept_strata = None, None, None
+    stratum_totals = {}
+    for records in iter_record_chunks(data_file_path, chunksize):
+        keyed = decode_records(records, ddi, key_columns)
+        u = rng.random(len(records))
+        if wvar:
+            # a blank weight decodes as NaN and, like zero, represents nobody
+            weights = _as_weights(keyed[wvar])
+        else:
+            weights = np.ones(len(records))
+        if strata:
+            chunk_strata = keyed[strata].to_numpy()
+        else:
+            chunk_strata = np.zeros(len(records), dtype=np.int64)
+
+        values, inverse = np.unique(chunk_strata, return_inverse=True)
+        for value, total in zip(values, np.bincount(inverse, weights)):
+            stratum_totals[value] = stratum_totals.get(value, 0.0) + total
+
+        # zero-weight records represent nobody and are never drawn
+        positive = weights > 0
+        keys = np.log(u[positive]) / weights[positive]
+        if kept_records is None:
+            kept_records = records[positive]
+            kept_keys, kept_strata = keys, chunk_strata[positive]
+        else:
+            kept_records = np.concatenate([kept_records, records[positive]])
+            kept_keys = np.concatenate([kept_keys, keys])
+            kept_strata = np.concatenate([kept_strata, chunk_strata[positive]])
+        keep = _largest_keys_per_stratum(kept_keys, kept_strata, n)
+        kept_records, kept_keys, kept_strata = (
+            kept_records[keep],
+            kept_keys[keep],
+            kept_strata[keep],
+        )
+
+    if kept_records is None:
+        # an empty data file: decode no records for the columns and dtypes
+        record_length = max(end for _, end in ddi["column_specs"])
+        kept_records = np.empty((0, record_length), dtype=np.uint8)
+        kept_strata = np.empty(0, dtype=np.int64)
+    sample = decode_records(kept_records, ddi, columns)
+    _preview_weights(
+        sample, kept_strata, stratum_totals, wvar or PREVIEW_WEIGHT, n_replicates
+    )
+    return sample
+
+
+class PreviewSession:
+    """
+    Run exploratory tabulations against a small preview sample of an extract,
+    then switch the same session to the full data with ``use_full_data()``.
+    """
+
+    def __init__(
+        self,
+        ddi: Dict,
+        data_file_path: str,
+        n: int = DEFAULT_PREVIEW_SIZE,
+        strata: Optional[str] = None,
+        wvar: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+        seed: int = 0,
+        n_replicates: int = DEFAULT_PREVIEW_REPLICATES,
+        repwts: Optional[List[str]] = None,
+        method: str = "sdr",
+    ):
+        self.ddi = ddi
+        self.data_file_path = data_file_path
+        self.n = n
+        self.strata = strata
+        self.wvar = wvar
+        self.columns = columns
+        self.seed = seed
+        self.n_replicates = n_replicates
+        # replicate weights of the full extract, used once previewing is off
+        self.full_repwts = repwts
+        self.full_method = method
+        self.full = False
+        self._sample = None
+        self._full_data = None
+
+    def use_full_data(self, full: bool = True) -> "PreviewSession":
+        self.full = full
+        return self
+
+    @property
+    def weight(self) -> Optional[str]:
+        if self.full:
+            return self.wvar
+        return self.wvar or PREVIEW_WEIGHT
+
+    @property
+    def repwts(self) -> Optional[List[str]]:
+        if self.full:
+            return self.full_repwts
+        return [f"{PREVIEW_REPWT_PREFIX}{r}" for r in range(1, self.n_replicates + 1)]
+
+    @property
+    def method(self) -> str:
+        return self.full_method if self.full else PREVIEW_METHOD
+
+    def data(self) -> pd.DataFrame:
+        if self.full:
+            if self._full_data is None:
+                columns = self.columns
+                if columns is not None and self.full_repwts:
+                    columns = columns + list(self.full_repwts)
+                self._full_data = read_ipums_micro(
+                    self.ddi, self.data_file_path, columns=columns
+                )
+            return self._full_data
+
+        if self._sample is None:
+            self._sample = sample_ipums_micro(
+                self.ddi,
+                self.data_file_path,
+                n=self.n,
+                strata=self.strata,
+                wvar=self.wvar,
+                columns=self.columns,
+                seed=self.seed,
+                n_replicates=self.n_replicates,
+            )
+        return self._sample
+
+    def pt(self, ddi_codebook, xvar: str) -> pd.DataFrame:
+        return pt(
+            ddi_codebook,
+            self.data(),
+            xvar,
+            self.weight,
+            repwts=self.repwts,
+            method=self.method,
+        )
+
+    def clean(self, cleaner, ddi_codebook) -> pd.DataFrame:
+        return cleaner(self.data(), ddi_codebook).clean_data()
@@ -0,0 +1,217 @@
+"""
+Instrumentation for the cleaners. An observer is any callable taking a
+StageEvent; it is invoked after each cleaning stage and each ``map_codes``
+call. Cleaners built without an observer skip all of this.
+"""
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, NamedTuple, Optional
+
+MEMORY_MODES = (None, "tracemalloc", "rss")
+# tracemalloc.reset_peak is new in Python 3.9
+RESET_TRACED_PEAK = sys.version_info >= (3, 9)
+
+
+class StageEvent(NamedTuple):
+    stage: str
+    kind: str
+    seconds: float
+    rows: int
+    memory_delta: Optional[int]
+
+
+Observer = Callable[[StageEvent], None]
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, where /proc is available."""
+    try:
+        with open("/proc/self/statm") as fp:
+            pages = int(fp.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def peak_rss() -> Optional[int]:
+    """High-water mark of this process's RSS in bytes, where /proc is available."""
+    try:
+        with open("/proc/self/status") as fp:
+            for line in fp:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, IndexError, ValueError):
+        return None
+    return None
+
+
+def reset_peak_rss() -> bool:
+    """Reset the RSS high-water mark to the current RSS (Linux 4.0+)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fp:
+            fp.write("5")
+    except OSError:
+        return False
+    return peak_rss() is not None
+
+
+def _memory_reader(memory: Optional[str]) -> Optional[Callable[[], Optional[int]]]:
+    if memory not in MEMORY_MODES:
+        raise ValueError(f"Unknown memory mode {memory!r}, expected one of {MEMORY_MODES}")
+    if memory == "tracemalloc":
+        return lambda: tracemalloc.get_traced_memory()[0]
+    if memory == "rss":
+        return current_rss
+    return None
+
+
+@contextmanager
+def observe(
+    observer: Observer,
+    stage: str,
+    kind: str = "stage",
+    rows: int = 0,
+    memory: Optional[str] = None,
+) -> Iterator[None]:
+    """
+    Time the body and report it to ``observer``. ``memory`` adds the change
+    in traced Python allocations ("tracemalloc") or in process RSS ("rss").
+    """
+    read_memory = _memory_reader(memory)
+    started_tracing = memory == "tracemalloc" and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    before = read_memory() if read_memory else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        after = read_memory() if read_memory else None
+        if started_tracing:
+            tracemalloc.stop()
+        delta = None if before is None or after is None else after - before
+        observer(StageEvent(stage, kind, seconds, rows, delta))
+
+
+class StageProfiler:
+    """
+    Observer that records every event and summarizes them per stage:
+
+        profiler = StageProfiler(memory="tracemalloc")
+        IpumsAsecCleaner(df, ddi_codebook, observer=profiler).clean_data()
+        print(profiler.report())
+    """
+
+    def __init__(self, memory: Optional[str] = None):
+        _memory_reader(memory)
+        self.memory = memory
+        self.events: List[StageEvent] = []
+
+    def __call__(self, event: StageEvent):
+        self.events.append(event)
+
+    def summary(self):
+        import pandas as pd
+
+        columns = list(StageEvent._fields)
+        events = pd.DataFrame(self.events, columns=columns)
+        out = events.groupby(["kind", "stage"], sort=False).agg(
+            calls=("seconds", "size"),
+            seconds=("seconds", "sum"),
+            rows=("rows", "sum"),
+            memory_delta=("memory_delta", "sum"),
+        )
+        stage_seconds = events.loc[events["kind"] == "stage", "seconds"].sum()
+        out["percent"] = 100 * out["seconds"] / stage_seconds if stage_seconds else 0.0
+        out["rows_per_second"] = out["rows"] / out["seconds"]
+        if self.memory is None:
+            out = out.drop(columns="memory_delta")
+        # events arrive as calls finish, so nested map_codes calls precede
+        # their stage; list the stages first
+        out = out.reset_index()
+        out = out.sort_values("kind", key=lambda k: k != "stage", kind="stable")
+        return out.reset_index(drop=True)
+
+    def report(self) -> str:
+        if not self.events:
+            return "no stages recorded"
+        summary = self.summary()
+        header = f"  {'stage':<40} {'seconds':>10} {'share':>7} {'rows':>17}"
+        lines = [header + (f" {'memory':>13}" if self.memory is not None else "")]
+        for row in summary.itertuples(index=False):
+            name = row.stage if row.kind == "stage" else f"  {row.kind}({row.stage})"
+            line = (
+                f"  {name:<40} {row.seconds:9.4f}s {row.percent:6.1f}% "
+                f"{row.rows:>12,} rows"
+            )
+            if self.memory is not None:
+                line += f" {row.memory_delta / 1e6:+10.1f} MB"
+            lines.append(line)
+        total = summary.loc[summary["kind"] == "stage", "seconds"].sum()
+        lines.append(f"  {'total':<40} {total:9.4f}s")
+        return "\n".join(lines)
+
+
+class PeakMemory:
+    """
+    The most memory used inside a ``with`` block beyond what was in use when
+    it began, in bytes: of traced allocations ("tracemalloc"), or of process
+    RSS ("rss") from the kernel's high-water mark, reset on entry. Where that
+    can't be reset, RSS is only seen at each ``sample()`` call, as are traced
+    allocations on Python 3.8 when tracing was already on.
+    """
+
+    def __init__(self, memory: str = "rss"):
+        if memory not in MEMORY_MODES[1:]:
+            raise ValueError(f"Unknown memory mode {memory!r}")
+        self.memory = memory
+        self.peak: Optional[int] = None
+        self._started_tracing = False
+
+    def __enter__(self) -> "PeakMemory":
+        if self.memory == "tracemalloc":
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+            elif RESET_TRACED_PEAK:
+                tracemalloc.reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+            self._sampled = self._base
+        else:
+            self._base = current_rss()
+            self._high_water = reset_peak_rss()
+            self._sampled = self._base
+        return self
+
+    def _traced_peak_reset(self) -> bool:
+        return self._started_tracing or RESET_TRACED_PEAK
+
+    def sample(self):
+        if self.memory == "tracemalloc":
+            if not self._traced_peak_reset():
+                current = tracemalloc.get_traced_memory()[0]
+                self._sampled = max(self._sampled, current)
+            return
+        if not self._high_water:
+            rss = current_rss()
+            if rss is not None and self._sampled is not None:
+                self._sampled = max(self._sampled, rss)
+
+    def __exit__(self, *exc_info):
+        if self.memory == "tracemalloc":
+            current, top = tracemalloc.get_traced_memory()
+            if not self._traced_peak_reset():
+                # the traced peak may predate the block; use the samples
+                top = max(self._sampled, current)
+            self.peak = top - self._base
+            if self._started_tracing:
+                tracemalloc.stop()
+            return
+        self.sample()
+        top = peak_rss() if self._high_water else self._sampled
+        if top is not None and self._base is not None:
+            self.peak = max(top - self._base, 0)
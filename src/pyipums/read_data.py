@@ -0,0 +1,312 @@
+import gzip
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from .validation import ConformanceReport
+
+DEFAULT_CHUNKSIZE = 100_000
+NEWLINE = ord("\n")
+CARRIAGE_RETURN = ord("\r")
+SPACE = ord(" ")
+MINUS = ord("-")
+ZERO = ord("0")
+
+
+def open_data_file(data_file_path: str):
+    """Open a local path, a URL or a RemoteFile, decompressing ``.gz``."""
+    from .remote import is_url, open_remote
+
+    if is_url(data_file_path):
+        return open_remote(data_file_path)
+    if str(data_file_path).endswith(".gz"):
+        return gzip.open(data_file_path, "rb")
+    return open(data_file_path, "rb")
+
+
+def gather_records(raw: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """
+    The records spanning ``raw[starts[i]:ends[i]]`` as a 2-D uint8 array with
+    one row per record, padded with spaces when their lengths differ.
+    """
+    lengths = ends - starts
+    if len(lengths) == 0:
+        return np.empty((0, 0), dtype=np.uint8)
+    width = lengths.max()
+    if (lengths == width).all():
+        records = raw[starts[:, None] + np.arange(width)]
+        if width and (records[:, -1] == CARRIAGE_RETURN).all():
+            records = records[:, :-1]
+        return records
+
+    positions = np.arange(width)
+    inside = positions < lengths[:, None]
+    records = np.full((len(ends), width), SPACE, dtype=np.uint8)
+    records[inside] = raw[(starts[:, None] + positions)[inside]]
+    records[records == CARRIAGE_RETURN] = SPACE
+    return records
+
+
+def record_starts(ends: np.ndarray) -> np.ndarray:
+    starts = np.empty_like(ends)
+    if len(ends):
+        starts[0] = 0
+        starts[1:] = ends[:-1] + 1
+    return starts
+
+
+def records_to_array(buf: bytes) -> np.ndarray:
+    """
+    Turn a buffer of complete newline-terminated records into a 2-D uint8
+    array with one row per record. Rectangular extracts are a zero-copy
+    reshape; records of differing lengths are padded with spaces.
+    """
+    raw = np.frombuffer(buf, dtype=np.uint8)
+    ends = np.flatnonzero(raw == NEWLINE)
+    if len(ends) == 0:
+        return np.empty((0, 0), dtype=np.uint8)
+    starts = record_starts(ends)
+    lengths = ends - starts
+    width = lengths[0]
+    if (lengths == width).all() and ends[-1] + 1 == len(raw):
+        records = raw.reshape(len(ends), width + 1)[:, :width]
+        if width and (records[:, -1] == CARRIAGE_RETURN).all():
+            records = records[:, :-1]
+        return records
+    return gather_records(raw, starts, ends)
+
+
+def iter_record_buffers(
+    data_file_path: str, chunksize: int = DEFAULT_CHUNKSIZE
+) -> Iterator[bytes]:
+    """
+    Stream a (optionally gzipped) fixed-width data file as byte buffers of
+    about ``chunksize`` complete newline-terminated records.
+    """
+    with open_data_file(data_file_path) as fp:
+        # the first record sizes the reads, and the first read tops it up to
+        # a full block; streams are never rewound
+        pending = fp.readline()
+        read_size = max(len(pending), 1) * chunksize
+        block = fp.read(read_size - len(pending))
+        while block or pending:
+            buf = pending + block
+            cut = buf.rfind(b"\n") + 1
+            pending = buf[cut:]
+            if cut:
+                yield buf[:cut]
+            block = fp.read(read_size)
+            if not block:
+                break
+        if pending:
+            yield pending + b"\n"
+
+
+def iter_record_chunks(
+    data_file_path: str,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    n_max: Optional[int] = None,
+) -> Iterator[np.ndarray]:
+    """
+    Stream a (optionally gzipped) fixed-width data file as 2-D uint8 arrays of
+    at most ``chunksize`` records, so the whole file is never materialized.
+    """
+    n_read = 0
+    if n_max is not None:
+        chunksize = max(min(chunksize, n_max), 1)
+    for buf in iter_record_buffers(data_file_path, chunksize):
+        records = records_to_array(buf)
+        if n_max is not None:
+            records = records[: n_max - n_read]
+        n_read += len(records)
+        if len(records):
+            yield records
+        if n_max is not None and n_read >= n_max:
+            break
+
+
+def _decode_digits(field: np.ndarray):
+    """
+    The integers in a 2-D uint8 slice of ASCII digits, with the masks of its
+    digit and minus-sign bytes and of the rows holding a minus sign.
+    """
+    digits = field.astype(np.int64) - ZERO
+    is_digit = (digits >= 0) & (digits <= 9)
+    values = np.zeros(len(field), dtype=np.int64)
+    for j in range(field.shape[1]):
+        values = np.where(is_digit[:, j], values * 10 + digits[:, j], values)
+    signs = field == MINUS
+    negative = signs.any(axis=1)
+    if negative.any():
+        values[negative] *= -1
+    return values, is_digit, signs, negative
+
+
+def blank_rows(field: np.ndarray, is_digit: np.ndarray) -> Optional[np.ndarray]:
+    """The rows of a numeric field left all blank, or None if there are none."""
+    # IPUMS fields are zero padded, so the common case is all digits
+    if is_digit.all():
+        return None
+    blank = (field == SPACE).all(axis=1)
+    return blank if blank.any() else None
+
+
+def with_missing(
+    values: np.ndarray, blank: Optional[np.ndarray], dtype=None
+) -> np.ndarray:
+    """
+    ``values`` as ``dtype``, or where ``blank`` rows are missing, as the
+    narrowest float that holds ``dtype`` exactly, with NaN in those rows.
+    """
+    if blank is None:
+        return values if dtype is None else values.astype(dtype, copy=False)
+    values = values.astype(np.promote_types(dtype or values.dtype, np.float32))
+    values[blank] = np.nan
+    return values
+
+
+def decode_numeric(field: np.ndarray, decimals: int = 0) -> np.ndarray:
+    """
+    Decode a 2-D uint8 slice of ASCII digits into integers, or floats when the
+    codebook declares implied decimal places. Blank padding is skipped and a
+    minus sign anywhere in the field negates it; an all-blank field is
+    missing, making the result float with NaN there.
+    """
+    values, is_digit = _decode_digits(field)[:2]
+    if decimals:
+        values = values / 10**decimals
+    return with_missing(values, blank_rows(field, is_digit))
+
+
+def decode_character(field: np.ndarray) -> np.ndarray:
+    width = field.shape[1]
+    values = np.ascontiguousarray(field).view(f"S{width}").ravel()
+    return np.char.strip(values.astype(str))
+
+
+def decode_column(
+    records: np.ndarray,
+    ddi: Dict,
+    col: str,
+    dtype: Optional[str] = None,
+    validate: Optional["ConformanceReport"] = None,
+    row_offset: int = 0,
+) -> np.ndarray:
+    """
+    With ``validate``, the column's values are also checked against the
+    codebook in the same pass, as rows ``row_offset`` onwards of the report.
+    All-blank numeric fields are missing: a chunk holding any decodes to a
+    float dtype (see ``with_missing``), so chunks of one column may differ.
+    """
+    start, end = ddi["column_specs"][ddi["columns"].index(col)]
+    field = records[:, start:end]
+    if ddi[col].get("data_type") == "character":
+        values = decode_character(field)
+        if validate is not None:
+            validate.check_character(col, values, row_offset)
+        return values
+    values, is_digit, signs, negative = _decode_digits(field)
+    blank = blank_rows(field, is_digit)
+    if validate is not None:
+        validate.check_numeric(
+            col, field, values, is_digit, signs, negative, row_offset, blank
+        )
+    decimals = ddi[col].get("decimals", 0)
+    if decimals:
+        values = values / 10**decimals
+    return with_missing(values, blank, dtype)
+
+
+def decode_records(
+    records: np.ndarray,
+    ddi: Dict,
+    columns: Optional[List[str]] = None,
+    compact: bool = True,
+    jobs: int = 1,
+    validate: Optional["ConformanceReport"] = None,
+) -> "pd.DataFrame":
+    """
+    Decode the requested columns of a chunk of records. With ``compact``, each
+    numeric column is stored in the narrowest exact dtype chosen from the
+    codebook (``ddi["dtypes"]``) instead of int64/float64. ``jobs`` > 1
+    decodes columns on a thread pool; the NumPy loops release the GIL.
+    ``validate`` is a ConformanceReport to add the chunk's violations to.
+    """
+    if columns is None:
+        columns = ddi["columns"]
+    dtypes = ddi.get("dtypes", {}) if compact else {}
+    row_offset = 0 if validate is None else validate.n_rows
+
+    def decode(col):
+        return decode_column(
+            records, ddi, col, dtypes.get(col), validate, row_offset
+        )
+
+    if jobs > 1 and len(columns) > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            decoded = dict(zip(columns, pool.map(decode, columns)))
+    else:
+        decoded = {col: decode(col) for col in columns}
+    if validate is not None:
+        validate.n_rows += len(records)
+    # pandas is only needed once there are decoded columns to wrap
+    import pandas as pd
+
+    return pd.DataFrame(decoded, columns=columns)
+
+
+def iter_ipums_micro(
+    ddi: Dict,
+    data_file_path: str,
+    columns: Optional[List[str]] = None,
+    n_max: Optional[int] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    compact: bool = True,
+    jobs: int = 1,
+    validate: Optional["ConformanceReport"] = None,
+) -> Iterator["pd.DataFrame"]:
+    """
+    Stream an extract as DataFrames of at most ``chunksize`` rows.
+    Hierarchical extracts yield person rows with their household's variables.
+    ``validate`` is a ConformanceReport filled in while decoding (rectangular
+    extracts only).
+    """
+    from .hierarchical import is_hierarchical, iter_hierarchical_micro
+
+    if is_hierarchical(ddi):
+        if validate is not None:
+            raise ValueError("Validating hierarchical extracts is not supported")
+        yield from iter_hierarchical_micro(
+            ddi, data_file_path, columns, n_max, chunksize, compact, jobs
+        )
+        return
+    for records in iter_record_chunks(data_file_path, chunksize, n_max):
+        yield decode_records(records, ddi, columns, compact, jobs, validate)
+
+
+def read_ipums_micro(
+    ddi: Dict,
+    data_file_path: str,
+    columns: Optional[List[str]] = None,
+    n_max: Optional[int] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    compact: bool = True,
+    jobs: int = 1,
+    validate: Optional["ConformanceReport"] = None,
+) -> "pd.DataFrame":
+    chunks = list(
+        iter_ipums_micro(
+            ddi, data_file_path, columns, n_max, chunksize, compact, jobs, validate
+        )
+    )
+    if not chunks:
+        record_length = max(end for _, end in ddi["column_specs"])
+        empty = np.empty((0, record_length), dtype=np.uint8)
+        return decode_records(empty, ddi, columns, compact)
+    import pandas as pd
+
+    return pd.concat(chunks, ignore_index=True)
@@ -0,0 +1,213 @@
+"""
+Reading extracts from object stores and web servers. Wherever a data file
+path is accepted, a URL works too:
+
+    read_ipums_micro(ddi, "https://example.org/extracts/usa_00003.dat.gz")
+    read_ipums_micro(ddi, RemoteFile("s3://bucket/usa_00003.dat.gz", max_in_flight=8))
+
+The object is fetched in byte ranges on a thread pool that keeps a bounded
+number of requests in flight ahead of the reader, so downloading overlaps
+with decompression and decoding. ``http(s)://`` URLs need only the standard
+library (the server must honour Range requests); other schemes such as
+``s3://`` or ``gs://`` go through fsspec, which must be installed.
+"""
+import gzip
+import io
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, Optional
+
+DEFAULT_BLOCK_SIZE = 8 * 2**20
+DEFAULT_MAX_IN_FLIGHT = 4
+HTTP_SCHEMES = ("http", "https")
+
+
+def url_scheme(path) -> Optional[str]:
+    """The scheme of a URL such as ``s3://bucket/key``, else None."""
+    text = str(path)
+    if "://" not in text:
+        return None
+    scheme = text.split("://", 1)[0].lower()
+    return None if scheme == "file" else scheme
+
+
+def is_url(path) -> bool:
+    return isinstance(path, RemoteFile) or url_scheme(path) is not None
+
+
+class HttpRangeSource:
+    """Byte ranges of a URL served over HTTP(S), using the standard library."""
+
+    def __init__(self, url: str, headers: Optional[Dict] = None, timeout: float = 60):
+        self.url = url
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+
+    def _open(self, method: str, headers: Optional[Dict] = None):
+        request = urllib.request.Request(
+            self.url, method=method, headers={**self.headers, **(headers or {})}
+        )
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def size(self) -> int:
+        with self._open("HEAD") as response:
+            length = response.headers.get("Content-Length")
+        if length is None:
+            raise OSError(f"{self.url} did not report its size")
+        return int(length)
+
+    def fetch(self, start: int, end: int) -> bytes:
+        headers = {"Range": f"bytes={start}-{end - 1}"}
+        with self._open("GET", headers) as response:
+            if response.status != 206 and (start > 0 or end < self.size()):
+                raise OSError(f"{self.url} does not support range requests")
+            data = response.read()
+        if len(data) != end - start:
+            raise OSError(
+                f"Expected {end - start} bytes from {self.url}, received {len(data)}"
+            )
+        return data
+
+
+class FsspecRangeSource:
+    """Byte ranges of any fsspec URL (``s3://``, ``gs://``, ``abfs://``, ...)."""
+
+    def __init__(self, url: str, storage_options: Optional[Dict] = None):
+        try:
+            from fsspec.core import url_to_fs
+        except ImportError:
+            raise ImportError(
+                f"Reading {url} requires fsspec and the filesystem's driver "
+                "(e.g. s3fs); install them with pip"
+            )
+        self.url = url
+        self.fs, self.path = url_to_fs(url, **(storage_options or {}))
+
+    def size(self) -> int:
+        return self.fs.size(self.path)
+
+    def fetch(self, start: int, end: int) -> bytes:
+        return self.fs.cat_file(self.path, start=start, end=end)
+
+
+class RemoteFile:
+    """
+    A remote data file with its fetch settings, usable anywhere a data file
+    path is. ``headers`` apply to HTTP(S) URLs and ``storage_options`` are
+    passed to fsspec for other schemes.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        headers: Optional[Dict] = None,
+        **storage_options,
+    ):
+        if url_scheme(url) is None:
+            raise ValueError(f"{url} is not a URL")
+        if block_size < 1 or max_in_flight < 1:
+            raise ValueError("block_size and max_in_flight must be positive")
+        self.url = url
+        self.block_size = block_size
+        self.max_in_flight = max_in_flight
+        self.headers = headers
+        self.storage_options = storage_options
+
+    def __str__(self) -> str:
+        return self.url
+
+    def __repr__(self) -> str:
+        return f"RemoteFile({self.url!r})"
+
+    def source(self):
+        if url_scheme(self.url) in HTTP_SCHEMES:
+            return HttpRangeSource(self.url, self.headers)
+        return FsspecRangeSource(self.url, self.storage_options)
+
+    def open(self) -> io.BufferedReader:
+        reader = PrefetchReader(self.source(), self.block_size, self.max_in_flight)
+        return io.BufferedReader(reader, buffer_size=min(self.block_size, 2**20))
+
+
+class PrefetchReader(io.RawIOBase):
+    """
+    Sequential reads over a range source. Up to ``max_in_flight`` blocks are
+    requested ahead of the read position, so at most that many requests run
+    at once and about ``(max_in_flight + 1) * block_size`` bytes are held.
+    """
+
+    def __init__(
+        self,
+        source,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    ):
+        super().__init__()
+        self.source = source
+        self.block_size = block_size
+        self.max_in_flight = max_in_flight
+        self.length = source.size()
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._pending: Deque = deque()
+        self._next_start = 0
+        self._block = memoryview(b"")
+        self._position = 0
+        self._fill()
+
+    def _fill(self):
+        while len(self._pending) < self.max_in_flight:
+            if self._next_start >= self.length:
+                break
+            start = self._next_start
+            end = min(start + self.block_size, self.length)
+            self._pending.append(self._pool.submit(self.source.fetch, start, end))
+            self._next_start = end
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not len(self._block):
+            if not self._pending:
+                return 0
+            self._block = memoryview(self._pending.popleft().result())
+            self._fill()
+        n = min(len(buffer), len(self._block))
+        buffer[:n] = self._block[:n]
+        self._block = self._block[n:]
+        self._position += n
+        return n
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self):
+        if not self.closed:
+            for future in self._pending:
+                future.cancel()
+            self._pending.clear()
+            self._pool.shutdown(wait=True)
+        super().close()
+
+
+class _RemoteGzipFile(gzip.GzipFile):
+    # GzipFile leaves a file object it was given open; this one owns it
+    def close(self):
+        fileobj = self.fileobj
+        try:
+            super().close()
+        finally:
+            if fileobj is not None:
+                fileobj.close()
+
+
+def open_remote(path):
+    """Open a URL or RemoteFile for sequential reads, decompressing ``.gz``."""
+    remote = path if isinstance(path, RemoteFile) else RemoteFile(str(path))
+    fp = remote.open()
+    if remote.url.endswith(".gz"):
+        return _RemoteGzipFile(fileobj=fp, mode="rb")
+    return fp
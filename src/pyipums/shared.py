@@ -0,0 +1,339 @@
+"""
+Hand a decoded or cleaned extract to other processes on the same host
+through POSIX shared memory, so each worker doesn't read and clean it again:
+
+    with publish_extract(df, "acs2021", ddi) as extract:  # in the loader
+        ...
+    with attach_extract("acs2021") as extract:            # in each worker
+        df = extract.frame()
+
+Every column lives in its own named segment, in the layout of
+``pyipums.columnar``: numeric columns as their raw values (nullable ones
+with a second segment for their missing mask), text and categorical
+columns as dictionary codes. A descriptor segment holds a
+reference count and a JSON description of the columns and of their DDI
+codebook entries. Attached frames are read-only NumPy views of the segments;
+the segments are removed when the last process holding them closes.
+"""
+import json
+import os
+import secrets
+import struct
+import sys
+import tempfile
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .codebook import Codebook, VariableInfo, as_codebook
+
+FORMAT_NAME = "pyipums-shared"
+FORMAT_VERSION = 1
+# reference count and JSON length ahead of the JSON descriptor
+HEADER = struct.Struct("<qq")
+NAME_PREFIX = "pyipums_"
+# Python 3.13 can leave segments out of the resource tracker by itself
+TRACK_ARGUMENT = sys.version_info >= (3, 13)
+MASKED_ARRAYS = (
+    pd.arrays.IntegerArray,
+    pd.arrays.FloatingArray,
+    pd.arrays.BooleanArray,
+)
+
+
+def _codes_dtype(n_categories: int) -> np.dtype:
+    # the width pandas picks for Categorical codes, so they attach without a copy
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _segment(name: str, create: bool = False, size: int = 0):
+    size = max(size, 1) if create else 0
+    if TRACK_ARGUMENT:
+        return shared_memory.SharedMemory(name, create, size, track=False)
+    segment = shared_memory.SharedMemory(name, create, size)
+    # the reference count decides when segments go, not the resource tracker
+    # of whichever process happens to exit first
+    resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+def _unlink(segment):
+    if not TRACK_ARGUMENT:
+        # unlink() unregisters the segment, which _segment already did
+        resource_tracker.register(segment._name, "shared_memory")
+    segment.unlink()
+
+
+def _lock_path(name: str) -> str:
+    return os.path.join(tempfile.gettempdir(), f"{name}.lock")
+
+
+def _remove_lock(name: str):
+    try:
+        os.remove(_lock_path(name))
+    except FileNotFoundError:
+        pass
+
+
+@contextmanager
+def _locked(name: str):
+    import fcntl
+
+    with open(_lock_path(name), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _codebook_entries(ddi, columns: List[str]) -> Dict:
+    codebook = as_codebook(ddi)
+    entries = {}
+    for name in columns:
+        if name not in codebook:
+            continue
+        var = codebook[name]
+        entries[name] = {
+            "label": var.label,
+            "data_type": var.data_type,
+            "decimals": var.decimals,
+            "dtype": var.dtype,
+            "categories": [[code, label] for code, label in var.labels_by_code.items()],
+        }
+    return {"file_metadata": codebook.file_metadata, "variables": entries}
+
+
+class SharedExtract:
+    """
+    One process's handle on a published extract. ``close`` (or leaving the
+    ``with`` block) releases this process's reference; frames taken from it
+    must not be used afterwards.
+    """
+
+    def __init__(self, name: str, descriptor, segments: Dict, info: Dict):
+        self.name = name
+        self.info = info
+        self._descriptor = descriptor
+        self._segments = segments
+        self.closed = False
+
+    @property
+    def n_rows(self) -> int:
+        return self.info["n_rows"]
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.info["columns"])
+
+    @property
+    def refcount(self) -> int:
+        with _locked(self.name):
+            return HEADER.unpack_from(self._descriptor.buf)[0]
+
+    @property
+    def codebook(self) -> Optional[Codebook]:
+        """The codebook entries of the published DDI variables, if any."""
+        ddi = self.info.get("ddi")
+        if ddi is None:
+            return None
+        variables = [
+            VariableInfo(
+                name,
+                [tuple(category) for category in entry["categories"]],
+                label=entry["label"],
+                data_type=entry["data_type"],
+                decimals=entry["decimals"],
+                dtype=entry["dtype"],
+            )
+            for name, entry in ddi["variables"].items()
+        ]
+        return Codebook(variables, ddi["file_metadata"])
+
+    def _view(self, key, dtype) -> np.ndarray:
+        if self.closed:
+            raise ValueError(f"Shared extract {self.name!r} is closed")
+        values = np.ndarray((self.n_rows,), dtype=dtype, buffer=self._segments[key].buf)
+        values.flags.writeable = False
+        return values
+
+    def array(self, name: str) -> np.ndarray:
+        """
+        The column's values, or its dictionary codes, as a read-only view.
+        For nullable columns these are the values under the missing mask.
+        """
+        return self._view(name, self.info["columns"][name]["dtype"])
+
+    def column(self, name: str, text_as_object: bool = False):
+        values = self.array(name)
+        spec = self.info["columns"][name]
+        if spec["kind"] == "numeric":
+            return values
+        if spec["kind"] == "masked":
+            mask = self._view(_mask_key(name), np.bool_)
+            dtype = pd.api.types.pandas_dtype(spec["extension"])
+            return dtype.construct_array_type()(values, mask, copy=False)
+        dtype = pd.CategoricalDtype(pd.Index(spec["categories"], dtype=object))
+        values = pd.Categorical.from_codes(values, dtype=dtype)
+        if text_as_object and not spec["categorical"]:
+            # object columns can't live in shared memory; this is a copy
+            values = values.to_numpy(dtype=object, na_value=None)
+        return values
+
+    def frame(
+        self, columns: Optional[List[str]] = None, text_as_object: bool = False
+    ) -> pd.DataFrame:
+        """
+        The extract as a DataFrame sharing the segments' memory. Text columns
+        come back as Categoricals over the shared codes unless
+        ``text_as_object``, which copies them into object columns.
+        """
+        columns = self.columns if columns is None else list(columns)
+        data = {name: self.column(name, text_as_object) for name in columns}
+        return pd.DataFrame(data, columns=columns, copy=False)
+
+    def close(self):
+        """
+        Release this process's reference; the last one removes the segments.
+        Views still held elsewhere in the process keep their memory mapped
+        until they are garbage collected.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        with _locked(self.name):
+            refcount, length = HEADER.unpack_from(self._descriptor.buf)
+            refcount -= 1
+            HEADER.pack_into(self._descriptor.buf, 0, refcount, length)
+            if refcount <= 0:
+                for segment in [*self._segments.values(), self._descriptor]:
+                    _unlink(segment)
+                _remove_lock(self.name)
+        for segment in [*self._segments.values(), self._descriptor]:
+            try:
+                segment.close()
+            except BufferError:
+                pass
+
+    def __enter__(self) -> "SharedExtract":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self) -> str:
+        return (
+            f"SharedExtract({self.name!r}, n_rows={self.n_rows}, "
+            f"columns={len(self.info['columns'])})"
+        )
+
+
+def _mask_key(column: str):
+    # masks sit next to the column segments, under keys no column name takes
+    return ("mask", column)
+
+
+def _encode(values: pd.Series):
+    """The column's spec, its fixed-width values and, if nullable, its mask."""
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in "biuf":
+        return {"kind": "numeric"}, np.ascontiguousarray(values.to_numpy()), None
+    if isinstance(values.array, MASKED_ARRAYS):
+        # Int64, Float64 and boolean columns: to_numpy() would give objects
+        spec = {"kind": "masked", "extension": values.dtype.name}
+        return spec, values.array._data, values.array._mask
+    categorical = isinstance(values.dtype, pd.CategoricalDtype)
+    if categorical:
+        codes, categories = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, categories = pd.factorize(values)
+    spec = {
+        "kind": "dictionary",
+        "categorical": categorical,
+        "categories": categories.tolist(),
+    }
+    return spec, codes.astype(_codes_dtype(len(categories)), copy=False), None
+
+
+def _copy_to_segment(key, values: np.ndarray, name: str, segments: Dict):
+    if values.dtype.kind == "O":
+        # a segment of PyObject pointers is garbage in any other process
+        raise TypeError(f"Column {key!r} holds Python objects and can't be shared")
+    segment = _segment(name, create=True, size=values.nbytes)
+    segments[key] = segment
+    np.ndarray(values.shape, values.dtype, buffer=segment.buf)[:] = values
+    return segment
+
+
+def publish_extract(
+    df: pd.DataFrame, name: Optional[str] = None, ddi=None
+) -> SharedExtract:
+    """
+    Copy ``df`` into shared memory under ``name`` (a random one by default)
+    and hold the first reference to it. With ``ddi``, the codebook entries of
+    its columns are published too. The index is not kept.
+    """
+    name = name or f"{NAME_PREFIX}{secrets.token_hex(4)}"
+    columns = [str(column) for column in df.columns]
+    info = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "n_rows": len(df),
+        "columns": {},
+    }
+    if ddi is not None:
+        info["ddi"] = _codebook_entries(ddi, columns)
+
+    segments = {}
+    try:
+        for index, column in enumerate(columns):
+            spec, values, mask = _encode(df.iloc[:, index])
+            spec["dtype"] = values.dtype.str
+            segment = _copy_to_segment(column, values, f"{name}_{index}", segments)
+            spec["segment"] = segment.name
+            if mask is not None:
+                segment = _copy_to_segment(
+                    _mask_key(column), mask, f"{name}_{index}_mask", segments
+                )
+                spec["mask_segment"] = segment.name
+            info["columns"][column] = spec
+
+        payload = json.dumps(info).encode()
+        descriptor = _segment(name, create=True, size=HEADER.size + len(payload))
+    except BaseException:
+        for segment in segments.values():
+            segment.close()
+            _unlink(segment)
+        raise
+    with _locked(name):
+        HEADER.pack_into(descriptor.buf, 0, 1, len(payload))
+        descriptor.buf[HEADER.size : HEADER.size + len(payload)] = payload
+    return SharedExtract(name, descriptor, segments, info)
+
+
+def attach_extract(name: str) -> SharedExtract:
+    """
+    Take a reference to the extract published as ``name``. Raises
+    FileNotFoundError once it has been released by every process.
+    """
+    descriptor = _segment(name)
+    with _locked(name):
+        refcount, length = HEADER.unpack_from(descriptor.buf)
+        if refcount <= 0:
+            descriptor.close()
+            _remove_lock(name)
+            raise FileNotFoundError(f"Shared extract {name!r} has been released")
+        info = json.loads(bytes(descriptor.buf[HEADER.size : HEADER.size + length]))
+        segments = {}
+        for column, spec in info["columns"].items():
+            segments[column] = _segment(spec["segment"])
+            if "mask_segment" in spec:
+                segments[_mask_key(column)] = _segment(spec["mask_segment"])
+        HEADER.pack_into(descriptor.buf, 0, refcount + 1, length)
+    return SharedExtract(name, descriptor, segments, info)
+
@@ -0,0 +1,372 @@
+"""
+Load decoded or cleaned extracts into an embedded SQL engine, SQLite (in the
+standard library) or DuckDB (``pip install duckdb``), so they can be queried
+without pandas:
+
+    export_sql(cleaned, "acs.sqlite", "persons", ddi=ddi)
+    export_extract(ddi, "usa_00003.dat.gz", "acs.duckdb", "persons",
+                   cleaner="IpumsAcsCleaner")
+
+SQLite is filled with batched ``executemany`` inserts; DuckDB ingests Arrow
+tables directly. Alongside the data, the DDI's category labels go into a
+lookup table (``ipums_labels``: variable, code, label) and its variable
+labels into ``ipums_variables``, and the common filter keys are indexed:
+
+    SELECT l.label AS state, SUM(p.PERWT) FROM persons p
+    JOIN ipums_labels l ON l.variable = 'STATEFIP' AND l.code = p.STATEFIP
+    WHERE p.YEAR = 2021 GROUP BY 1
+"""
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .codebook import as_codebook
+from .read_data import DEFAULT_CHUNKSIZE, iter_ipums_micro
+
+ENGINES = ("sqlite", "duckdb")
+DUCKDB_SUFFIXES = (".duckdb", ".ddb")
+IF_EXISTS = ("replace", "append", "fail")
+# rows bound per executemany call
+BATCH_ROWS = 50_000
+# variables extracts are usually filtered or joined on
+INDEX_VARIABLES = ["YEAR", "SAMPLE", "SERIAL", "STATEFIP", "COUNTYFIP", "SEX", "AGE"]
+LABELS_TABLE = "ipums_labels"
+VARIABLES_TABLE = "ipums_variables"
+
+
+def quote(name: str) -> str:
+    """A SQL identifier; cleaned columns have spaces and punctuation."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def sql_columns(columns: Sequence) -> List[str]:
+    """
+    Column names unique under SQL's case-insensitive identifiers: the
+    cleaners' "Sex" label would clash with SEX, so it becomes "Sex_2".
+    """
+    seen, out = set(), []
+    for col in columns:
+        name, n = str(col), 1
+        while name.lower() in seen:
+            n += 1
+            name = f"{col}_{n}"
+        seen.add(name.lower())
+        out.append(name)
+    return out
+
+
+def engine_of(target) -> str:
+    if isinstance(target, sqlite3.Connection):
+        return "sqlite"
+    if isinstance(target, str):
+        return "duckdb" if target.endswith(DUCKDB_SUFFIXES) else "sqlite"
+    if type(target).__module__.split(".")[0] == "duckdb":
+        return "duckdb"
+    raise TypeError(f"Cannot tell the SQL engine of {type(target).__name__}")
+
+
+def connect(path: str, engine: Optional[str] = None):
+    """Open ``path`` with ``engine``, by default DuckDB for .duckdb/.ddb files."""
+    engine = engine or engine_of(path)
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+    if engine == "duckdb":
+        try:
+            import duckdb
+        except ImportError:
+            raise ImportError("Exporting to DuckDB requires duckdb; pip install duckdb")
+        return duckdb.connect(path)
+    return sqlite3.connect(path)
+
+
+def _sqlite_type(values) -> str:
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return _sqlite_type(values.cat.categories)
+    kind = values.dtype.kind
+    if kind in "biu":
+        return "INTEGER"
+    if kind == "f":
+        return "REAL"
+    return "TEXT"
+
+
+def _python_values(values: pd.Series) -> List:
+    """A column as Python scalars for the sqlite3 module, missing as None."""
+    # nullable (Int64, boolean) and categorical columns hold pd.NA or NaN,
+    # which sqlite3 cannot bind
+    if values.dtype.kind in "biuf" and not pd.api.types.is_extension_array_dtype(
+        values.dtype
+    ):
+        # sqlite3 stores NaN as NULL
+        return values.to_numpy().tolist()
+    out = values.to_numpy(dtype=object, na_value=None)
+    return out.tolist()
+
+
+def _frame(data) -> pd.DataFrame:
+    if not isinstance(data, pd.DataFrame):
+        # a pyarrow.Table from backend="arrow"
+        data = data.to_pandas()
+    columns = sql_columns(data.columns)
+    if columns != list(data.columns):
+        data = data.set_axis(columns, axis=1)
+    return data
+
+
+def _table_exists(connection, engine: str, table: str) -> bool:
+    if engine == "sqlite":
+        sql = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+    else:
+        sql = "SELECT 1 FROM information_schema.tables WHERE table_name = ?"
+    return connection.execute(sql, [table]).fetchone() is not None
+
+
+def _prepare(connection, engine: str, table: str, df: pd.DataFrame, if_exists: str):
+    exists = _table_exists(connection, engine, table)
+    if exists and if_exists == "fail":
+        raise ValueError(f"Table {table!r} already exists")
+    if exists and if_exists == "replace":
+        connection.execute(f"DROP TABLE {quote(table)}")
+        exists = False
+    if not exists and engine == "sqlite":
+        columns = ", ".join(
+            f"{quote(col)} {_sqlite_type(df[col])}" for col in df.columns
+        )
+        connection.execute(f"CREATE TABLE {quote(table)} ({columns})")
+    return exists
+
+
+def _column_list(df: pd.DataFrame) -> str:
+    return ", ".join(quote(col) for col in df.columns)
+
+
+def _insert_sqlite(connection, table: str, df: pd.DataFrame, batch_rows: int):
+    sql = (
+        f"INSERT INTO {quote(table)} ({_column_list(df)}) "
+        f"VALUES ({', '.join(['?'] * len(df.columns))})"
+    )
+    for start in range(0, len(df), batch_rows):
+        batch = df.iloc[start : start + batch_rows]
+        columns = [_python_values(batch[col]) for col in batch.columns]
+        connection.executemany(sql, zip(*columns))
+
+
+def _insert_duckdb(connection, table: str, df: pd.DataFrame, exists: bool):
+    import pyarrow as pa
+
+    view = "_pyipums_export"
+    connection.register(view, pa.Table.from_pandas(df, preserve_index=False))
+    try:
+        if exists:
+            connection.execute(
+                f"INSERT INTO {quote(table)} ({_column_list(df)}) "
+                f"SELECT * FROM {view}"
+            )
+        else:
+            connection.execute(f"CREATE TABLE {quote(table)} AS SELECT * FROM {view}")
+    finally:
+        connection.unregister(view)
+
+
+def label_rows(ddi, columns: Sequence[str]) -> Tuple[List[Tuple], List[Tuple]]:
+    """
+    (variable, code, label) rows of the labelled DDI variables in
+    ``columns`` and (name, label, description) rows of every DDI variable.
+    """
+    codebook = as_codebook(ddi)
+    labels, variables = [], []
+    for name in columns:
+        if name not in codebook:
+            continue
+        var = codebook[name]
+        variables.append((name, var.label, var.description))
+        labels += [(name, code, label) for code, label in var.labels_by_code.items()]
+    return labels, variables
+
+
+def write_lookups(connection, engine: str, ddi, columns: Sequence[str]) -> int:
+    """Replace the lookup rows of ``columns``; returns how many variables."""
+    labels, variables = label_rows(ddi, columns)
+    if not variables:
+        return 0
+    # codes are integers in every IPUMS variable but a few character ones
+    # (RECTYPE), kept by SQLite's untyped column but left out of DuckDB's
+    code_type = "" if engine == "sqlite" else " BIGINT"
+    connection.execute(
+        f"CREATE TABLE IF NOT EXISTS {LABELS_TABLE} (variable TEXT NOT NULL, "
+        f"code{code_type} NOT NULL, label TEXT, PRIMARY KEY (variable, code))"
+    )
+    connection.execute(
+        f"CREATE TABLE IF NOT EXISTS {VARIABLES_TABLE} "
+        "(name TEXT PRIMARY KEY, label TEXT, description TEXT)"
+    )
+    names = [row[0] for row in variables]
+    placeholders = ", ".join(["?"] * len(names))
+    for table, key in ((LABELS_TABLE, "variable"), (VARIABLES_TABLE, "name")):
+        connection.execute(
+            f"DELETE FROM {table} WHERE {key} IN ({placeholders})", names
+        )
+    if engine == "duckdb":
+        labels = [row for row in labels if isinstance(row[1], int)]
+    if labels:
+        connection.executemany(f"INSERT INTO {LABELS_TABLE} VALUES (?, ?, ?)", labels)
+    connection.executemany(f"INSERT INTO {VARIABLES_TABLE} VALUES (?, ?, ?)", variables)
+    return len(variables)
+
+
+def create_indexes(
+    connection, table: str, columns: Iterable[str], present: Sequence[str]
+) -> List[str]:
+    created = []
+    for col in columns:
+        if col not in present:
+            continue
+        name = f"{table}_{col}".replace(" ", "_")
+        connection.execute(
+            f"CREATE INDEX IF NOT EXISTS {quote(name)} ON {quote(table)} ({quote(col)})"
+        )
+        created.append(name)
+    return created
+
+
+class _Connection:
+    """A connection opened from a path (and closed after), or the caller's."""
+
+    def __init__(self, target, engine: Optional[str]):
+        self.engine = engine or engine_of(target)
+        self.owned = isinstance(target, str)
+        self.connection = connect(target, self.engine) if self.owned else target
+        if self.owned and self.engine == "sqlite":
+            # a fresh bulk load can be redone if interrupted
+            self.connection.execute("PRAGMA synchronous = OFF")
+
+    def __enter__(self):
+        if self.engine == "duckdb":
+            self.connection.execute("BEGIN TRANSACTION")
+        return self.connection
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.connection.commit()
+        else:
+            self.connection.rollback()
+        if self.owned:
+            self.connection.close()
+
+
+def _stats(table: str, engine: str, n_rows: int, seconds: float, **extra) -> Dict:
+    seconds = max(seconds, 1e-9)
+    return {
+        "table": table,
+        "engine": engine,
+        "rows": n_rows,
+        "seconds": seconds,
+        "rows_per_second": n_rows / seconds,
+        **extra,
+    }
+
+
+def export_sql(
+    data,
+    target,
+    table: str,
+    ddi=None,
+    engine: Optional[str] = None,
+    index_columns: Optional[Sequence[str]] = None,
+    if_exists: str = "replace",
+    batch_rows: int = BATCH_ROWS,
+) -> Dict:
+    """
+    Write a DataFrame (or ``pyarrow.Table``) to ``table`` of ``target``, a
+    database path or an open sqlite3/duckdb connection. With ``ddi``, the
+    labels of its variables among the columns are written to the lookup
+    tables. ``index_columns`` defaults to the INDEX_VARIABLES present.
+    Returns the load statistics.
+    """
+    if if_exists not in IF_EXISTS:
+        raise ValueError(
+            f"Unknown if_exists {if_exists!r}, expected one of {IF_EXISTS}"
+        )
+    start = time.perf_counter()
+    df = _frame(data)
+    columns = list(df.columns)
+    if index_columns is None:
+        index_columns = INDEX_VARIABLES
+    session = _Connection(target, engine)
+    with session as connection:
+        exists = _prepare(connection, session.engine, table, df, if_exists)
+        if session.engine == "sqlite":
+            _insert_sqlite(connection, table, df, batch_rows)
+        else:
+            _insert_duckdb(connection, table, df, exists)
+        n_lookups = 0 if ddi is None else write_lookups(
+            connection, session.engine, ddi, columns
+        )
+        indexes = create_indexes(connection, table, index_columns, columns)
+    return _stats(
+        table,
+        session.engine,
+        len(df),
+        time.perf_counter() - start,
+        indexes=indexes,
+        lookup_variables=n_lookups,
+    )
+
+
+def export_extract(
+    ddi: Dict,
+    data_file_path: str,
+    target,
+    table: str,
+    columns: Optional[List[str]] = None,
+    cleaner: Optional[str] = None,
+    engine: Optional[str] = None,
+    index_columns: Optional[Sequence[str]] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    jobs: int = 1,
+) -> Dict:
+    """
+    Stream a fixed-width extract into ``table`` of the database at
+    ``target`` a chunk at a time, cleaned by ``cleaner`` (e.g.
+    "IpumsAcsCleaner") when given, so the extract is never held in memory
+    whole. The table is replaced.
+    """
+    if cleaner is not None:
+        from . import clean_data
+
+        cleaner = getattr(clean_data, cleaner)
+    start = time.perf_counter()
+    n_rows, indexes, n_lookups = 0, [], 0
+    session = _Connection(target, engine)
+    with session as connection:
+        exists = False
+        written = []
+        for chunk in iter_ipums_micro(
+            ddi, data_file_path, columns, chunksize=chunksize, jobs=jobs
+        ):
+            if cleaner is not None:
+                chunk = cleaner(chunk, ddi["codebook"]).clean_data()
+            chunk = _frame(chunk)
+            if not written:
+                exists = _prepare(connection, session.engine, table, chunk, "replace")
+                written = list(chunk.columns)
+            if session.engine == "sqlite":
+                _insert_sqlite(connection, table, chunk, BATCH_ROWS)
+            else:
+                _insert_duckdb(connection, table, chunk, exists)
+                exists = True
+            n_rows += len(chunk)
+        if written:
+            n_lookups = write_lookups(connection, session.engine, ddi, written)
+            index_columns = INDEX_VARIABLES if index_columns is None else index_columns
+            indexes = create_indexes(connection, table, index_columns, written)
+    return _stats(
+        table,
+        session.engine,
+        n_rows,
+        time.perf_counter() - start,
+        indexes=indexes,
+        lookup_variables=n_lookups,
+    )
@@ -0,0 +1,159 @@
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from .grouping import GroupIndex
+from .variance import (
+    replicate_se,
+    replicate_totals,
+    replicate_weight_matrix,
+    weighted_mean,
+)
+
+US_STATE_TO_ABBREV = {
+    "Alabama": "AL",
+    "Alaska": "AK",
+    "Arizona": "AZ",
+    "Arkansas": "AR",
+    "California": "CA",
+    "Colorado": "CO",
+    "Connecticut": "CT",
+    "Delaware": "DE",
+    "District of Columbia": "DC",
+    "Florida": "FL",
+    "Georgia": "GA",
+    "Hawaii": "HI",
+    "Idaho": "ID",
+    "Illinois": "IL",
+    "Indiana": "IN",
+    "Iowa": "IA",
+    "Kansas": "KS",
+    "Kentucky": "KY",
+    "Louisiana": "LA",
+    "Maine": "ME",
+    "Maryland": "MD",
+    "Massachusetts": "MA",
+    "Michigan": "MI",
+    "Minnesota": "MN",
+    "Mississippi": "MS",
+    "Missouri": "MO",
+    "Montana": "MT",
+    "Nebraska": "NE",
+    "Nevada": "NV",
+    "New Hampshire": "NH",
+    "New Jersey": "NJ",
+    "New Mexico": "NM",
+    "New York": "NY",
+    "North Carolina": "NC",
+    "North Dakota": "ND",
+    "Ohio": "OH",
+    "Oklahoma": "OK",
+    "Oregon": "OR",
+    "Pennsylvania": "PA",
+    "Rhode Island": "RI",
+    "South Carolina": "SC",
+    "South Dakota": "SD",
+    "Tennessee": "TN",
+    "Texas": "TX",
+    "Utah": "UT",
+    "Vermont": "VT",
+    "Virginia": "VA",
+    "Washington": "WA",
+    "West Virginia": "WV",
+    "Wisconsin": "WI",
+    "Wyoming": "WY",
+}
+
+
+def _group_totals(df, xvar: str, weight_columns: List[str], backend: str):
+    """
+    Sorted codes of ``xvar``, their row counts and the (groups x weights)
+    matrix of weighted totals, computed by the selected backend.
+    """
+    if backend == "arrow":
+        from .arrow_backend import group_sums
+
+        return group_sums(df, xvar, weight_columns)
+    if backend != "pandas":
+        raise ValueError(f"Unknown backend {backend!r}, expected 'pandas' or 'arrow'")
+    groups = GroupIndex(df[xvar], sort=True)
+    totals = np.empty((groups.n_groups, len(weight_columns)))
+    if len(weight_columns) > 1:
+        weights = replicate_weight_matrix(df, weight_columns[0], weight_columns[1:])
+        (totals,) = replicate_totals([None], weights, groups)
+    if weight_columns:
+        # bincount skips missing weights, like groupby().sum()
+        totals[:, 0] = groups.counts(df[weight_columns[0]])
+    return groups.uniques, groups.counts(), totals
+
+
+def pt(
+    ddi,
+    df: pd.DataFrame,
+    xvar: str,
+    wvar: str = None,
+    repwts: List[str] = None,
+    method: str = "sdr",
+    backend: str = "pandas",
+) -> pd.DataFrame:
+    """
+    Weighted frequency table of ``xvar``. ``backend="arrow"`` aggregates with
+    a pyarrow group-by instead (``df`` may then be a ``pyarrow.Table``) and
+    returns the same table.
+    """
+    weight_columns = [wvar] + list(repwts or []) if wvar else []
+    codes, raw_counts, totals = _group_totals(df, xvar, weight_columns, backend)
+    aggdf = pd.DataFrame({"code": codes})
+    if wvar:
+        aggdf["count"] = totals[:, 0]
+        aggdf["raw_count"] = raw_counts
+        aggdf["raw_percent"] = aggdf["raw_count"] / aggdf["raw_count"].sum()
+    else:
+        aggdf["count"] = raw_counts
+
+    aggdf["Percent"] = aggdf["count"] / aggdf["count"].sum()
+    if wvar and repwts:
+        aggdf["count_se"] = replicate_se(totals, method)
+        aggdf["Percent_se"] = replicate_se(totals / totals.sum(axis=0), method)
+    outdf = aggdf.sort_values(by="count", ascending=False).reset_index(drop=True)
+    if ddi:
+        labels = {v: k for k, v in ddi.get_variable_info(xvar).codes.items()}
+        outdf.insert(0, xvar, outdf["code"].map(labels))
+    else:
+        outdf.rename({"code": xvar}, axis=1, inplace=True)
+    return outdf
+
+
+def weighted_mean_by(
+    df: pd.DataFrame, gvar: str, xvar: str, wvar: str, backend: str = "pandas"
+) -> pd.DataFrame:
+    if backend == "arrow":
+        from .arrow_backend import weighted_sums
+
+        uniques, xweight, weights = weighted_sums(df, gvar, xvar, wvar)
+        return pd.DataFrame(
+            {"final": xweight / weights}, index=pd.Index(uniques, name=gvar)
+        )
+    groups = GroupIndex(df[gvar], sort=True)
+    weights = df[wvar].to_numpy(dtype=float)
+    xweight = groups.counts(df[xvar].to_numpy(dtype=float) * weights)
+    return pd.DataFrame(
+        {"final": xweight / groups.counts(weights)},
+        index=pd.Index(groups.uniques, name=gvar),
+    )
+
+
+def gen_state_df(ddi, xdf, gvar, wvar, xvar, repwts=None, method="sdr"):
+    t1 = pt(ddi=ddi, df=xdf, xvar=gvar, wvar=xvar)
+    t2 = pt(ddi=ddi, df=xdf, xvar=gvar, wvar=wvar)
+    t3 = t1.merge(t2, on=gvar)
+    t3["avg_x"] = t3["count_x"] / t3["count_y"]
+    if repwts:
+        # xvar is already multiplied by wvar, so avg_x is the weighted mean of
+        # xvar / wvar and each replicate reweights that per-person value
+        sub = xdf[[gvar, wvar] + list(repwts)].assign(avg_x=xdf[xvar] / xdf[wvar])
+        se = weighted_mean(sub, "avg_x", wvar, repwts, by=gvar, method=method)
+        t3["avg_x_se"] = t3["code_x" if ddi else gvar].map(se["se"])
+    t3["STATE_ABBREV"] = t3[gvar].map(US_STATE_TO_ABBREV)
+    return t3
@@ -0,0 +1,242 @@
+"""
+Checks that an extract's values are legal per its DDI codebook, made by the
+fixed-width decoder in the same pass that decodes them:
+
+    report = ConformanceReport(ddi)
+    df = read_ipums_micro(ddi, "usa_00003.dat.gz", validate=report)
+    report.summary()  # one row per variable with violations
+
+Four kinds of violation are counted for each variable:
+
+* ``format``: a numeric field holding bytes other than digits and a single
+  minus sign, which the decoder would otherwise skip silently;
+* ``range``: a negative value in a variable whose codes are all
+  non-negative, which wraps around in its compact unsigned dtype;
+* ``category``: a value outside the variable's ``catgry`` codes, which
+  ``map_codes`` would turn into ``None``;
+* ``blank``: an all-blank numeric field, which decodes as missing.
+
+Codes are compared before implied decimals are applied, as the DDI lists
+them. Only category lists that look complete are enforced: IPUMS also labels
+just the special codes (N/A, top codes) of variables whose values are
+otherwise the numbers themselves, e.g. YRMARR or UHRSWORK1.
+"""
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import numpy as np
+
+from .codebook import labelled_categories, parse_code
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+KINDS = ("format", "range", "category", "blank")
+# row offsets kept per variable to look the bad records up by
+SAMPLE_ROWS = 5
+# codes at or above this share of a field's range are IPUMS special codes
+# such as 99, 997 or 9999999
+SPECIAL_CODE_SHARE = 0.99
+# codes up to this are looked up in a table indexed by value rather than by
+# a binary search
+MAX_TABLE_CODE = 1_000_000
+
+
+class ColumnRule:
+    """What a variable's values are checked against."""
+
+    __slots__ = ("name", "character", "signed", "codes", "table")
+
+    def __init__(self, name: str, character: bool, signed: bool, codes=None):
+        self.name = name
+        self.character = character
+        self.signed = signed
+        # sorted legal codes, or None when the categories aren't enforced
+        self.codes = codes
+        self.table = None
+        if codes is not None and not character and len(codes):
+            if codes[0] >= 0 and codes[-1] < MAX_TABLE_CODE:
+                # legal[value], with a last False entry that larger values clip to
+                self.table = np.zeros(codes[-1] + 2, dtype=bool)
+                self.table[codes] = True
+
+    def outside(self, values: np.ndarray, negative: bool = False) -> np.ndarray:
+        """Where ``values`` aren't among the codes."""
+        if self.table is not None and not negative:
+            return ~np.take(self.table, values, mode="clip")
+        if self.character:
+            return ~np.isin(values, self.codes)
+        position = np.searchsorted(self.codes, values)
+        np.minimum(position, len(self.codes) - 1, out=position)
+        return self.codes[position] != values
+
+    def __repr__(self) -> str:
+        n_codes = "open" if self.codes is None else f"{len(self.codes)} codes"
+        return f"ColumnRule({self.name!r}, {n_codes}, signed={self.signed})"
+
+
+def closed_codes(var_dict: Dict, width: int) -> Optional[np.ndarray]:
+    """
+    The sorted ``catgry`` codes of a variable when they look like its whole
+    set of legal values, else None. Numeric variables whose codes are only
+    zero and special codes near the top of the field are left open.
+    """
+    values = [
+        value for value, _ in labelled_categories(var_dict) if value is not None
+    ]
+    if not values:
+        return None
+    if var_dict.get("data_type") == "character":
+        return np.unique(np.array([value.strip() for value in values]))
+    codes = [parse_code(value) for value in values]
+    if not all(isinstance(code, int) for code in codes):
+        return None
+    codes = np.unique(np.array(codes, dtype=np.int64))
+    special = SPECIAL_CODE_SHARE * 10**width
+    if ((codes == 0) | (codes >= special)).all():
+        return None
+    return codes
+
+
+def column_rule(ddi: Dict, col: str) -> ColumnRule:
+    var_dict = ddi[col]
+    start, end = ddi["column_specs"][ddi["columns"].index(col)]
+    codes = closed_codes(var_dict, end - start)
+    character = var_dict.get("data_type") == "character"
+    negative_codes = any(
+        (meta.get("category_value") or "").strip().startswith("-")
+        for meta in var_dict.get("field_metadata", [])
+    )
+    # the same test infer_dtype uses to pick an unsigned dtype
+    signed = var_dict.get("field_type") != "discrete" or negative_codes
+    return ColumnRule(col, character, signed, codes)
+
+
+class ConformanceReport:
+    """
+    Violation counts and sample row offsets per variable, accumulated over
+    every chunk decoded with ``validate=report``. Row offsets count records
+    from the start of the file (or of the rows decoded with this report).
+    """
+
+    def __init__(
+        self,
+        ddi: Dict,
+        columns: Optional[List[str]] = None,
+        samples: int = SAMPLE_ROWS,
+    ):
+        self.ddi = ddi
+        self.columns = None if columns is None else set(columns)
+        self.samples = samples
+        self.n_rows = 0
+        self.rules: Dict[str, ColumnRule] = {}
+        self._counts: Dict[str, Dict] = {}
+
+    def rule(self, col: str) -> Optional[ColumnRule]:
+        if self.columns is not None and col not in self.columns:
+            return None
+        if col not in self.rules:
+            self.rules[col] = column_rule(self.ddi, col)
+        return self.rules[col]
+
+    def check_numeric(
+        self,
+        col: str,
+        field: np.ndarray,
+        values: np.ndarray,
+        is_digit: np.ndarray,
+        signs: np.ndarray,
+        negative: np.ndarray,
+        row_offset: int,
+        blank: Optional[np.ndarray] = None,
+    ):
+        """
+        Check a decoded numeric field, reusing the decoder's digit and sign
+        masks and its all-blank rows. ``values`` are the integers before
+        implied decimals.
+        """
+        rule = self.rule(col)
+        if rule is None:
+            return
+        masks = {}
+        any_negative = False
+        # IPUMS fields are zero padded, so the common case is all digits
+        if not is_digit.all():
+            stray = ~(is_digit | signs)
+            if blank is not None:
+                masks["blank"] = blank
+                # an all-blank field is missing, not malformed
+                stray[blank] = False
+            if stray.any():
+                masks["format"] = stray.any(axis=1)
+            any_negative = negative.any()
+        if any_negative:
+            signed_rows = np.flatnonzero(negative)
+            repeated = np.count_nonzero(signs[signed_rows], axis=1) > 1
+            if repeated.any():
+                format_rows = masks.setdefault("format", np.zeros(len(values), bool))
+                format_rows[signed_rows[repeated]] = True
+            if not rule.signed:
+                masks["range"] = negative
+        if rule.codes is not None:
+            outside = rule.outside(values, any_negative)
+            if blank is not None:
+                outside &= ~blank
+            if outside.any():
+                masks["category"] = outside
+        self._record(col, masks, row_offset)
+
+    def check_character(self, col: str, values: np.ndarray, row_offset: int):
+        rule = self.rule(col)
+        if rule is None or rule.codes is None:
+            return
+        outside = rule.outside(values)
+        if outside.any():
+            self._record(col, {"category": outside}, row_offset)
+
+    def _record(self, col: str, masks: Dict[str, np.ndarray], row_offset: int):
+        if not masks:
+            return
+        # each column is only checked by one thread at a time
+        counts = self._counts.setdefault(
+            col, {**dict.fromkeys(KINDS, 0), "rows": 0, "sample_rows": []}
+        )
+        bad = None
+        for kind, mask in masks.items():
+            counts[kind] += int(np.count_nonzero(mask))
+            bad = mask if bad is None else bad | mask
+        counts["rows"] += int(np.count_nonzero(bad))
+        wanted = self.samples - len(counts["sample_rows"])
+        if wanted > 0:
+            rows = np.flatnonzero(bad)[:wanted] + row_offset
+            counts["sample_rows"].extend(rows.tolist())
+
+    @property
+    def n_violations(self) -> int:
+        """Rows with a violation, summed over variables."""
+        return sum(counts["rows"] for counts in self._counts.values())
+
+    def violations(self, col: str) -> Dict:
+        return self._counts.get(
+            col, {**dict.fromkeys(KINDS, 0), "rows": 0, "sample_rows": []}
+        )
+
+    def summary(self) -> "pd.DataFrame":
+        """
+        One row per variable with violations, in DDI order: the count of each
+        kind, the rows with any of them and a few of their row offsets.
+        """
+        import pandas as pd
+
+        order = [col for col in self.ddi["columns"] if col in self._counts]
+        summary = pd.DataFrame(
+            [self._counts[col] for col in order],
+            index=pd.Index(order, name="variable"),
+            columns=[*KINDS, "rows", "sample_rows"],
+        )
+        return summary.astype({kind: np.int64 for kind in [*KINDS, "rows"]})
+
+    def __repr__(self) -> str:
+        return (
+            f"ConformanceReport({self.n_rows:,} rows, "
+            f"{len(self._counts)} variables with violations)"
+        )
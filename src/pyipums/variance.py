@@ -0,0 +1,185 @@
+import re
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .grouping import GroupIndex, _as_weights
+
+# Person and household replicate weights shipped with ACS (REPWTP1-80,
+# REPWT1-80) and CPS ASEC (REPWTP1-160, REPWT1-160) extracts
+PERSON_REPWT_PREFIX = "REPWTP"
+HOUSEHOLD_REPWT_PREFIX = "REPWT"
+DEFAULT_CHUNKSIZE = 1 << 16
+
+
+def _sdr_factor(n_replicates: int) -> float:
+    # successive difference replication, used for ACS and CPS ASEC
+    return 4.0 / n_replicates
+
+
+def _jk1_factor(n_replicates: int) -> float:
+    # delete-one-group jackknife
+    return (n_replicates - 1.0) / n_replicates
+
+
+REPLICATE_METHODS = {
+    "sdr": _sdr_factor,
+    "jk1": _jk1_factor,
+}
+
+
+def replicate_weight_columns(columns: Sequence[str], prefix: str) -> List[str]:
+    """
+    The numbered replicate weight columns for ``prefix`` in numeric order, e.g.
+    REPWTP1, REPWTP2, ..., REPWTP80. The unnumbered flag variable is skipped.
+    """
+    pattern = re.compile(rf"^{re.escape(prefix)}(\d+)$")
+    numbered = []
+    for col in columns:
+        match = pattern.match(col)
+        if match:
+            numbered.append((int(match.group(1)), col))
+    return [col for _, col in sorted(numbered)]
+
+
+def replicate_totals(
+    values: Sequence[Optional[np.ndarray]],
+    weights: np.ndarray,
+    groups: Optional[GroupIndex] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> np.ndarray:
+    """
+    Weighted totals of every variable in ``values`` under the full-sample and
+    all replicate weights at once.
+
+    ``weights`` is a rows x (1 + R) matrix whose first column holds the full
+    sample weight. Passing ``None`` as a value totals the weights themselves.
+    Rows are processed in chunks: each chunk's group indicator matrix is
+    multiplied against the weight matrix, so memory stays bounded by
+    ``chunksize`` regardless of the number of rows.
+
+    Returns an array shaped (len(values), n_groups, 1 + R); without ``groups``
+    there is a single group.
+    """
+    weights = np.asarray(weights)
+    n_rows, n_weights = weights.shape
+    n_groups = 1 if groups is None else groups.n_groups
+    out = np.zeros((len(values), n_groups, n_weights))
+    values = [None if v is None else np.asarray(v, dtype=float) for v in values]
+    group_ids = np.arange(n_groups)[:, None]
+    for start in range(0, n_rows, chunksize):
+        stop = min(start + chunksize, n_rows)
+        # a missing weight would turn every group's total NaN through the
+        # matmul, so it counts as zero like the full-sample bincount
+        chunk_weights = _as_weights(weights[start:stop])
+        if groups is None:
+            indicator = np.ones((1, stop - start))
+        else:
+            indicator = (groups.codes[start:stop] == group_ids).astype(float)
+
+        for i, v in enumerate(values):
+            if v is None:
+                out[i] += indicator @ chunk_weights
+            else:
+                out[i] += (indicator * np.nan_to_num(v[start:stop])) @ chunk_weights
+    return out
+
+
+def replicate_se(estimates: np.ndarray, method: str = "sdr") -> np.ndarray:
+    """
+    Standard errors from estimates whose last axis holds the full-sample
+    estimate followed by the R replicate estimates.
+    """
+    if method not in REPLICATE_METHODS:
+        raise ValueError(
+            f"Unknown replicate method {method!r}, "
+            f"expected one of {list(REPLICATE_METHODS)}"
+        )
+    full, reps = estimates[..., :1], estimates[..., 1:]
+    factor = REPLICATE_METHODS[method](reps.shape[-1])
+    return np.sqrt(factor * np.square(reps - full).sum(axis=-1))
+
+
+def replicate_weight_matrix(
+    df: pd.DataFrame, wvar: str, repwts: Sequence[str]
+) -> np.ndarray:
+    return df[[wvar] + list(repwts)].to_numpy()
+
+
+def _estimates_frame(
+    estimates: np.ndarray,
+    groups: Optional[GroupIndex],
+    by: Optional[str],
+    method: str,
+) -> pd.DataFrame:
+    index = (
+        pd.Index(["Total"]) if groups is None else pd.Index(groups.uniques, name=by)
+    )
+    return pd.DataFrame(
+        {"estimate": estimates[:, 0], "se": replicate_se(estimates, method)},
+        index=index,
+    )
+
+
+def _ratio_estimates(
+    df: pd.DataFrame,
+    numerator: Optional[np.ndarray],
+    denominator: Optional[np.ndarray],
+    wvar: str,
+    repwts: Sequence[str],
+    by: Optional[str],
+    chunksize: int,
+):
+    groups = None if by is None else GroupIndex(df[by], sort=True)
+    weights = replicate_weight_matrix(df, wvar, repwts)
+    num, den = replicate_totals([numerator, denominator], weights, groups, chunksize)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return groups, num / den
+
+
+def weighted_total(
+    df: pd.DataFrame,
+    xvar: str,
+    wvar: str,
+    repwts: Sequence[str],
+    by: Optional[str] = None,
+    method: str = "sdr",
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> pd.DataFrame:
+    groups = None if by is None else GroupIndex(df[by], sort=True)
+    weights = replicate_weight_matrix(df, wvar, repwts)
+    (totals,) = replicate_totals([df[xvar]], weights, groups, chunksize)
+    return _estimates_frame(totals, groups, by, method)
+
+
+def weighted_mean(
+    df: pd.DataFrame,
+    xvar: str,
+    wvar: str,
+    repwts: Sequence[str],
+    by: Optional[str] = None,
+    method: str = "sdr",
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> pd.DataFrame:
+    # missing values drop out of both the numerator and the denominator
+    groups, means = _ratio_estimates(
+        df, df[xvar], df[xvar].notna(), wvar, repwts, by, chunksize
+    )
+    return _estimates_frame(means, groups, by, method)
+
+
+def weighted_ratio(
+    df: pd.DataFrame,
+    numvar: str,
+    denvar: str,
+    wvar: str,
+    repwts: Sequence[str],
+    by: Optional[str] = None,
+    method: str = "sdr",
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> pd.DataFrame:
+    groups, ratios = _ratio_estimates(
+        df, df[numvar], df[denvar], wvar, repwts, by, chunksize
+    )
+    return _estimates_frame(ratios, groups, by, method)
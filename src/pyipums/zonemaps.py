@@ -0,0 +1,199 @@
+"""
+Zone maps summarize every block of ``block_rows`` rows of a columnar
+directory: the minimum and maximum of each column and, for small
+non-negative integer codes (STATEFIP, AGE, dictionary codes), a bitset of the
+codes present. A filter such as ``[("STATEFIP", "==", 6), ("AGE", ">=", 25)]``
+only reads the blocks whose summaries leave room for a match, which is most
+effective once rows are clustered on the filtered variables.
+
+Filters follow pyarrow's convention: a list of ``(column, op, value)``
+predicates that must all hold, or a list of such lists of which any may hold.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_BLOCK_ROWS = 65_536
+# integer columns whose values all lie in [0, MAX_BITSET_CODE] get code bitsets
+MAX_BITSET_CODE = 4095
+OPERATORS = ("==", "=", "!=", "<", "<=", ">", ">=", "in", "not in")
+SET_OPERATORS = ("in", "not in")
+
+
+def n_blocks(n_rows: int, block_rows: Optional[int]) -> int:
+    if not block_rows:
+        return 1
+    return -(-n_rows // block_rows)
+
+
+def _json_value(value):
+    if isinstance(value, np.floating) and np.isnan(value):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def build_zone_map(
+    values: np.ndarray, block_rows: int, dictionary: bool = False
+) -> Dict:
+    """
+    Per-block ``min`` and ``max`` (None for an all-NaN block) of a numeric
+    column, and ``codes`` bitsets as hex strings when the values, or the
+    dictionary codes, are small enough. Dictionary columns get no min/max.
+    """
+    starts = np.arange(0, len(values), block_rows)
+    zones = {}
+    if not len(values):
+        return zones
+    if not dictionary and values.dtype.kind in "biuf":
+        if values.dtype.kind == "f":
+            # fmin/fmax skip NaN unless a whole block is NaN
+            mins = np.fmin.reduceat(values, starts)
+            maxs = np.fmax.reduceat(values, starts)
+        else:
+            mins = np.minimum.reduceat(values, starts)
+            maxs = np.maximum.reduceat(values, starts)
+        zones["min"] = [_json_value(v) for v in mins]
+        zones["max"] = [_json_value(v) for v in maxs]
+
+    if values.dtype.kind in "iu":
+        present = values[values >= 0] if dictionary else values
+        lowest = present.min() if len(present) else 0
+        highest = present.max() if len(present) else -1
+        if lowest >= 0 and highest <= MAX_BITSET_CODE:
+            bitsets = []
+            for start in starts:
+                block = values[start : start + block_rows]
+                if dictionary:
+                    block = block[block >= 0]
+                counts = np.bincount(block.astype(np.intp), minlength=highest + 1)
+                bits = np.packbits(counts > 0, bitorder="little")
+                bitsets.append(bits.tobytes().hex())
+            zones["codes"] = bitsets
+    return zones
+
+
+def decode_bitsets(codes: List[str]) -> np.ndarray:
+    """The ``codes`` bitsets of a zone map as a (blocks, codes) boolean array."""
+    bits = [
+        np.unpackbits(np.frombuffer(bytes.fromhex(h), np.uint8), bitorder="little")
+        for h in codes
+    ]
+    return np.array(bits, dtype=bool).reshape(len(codes), -1)
+
+
+def normalize_filters(filters) -> List[List[Tuple]]:
+    """Filters as a list of conjunctions, any of which may hold."""
+    if not filters:
+        return []
+    if isinstance(filters[0], tuple) or isinstance(filters[0][0], str):
+        filters = [filters]
+    out = []
+    for conjunction in filters:
+        predicates = []
+        for name, op, value in conjunction:
+            if op not in OPERATORS:
+                raise ValueError(f"Unsupported filter operator {op!r} on {name}")
+            if op in SET_OPERATORS:
+                value = list(value)
+            predicates.append((name, "==" if op == "=" else op, value))
+        out.append(predicates)
+    return out
+
+
+def filter_columns(filters) -> List[str]:
+    columns = []
+    for conjunction in normalize_filters(filters):
+        columns += [name for name, _, _ in conjunction if name not in columns]
+    return columns
+
+
+def _numbers(values) -> list:
+    # a numeric column equals no text (e.g. "25" from a CLI --filter)
+    return [v for v in values if isinstance(v, (int, float, np.number))]
+
+
+def _codes_present(bitsets: np.ndarray, codes) -> np.ndarray:
+    width = bitsets.shape[1]
+    codes = [
+        int(c) for c in _numbers(codes) if 0 <= c < width and float(c).is_integer()
+    ]
+    return bitsets[:, codes].any(axis=1)
+
+
+def block_may_match(spec: Dict, count: int, op: str, value) -> np.ndarray:
+    """
+    False for the blocks of a column whose zone map rules out ``op value``;
+    True wherever a block might hold a match.
+    """
+    zones = spec.get("zones")
+    anything = np.ones(count, dtype=bool)
+    if not zones:
+        return anything
+    values = value if op in SET_OPERATORS else [value]
+    if spec["kind"] == "dictionary":
+        if op not in ("==", "in") or "codes" not in zones:
+            return anything
+        lookup = {category: code for code, category in enumerate(spec["categories"])}
+        codes = [lookup[v] for v in values if v in lookup]
+        return _codes_present(decode_bitsets(zones["codes"]), codes)
+
+    if "min" not in zones:
+        return anything
+    dtype = float if np.dtype(spec["dtype"]).kind == "f" else np.dtype(spec["dtype"])
+    mins = np.array(zones["min"], dtype=dtype)
+    maxs = np.array(zones["max"], dtype=dtype)
+    with np.errstate(invalid="ignore"):
+        if op in ("==", "in"):
+            values = _numbers(values)
+            may = np.zeros(count, dtype=bool)
+            for v in values:
+                may |= (mins <= v) & (v <= maxs)
+            if "codes" in zones:
+                may &= _codes_present(decode_bitsets(zones["codes"]), values)
+            return may
+        if op in ("!=", "not in"):
+            return ~((mins == maxs) & np.isin(mins, values))
+        if op == "<":
+            return mins < value
+        if op == "<=":
+            return mins <= value
+        if op == ">":
+            return maxs > value
+        return maxs >= value
+
+
+def evaluate(values: np.ndarray, op: str, value) -> np.ndarray:
+    """Row-level ``values op value`` as a boolean array."""
+    values = np.asarray(values)
+    if op in SET_OPERATORS:
+        if values.dtype == object:
+            # element-wise, since sorting mixed text and None would fail
+            found = np.zeros(len(values), dtype=bool)
+            for v in value:
+                found |= values == v
+        else:
+            # text in the set would turn it, and the comparison, into text
+            found = np.isin(values, _numbers(value))
+        return found if op == "in" else ~found
+    if op == "==":
+        return values == value
+    if op == "!=":
+        return values != value
+    if op == "<":
+        return values < value
+    if op == "<=":
+        return values <= value
+    if op == ">":
+        return values > value
+    return values >= value
+
+
+def filter_mask(df, filters) -> np.ndarray:
+    """Rows of a DataFrame matching ``filters``."""
+    mask = np.zeros(len(df), dtype=bool)
+    for conjunction in normalize_filters(filters):
+        matched = np.ones(len(df), dtype=bool)
+        for name, op, value in conjunction:
+            matched &= evaluate(df[name].to_numpy(), op, value)
+        mask |= matched
+    return mask
@@ -0,0 +1,34 @@
+import gzip
+
+import numpy as np
+import pandas as pd
+
+
+def format_field(value, width: int, decimals: int = 0, character: bool = False) -> str:
+    if character:
+        return str(value).rjust(width)[:width]
+    if pd.isnull(value):
+        return " " * width
+    scaled = int(round(float(value) * 10**decimals))
+    if scaled < 0:
+        return "-" + str(-scaled).zfill(width - 1)
+    return str(scaled).zfill(width)
+
+
+def write_fixed_width(ddi, df: pd.DataFrame, data_file_path: str):
+    """Write the columns of ``df`` into an IPUMS-style fixed-width file."""
+    record_length = max(end for _, end in ddi["column_specs"])
+    specs = dict(zip(ddi["columns"], ddi["column_specs"]))
+    lines = np.full((len(df), record_length), "0", dtype="<U1")
+    for col in df.columns:
+        start, end = specs[col]
+        character = ddi[col].get("data_type") == "character"
+        fields = [
+            format_field(v, end - start, ddi[col].get("decimals", 0), character)
+            for v in df[col]
+        ]
+        lines[:, start:end] = np.array([list(f) for f in fields])
+    text = "".join("".join(row) + "\n" for row in lines)
+    opener = gzip.open if str(data_file_path).endswith(".gz") else open
+    with opener(data_file_path, "wt") as fp:
+        fp.write(text)
@@ -0,0 +1,80 @@
+import os
+import re
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+RANGE = re.compile(r"bytes=(\d+)-(\d*)")
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """Static files with single-range GET support, like an object store."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        match = RANGE.fullmatch(self.headers.get("Range", ""))
+        if match is None:
+            return super().do_GET()
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            return self.send_error(404)
+        size = os.path.getsize(path)
+        start = int(match.group(1))
+        end = min(int(match.group(2) or size - 1), size - 1)
+        server = self.server
+        with server.lock:
+            server.ranges.append((start, end + 1))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(server.delay)
+        with open(path, "rb") as fp:
+            fp.seek(start)
+            data = fp.read(end + 1 - start)
+        # done before replying, so a client's next request can't overlap it
+        with server.lock:
+            server.in_flight -= 1
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class RangeServer:
+    """
+    Serve ``directory`` on a local port in a background thread, recording
+    every range requested and the most requests handled at once.
+    """
+
+    def __init__(self, directory: str, delay: float = 0.0):
+        handler = partial(RangeRequestHandler, directory=directory)
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.lock = threading.Lock()
+        self.httpd.ranges = []
+        self.httpd.in_flight = 0
+        self.httpd.max_in_flight = 0
+        self.httpd.delay = delay
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def url(self, name: str) -> str:
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}/{name}"
+
+    @property
+    def ranges(self):
+        return self.httpd.ranges
+
+    @property
+    def max_in_flight(self):
+        return self.httpd.max_in_flight
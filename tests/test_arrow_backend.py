@@ -0,0 +1,84 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from src.pyipums.benchmarks.synthetic import write_synthetic_extract
+from src.pyipums.clean_data import IpumsAcsCleaner, IpumsAsecCleaner
+from src.pyipums.parse_xml import read_ipums_ddi
+from src.pyipums.profiling import StageProfiler
+from src.pyipums.read_data import read_ipums_micro
+from src.pyipums.tabulate import pt, weighted_mean_by
+
+
+class TestArrowParity(TestCase):
+    def setUp(self):
+        self.absolute_path = os.path.dirname(__file__)
+        self.cps_ddi = read_ipums_ddi(os.path.join(self.absolute_path, "metadata_cps.xml"))
+        self.acs_ddi = read_ipums_ddi(os.path.join(self.absolute_path, "metadata_acs.xml"))
+        self.cps = pd.read_csv(os.path.join(self.absolute_path, "cps_sample_data.csv.gz"))
+        self.acs = pd.read_csv(os.path.join(self.absolute_path, "acs_sample_data.csv.gz"))
+
+    def assert_cleaner_parity(self, cleaner, df, ddi):
+        expected = cleaner(df.copy(), ddi["codebook"]).clean_data()
+        table = cleaner(df, ddi["codebook"], backend="arrow").clean_data()
+        self.assertIsInstance(table, pa.Table)
+        pd.testing.assert_frame_equal(table.to_pandas(), expected)
+
+    def test_cleaners(self):
+        self.assert_cleaner_parity(IpumsAsecCleaner, self.cps, self.cps_ddi)
+        self.assert_cleaner_parity(IpumsAcsCleaner, self.acs, self.acs_ddi)
+
+    def test_cleaners_on_compact_synthetic_extracts(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            data_file_path = os.path.join(tmpdir, "synthetic.dat")
+            for cleaner, ddi in [
+                (IpumsAsecCleaner, self.cps_ddi),
+                (IpumsAcsCleaner, self.acs_ddi),
+            ]:
+                write_synthetic_extract(ddi, data_file_path, 2000, seed=3)
+                df = read_ipums_micro(ddi, data_file_path)
+                if "INCWAGE" in df.columns:
+                    # invalid income codes and zero totals take the edge paths
+                    df.loc[::7, "INCWAGE"] = 999999
+                    df.loc[::5, "INCTOT"] = 0
+                self.assert_cleaner_parity(cleaner, df, ddi)
+
+    def test_arrow_input_is_untouched_and_observed(self):
+        table = pa.Table.from_pandas(self.cps)
+        profiler = StageProfiler()
+        cleaned = IpumsAsecCleaner(
+            table, self.cps_ddi["codebook"], observer=profiler, backend="arrow"
+        ).clean_data()
+        self.assertEqual(table.column_names, list(self.cps.columns))
+        self.assertEqual(cleaned.num_rows, table.num_rows)
+        stages = [e.stage for e in profiler.events if e.kind == "stage"]
+        self.assertEqual(stages, IpumsAsecCleaner.STAGES)
+        with self.assertRaises(ValueError):
+            IpumsAsecCleaner(self.cps, self.cps_ddi["codebook"], backend="polars")
+
+    def test_pt(self):
+        df = self.acs.copy()
+        rng = np.random.default_rng(0)
+        repwts = [f"REPWTP{r}" for r in range(1, 9)]
+        for col in repwts:
+            df[col] = df["PERWT"] * rng.uniform(0.5, 1.5, size=len(df))
+        df.loc[3, "PERWT"] = np.nan
+        codebook = self.acs_ddi["codebook"]
+        for args in [
+            (codebook, "STATEFIP", None, None),
+            (codebook, "SEX", "PERWT", None),
+            (None, "RACE", "PERWT", repwts),
+        ]:
+            ddi, xvar, wvar, reps = args
+            expected = pt(ddi, df, xvar, wvar, reps)
+            for data in [df, pa.Table.from_pandas(df)]:
+                result = pt(ddi, data, xvar, wvar, reps, backend="arrow")
+                pd.testing.assert_frame_equal(result, expected)
+
+    def test_weighted_mean_by(self):
+        expected = weighted_mean_by(self.acs, "STATEFIP", "AGE", "PERWT")
+        result = weighted_mean_by(self.acs, "STATEFIP", "AGE", "PERWT", backend="arrow")
+        pd.testing.assert_frame_equal(result, expected)
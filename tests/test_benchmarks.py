@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+from src.pyipums.benchmarks.suite import compare_results, run_suite
+from src.pyipums.benchmarks.synthetic import write_synthetic_extract
+from src.pyipums.parse_xml import read_ipums_ddi
+from src.pyipums.read_data import read_ipums_micro
+
+
+class TestSyntheticExtract(TestCase):
+    def setUp(self):
+        self.absolute_path = os.path.dirname(__file__)
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_values_follow_the_codebook(self):
+        ddi = read_ipums_ddi(os.path.join(self.absolute_path, "metadata_acs.xml"))
+        data_file_path = os.path.join(self.tmpdir.name, "synthetic.dat.gz")
+        write_synthetic_extract(ddi, data_file_path, 500, seed=1, chunksize=64)
+        df = read_ipums_micro(ddi, data_file_path)
+        self.assertEqual(df.shape, (500, len(ddi["columns"])))
+
+        codebook = ddi["codebook"]
+        for col in ["STATEFIP", "SEX", "RACE", "EDUCD"]:
+            self.assertTrue(set(df[col]) <= set(codebook[col].labels_by_code), col)
+        self.assertEqual(df["INDNAICS"].str.len().max(), 8)
+
+        again = os.path.join(self.tmpdir.name, "again.dat")
+        write_synthetic_extract(ddi, again, 500, seed=1, chunksize=64)
+        np.testing.assert_array_equal(
+            read_ipums_micro(ddi, again)["PERWT"], df["PERWT"]
+        )
+
+    def test_suite(self):
+        datasets = {
+            "cps": (os.path.join(self.absolute_path, "metadata_cps.xml"), "IpumsAsecCleaner"),
+            "acs": (os.path.join(self.absolute_path, "metadata_acs.xml"), "IpumsAcsCleaner"),
+        }
+        suite = run_suite(n_rows=200, repeat=1, datasets=datasets)
+        json.dumps(suite)
+        benchmarks = {(r["dataset"], r["benchmark"]) for r in suite["results"]}
+        self.assertIn(("cps", "IpumsAsecCleaner.clean_data"), benchmarks)
+        self.assertIn(("acs", "IpumsAcsCleaner.clean_data"), benchmarks)
+        self.assertIn(("acs", "pt"), benchmarks)
+        self.assertIn(("cps", "export_sql[sqlite]"), benchmarks)
+        self.assertIn(("acs", "sql.count_by_state[sqlite]"), benchmarks)
+        self.assertEqual(len(benchmarks), 14)
+
+        comparison = compare_results(suite, suite)
+        np.testing.assert_allclose(comparison["ratio"], 1.0)
+        self.assertFalse(comparison["regression"].any())
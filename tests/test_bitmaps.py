@@ -0,0 +1,123 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from src.pyipums.bitmaps import BitmapIndex, bitmap_candidates
+from src.pyipums.columnar import (
+    convert_extract,
+    read_columnar,
+    read_manifest,
+    refresh_extract,
+)
+from src.pyipums.parse_xml import read_ipums_ddi
+from src.pyipums.read_data import read_ipums_micro
+from src.pyipums.zonemaps import filter_mask
+from tests.fixed_width import write_fixed_width
+
+INDEXED = ["SEX", "RACE", "HISPAN", "LABFORCE", "MARST", "EDUC", "INDNAICS"]
+
+
+class TestBitmaps(TestCase):
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.ddi = read_ipums_ddi(os.path.join(absolute_path, "metadata_acs.xml"))
+        self.raw = pd.read_csv(
+            os.path.join(absolute_path, "acs_sample_data.csv.gz"), compression="gzip"
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_file_path = os.path.join(self.tmpdir.name, "usa_00001.dat.gz")
+        write_fixed_width(self.ddi, self.raw, self.data_file_path)
+        self.columns = INDEXED + ["AGE", "PERWT"]
+        self.df = read_ipums_micro(self.ddi, self.data_file_path, self.columns)
+        self.path = os.path.join(self.tmpdir.name, "usa_00001")
+        convert_extract(
+            self.ddi,
+            self.data_file_path,
+            self.path,
+            self.columns,
+            block_rows=16,
+            bitmap_columns=INDEXED,
+        )
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_bitmap_candidates(self):
+        self.assertEqual(
+            bitmap_candidates(self.ddi, self.columns),
+            ["SEX", "RACE", "HISPAN", "LABFORCE", "MARST", "EDUC"],
+        )
+
+    def test_blank_fields(self):
+        # a blank SEX promotes the column to floats; the row is in no bitmap
+        raw = self.raw.astype({"SEX": float})
+        raw.loc[5, "SEX"] = np.nan
+        write_fixed_width(self.ddi, raw, self.data_file_path)
+        df = read_ipums_micro(self.ddi, self.data_file_path, self.columns)
+        columns = bitmap_candidates(self.ddi, self.columns)
+        convert_extract(
+            self.ddi,
+            self.data_file_path,
+            self.path,
+            self.columns,
+            chunksize=7,
+            bitmap_columns=columns,
+        )
+        index = BitmapIndex(self.path)
+        self.assertEqual(index.columns, columns)
+        self.assertEqual(read_manifest(self.path)["columns"]["SEX"]["dtype"], "<f4")
+        for filters in ([("SEX", "==", 2)], [("SEX", "!=", 2), ("RACE", "==", 1)]):
+            mask = filter_mask(df, filters)
+            np.testing.assert_array_equal(index.rows(filters), np.flatnonzero(mask))
+        counts = index.counts("SEX")
+        self.assertEqual(counts.sum(), len(df) - 1)
+        self.assertEqual(counts.to_dict(), df["SEX"].value_counts().to_dict())
+
+    def test_predicates_resolve_from_bitmaps(self):
+        index = BitmapIndex(self.path)
+        self.assertEqual(index.columns, INDEXED)
+        for filters in (
+            [("HISPAN", "!=", 0), ("LABFORCE", "==", 2)],
+            [[("SEX", "==", 2), ("EDUC", ">=", 6)], [("RACE", "in", [2, 4])]],
+            [("MARST", "not in", [1, 6]), ("INDNAICS", "in", ["0", "6111"])],
+            [("EDUC", "==", 99)],
+        ):
+            mask = filter_mask(self.df, filters)
+            np.testing.assert_array_equal(index.rows(filters), np.flatnonzero(mask))
+            self.assertEqual(index.count(filters), mask.sum())
+            self.assertAlmostEqual(
+                index.count(filters, weight="PERWT"), self.df["PERWT"][mask].sum()
+            )
+
+        filters = [("LABFORCE", "==", 2)]
+        counts = index.counts("SEX", weight="PERWT", filters=filters)
+        selected = self.df[filter_mask(self.df, filters)]
+        expected = selected.groupby("SEX")["PERWT"].sum()
+        np.testing.assert_allclose(counts[expected.index], expected)
+        self.assertEqual(index.counts("RACE").sum(), len(self.df))
+
+    def test_filtered_reads_use_bitmaps(self):
+        filters = [("HISPAN", "!=", 0), ("AGE", ">=", 25), ("AGE", "<=", 54)]
+        stats = {}
+        df = read_columnar(self.path, ["SEX", "PERWT"], filters=filters, stats=stats)
+        expected = self.df[filter_mask(self.df, filters)][["SEX", "PERWT"]]
+        pd.testing.assert_frame_equal(df, expected.reset_index(drop=True))
+
+        # only blocks holding a Hispanic person are scanned for AGE
+        hispanic = np.flatnonzero(self.df["HISPAN"] != 0) // 16
+        self.assertEqual(stats["blocks_skipped"], 7 - len(np.unique(hispanic)))
+
+    def test_refresh_rebuilds_changed_bitmaps(self):
+        raw = self.raw.copy()
+        raw["SEX"] = 3 - raw["SEX"]
+        data_file_path = os.path.join(self.tmpdir.name, "usa_00002.dat.gz")
+        write_fixed_width(self.ddi, raw, data_file_path)
+        before = read_manifest(self.path)["columns"]["SEX"]["bitmap"]["file"]
+
+        report = refresh_extract(self.ddi, data_file_path, self.path)
+        self.assertEqual(report["rewritten"], {"SEX": "data"})
+        self.assertFalse(os.path.exists(os.path.join(self.path, before)))
+        index = BitmapIndex(self.path)
+        self.assertEqual(index.count([("SEX", "==", 1)]), (self.df["SEX"] == 2).sum())
@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from src.pyipums.benchmarks.catalog import bench_catalog
+from src.pyipums.catalog import DdiCatalog, build_catalog
+from src.pyipums.parse_xml import read_ipums_ddi
+
+CODEBOOKS = ["metadata_acs.xml", "metadata_cps.xml", "metadata_hierarchical.xml"]
+
+
+class TestDdiCatalog(TestCase):
+    def setUp(self):
+        self.absolute_path = os.path.dirname(__file__)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.archive = os.path.join(self.tmpdir.name, "ddi")
+        os.makedirs(os.path.join(self.archive, "2021"))
+        for name in CODEBOOKS:
+            shutil.copyfile(
+                os.path.join(self.absolute_path, name),
+                os.path.join(self.archive, "2021", name),
+            )
+        self.catalog_path = os.path.join(self.tmpdir.name, "catalog.sqlite")
+        self.catalog = build_catalog(self.catalog_path, self.archive, jobs=2)
+
+    def tearDown(self):
+        self.catalog.close()
+        self.tmpdir.cleanup()
+
+    def test_lookups(self):
+        extracts = self.catalog.extracts()
+        self.assertEqual(extracts["name"].tolist(), CODEBOOKS)
+        self.assertEqual(extracts["n_variables"].tolist(), [112, 479, 12])
+
+        found = self.catalog.find_variable("SEX")
+        self.assertEqual(found["extract"].tolist(), CODEBOOKS)
+        acs = read_ipums_ddi(os.path.join(self.absolute_path, CODEBOOKS[0]))
+        start, end = acs["column_specs"][acs["columns"].index("SEX")]
+        self.assertEqual(found.loc[0, ["start", "end"]].tolist(), [start, end])
+        self.assertEqual(found["n_categories"].tolist(), [2, 3, 2])
+        self.assertEqual(len(self.catalog.find_variable("NOT_A_VARIABLE")), 0)
+
+        matches = self.catalog.search("field of degree")
+        self.assertIn("DEGFIELDD", matches["name"].tolist())
+        self.assertTrue(matches["label"].str.contains("degree").all())
+        wages = self.catalog.search("Wage salary income")
+        self.assertEqual(wages.loc[0, "name"], "INCWAGE")
+        with self.assertRaises(ValueError):
+            self.catalog.search(' " ')
+
+        self.catalog.full_text = False
+        matches = self.catalog.search("field of DEGREE")
+        self.assertIn("DEGFIELDD", matches["name"].tolist())
+
+    def test_categories(self):
+        categories = self.catalog.categories("SEX", "metadata_cps.xml")
+        self.assertEqual(categories["value"].tolist(), [1, 2, 9])
+        acs, cps = CODEBOOKS[:2]
+        diff = self.catalog.category_diff("SEX", acs, cps)
+        self.assertEqual(diff["code"].tolist(), [9])
+        self.assertEqual(diff["change"].tolist(), ["added"])
+        diff = self.catalog.category_diff("SEX", cps, acs)
+        self.assertEqual(diff["change"].tolist(), ["removed"])
+        self.assertEqual(len(self.catalog.category_diff("SEX", acs, acs)), 0)
+
+        history = self.catalog.category_history("SEX")
+        self.assertEqual(list(history.columns), CODEBOOKS)
+        self.assertEqual(history.loc[1].tolist(), ["Male"] * 3)
+
+        for name in CODEBOOKS:
+            codebook = self.catalog.codebook(name)
+            ddi = read_ipums_ddi(os.path.join(self.absolute_path, name))
+            expected = ddi["codebook"]
+            self.assertEqual(list(codebook.variables), list(expected.variables))
+            self.assertEqual(codebook.file_metadata, expected.file_metadata)
+            for var in expected:
+                self.assertEqual(codebook[var.name].labels_by_code, var.labels_by_code)
+                for attribute in ("label", "start", "end", "decimals", "dtype"):
+                    self.assertEqual(
+                        getattr(codebook[var.name], attribute), getattr(var, attribute)
+                    )
+
+        with self.assertRaises(KeyError):
+            self.catalog.categories("SEX", "usa_99999.xml")
+        with self.assertRaises(KeyError):
+            self.catalog.categories("DEGFIELDD", "metadata_cps.xml")
+
+    def test_incremental_update(self):
+        directory = os.path.join(self.archive, "2021")
+        changes = self.catalog.update(self.archive)
+        self.assertEqual(len(changes["unchanged"]), 3)
+        self.assertEqual(changes["added"] + changes["updated"] + changes["removed"], [])
+
+        os.remove(os.path.join(directory, "metadata_cps.xml"))
+        shutil.copyfile(
+            os.path.join(self.absolute_path, "metadata_example.xml"),
+            os.path.join(self.archive, "metadata_example.xml"),
+        )
+        changed = os.path.join(directory, "metadata_acs.xml")
+        stat = os.stat(changed)
+        os.utime(changed, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        changes = self.catalog.update(self.archive)
+        self.assertEqual(
+            [len(changes[key]) for key in ("added", "updated", "removed", "unchanged")],
+            [1, 1, 1, 1],
+        )
+        self.catalog.close()
+
+        # the catalog persists, and copies of a codebook are told apart by path
+        self.catalog = DdiCatalog(self.catalog_path)
+        shutil.copyfile(changed, os.path.join(self.archive, "metadata_acs.xml"))
+        self.catalog.update([self.archive])
+        self.assertEqual(len(self.catalog), 4)
+        self.assertEqual(len(self.catalog.find_variable("DEGFIELDD")), 3)
+        self.assertEqual(self.catalog.find_variable("ASECWT")["path"].tolist(), [])
+        with self.assertRaises(ValueError):
+            self.catalog.codebook("metadata_acs.xml")
+        self.assertEqual(len(self.catalog.codebook(changed)), 112)
+        search = self.catalog.search("Sex")
+        self.assertEqual(search.set_index("name").loc["SEX", "n_extracts"], 4)
+
+    def test_benchmark(self):
+        result = bench_catalog(n_codebooks=2, repeat=1)
+        self.assertEqual(result["n_codebooks"], 2)
+        self.assertGreater(result["speedup"], 0)
@@ -1,6 +1,10 @@
 import os
+import subprocess
+import sys
+import unittest
 from unittest import TestCase
 
+import numpy as np
 import pandas as pd
 from ipumspy import readers, ddi
 from src.pyipums.parse_xml import read_ipums_ddi
@@ -103,3 +107,75 @@ class TestReadACSData(TestCase):
             set(df["Educational Attainment"].unique()),
             set(ACS_EDUC_ATTAINMENT.values()),
         )
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# cleans a 200k-row CPS frame widened with 60 unused float64 columns (~100MB)
+# and prints the growth in peak RSS while cleaning
+PEAK_RSS_SCRIPT = """
+import resource, sys
+import numpy as np, pandas as pd
+from src.pyipums.parse_xml import read_ipums_ddi
+from src.pyipums.clean_data import IpumsAsecCleaner
+
+ddi = read_ipums_ddi("tests/metadata_cps.xml")
+df = pd.read_csv("tests/cps_sample_data.csv.gz")
+df = pd.concat([df] * 2000, ignore_index=True)
+filler = np.zeros((len(df), 60))
+df = pd.concat([df, pd.DataFrame(filler).add_prefix("FILLER")], axis=1)
+del filler
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.argv[1] == "copy":
+    IpumsAsecCleaner(df.copy(), ddi["codebook"]).clean_data()
+else:
+    IpumsAsecCleaner(df, ddi["codebook"], inplace=False).clean_data()
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print((after - before) * 1024, df.memory_usage().sum())
+"""
+
+
+class TestNonMutatingCleaners(TestCase):
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.cps_ddi = read_ipums_ddi(os.path.join(absolute_path, "metadata_cps.xml"))
+        self.acs_ddi = read_ipums_ddi(os.path.join(absolute_path, "metadata_acs.xml"))
+        self.cps = pd.read_csv(os.path.join(absolute_path, "cps_sample_data.csv.gz"))
+        self.acs = pd.read_csv(os.path.join(absolute_path, "acs_sample_data.csv.gz"))
+
+    def test_input_is_untouched(self):
+        for cleaner, df, ddi_dict in [
+            (IpumsAsecCleaner, self.cps, self.cps_ddi),
+            (IpumsAcsCleaner, self.acs, self.acs_ddi),
+        ]:
+            original = df.copy()
+            cleaned = cleaner(df, ddi_dict["codebook"], inplace=False).clean_data()
+            pd.testing.assert_frame_equal(df, original)
+
+            expected = cleaner(original.copy(), ddi_dict["codebook"]).clean_data()
+            self.assertLess(cleaned.shape[1], expected.shape[1])
+            pd.testing.assert_frame_equal(cleaned, expected[cleaned.columns])
+            derived = [c for c in expected.columns if c not in original.columns]
+            self.assertTrue(set(derived) <= set(cleaned.columns))
+            self.assertEqual(sorted(derived), sorted(cleaner.DERIVED_COLUMNS))
+
+        cleaned = IpumsAcsCleaner(
+            self.acs, self.acs_ddi["codebook"], inplace=False
+        ).clean_data()
+        self.assertTrue(
+            np.shares_memory(cleaned["STATEFIP"].to_numpy(), self.acs["STATEFIP"].to_numpy())
+        )
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "ru_maxrss units")
+    def test_peak_rss(self):
+        growth = {}
+        for mode in ["copy", "views"]:
+            out = subprocess.run(
+                [sys.executable, "-c", PEAK_RSS_SCRIPT, mode],
+                cwd=REPO_ROOT,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            growth[mode], frame_bytes = map(int, out.stdout.split())
+        # the defensive copy costs at least the whole frame on top of the views
+        self.assertGreater(growth["copy"] - growth["views"], 0.8 * frame_bytes)
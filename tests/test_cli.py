@@ -0,0 +1,131 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+import pandas as pd
+from src.pyipums.cli import main
+from src.pyipums.columnar import read_columnar, read_manifest
+from src.pyipums.parse_xml import read_ipums_ddi
+from src.pyipums.tabulate import pt
+from tests.fixed_width import write_fixed_width
+
+
+class TestCli(TestCase):
+    def setUp(self):
+        self.absolute_path = os.path.dirname(__file__)
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _extract(self, ddi_file_path, data_file_path):
+        ddi_file_path = os.path.join(self.absolute_path, ddi_file_path)
+        ddi = read_ipums_ddi(ddi_file_path)
+        df = pd.read_csv(
+            os.path.join(self.absolute_path, data_file_path), compression="gzip"
+        )
+        fixed_width_path = os.path.join(self.tmpdir.name, "extract.dat.gz")
+        write_fixed_width(ddi, df, fixed_width_path)
+        return ddi_file_path, ddi, df, fixed_width_path
+
+    def _run(self, *argv):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            self.assertEqual(main([str(a) for a in argv]), 0)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_convert_and_tabulate(self):
+        ddi_path, ddi, df, data_path = self._extract(
+            "metadata_acs.xml", "acs_sample_data.csv.gz"
+        )
+        output = os.path.join(self.tmpdir.name, "usa_00001")
+        stats_path = os.path.join(self.tmpdir.name, "stats.json")
+        _, stderr = self._run(
+            "convert", ddi_path, data_path, output,
+            "--columns", "STATEFIP,SEX,PERWT",
+            "--chunksize", 11, "--jobs", 2, "--stats", stats_path,
+        )
+        self.assertIn("rows/s", stderr)
+        self.assertIn("MB/s", stderr)
+        with open(stats_path) as fp:
+            stats = json.load(fp)
+        self.assertEqual(stats["rows"], len(df))
+        self.assertEqual(read_columnar(output).columns.tolist(), ["STATEFIP", "SEX", "PERWT"])
+
+        stdout, _ = self._run("tabulate", ddi_path, output, "SEX", "--weight", "PERWT")
+        # tabulate reads its own variables and ignores --columns
+        with_columns, _ = self._run(
+            "tabulate", ddi_path, output, "SEX", "--weight", "PERWT",
+            "--columns", "STATEFIP,SEX",
+        )
+        self.assertEqual(with_columns, stdout)
+        table = pd.read_csv(io.StringIO(stdout))
+        expected = pt(ddi["codebook"], df, "SEX", "PERWT")
+        self.assertEqual(table["SEX"].tolist(), expected["SEX"].tolist())
+        self.assertEqual(table["count"].tolist(), expected["count"].tolist())
+
+    def test_filtered_tabulate(self):
+        ddi_path, ddi, df, data_path = self._extract(
+            "metadata_acs.xml", "acs_sample_data.csv.gz"
+        )
+        output = os.path.join(self.tmpdir.name, "usa_00001")
+        self._run(
+            "convert", ddi_path, data_path, output,
+            "--columns", "STATEFIP,SEX,AGE,PERWT", "--cluster-by", "STATEFIP",
+            "--bitmap-index", "auto",
+        )
+        self.assertIn("bitmap", read_manifest(output)["columns"]["SEX"])
+        selected = df[(df["AGE"] >= 25) & (df["STATEFIP"] == 48)]
+        expected = pt(ddi["codebook"], selected, "SEX", "PERWT")
+        for data in (data_path, output):
+            stdout, stderr = self._run(
+                "tabulate", ddi_path, data, "SEX", "--weight", "PERWT",
+                "--filter", "AGE >= 25", "--filter", "STATEFIP == 48",
+            )
+            table = pd.read_csv(io.StringIO(stdout))
+            self.assertEqual(table["count"].tolist(), expected["count"].tolist())
+        self.assertIn("skipped 0 of 1 blocks", stderr)
+
+    def test_clean_asec(self):
+        ddi_path, ddi, df, data_path = self._extract(
+            "metadata_cps.xml", "cps_sample_data.csv.gz"
+        )
+        output = os.path.join(self.tmpdir.name, "cleaned.csv")
+        self._run(
+            "clean", "asec", ddi_path, data_path, output,
+            "--columns", ",".join(df.columns),
+        )
+        cleaned = pd.read_csv(output)
+        self.assertEqual(len(cleaned), len(df))
+        self.assertIn("Educational Attainment", cleaned.columns)
+        self.assertIn("Weighted Wage Income", cleaned.columns)
+
+    def test_clean_with_memory_budget(self):
+        ddi_path, ddi, df, data_path = self._extract(
+            "metadata_acs.xml", "acs_sample_data.csv.gz"
+        )
+        outputs = []
+        for options in [(), ("--memory-budget", "64M", "--cores", 2)]:
+            output = os.path.join(self.tmpdir.name, f"cleaned{len(options)}.csv")
+            _, stderr = self._run("clean", "acs", ddi_path, data_path, output, *options)
+            outputs.append(pd.read_csv(output))
+        self.assertIn("plan: 1 chunks of 100 rows at once, 2 decoding threads", stderr)
+        pd.testing.assert_frame_equal(outputs[0], outputs[1])
+
+    def test_validate(self):
+        ddi_path, ddi, df, data_path = self._extract(
+            "metadata_acs.xml", "acs_sample_data.csv.gz"
+        )
+        stats_path = os.path.join(self.tmpdir.name, "stats.json")
+        stdout, stderr = self._run(
+            "validate", ddi_path, data_path, "--columns", "SEX,AGE",
+            "--stats", stats_path,
+        )
+        self.assertIn("validate:", stderr)
+        self.assertEqual(len(pd.read_csv(io.StringIO(stdout))), 0)
+        with open(stats_path) as fp:
+            stats = json.load(fp)
+        self.assertEqual((stats["rows"], stats["violations"]), (len(df), 0))
@@ -0,0 +1,59 @@
+import os
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from ipumspy import readers
+from src.pyipums.clean_data import IpumsAsecCleaner, map_codes
+from src.pyipums.codebook import Codebook, as_codebook, labelled_categories
+from src.pyipums.parse_xml import read_ipums_ddi
+
+
+class TestCodebook(TestCase):
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.ddi_file_path = os.path.join(absolute_path, "metadata_cps.xml")
+        self.ddi = read_ipums_ddi(self.ddi_file_path)
+        self.codebook = self.ddi["codebook"]
+        self.df = pd.read_csv(
+            os.path.join(absolute_path, "cps_sample_data.csv.gz"), compression="gzip"
+        )
+
+    def test_lookups(self):
+        self.assertIsInstance(self.codebook, Codebook)
+        self.assertEqual(len(self.codebook), len(self.ddi["columns"]))
+        statefip = self.codebook["STATEFIP"]
+        self.assertEqual(statefip.label, "State (FIPS code)")
+        self.assertEqual(statefip.label_for(6), "California")
+        self.assertEqual(self.codebook.code_for("STATEFIP", "Alaska"), 2)
+        self.assertEqual((statefip.start, statefip.end), (55, 57))
+        self.assertTrue(np.all(np.diff(statefip.code_values) > 0))
+        self.assertIs(as_codebook(self.ddi), self.codebook)
+
+    def test_labelled_categories(self):
+        var_dict = {
+            "field_metadata": [
+                {"category_value": "01", "category_label": "Male"},
+                {"category_value": "07", "category_label": ""},
+                {"category_value": "09", "category_label": None},
+            ]
+        }
+        self.assertEqual(labelled_categories(var_dict), [("01", "Male")])
+        self.assertEqual(labelled_categories({}), [])
+
+    def test_map_labels(self):
+        labels = self.codebook["SEX"].map_labels(np.array([1, 2, 3, 9], dtype=np.uint8))
+        self.assertEqual(labels.tolist(), ["Male", "Female", None, "NIU"])
+
+    def test_matches_ipumspy(self):
+        ipumspy_codebook = readers.read_ipums_ddi(self.ddi_file_path)
+        for xvar in ["STATEFIP", "EDUC", "OCC2010", "HISPAN", "INCTOT"]:
+            g = {v: k for k, v in ipumspy_codebook.get_variable_info(xvar).codes.items()}
+            pd.testing.assert_series_equal(
+                map_codes(self.codebook, self.df, xvar),
+                self.df[xvar].apply(lambda x: g.get(x, None)),
+            )
+
+        expected = IpumsAsecCleaner(self.df.copy(), ipumspy_codebook).clean_data()
+        df = IpumsAsecCleaner(self.df.copy(), self.codebook).clean_data()
+        pd.testing.assert_frame_equal(df, expected)
@@ -0,0 +1,141 @@
+import copy
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from src.pyipums.columnar import (
+    ColumnarWriter,
+    codebook_changes,
+    convert_extract,
+    read_columnar,
+    read_manifest,
+    refresh_extract,
+    verify_columnar,
+)
+from src.pyipums.parse_xml import read_ipums_ddi
+from src.pyipums.read_data import read_ipums_micro
+from tests.fixed_width import write_fixed_width
+
+
+class TestColumnar(TestCase):
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.ddi = read_ipums_ddi(os.path.join(absolute_path, "metadata_acs.xml"))
+        self.df = pd.read_csv(
+            os.path.join(absolute_path, "acs_sample_data.csv.gz"), compression="gzip"
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_file_path = os.path.join(self.tmpdir.name, "usa_00001.dat.gz")
+        write_fixed_width(self.ddi, self.df, self.data_file_path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_convert_roundtrip(self):
+        columns = ["STATEFIP", "PERWT", "INDNAICS", "AGE"]
+        path = os.path.join(self.tmpdir.name, "usa_00001")
+        result = convert_extract(
+            self.ddi, self.data_file_path, path, columns, chunksize=7, jobs=2
+        )
+        self.assertEqual(result["n_rows"], len(self.df))
+
+        expected = read_ipums_micro(self.ddi, self.data_file_path, columns)
+        df = read_columnar(path)
+        pd.testing.assert_frame_equal(df, expected)
+        self.assertEqual(df["STATEFIP"].dtype, np.uint8)
+        self.assertEqual(read_manifest(path)["columns"]["INDNAICS"]["kind"], "dictionary")
+        pd.testing.assert_frame_equal(
+            read_columnar(path, ["AGE", "PERWT"], mmap=False), expected[["AGE", "PERWT"]]
+        )
+
+    def test_dictionary_columns_across_chunks(self):
+        path = os.path.join(self.tmpdir.name, "cleaned")
+        first = pd.DataFrame({"Race": ["White", None], "x": [1.5, np.nan]})
+        second = pd.DataFrame({"Race": ["Black", "White"], "x": [2.0, 3.0]})
+        first["Bucket"] = pd.Categorical(["<15", "65+"], categories=["<15", "65+"])
+        second["Bucket"] = pd.Categorical(["65+", "65+"], categories=["<15", "65+"])
+        with ColumnarWriter(path) as writer:
+            writer.append(first)
+            writer.append(second)
+
+        df = read_columnar(path)
+        self.assertEqual(df["Race"].tolist(), ["White", None, "Black", "White"])
+        np.testing.assert_array_equal(df["x"], [1.5, np.nan, 2.0, 3.0])
+        self.assertEqual(df["Bucket"].dtype, "category")
+        self.assertEqual(df["Bucket"].tolist(), ["<15", "65+", "65+", "65+"])
+
+    def test_blank_fields_in_later_chunks(self):
+        # a blank age after the first chunks turns the column into floats
+        df = self.df.astype({"AGE": float})
+        df.loc[50, "AGE"] = np.nan
+        write_fixed_width(self.ddi, df, self.data_file_path)
+        columns = ["AGE", "PERWT"]
+        path = os.path.join(self.tmpdir.name, "usa_00001")
+        convert_extract(self.ddi, self.data_file_path, path, columns, chunksize=7)
+        self.assertEqual(read_manifest(path)["columns"]["AGE"]["dtype"], "<f4")
+        self.assertTrue(all(verify_columnar(path).values()))
+        pd.testing.assert_frame_equal(
+            read_columnar(path), df[columns], check_dtype=False
+        )
+
+        path = os.path.join(self.tmpdir.name, "usa_00001.parquet")
+        convert_extract(self.ddi, self.data_file_path, path, columns, chunksize=7)
+        pd.testing.assert_frame_equal(
+            pd.read_parquet(path), df[columns], check_dtype=False
+        )
+
+    def test_refresh_decodes_changed_columns_only(self):
+        columns = ["STATEFIP", "PERWT", "INDNAICS", "AGE", "SEX"]
+        path = os.path.join(self.tmpdir.name, "usa_00001")
+        convert_extract(self.ddi, self.data_file_path, path, columns, chunksize=7)
+        before = read_manifest(path)
+
+        # the re-issue relabels SEX, gives PERWT another implied decimal and
+        # revises a few ages
+        revised = copy.deepcopy(self.ddi)
+        revised["SEX"]["field_metadata"][0]["category_label"] = "Man"
+        revised["PERWT"]["decimals"] = 3
+        df = self.df.copy()
+        df.loc[:4, "AGE"] += 1
+        data_file_path = os.path.join(self.tmpdir.name, "usa_00002.dat.gz")
+        write_fixed_width(self.ddi, df, data_file_path)
+
+        changes = codebook_changes(before, revised, columns)
+        self.assertEqual(changes, {"PERWT": "spec", "SEX": "categories"})
+        report = refresh_extract(revised, data_file_path, path, chunksize=7)
+        self.assertEqual(report["reused"], ["STATEFIP", "INDNAICS", "SEX"])
+        self.assertEqual(report["rewritten"], {"PERWT": "spec", "AGE": "data"})
+        self.assertEqual(report["relabelled"], ["SEX"])
+
+        after = read_manifest(path)
+        for name in report["reused"]:
+            self.assertEqual(after["columns"][name]["file"], before["columns"][name]["file"])
+        self.assertEqual(sorted(os.listdir(path)), sorted(
+            [spec["file"] for spec in after["columns"].values()] + ["manifest.json"]
+        ))
+        pd.testing.assert_frame_equal(
+            read_columnar(path), read_ipums_micro(revised, data_file_path, columns)
+        )
+
+        report = refresh_extract(revised, data_file_path, path, columns[:3])
+        self.assertEqual(report["reused"], columns[:3])
+        self.assertEqual(report["removed"], ["AGE", "SEX"])
+        self.assertEqual(list(read_manifest(path)["columns"]), columns[:3])
+
+    def test_refresh_rewrites_corrupted_columns(self):
+        columns = ["STATEFIP", "AGE"]
+        path = os.path.join(self.tmpdir.name, "usa_00001")
+        convert_extract(self.ddi, self.data_file_path, path, columns)
+        file_path = os.path.join(path, read_manifest(path)["columns"]["AGE"]["file"])
+        with open(file_path, "r+b") as fp:
+            fp.write(b"\xff\xff")
+        self.assertEqual(verify_columnar(path), {"STATEFIP": True, "AGE": False})
+
+        report = refresh_extract(self.ddi, self.data_file_path, path)
+        self.assertEqual(report["rewritten"], {"AGE": "checksum"})
+        self.assertEqual(verify_columnar(path), {"STATEFIP": True, "AGE": True})
+        pd.testing.assert_frame_equal(
+            read_columnar(path), read_ipums_micro(self.ddi, self.data_file_path, columns)
+        )
@@ -0,0 +1,136 @@
+import os
+import re
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+import numpy as np
+import pandas as pd
+from src.pyipums import dataset as dataset_module
+from src.pyipums.dataset import IpumsDataset, count_records
+from src.pyipums.parse_xml import read_ipums_ddi
+from src.pyipums.read_data import read_ipums_micro
+
+from .fixed_width import write_fixed_width
+
+COLUMNS = ["YEAR", "STATEFIP", "SEX", "AGE", "PERWT", "LANGUAGE"]
+
+
+class TestIpumsDataset(TestCase):
+    def setUp(self):
+        self.absolute_path = os.path.dirname(__file__)
+        self.tmpdir = tempfile.mkdtemp()
+        ddi_file_path = os.path.join(self.absolute_path, "metadata_acs.xml")
+        with open(ddi_file_path) as fp:
+            xml = fp.read()
+        acs = pd.read_csv(os.path.join(self.absolute_path, "acs_sample_data.csv.gz"))
+        acs = acs[COLUMNS]
+
+        # 2019 alone, then 2020 and 2021 in one extract whose codebook drops
+        # LANGUAGE and relabels a SEX code
+        later = re.sub(r'<var ID="LANGUAGE".*?</var>\n', "", xml, flags=re.S)
+        later = later.replace("<labl>Female</labl>", "<labl>Woman</labl>")
+        first = acs.iloc[:40].assign(YEAR=2019)
+        second = acs.iloc[40:].assign(YEAR=np.where(np.arange(60) % 3, 2021, 2020))
+        for stem, text, df in [("usa_2019", xml, first), ("usa_2020", later, second)]:
+            path = os.path.join(self.tmpdir, f"{stem}.xml")
+            with open(path, "w") as fp:
+                fp.write(text)
+            ddi = read_ipums_ddi(path)
+            df = df[[c for c in df.columns if c in ddi["columns"]]]
+            write_fixed_width(ddi, df, os.path.join(self.tmpdir, f"{stem}.dat.gz"))
+        self.first, self.second = first, second
+        self.dataset = IpumsDataset(self.tmpdir, chunksize=7)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def expected(self, columns, years=None):
+        frames = []
+        for extract in self.dataset.extracts:
+            present = [c for c in columns if c in extract.columns]
+            df = read_ipums_micro(extract.ddi, extract.data_file_path, present)
+            if years is not None:
+                df = df[np.isin(df["YEAR"], years)]
+            frames.append(df)
+        return pd.concat(frames, ignore_index=True)[columns]
+
+    def test_reconciles_codebooks(self):
+        dataset = self.dataset
+        self.assertEqual(len(dataset.extracts), 2)
+        self.assertNotIn("LANGUAGE", dataset.variables())
+        self.assertIn("LANGUAGE", dataset.variables("union"))
+        self.assertEqual(dataset.partitions(), {2019: 40, 2020: 20, 2021: 40})
+        # labels from the later extract win; codes it lacks are kept
+        self.assertEqual(dataset.codebook.label_for("SEX", 2), "Woman")
+        self.assertEqual(dataset.codebook.label_for("LANGUAGE", 1), "English")
+        conflicts = dataset.category_conflicts()
+        self.assertEqual(conflicts["variable"].unique().tolist(), ["SEX"])
+        self.assertEqual(sorted(conflicts["label"]), ["Female", "Woman"])
+
+    def test_load(self):
+        columns = ["YEAR", "STATEFIP", "SEX", "AGE", "PERWT"]
+        # every year of unscanned extracts is read in one pass, which also
+        # counts the partitions
+        with mock.patch.object(
+            dataset_module, "scan_partitions", wraps=dataset_module.scan_partitions
+        ) as scan:
+            df = self.dataset.load(columns, jobs=2)
+        scan.assert_not_called()
+        pd.testing.assert_frame_equal(df, self.expected(columns))
+        self.assertEqual(df["STATEFIP"].dtype, np.uint8)
+        self.assertEqual(self.dataset.partitions(), {2019: 40, 2020: 20, 2021: 40})
+        pd.testing.assert_frame_equal(self.dataset.load(columns), df)
+
+        dataset = IpumsDataset(self.tmpdir, chunksize=7)
+        with mock.patch.object(dataset, "scan", wraps=dataset.scan) as scan:
+            dataset.load(columns, years=[2021], jobs=2)
+        scan.assert_called_once_with(2)
+
+        df = self.dataset.load(COLUMNS, how="union")
+        self.assertEqual(len(df), 100)
+        self.assertEqual(df["LANGUAGE"].dtype.kind, "f")
+        self.assertTrue(df["LANGUAGE"].iloc[40:].isna().all())
+        np.testing.assert_array_equal(df["LANGUAGE"].iloc[:40], self.first["LANGUAGE"])
+        unscanned = IpumsDataset(self.tmpdir, chunksize=7)
+        pd.testing.assert_frame_equal(unscanned.load(COLUMNS, how="union"), df)
+
+    def test_count_records(self):
+        path = os.path.join(self.tmpdir, "records.dat")
+        with open(path, "w") as fp:
+            fp.write("0012\r\n0013\r\n0014\r\n")
+        self.assertEqual(count_records(path), 3)
+        with open(path, "a") as fp:
+            fp.write("15\n16")
+        self.assertEqual(count_records(path, chunksize=2), 5)
+        gz_path = self.dataset.extracts[1].data_file_path
+        self.assertEqual(count_records(gz_path, chunksize=7), 60)
+
+    def test_blank_fields(self):
+        second = self.second.astype({"AGE": float})
+        second.iloc[5, second.columns.get_loc("AGE")] = np.nan
+        ddi = self.dataset.extracts[1].ddi
+        df = second[[c for c in second.columns if c in ddi["columns"]]]
+        write_fixed_width(ddi, df, self.dataset.extracts[1].data_file_path)
+        df = IpumsDataset(self.tmpdir, chunksize=7).load(["AGE"], jobs=2)
+        self.assertEqual(df["AGE"].dtype, np.float32)
+        self.assertEqual(df["AGE"].isna().sum(), 1)
+        self.assertTrue(np.isnan(df["AGE"][45]))
+        np.testing.assert_array_equal(df["AGE"][:40], self.first["AGE"])
+
+    def test_year_pruning(self):
+        columns = ["YEAR", "AGE", "PERWT"]
+        for years in [[2021], [2019, 2020], [1850]]:
+            df = self.dataset.load(columns, years=years, jobs=2)
+            expected = self.expected(columns, years)
+            pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+            self.assertEqual(df["AGE"].dtype, np.uint8)
+
+    def test_iter_partitions(self):
+        parts = dict(self.dataset.iter_partitions(["AGE"], years=[2019, 2021]))
+        self.assertEqual(sorted(parts), [2019, 2021])
+        self.assertEqual(list(parts[2021].columns), ["AGE"])
+        np.testing.assert_array_equal(parts[2019]["AGE"], self.first["AGE"])
+        np.testing.assert_array_equal(
+            parts[2021]["AGE"], self.second.loc[self.second["YEAR"] == 2021, "AGE"]
+        )
@@ -0,0 +1,35 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from src.pyipums.grouping import GroupIndex, top_k_mask, top_k_subset
+
+
+class TestGroupIndex(TestCase):
+    def setUp(self):
+        self.values = pd.Series(['a', 'b', 'a', None, 'c', 'a', 'b', 'say "hi"'])
+
+    def test_counts(self):
+        groups = GroupIndex(self.values)
+        self.assertEqual(groups.n_groups, 4)
+        self.assertEqual(groups.counts().tolist(), [3, 2, 1, 1])
+        weights = [1.0, 5.0, 1.0, 9.0, 2.0, np.nan, 5.0, 0.5]
+        self.assertEqual(groups.counts(weights).tolist(), [2.0, 10.0, 2.0, 0.5])
+
+    def test_top_k_mask(self):
+        mask, labels = top_k_mask(self.values, 2)
+        self.assertEqual(labels.tolist(), ["a", "b"])
+        self.assertEqual(
+            mask.tolist(), [True, True, True, False, False, True, True, False]
+        )
+        mask, labels = top_k_mask(self.values, 1, weights=[0, 1, 0, 0, 0, 0, 1, 9])
+        self.assertEqual(labels.tolist(), ['say "hi"'])
+        self.assertEqual(np.flatnonzero(mask).tolist(), [7])
+
+    def test_top_k_subset(self):
+        xdf = pd.DataFrame({"g": self.values, "x": np.arange(8)})
+        with self.assertLogs("src.pyipums.grouping", "INFO") as logs:
+            sub = top_k_subset(xdf, "g", k=2, xvar="x", max_percentile=1.0)
+        self.assertEqual(sub.index.tolist(), [0, 1, 2, 5])
+        self.assertIn("groups from 4 to 2", logs.output[0])
+        self.assertIs(top_k_subset(xdf, "g"), xdf)
@@ -0,0 +1,80 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from src.pyipums.benchmarks.synthetic import (
+    rectangular_ddi,
+    write_synthetic_hierarchical,
+)
+from src.pyipums.hierarchical import attach_households, read_ipums_hierarchical
+from src.pyipums.parse_xml import read_ipums_ddi
+from src.pyipums.read_data import read_ipums_micro
+
+
+class TestHierarchicalExtract(TestCase):
+    def setUp(self):
+        self.absolute_path = os.path.dirname(__file__)
+        self.ddi = read_ipums_ddi(
+            os.path.join(self.absolute_path, "metadata_hierarchical.xml")
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_file_path = os.path.join(self.tmpdir.name, "usa_00012.dat.gz")
+        self.rectangular_path = os.path.join(self.tmpdir.name, "rectangular.dat")
+        write_synthetic_hierarchical(
+            self.ddi,
+            self.data_file_path,
+            300,
+            seed=2,
+            rectangular_path=self.rectangular_path,
+            chunksize=64,
+        )
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_parse_structure(self):
+        self.assertEqual(self.ddi["file_type"], "hierarchical")
+        self.assertEqual(self.ddi["rectypes"], ["H", "P"])
+        self.assertEqual(self.ddi["rectype_idvar"], "RECTYPE")
+        self.assertEqual(self.ddi["rectype_keyvars"], ["SERIAL"])
+        self.assertEqual(self.ddi["SERIAL"]["rectypes"], ["H", "P"])
+        self.assertEqual(self.ddi["STATEFIP"]["rectypes"], ["H"])
+        acs = read_ipums_ddi(os.path.join(self.absolute_path, "metadata_acs.xml"))
+        self.assertEqual(acs["file_type"], "rectangular")
+        self.assertEqual(acs["SEX"]["rectypes"], [])
+
+    def test_matches_rectangularized_extract(self):
+        expected = read_ipums_micro(rectangular_ddi(self.ddi), self.rectangular_path)
+        # small chunks split households from their persons
+        for chunksize in [7, 100_000]:
+            df = read_ipums_micro(self.ddi, self.data_file_path, chunksize=chunksize)
+            pd.testing.assert_frame_equal(df, expected)
+
+        columns = ["STATEFIP", "AGE", "HHWT"]
+        df = read_ipums_micro(self.ddi, self.data_file_path, columns, chunksize=7)
+        pd.testing.assert_frame_equal(df, expected[columns])
+        self.assertEqual(df["STATEFIP"].dtype, np.uint8)
+
+    def test_record_types(self):
+        frames = read_ipums_hierarchical(self.ddi, self.data_file_path, chunksize=50)
+        self.assertEqual(len(frames["H"]), 300)
+        self.assertEqual(frames["H"]["RECTYPE"].unique().tolist(), ["H"])
+        self.assertEqual(frames["P"]["RECTYPE"].unique().tolist(), ["P"])
+        self.assertNotIn("STATEFIP", frames["P"].columns)
+        np.testing.assert_array_equal(frames["H"]["SERIAL"], np.arange(1, 301))
+        persons = frames["P"].groupby("SERIAL")["PERNUM"]
+        np.testing.assert_array_equal(persons.max(), persons.size())
+
+        first = read_ipums_hierarchical(self.ddi, self.data_file_path, n_max=10)
+        self.assertEqual(len(first["H"]) + len(first["P"]), 10)
+
+    def test_attach_households(self):
+        households = pd.DataFrame(
+            {"SAMPLE": [1, 2, 1], "SERIAL": [5, 5, 6], "STATEFIP": [6, 36, 48]}
+        )
+        persons = pd.DataFrame({"SAMPLE": [2, 1, 1, 1], "SERIAL": [5, 6, 5, 7]})
+        ddi = dict(self.ddi, rectype_keyvars=["SAMPLE", "SERIAL"])
+        df = attach_households(persons, households, ddi)
+        np.testing.assert_array_equal(df["STATEFIP"], [36, 48, 6, np.nan])
@@ -0,0 +1,57 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from src.pyipums.benchmarks.households import bench_household_rollup, synthetic_persons
+from src.pyipums.households import HouseholdSegments, household_rollup
+
+
+class TestHouseholds(TestCase):
+    def setUp(self):
+        self.df = synthetic_persons(1000, seed=3)
+        self.df.loc[[0, 1, 7, 500], "INCTOT"] = np.nan
+        self.df.index = self.df.index * 2
+
+    def test_rollup_matches_groupby(self):
+        keys = ["YEAR", "SERIAL"]
+        for how in ("sum", "count", "size", "mean", "min", "max", "first"):
+            for column in ("INCTOT", "AGE"):
+                aggregations = {"value": (column, how)}
+                grouped = self.df.groupby(keys, sort=False)
+                expected = grouped.agg(**aggregations).reset_index()
+                pd.testing.assert_frame_equal(
+                    household_rollup(self.df, aggregations),
+                    expected,
+                    check_dtype=False,
+                )
+                pd.testing.assert_series_equal(
+                    household_rollup(self.df, aggregations, broadcast=True)["value"],
+                    grouped[column].transform(how).rename("value"),
+                    check_dtype=False,
+                )
+
+    def test_segments(self):
+        df = pd.DataFrame({"SERIAL": [7, 7, 3, 9, 9, 9]})
+        segments = HouseholdSegments(df)
+        self.assertEqual(segments.keys, ["SERIAL"])
+        np.testing.assert_array_equal(segments.starts, [0, 2, 3])
+        np.testing.assert_array_equal(segments.household_numbers(), [0, 0, 1, 2, 2, 2])
+        narrow = np.array([200, 100, 1, 255, 255, 255], dtype=np.uint8)
+        np.testing.assert_array_equal(segments.reduce(narrow), [300, 1, 765])
+
+        with self.assertRaises(ValueError):
+            HouseholdSegments(pd.DataFrame({"SERIAL": [7, 3, 7]}))
+        unsorted = HouseholdSegments(pd.DataFrame({"SERIAL": [7, 3, 7]}), check=False)
+        self.assertEqual(unsorted.n_households, 3)
+        with self.assertRaises(KeyError):
+            HouseholdSegments(pd.DataFrame({"PERNUM": [1]}))
+        # without SERIAL, a year is not one household
+        with self.assertRaises(KeyError):
+            HouseholdSegments(pd.DataFrame({"YEAR": [2020, 2020], "PERNUM": [1, 2]}))
+        with self.assertRaises(KeyError):
+            HouseholdSegments(df, keys=["SERIAL", "CBSERIAL"])
+
+    def test_benchmark(self):
+        result = bench_household_rollup(n_rows=500, repeat=1)
+        self.assertEqual(result["n_rows"], 500)
+        self.assertGreater(result["persons"]["speedup"], 0)
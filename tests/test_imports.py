@@ -0,0 +1,27 @@
+import os
+from unittest import TestCase
+
+from src.pyipums.benchmarks.imports import heavy_imports, import_times
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestImportTime(TestCase):
+    def test_core_imports_are_light(self):
+        for module in ["src.pyipums", "src.pyipums.parse_xml", "src.pyipums.read_data"]:
+            times = import_times(module, cwd=REPO_ROOT)
+            self.assertIn(module, times)
+            self.assertEqual(heavy_imports(times), {}, module)
+            self.assertNotIn("src.pyipums.plotting", times)
+            # generous ceiling; numpy alone is most of read_data's budget
+            self.assertLess(times[module], 2_000_000, module)
+
+        self.assertNotIn("numpy", import_times("src.pyipums.parse_xml", cwd=REPO_ROOT))
+
+    def test_lazy_attributes(self):
+        import src.pyipums as pyipums
+
+        self.assertIn("read_ipums_ddi", dir(pyipums))
+        self.assertTrue(callable(pyipums.read_ipums_ddi))
+        with self.assertRaises(AttributeError):
+            pyipums.does_not_exist
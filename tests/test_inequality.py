@@ -0,0 +1,125 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from src.pyipums.benchmarks.inequality import bench_inequality
+from src.pyipums.inequality import (
+    WeightedDistribution,
+    gini,
+    income_shares,
+    inequality_summary,
+    theil,
+    weighted_percentiles,
+)
+
+PROBS = [0.0, 0.1, 0.25, 0.5, 0.9, 0.99, 1.0]
+
+
+def naive_percentile(x, w, p):
+    order = np.argsort(x, kind="stable")
+    x, w = x[order], w[order]
+    cumulative = np.cumsum(w)
+    return x[np.flatnonzero(cumulative >= p * cumulative[-1])[0]]
+
+
+def naive_gini(x, w):
+    differences = np.abs(x[:, None] - x[None, :])
+    return (w[:, None] * w[None, :] * differences).sum() / (
+        2 * w.sum() ** 2 * np.average(x, weights=w)
+    )
+
+
+def naive_theil(x, w):
+    ratio = x / np.average(x, weights=w)
+    terms = np.where(ratio > 0, ratio * np.log(np.where(ratio > 0, ratio, 1)), 0)
+    return np.average(terms, weights=w)
+
+
+def naive_lorenz(x, w, p):
+    # expand each row into slices of weight 0.1 and take the lowest p of them
+    slices = np.repeat(np.sort(x), np.asarray(w * 10, dtype=int)[np.argsort(x)])
+    return slices[: int(round(p * len(slices)))].sum() / slices.sum()
+
+
+class TestInequality(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        n_rows = 600
+        self.df = pd.DataFrame(
+            {
+                "STATEFIP": rng.choice([6, 36, 48, 56], size=n_rows),
+                "INCTOT": rng.lognormal(10, 1, size=n_rows).round(-2),
+                "PERWT": rng.integers(1, 200, size=n_rows).astype(float),
+            }
+        )
+        self.df.loc[:20, "INCTOT"] = 0.0
+        self.df.loc[[30, 31], "INCTOT"] = np.nan
+        self.df.loc[[40], "PERWT"] = 0.0
+        self.df.loc[[50], "STATEFIP"] = np.nan
+
+    def groups(self):
+        df = self.df.dropna(subset=["INCTOT", "STATEFIP"])
+        df = df[df["PERWT"] > 0]
+        for state, group in df.groupby("STATEFIP"):
+            yield state, group["INCTOT"].to_numpy(), group["PERWT"].to_numpy()
+
+    def test_percentiles(self):
+        result = weighted_percentiles(self.df, "INCTOT", "PERWT", "STATEFIP", PROBS)
+        self.assertEqual(list(result.index), [6, 36, 48, 56])
+        for state, x, w in self.groups():
+            expected = [naive_percentile(x, w, p) for p in PROBS]
+            np.testing.assert_array_equal(result.loc[state], expected)
+
+        # equal weights give the lower value at each exact half
+        dist = WeightedDistribution([4, 1, 3, 2], [1, 1, 1, 1])
+        self.assertEqual(dist.percentiles([0.5, 0.75]).values.tolist(), [[2, 3]])
+        with self.assertRaises(ValueError):
+            dist.percentiles([1.5])
+
+    def test_gini_and_theil(self):
+        ginis = gini(self.df, "INCTOT", "PERWT", "STATEFIP")
+        theils = theil(self.df, "INCTOT", "PERWT", "STATEFIP")
+        for state, x, w in self.groups():
+            self.assertAlmostEqual(ginis[state], naive_gini(x, w), places=10)
+            self.assertAlmostEqual(theils[state], naive_theil(x, w), places=10)
+
+        # unweighted, equal and fully concentrated incomes
+        x = self.df["INCTOT"].dropna().to_numpy()
+        unweighted = naive_gini(x, np.ones(len(x)))
+        self.assertAlmostEqual(gini(self.df, "INCTOT")[0], unweighted)
+        self.assertAlmostEqual(WeightedDistribution([5, 5, 5]).gini()[0], 0)
+        self.assertAlmostEqual(WeightedDistribution([0, 0, 0, 9]).gini()[0], 0.75)
+        self.assertTrue(np.isnan(WeightedDistribution([-1, 5]).theil()[0]))
+
+    def test_shares(self):
+        bands = [(0, 0.2), (0.2, 0.5), (0.9, 1)]
+        shares = income_shares(self.df, "INCTOT", "PERWT", "STATEFIP", bands)
+        self.assertEqual(list(shares.columns), ["P0-P20", "P20-P50", "P90-P100"])
+        for state, x, w in self.groups():
+            expected = [
+                naive_lorenz(x, w, high) - naive_lorenz(x, w, low)
+                for low, high in bands
+            ]
+            np.testing.assert_allclose(shares.loc[state], expected, atol=1e-12)
+
+        full = income_shares(self.df, "INCTOT", "PERWT", bands=[(0, 1)])
+        self.assertAlmostEqual(full.iloc[0, 0], 1)
+
+    def test_summary(self):
+        groups = pd.Categorical(["a", "a", "b"], categories=["a", "b", "c"])
+        dist = WeightedDistribution([1, 3, 2], [1, 1, 2], groups, name="g")
+        summary = dist.summary(probs=[0.1, 0.9], bands=[(0, 0.5)])
+        self.assertEqual(summary.index.name, "g")
+        self.assertEqual(summary.loc["a", "weight"], 2)
+        self.assertEqual(summary.loc["a", "P90/P10"], 3)
+        self.assertAlmostEqual(summary.loc["a", "P0-P50"], 0.25)
+        self.assertEqual(summary.loc["b", "gini"], 0)
+
+        summary = inequality_summary(self.df, "INCTOT", "PERWT", "STATEFIP")
+        self.assertEqual(len(summary), 4)
+        self.assertTrue(summary["gini"].between(0, 1).all())
+
+    def test_benchmark(self):
+        result = bench_inequality(n_rows=2000, repeat=1)
+        self.assertEqual(result["n_groups"], 51)
+        self.assertGreater(result["speedup"], 0)
@@ -63,3 +63,21 @@ class TestParseMetaDataXML(TestCase):
             len(metadata.get("columns")),
             149,
         )
+
+    def test_dtypes(self):
+        absolute_path = os.path.dirname(__file__)
+        cps_ddi = read_ipums_ddi(os.path.join(absolute_path, "metadata_cps.xml"))
+        acs_ddi = read_ipums_ddi(os.path.join(absolute_path, "metadata_example.xml"))
+        self.assertEqual(cps_ddi["dtypes"]["STATEFIP"], "uint8")
+        self.assertEqual(cps_ddi["dtypes"]["AGE"], "uint8")
+        self.assertEqual(cps_ddi["dtypes"]["ASECWT"], "float64")
+        # AGE is 3 digits wide but its codes stop at 135
+        self.assertEqual(acs_ddi["dtypes"]["AGE"], "uint8")
+        # a lone N/A code does not size the 4-digit YRMARR
+        self.assertEqual(acs_ddi["dtypes"]["YRMARR"], "uint16")
+        self.assertEqual(acs_ddi["dtypes"]["SERIAL"], "int32")
+        self.assertEqual(acs_ddi["dtypes"]["INCTOT"], "int32")
+        self.assertEqual(acs_ddi["dtypes"]["PRESGL"], "float32")
+        # RENT has negative category codes
+        self.assertEqual(acs_ddi["dtypes"]["RENT"], "int16")
+        self.assertEqual(acs_ddi["dtypes"]["YEAR"], acs_ddi["YEAR"]["dtype"])
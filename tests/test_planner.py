@@ -0,0 +1,101 @@
+import logging
+import os
+import tempfile
+from unittest import TestCase
+
+import pandas as pd
+from src.pyipums.clean_data import IpumsAcsCleaner
+from src.pyipums.parse_xml import read_ipums_ddi
+from src.pyipums.planner import (
+    estimate_row_bytes,
+    estimate_rows,
+    iter_planned,
+    parse_bytes,
+    plan_execution,
+    read_planned,
+)
+from src.pyipums.read_data import read_ipums_micro
+from tests.fixed_width import write_fixed_width
+
+
+class TestPlanner(TestCase):
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.ddi = read_ipums_ddi(os.path.join(absolute_path, "metadata_acs.xml"))
+        self.raw = pd.read_csv(
+            os.path.join(absolute_path, "acs_sample_data.csv.gz"), compression="gzip"
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "usa_00001.dat.gz")
+        write_fixed_width(self.ddi, self.raw, self.path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_estimates(self):
+        self.assertEqual(estimate_rows(self.ddi, self.path), len(self.raw))
+        plain = os.path.join(self.tmpdir.name, "usa_00001.dat")
+        write_fixed_width(self.ddi, self.raw, plain)
+        self.assertEqual(estimate_rows(self.ddi, plain), len(self.raw))
+        self.assertIsNone(estimate_rows(self.ddi, plain + ".missing"))
+
+        decoded = read_ipums_micro(self.ddi, plain)
+        row_bytes = estimate_row_bytes(self.ddi)
+        actual = decoded.memory_usage(deep=True, index=False).sum() / len(decoded)
+        self.assertAlmostEqual(row_bytes["decoded"], actual, delta=0.05 * actual)
+        cleaned = estimate_row_bytes(self.ddi, ["SEX", "AGE"], "IpumsAcsCleaner")
+        # SEX and AGE are both read as uint8
+        self.assertEqual(cleaned["decoded"], 2)
+        self.assertEqual(cleaned["derived"], 16 * len(IpumsAcsCleaner.DERIVED_COLUMNS))
+
+        self.assertEqual(parse_bytes("512M"), 512 * 2**20)
+        self.assertEqual(parse_bytes("1.5GiB"), 3 * 2**29)
+        self.assertEqual(parse_bytes(1000), 1000)
+        with self.assertRaises(ValueError):
+            parse_bytes("lots")
+
+    def test_budget(self):
+        roomy = plan_execution(
+            self.ddi, cleaner="IpumsAcsCleaner", memory_budget="8G", cores=8,
+            keep=False, n_rows=10**7,
+        )
+        self.assertEqual((roomy.workers, roomy.jobs), (8, 1))
+        self.assertLessEqual(roomy.estimated_peak, roomy.memory_budget)
+        tight = plan_execution(
+            self.ddi, cleaner="IpumsAcsCleaner", memory_budget="50M", cores=8,
+            keep=False, n_rows=10**7,
+        )
+        self.assertLess(tight.workers, roomy.workers)
+        self.assertLess(tight.chunksize, roomy.chunksize)
+        self.assertGreater(tight.jobs, 1)
+        self.assertLessEqual(tight.estimated_peak, tight.memory_budget)
+        # a small extract isn't split among more workers than it has chunks
+        small = plan_execution(self.ddi, self.path, memory_budget="1G", cores=8)
+        self.assertEqual((small.chunksize, small.workers), (len(self.raw), 1))
+        with self.assertRaises(ValueError):
+            plan_execution(self.ddi, memory_budget="100M", n_rows=10**7)
+        with self.assertRaises(ValueError):
+            plan_execution(self.ddi, memory_budget=100, keep=False)
+
+    def test_read_planned(self):
+        expected = IpumsAcsCleaner(
+            read_ipums_micro(self.ddi, self.path), self.ddi["codebook"]
+        ).clean_data()
+        plan = plan_execution(
+            self.ddi, self.path, cleaner="IpumsAcsCleaner", memory_budget="1G"
+        )
+        # several chunks in flight at once
+        plan = plan._replace(chunksize=7, workers=3, jobs=2)
+        self.assertEqual(len(list(iter_planned(self.ddi, self.path, plan))), 15)
+        with self.assertLogs("src.pyipums.planner", logging.INFO) as logs:
+            df, report = read_planned(self.ddi, self.path, plan, memory="tracemalloc")
+        pd.testing.assert_frame_equal(df, expected)
+        self.assertEqual(report["rows"], len(self.raw))
+        self.assertGreater(report["peak_memory"], 0)
+        self.assertIn("3 chunks of 7 rows at once", logs.output[0])
+        self.assertIn("peak memory", logs.output[1])
+
+        columns = ["SEX", "AGE", "PERWT"]
+        df, _ = read_planned(self.ddi, self.path, columns=columns, memory_budget="1G")
+        expected = read_ipums_micro(self.ddi, self.path, columns)
+        pd.testing.assert_frame_equal(df, expected)
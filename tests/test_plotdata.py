@@ -0,0 +1,129 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from src.pyipums.codebook import Codebook, VariableInfo
+from src.pyipums.plotdata import (
+    PlotDataCache,
+    density_data,
+    ecdf_data,
+    frame_fingerprint,
+    group_means,
+    tabulation_data,
+    weighted_kde,
+)
+from src.pyipums.tabulate import pt, weighted_mean_by
+
+
+def exact_kde(x, w, grid):
+    total, squared = w.sum(), (w * w).sum()
+    mean = (w * x).sum() / total
+    variance = (w * (x - mean) ** 2).sum() / (total - squared / total)
+    bandwidth = np.sqrt(variance) * (total * total / squared) ** -0.2
+    kernel = np.exp(-0.5 * ((grid[:, None] - x[None, :]) / bandwidth) ** 2)
+    return (w * kernel).sum(axis=1) / (total * bandwidth * np.sqrt(2 * np.pi))
+
+
+class TestPlotData(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        n_rows = 3000
+        self.df = pd.DataFrame(
+            {
+                "State": rng.choice(["Texas", "Ohio", "Utah", "Iowa"], size=n_rows),
+                "Total Income": rng.lognormal(10, 0.8, size=n_rows).round(-2),
+                "ASECWT": rng.random(n_rows) * 500,
+                "SEX": rng.choice([1, 2], size=n_rows),
+            }
+        )
+        self.cache = PlotDataCache(maxsize=4)
+        self.args = (self.df, "State", "Total Income", "ASECWT")
+        # top_k_subset keeps values strictly below the max_percentile quantile
+        self.kept = self.df[self.df["Total Income"] < self.df["Total Income"].max()]
+
+    def test_ecdf(self):
+        curves = ecdf_data(*self.args, cache=self.cache)
+        self.assertEqual(list(curves), list(self.df["State"].unique()))
+        for state, (x, y) in curves.items():
+            group = self.kept[self.kept["State"] == state]
+            below = [group["ASECWT"][group["Total Income"] <= v].sum() for v in x]
+            np.testing.assert_allclose(y, np.array(below) / group["ASECWT"].sum())
+            self.assertEqual(len(x), group["Total Income"].nunique())
+            with self.assertRaises(ValueError):
+                y[0] = 0
+
+        thinned = ecdf_data(*self.args, k=2, points=50, cache=self.cache)
+        self.assertEqual(len(thinned), 2)
+        for x, y in thinned.values():
+            self.assertEqual(len(x), 50)
+            self.assertAlmostEqual(y[-1], 1)
+
+    def test_density(self):
+        x = np.sort(self.df["Total Income"].to_numpy())
+        w = self.df["ASECWT"].to_numpy()
+        grid, density = weighted_kde(x, w)
+        exact = exact_kde(x, w, grid)
+        self.assertLess(np.abs(density - exact).max() / exact.max(), 1e-4)
+        self.assertEqual(len(weighted_kde(np.ones(3), np.ones(3))[0]), 0)
+
+        curves = density_data(*self.args, max_percentile=0.95, cache=self.cache)
+        cutoff = np.nanquantile(self.df["Total Income"], 0.95)
+        for state, (grid, density) in curves.items():
+            group = self.df[self.df["State"] == state]
+            x = group["Total Income"][group["Total Income"] < cutoff].to_numpy()
+            w = group["ASECWT"][group["Total Income"] < cutoff].to_numpy()
+            self.assertEqual(grid[-1], x.max())
+            exact = exact_kde(x, w, grid)
+            self.assertLess(np.abs(density - exact).max() / exact.max(), 1e-4)
+
+        means = group_means(*self.args, k=2, cache=self.cache)
+        subset = self.df[self.df["State"].isin(means.index)]
+        subset = subset[subset["Total Income"] < subset["Total Income"].max()]
+        pd.testing.assert_frame_equal(
+            means, weighted_mean_by(subset, "State", "Total Income", "ASECWT")
+        )
+
+    def test_cache(self):
+        first = ecdf_data(*self.args, cache=self.cache)
+        self.assertIs(ecdf_data(*self.args, cache=self.cache), first)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        # a copy has the same fingerprint; a changed value does not
+        copied = self.df.copy()
+        self.assertIs(ecdf_data(copied, *self.args[1:], cache=self.cache), first)
+        changed = self.df.copy()
+        changed.loc[0, "Total Income"] += 1
+        self.assertIsNot(ecdf_data(changed, *self.args[1:], cache=self.cache), first)
+        self.assertIsNot(ecdf_data(*self.args, k=2, cache=self.cache), first)
+
+        for k in (1, 2, 3):
+            density_data(*self.args, k=k, cache=self.cache)
+        self.assertEqual(len(self.cache), 4)
+        ecdf_data(*self.args, cache=self.cache)
+        self.assertEqual(self.cache.misses, 7)
+        self.assertIsNot(ecdf_data(*self.args, cache=None), first)
+
+    def test_fingerprint(self):
+        columns = ["State", "Total Income"]
+        fingerprint = frame_fingerprint(self.df, columns)
+        categorical = self.df.assign(State=self.df["State"].astype("category"))
+        self.assertNotEqual(frame_fingerprint(categorical, columns), fingerprint)
+        self.assertEqual(frame_fingerprint(self.df, columns + [None]), fingerprint)
+        for frame in (self.df.copy(), categorical):
+            other = "Ohio" if frame.loc[5, "State"] != "Ohio" else "Utah"
+            frame.loc[5, "State"] = other
+            self.assertNotEqual(frame_fingerprint(frame, columns), fingerprint)
+
+    def test_tabulation(self):
+        ddi = Codebook([VariableInfo("SEX", [(1, "Male"), (2, "Female")])])
+        table, bars = tabulation_data(ddi, self.df, "SEX", "ASECWT", cache=self.cache)
+        expected = pt(ddi, self.df, "SEX", "ASECWT")
+        percent = (expected["Percent"] * 100).round(2)
+        np.testing.assert_allclose(table["Percent"], percent)
+        self.assertEqual(bars["Percent"].tolist(), sorted(table["Percent"]))
+
+        relabelled = Codebook([VariableInfo("SEX", [(1, "Men"), (2, "Women")])])
+        table, _ = tabulation_data(
+            relabelled, self.df, "SEX", "ASECWT", cache=self.cache
+        )
+        self.assertEqual(set(table["SEX"]), {"Men", "Women"})
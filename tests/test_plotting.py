@@ -0,0 +1,56 @@
+from unittest import TestCase, skipUnless
+
+import numpy as np
+import pandas as pd
+from src.pyipums.codebook import Codebook, VariableInfo
+
+try:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    from matplotlib import pyplot as plt
+    from src.pyipums import plotting
+except ImportError:
+    plotting = None
+
+
+@skipUnless(plotting, "matplotlib and seaborn are not installed")
+class TestPlotting(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        n_rows = 400
+        self.df = pd.DataFrame(
+            {
+                "State": rng.choice(["Texas", "Ohio", "Utah"], size=n_rows),
+                "INCTOT": rng.lognormal(10, 0.8, size=n_rows).round(-2),
+                "ASECWT": rng.random(n_rows) * 500,
+                "SEX": rng.choice([1, 2], size=n_rows),
+            }
+        )
+        self.codebook = Codebook(
+            [
+                VariableInfo("SEX", [(1, "Male"), (2, "Female")], label="Sex"),
+                VariableInfo("INCTOT", [], label="Total personal income"),
+            ]
+        )
+
+    def tearDown(self):
+        plt.close("all")
+
+    def test_render(self):
+        args = (self.codebook, self.df, "State", "INCTOT", "ASECWT")
+        plotting.cdf_plot_by_x(*args, k=2)
+        ax = plt.gcf().axes[0]
+        self.assertEqual(len(ax.lines), 2)
+        self.assertEqual(ax.get_xlabel(), "Total Personal Income")
+
+        plotting.den_plot_by_x(*args)
+        ax = plt.gcf().axes[0]
+        # a density curve and its filled area per state
+        self.assertEqual(len(ax.lines), 3)
+        self.assertEqual(len(ax.collections), 3)
+
+        table = plotting.ptbarplot(self.codebook, self.df, "SEX", "ASECWT", out=True)
+        self.assertEqual(sorted(table["SEX"]), ["Female", "Male"])
+        bars = plt.gca().patches
+        self.assertAlmostEqual(sum(bar.get_width() for bar in bars), 100, places=1)
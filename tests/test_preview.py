@@ -0,0 +1,75 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from src.pyipums.parse_xml import read_ipums_ddi
+from src.pyipums.preview import PREVIEW_WEIGHT, PreviewSession, sample_ipums_micro
+from tests.fixed_width import write_fixed_width
+
+
+class TestPreviewSample(TestCase):
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.ddi = read_ipums_ddi(os.path.join(absolute_path, "metadata_acs.xml"))
+        df = pd.read_csv(
+            os.path.join(absolute_path, "acs_sample_data.csv.gz"), compression="gzip"
+        )
+        self.df = pd.concat([df] * 5, ignore_index=True)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_file_path = os.path.join(self.tmpdir.name, "usa_00001.dat.gz")
+        write_fixed_width(self.ddi, self.df, self.data_file_path)
+        self.columns = ["STATEFIP", "SEX", "AGE", "PERWT"]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_stratified_weighted_sample(self):
+        kwargs = dict(n=3, strata="STATEFIP", wvar="PERWT", columns=self.columns)
+        sample = sample_ipums_micro(self.ddi, self.data_file_path, **kwargs)
+        again = sample_ipums_micro(
+            self.ddi, self.data_file_path, chunksize=17, **kwargs
+        )
+        pd.testing.assert_frame_equal(sample, again)
+
+        self.assertTrue((sample.groupby("STATEFIP").size() <= 3).all())
+        np.testing.assert_allclose(
+            sample.groupby("STATEFIP")["PERWT"].sum(),
+            self.df.groupby("STATEFIP")["PERWT"].sum(),
+        )
+        replicate_totals = sample.filter(like="PREVIEW_REPWT").sum()
+        np.testing.assert_allclose(replicate_totals, self.df["PERWT"].sum())
+
+    def test_empty_and_blank_weights(self):
+        empty = os.path.join(self.tmpdir.name, "empty.dat")
+        open(empty, "wb").close()
+        sample = sample_ipums_micro(self.ddi, empty, n=3, columns=self.columns)
+        self.assertEqual(len(sample), 0)
+        self.assertEqual(list(sample.columns)[:4], self.columns)
+
+        df = self.df.astype({"PERWT": float})
+        df.loc[0, "PERWT"] = np.nan
+        write_fixed_width(self.ddi, df, self.data_file_path)
+        sample = sample_ipums_micro(
+            self.ddi, self.data_file_path, n=3, strata="STATEFIP", wvar="PERWT"
+        )
+        self.assertFalse(sample["PERWT"].isna().any())
+        self.assertAlmostEqual(sample["PERWT"].sum(), df["PERWT"].sum())
+
+    def test_session_switches_to_full_data(self):
+        session = PreviewSession(
+            self.ddi, self.data_file_path, n=20, columns=self.columns
+        )
+        preview = session.pt(None, "SEX")
+        self.assertEqual(session.weight, PREVIEW_WEIGHT)
+        self.assertEqual(len(session.data()), 20)
+        self.assertIn("Percent_se", preview.columns)
+        self.assertAlmostEqual(preview["count"].sum(), len(self.df))
+
+        full = session.use_full_data().pt(None, "SEX")
+        self.assertEqual(len(session.data()), len(self.df))
+        self.assertEqual(
+            dict(zip(full["SEX"], full["count"])),
+            self.df["SEX"].value_counts().to_dict(),
+        )
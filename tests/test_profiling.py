@@ -0,0 +1,79 @@
+import os
+import tracemalloc
+from unittest import TestCase, mock
+
+import numpy as np
+import pandas as pd
+from src.pyipums.clean_data import IpumsAsecCleaner
+from src.pyipums.parse_xml import read_ipums_ddi
+from src.pyipums import profiling
+from src.pyipums.profiling import PeakMemory, StageEvent, StageProfiler, observe
+
+ASEC_STAGES = [
+    "clean_variables",
+    "clean_cps_income",
+    "clean_educ_attainment",
+    "clean_wages",
+]
+
+
+class TestProfiling(TestCase):
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.ddi = read_ipums_ddi(os.path.join(absolute_path, "metadata_cps.xml"))
+        self.df = pd.read_csv(
+            os.path.join(absolute_path, "cps_sample_data.csv.gz"), compression="gzip"
+        )
+
+    def test_cleaner_stages_and_map_codes(self):
+        profiler = StageProfiler(memory="tracemalloc")
+        cleaned = IpumsAsecCleaner(
+            self.df.copy(), self.ddi["codebook"], observer=profiler
+        ).clean_data()
+        expected = IpumsAsecCleaner(self.df.copy(), self.ddi["codebook"]).clean_data()
+        pd.testing.assert_frame_equal(cleaned, expected)
+
+        stages = [e.stage for e in profiler.events if e.kind == "stage"]
+        self.assertEqual(stages, ASEC_STAGES)
+        mapped = [e.stage for e in profiler.events if e.kind == "map_codes"]
+        self.assertIn("OCC2010", mapped)
+        self.assertEqual(len(mapped), 11)
+        for event in profiler.events:
+            self.assertEqual(event.rows, len(self.df))
+            self.assertGreaterEqual(event.seconds, 0)
+            self.assertIsNotNone(event.memory_delta)
+
+        summary = profiler.summary()
+        self.assertEqual(summary["stage"].tolist()[:4], ASEC_STAGES)
+        self.assertAlmostEqual(
+            summary.loc[summary["kind"] == "stage", "percent"].sum(), 100.0
+        )
+        report = profiler.report()
+        self.assertIn("clean_wages", report)
+        self.assertIn("map_codes(VETSTAT)", report)
+
+    def test_observer_is_any_callable(self):
+        events = []
+        with observe(events.append, "load", rows=3):
+            pass
+        self.assertEqual(len(events), 1)
+        self.assertIsInstance(events[0], StageEvent)
+        self.assertIsNone(events[0].memory_delta)
+        with self.assertRaises(ValueError):
+            StageProfiler(memory="heap")
+
+    def test_traced_peak(self):
+        for reset in (True, False):
+            # without reset_peak (Python 3.8), tracing already on is sampled
+            tracemalloc.start()
+            np.ones(4_000_000)
+            try:
+                with mock.patch.object(profiling, "RESET_TRACED_PEAK", reset):
+                    with PeakMemory("tracemalloc") as peak:
+                        block = np.ones(500_000)
+                        peak.sample()
+                        del block
+            finally:
+                tracemalloc.stop()
+            self.assertGreaterEqual(peak.peak, 4_000_000)
+            self.assertLess(peak.peak, 8_000_000)
@@ -0,0 +1,72 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from src.pyipums.parse_xml import read_ipums_ddi
+from src.pyipums.read_data import (
+    decode_numeric,
+    iter_record_chunks,
+    read_ipums_micro,
+    records_to_array,
+)
+from tests.fixed_width import write_fixed_width
+
+
+class TestReadFixedWidth(TestCase):
+    def setUp(self):
+        self.absolute_path = os.path.dirname(__file__)
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _roundtrip(self, ddi_file_path, data_file_path):
+        ddi = read_ipums_ddi(os.path.join(self.absolute_path, ddi_file_path))
+        expected = pd.read_csv(
+            os.path.join(self.absolute_path, data_file_path), compression="gzip"
+        )
+        fixed_width_path = os.path.join(self.tmpdir.name, "extract.dat.gz")
+        write_fixed_width(ddi, expected, fixed_width_path)
+        df = read_ipums_micro(
+            ddi, fixed_width_path, columns=list(expected.columns), chunksize=7
+        )
+        return expected, df
+
+    def test_read_cps(self):
+        expected, df = self._roundtrip("metadata_cps.xml", "cps_sample_data.csv.gz")
+        self.assertEqual(df.shape, expected.shape)
+        pd.testing.assert_frame_equal(
+            df, expected, check_dtype=False, check_exact=False
+        )
+
+    def test_read_acs_character_columns(self):
+        expected, df = self._roundtrip("metadata_acs.xml", "acs_sample_data.csv.gz")
+        self.assertEqual(df["INDNAICS"].tolist(), expected["INDNAICS"].tolist())
+        self.assertEqual(df["PERWT"].tolist(), expected["PERWT"].tolist())
+
+    def test_compact_dtypes(self):
+        expected, df = self._roundtrip("metadata_cps.xml", "cps_sample_data.csv.gz")
+        self.assertEqual(df["STATEFIP"].dtype, np.uint8)
+        self.assertEqual(df["INCTOT"].dtype, np.int32)
+        self.assertEqual(df["INCTOT"].tolist(), expected["INCTOT"].tolist())
+        self.assertLess(
+            df.memory_usage(deep=True).sum(),
+            expected.memory_usage(deep=True).sum() / 2,
+        )
+
+    def test_records_and_n_max(self):
+        records = records_to_array(b"0012\n-045\n12\n")
+        self.assertEqual(records.shape, (3, 4))
+        self.assertEqual(decode_numeric(records).tolist(), [12, -45, 12])
+        self.assertEqual(decode_numeric(records[:, :2], decimals=1).tolist(), [0.0, 0.0, 1.2])
+
+        path = os.path.join(self.tmpdir.name, "extract.dat")
+        with open(path, "w") as fp:
+            fp.write("".join(f"{i:04d}\r\n" for i in range(10)))
+        chunks = list(iter_record_chunks(path, chunksize=4, n_max=9))
+        self.assertEqual([len(c) for c in chunks], [4, 4, 1])
+        self.assertEqual(
+            np.concatenate([decode_numeric(c) for c in chunks]).tolist(), list(range(9))
+        )
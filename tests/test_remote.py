@@ -0,0 +1,67 @@
+import os
+import tempfile
+import threading
+from unittest import TestCase
+
+import pandas as pd
+from src.pyipums.benchmarks.synthetic import write_synthetic_extract
+from src.pyipums.parse_xml import read_ipums_ddi
+from src.pyipums.read_data import iter_ipums_micro, read_ipums_micro
+from src.pyipums.remote import RemoteFile, is_url
+
+from .range_server import RangeServer
+
+
+class TestRemoteRead(TestCase):
+    def setUp(self):
+        self.absolute_path = os.path.dirname(__file__)
+        self.ddi = read_ipums_ddi(os.path.join(self.absolute_path, "metadata_acs.xml"))
+        self.tmpdir = tempfile.TemporaryDirectory()
+        for name in ["usa.dat", "usa.dat.gz"]:
+            path = os.path.join(self.tmpdir.name, name)
+            write_synthetic_extract(self.ddi, path, 3000, seed=4)
+        self.expected = read_ipums_micro(
+            self.ddi, os.path.join(self.tmpdir.name, "usa.dat")
+        )
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_is_url(self):
+        self.assertTrue(is_url("s3://bucket/usa.dat.gz"))
+        self.assertTrue(is_url("https://example.org/usa.dat"))
+        self.assertFalse(is_url("file:///tmp/usa.dat"))
+        self.assertFalse(is_url("/tmp/usa.dat"))
+        with self.assertRaises(ValueError):
+            RemoteFile("/tmp/usa.dat")
+
+    def test_read_over_http(self):
+        with RangeServer(self.tmpdir.name, delay=0.01) as server:
+            for name in ["usa.dat", "usa.dat.gz"]:
+                remote = RemoteFile(
+                    server.url(name), block_size=20_000, max_in_flight=3
+                )
+                df = read_ipums_micro(self.ddi, remote, chunksize=500)
+                pd.testing.assert_frame_equal(df, self.expected)
+            self.assertGreater(len(server.ranges), 20)
+            # requests overlap, but never more than max_in_flight at once
+            self.assertGreater(server.max_in_flight, 1)
+            self.assertLessEqual(server.max_in_flight, 3)
+            # plain URLs use the default settings
+            df = read_ipums_micro(self.ddi, server.url("usa.dat.gz"))
+            pd.testing.assert_frame_equal(df, self.expected)
+
+    def test_early_stop_releases_fetchers(self):
+        threads = threading.active_count()
+        with RangeServer(self.tmpdir.name) as server:
+            remote = RemoteFile(
+                server.url("usa.dat"), block_size=4096, max_in_flight=2
+            )
+            first = next(iter_ipums_micro(self.ddi, remote, chunksize=10))
+            df = read_ipums_micro(self.ddi, remote, n_max=25)
+            n_ranges = len(server.ranges)
+        pd.testing.assert_frame_equal(first, self.expected.iloc[:10])
+        pd.testing.assert_frame_equal(df, self.expected.iloc[:25])
+        # only the blocks ahead of the reader were requested
+        self.assertLess(n_ranges, 20)
+        self.assertEqual(threading.active_count(), threads)
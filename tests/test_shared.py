@@ -0,0 +1,129 @@
+import multiprocessing
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from src.pyipums.clean_data import map_codes
+from src.pyipums.parse_xml import read_ipums_ddi
+from src.pyipums.read_data import read_ipums_micro
+from src.pyipums.shared import attach_extract, publish_extract
+from tests.fixed_width import write_fixed_width
+
+
+def weighted_women(name, queue):
+    with attach_extract(name) as extract:
+        df = extract.frame()
+        women = df["PERWT"][df["Sex"] == "Female"]
+        queue.put((extract.refcount, float(women.sum())))
+
+
+def nullable_column(name, queue):
+    with attach_extract(name) as extract:
+        income = extract.frame()["INCTOT"]
+        queue.put((str(income.dtype), income.isna().tolist(), int(income.sum())))
+
+
+class TestSharedExtract(TestCase):
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.ddi = read_ipums_ddi(os.path.join(absolute_path, "metadata_acs.xml"))
+        raw = pd.read_csv(
+            os.path.join(absolute_path, "acs_sample_data.csv.gz"), compression="gzip"
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            data_file_path = os.path.join(tmpdir, "usa_00001.dat.gz")
+            write_fixed_width(self.ddi, raw, data_file_path)
+            self.df = read_ipums_micro(
+                self.ddi, data_file_path, ["SEX", "AGE", "PERWT", "INDNAICS"]
+            )
+        self.df["Sex"] = map_codes(self.ddi["codebook"], self.df, "SEX")
+        self.df["Age Bucket"] = pd.Categorical(
+            np.where(self.df["AGE"] < 55, "<55", "55+"), categories=["<55", "55+", "?"]
+        )
+
+    def test_round_trip(self):
+        with publish_extract(self.df, ddi=self.ddi) as published:
+            self.assertEqual(published.refcount, 1)
+            with attach_extract(published.name) as extract:
+                self.assertEqual(extract.refcount, 2)
+                pd.testing.assert_frame_equal(
+                    extract.frame(text_as_object=True), self.df
+                )
+                df = extract.frame(["PERWT", "Sex"])
+                self.assertEqual(df["Sex"].dtype, "category")
+                # the frame's columns are views of the shared segments
+                self.assertTrue(
+                    np.shares_memory(df["PERWT"].to_numpy(), extract.array("PERWT"))
+                )
+                codes = df["Sex"].cat.codes.to_numpy()
+                self.assertTrue(np.shares_memory(codes, extract.array("Sex")))
+                with self.assertRaises(ValueError):
+                    df["PERWT"].to_numpy()[0] = 0
+
+                codebook = extract.codebook
+                self.assertEqual(list(codebook.variables), list(self.df.columns[:4]))
+                self.assertEqual(
+                    codebook["SEX"].labels_by_code,
+                    self.ddi["codebook"]["SEX"].labels_by_code,
+                )
+                labels = map_codes(codebook, self.df, "SEX")
+                np.testing.assert_array_equal(labels, self.df["Sex"])
+                del df, codes
+            self.assertEqual(published.refcount, 1)
+
+        with self.assertRaises(FileNotFoundError):
+            attach_extract(published.name)
+        with self.assertRaises(ValueError):
+            published.array("PERWT")
+
+    def test_other_processes(self):
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        with publish_extract(self.df) as published:
+            self.assertIsNone(published.codebook)
+            worker = context.Process(
+                target=weighted_women, args=(published.name, queue)
+            )
+            worker.start()
+            refcount, total = queue.get(timeout=60)
+            worker.join()
+            self.assertEqual(refcount, 2)
+            self.assertEqual(total, self.df["PERWT"][self.df["SEX"] == 2].sum())
+            self.assertEqual(published.refcount, 1)
+
+            # the last process out removes the segments, whichever it is
+            extract = attach_extract(published.name)
+        extract.close()
+        with self.assertRaises(FileNotFoundError):
+            attach_extract(published.name)
+
+    def test_nullable_columns(self):
+        df = pd.DataFrame(
+            {
+                "INCTOT": pd.array([30, None, 5], dtype="Int64"),
+                "WEIGHT": pd.array([1.5, 2.0, None], dtype="Float64"),
+                "WORKED": pd.array([True, None, False], dtype="boolean"),
+            }
+        )
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        with publish_extract(df) as published:
+            pd.testing.assert_frame_equal(published.frame(), df)
+            worker = context.Process(
+                target=nullable_column, args=(published.name, queue)
+            )
+            worker.start()
+            result = queue.get(timeout=60)
+            worker.join()
+        self.assertEqual(worker.exitcode, 0)
+        self.assertEqual(result, ("Int64", [False, True, False], 35))
+
+    def test_failed_publish_leaves_nothing(self):
+        with publish_extract(self.df[["AGE"]], "pyipums_test_taken"):
+            with self.assertRaises(FileExistsError):
+                publish_extract(self.df, "pyipums_test_taken")
+            with attach_extract("pyipums_test_taken") as extract:
+                self.assertEqual(extract.columns, ["AGE"])
+        self.assertFalse(os.path.exists("/dev/shm/pyipums_test_taken_0"))
@@ -0,0 +1,145 @@
+import os
+import sqlite3
+import tempfile
+from unittest import TestCase, mock, skipUnless
+
+import pandas as pd
+from src.pyipums.clean_data import IpumsAcsCleaner
+from src.pyipums.parse_xml import read_ipums_ddi
+from src.pyipums.sqlexport import export_extract, export_sql, sql_columns
+from tests.fixed_width import write_fixed_width
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+BY_STATE = (
+    "SELECT l.label, COUNT(*) FROM persons p JOIN ipums_labels l "
+    "ON l.variable = 'STATEFIP' AND l.code = p.STATEFIP GROUP BY 1 ORDER BY 1"
+)
+
+
+class TestSqlExport(TestCase):
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.ddi = read_ipums_ddi(os.path.join(absolute_path, "metadata_acs.xml"))
+        self.raw = pd.read_csv(
+            os.path.join(absolute_path, "acs_sample_data.csv.gz"), compression="gzip"
+        )
+        cleaner = IpumsAcsCleaner(self.raw.copy(), self.ddi["codebook"])
+        self.cleaned = cleaner.clean_data()
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def expected_by_state(self):
+        states = self.cleaned["State"].value_counts().sort_index()
+        return list(zip(states.index, states.tolist()))
+
+    def test_sqlite(self):
+        path = os.path.join(self.tmpdir.name, "acs.sqlite")
+        stats = export_sql(self.cleaned, path, "persons", ddi=self.ddi, batch_rows=7)
+        self.assertEqual(stats["rows"], len(self.cleaned))
+        self.assertEqual(stats["engine"], "sqlite")
+        self.assertIn("persons_STATEFIP", stats["indexes"])
+        self.assertEqual(stats["lookup_variables"], len(self.ddi["columns"]))
+
+        with sqlite3.connect(path) as connection:
+            rows = connection.execute(BY_STATE).fetchall()
+            frame = pd.read_sql("SELECT * FROM persons", connection)
+            plan = connection.execute(
+                "EXPLAIN QUERY PLAN SELECT COUNT(*) FROM persons WHERE SEX = 2"
+            ).fetchall()
+        self.assertEqual(rows, self.expected_by_state())
+        self.assertIn("persons_SEX", plan[0][-1])
+        self.assertEqual(list(frame.columns), sql_columns(self.cleaned.columns))
+        self.assertIn("Sex_2", frame.columns)
+        pd.testing.assert_series_equal(
+            frame["PERWT"], self.cleaned["PERWT"], check_dtype=False
+        )
+        self.assertEqual(
+            frame["Sex_2"].tolist(), self.cleaned["Sex"].astype(object).tolist()
+        )
+
+        export_sql(self.raw, path, "persons", ddi=self.ddi, if_exists="append")
+        with self.assertRaises(ValueError):
+            export_sql(self.raw, path, "persons", if_exists="fail")
+        with sqlite3.connect(path) as connection:
+            count = connection.execute("SELECT COUNT(*) FROM persons").fetchone()[0]
+            labels = connection.execute(
+                "SELECT label FROM ipums_labels WHERE variable = 'SEX' ORDER BY code"
+            ).fetchall()
+        self.assertEqual(count, 2 * len(self.raw))
+        self.assertEqual(labels, [("Male",), ("Female",)])
+
+    def test_export_extract(self):
+        data_file_path = os.path.join(self.tmpdir.name, "usa_00001.dat")
+        write_fixed_width(self.ddi, self.raw, data_file_path)
+        connection = sqlite3.connect(":memory:")
+        stats = export_extract(
+            self.ddi,
+            data_file_path,
+            connection,
+            "persons",
+            cleaner="IpumsAcsCleaner",
+            chunksize=30,
+        )
+        self.assertEqual(stats["rows"], len(self.raw))
+        rows = connection.execute(BY_STATE).fetchall()
+        self.assertEqual(rows, self.expected_by_state())
+
+    def test_nullable_columns(self):
+        df = pd.DataFrame(
+            {
+                "AGE": pd.array([30, None, 41], dtype="Int64"),
+                "Employed": pd.array([True, None, False], dtype="boolean"),
+                "Weight": pd.array([1.5, 2.0, None], dtype="Float64"),
+                "State": pd.Categorical(["Ohio", None, "Iowa"]),
+            }
+        )
+        connection = sqlite3.connect(":memory:")
+        export_sql(df, connection, "persons")
+        rows = connection.execute("SELECT * FROM persons").fetchall()
+        self.assertEqual(
+            rows, [(30, 1, 1.5, "Ohio"), (None, None, 2.0, None), (41, 0, None, "Iowa")]
+        )
+        types = [row[2] for row in connection.execute("PRAGMA table_info(persons)")]
+        self.assertEqual(types, ["INTEGER", "INTEGER", "REAL", "TEXT"])
+
+    def test_duckdb_statements(self):
+        # the SQL sent to DuckDB, checked without duckdb installed
+        connection = mock.MagicMock()
+        connection.execute.return_value.fetchone.return_value = None
+        stats = export_sql(
+            self.cleaned, connection, "persons", ddi=self.ddi, engine="duckdb"
+        )
+        self.assertEqual(stats["engine"], "duckdb")
+        statements = [c.args[0] for c in connection.execute.call_args_list]
+        self.assertEqual(statements[0], "BEGIN TRANSACTION")
+        self.assertIn("information_schema.tables", statements[1])
+        self.assertIn(
+            'CREATE TABLE "persons" AS SELECT * FROM _pyipums_export', statements
+        )
+        self.assertTrue(any("code BIGINT NOT NULL" in sql for sql in statements))
+        self.assertIn(
+            'CREATE INDEX IF NOT EXISTS "persons_SEX" ON "persons" ("SEX")', statements
+        )
+        view, table = connection.register.call_args.args
+        self.assertEqual(table.num_rows, len(self.cleaned))
+        self.assertEqual(table.column_names, sql_columns(self.cleaned.columns))
+        connection.unregister.assert_called_once_with(view)
+        labels = connection.executemany.call_args_list[0].args[1]
+        self.assertTrue(all(isinstance(code, int) for _, code, _ in labels))
+        connection.commit.assert_called_once()
+
+    @skipUnless(duckdb, "duckdb is not installed")
+    def test_duckdb(self):
+        path = os.path.join(self.tmpdir.name, "acs.duckdb")
+        stats = export_sql(self.cleaned, path, "persons", ddi=self.ddi)
+        self.assertEqual(stats["engine"], "duckdb")
+        connection = duckdb.connect(path)
+        rows = connection.execute(BY_STATE).fetchall()
+        connection.close()
+        self.assertEqual(rows, self.expected_by_state())
@@ -0,0 +1,46 @@
+import os
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from ipumspy import readers
+from src.pyipums.tabulate import pt, weighted_mean_by
+
+
+class TestTabulate(TestCase):
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.ddi_codebook = readers.read_ipums_ddi(
+            os.path.join(absolute_path, "metadata_cps.xml")
+        )
+        self.df = pd.read_csv(
+            os.path.join(absolute_path, "cps_sample_data.csv.gz"), compression="gzip"
+        )
+
+    def test_pt_weighted(self):
+        outdf = pt(self.ddi_codebook, self.df, "STATEFIP", "ASECWT")
+        self.assertEqual(
+            outdf.columns.tolist(),
+            ["STATEFIP", "code", "count", "raw_count", "raw_percent", "Percent"],
+        )
+        expected = self.df.groupby("STATEFIP")["ASECWT"].sum()
+        for code, count in zip(outdf["code"], outdf["count"]):
+            self.assertAlmostEqual(count, expected[code])
+        self.assertTrue(outdf["count"].is_monotonic_decreasing)
+        self.assertAlmostEqual(outdf["Percent"].sum(), 1.0)
+        self.assertEqual(outdf["raw_count"].sum(), self.df.shape[0])
+
+    def test_pt_unweighted(self):
+        outdf = pt(None, self.df, "SEX")
+        self.assertEqual(outdf.columns.tolist(), ["SEX", "count", "Percent"])
+        self.assertEqual(
+            dict(zip(outdf["SEX"], outdf["count"])),
+            self.df["SEX"].value_counts().to_dict(),
+        )
+
+    def test_weighted_mean_by(self):
+        x = weighted_mean_by(self.df, "SEX", "INCTOT", "ASECWT")
+        for sex, xdf in self.df.groupby("SEX"):
+            self.assertAlmostEqual(
+                x.loc[sex, "final"], np.average(xdf["INCTOT"], weights=xdf["ASECWT"])
+            )
@@ -0,0 +1,110 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from src.pyipums.parse_xml import read_ipums_ddi
+from src.pyipums.read_data import read_ipums_micro
+from src.pyipums.validation import ConformanceReport, column_rule
+from tests.fixed_width import write_fixed_width
+
+
+def set_field(lines, ddi, row, col, text):
+    start, end = ddi["column_specs"][ddi["columns"].index(col)]
+    line = lines[row]
+    lines[row] = line[:start] + text.encode().rjust(end - start, b"0") + line[end:]
+
+
+class TestConformance(TestCase):
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.ddi = read_ipums_ddi(os.path.join(absolute_path, "metadata_acs.xml"))
+        self.raw = pd.read_csv(
+            os.path.join(absolute_path, "acs_sample_data.csv.gz"), compression="gzip"
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "usa_00001.dat")
+        write_fixed_width(self.ddi, self.raw, self.path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def corrupt(self, *edits):
+        with open(self.path, "rb") as fp:
+            lines = fp.read().splitlines(keepends=True)
+        for row, col, text in edits:
+            set_field(lines, self.ddi, row, col, text)
+        with open(self.path, "wb") as fp:
+            fp.write(b"".join(lines))
+
+    def test_clean_extract(self):
+        report = ConformanceReport(self.ddi)
+        df = read_ipums_micro(self.ddi, self.path, chunksize=7, validate=report)
+        self.assertEqual(report.n_rows, len(self.raw))
+        self.assertEqual(report.n_violations, 0)
+        self.assertEqual(len(report.summary()), 0)
+        pd.testing.assert_frame_equal(df, read_ipums_micro(self.ddi, self.path))
+
+    def test_violations(self):
+        self.corrupt(
+            (3, "SEX", "7"),
+            (40, "SEX", "3"),
+            (12, "AGE", "4x"),
+            (20, "AGE", "-05"),
+            (30, "AGE", "   "),
+            (21, "SERIAL", "--1"),
+            (60, "YRMARR", "1234"),
+        )
+        columns = ["SEX", "AGE", "SERIAL", "YRMARR", "PERWT"]
+        reports = []
+        for jobs in (1, 2):
+            report = ConformanceReport(self.ddi)
+            df = read_ipums_micro(
+                self.ddi, self.path, columns, chunksize=9, jobs=jobs, validate=report
+            )
+            reports.append(report)
+            # a blank field is reported and decodes as missing
+            self.assertTrue(np.isnan(df["AGE"][30]))
+        summary = reports[0].summary()
+        pd.testing.assert_frame_equal(summary, reports[1].summary())
+
+        self.assertEqual(list(summary.index), ["SERIAL", "SEX", "AGE"])
+        self.assertEqual(summary.loc["SEX", "category"], 2)
+        self.assertEqual(summary.loc["SEX", "sample_rows"], [3, 40])
+        # "4x" is malformed and decodes to 4, a legal age
+        self.assertEqual(summary.loc["AGE"].tolist()[:5], [1, 1, 1, 1, 3])
+        self.assertEqual(summary.loc["AGE", "sample_rows"], [12, 20, 30])
+        # SERIAL is continuous: it may be negative, but has one sign at most
+        self.assertEqual(summary.loc["SERIAL"].tolist()[:5], [1, 0, 0, 0, 1])
+        self.assertEqual(reports[0].n_violations, 6)
+
+        report = ConformanceReport(self.ddi, columns=["SEX"], samples=1)
+        read_ipums_micro(self.ddi, self.path, columns, validate=report)
+        self.assertEqual(list(report.summary().index), ["SEX"])
+        self.assertEqual(report.violations("SEX")["sample_rows"], [3])
+        self.assertEqual(report.violations("AGE")["rows"], 0)
+
+    def test_rules(self):
+        sex, age = column_rule(self.ddi, "SEX"), column_rule(self.ddi, "AGE")
+        self.assertEqual(sex.codes.tolist(), [1, 2])
+        self.assertFalse(sex.signed)
+        self.assertIn(140, age.codes)
+        np.testing.assert_array_equal(
+            age.outside(np.array([0, 140, 136, 10**6])), [False, False, True, True]
+        )
+        np.testing.assert_array_equal(
+            age.outside(np.array([-5, 0]), negative=True), [True, False]
+        )
+        # codes with implied decimals are compared as stored
+        self.assertIn(815, column_rule(self.ddi, "PRESGL").codes)
+        # only N/A or special codes labelled, or no labels at all: values are open
+        for col in ["YRMARR", "YRSUSA1", "OCC", "INCTOT", "OCCSOC"]:
+            self.assertIsNone(column_rule(self.ddi, col).codes, col)
+        self.assertTrue(column_rule(self.ddi, "INCTOT").signed)
+
+    def test_hierarchical_unsupported(self):
+        path = os.path.join(os.path.dirname(__file__), "metadata_hierarchical.xml")
+        ddi = read_ipums_ddi(path)
+        with self.assertRaises(ValueError):
+            read_ipums_micro(ddi, self.path, validate=ConformanceReport(ddi))
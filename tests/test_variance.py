@@ -0,0 +1,101 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from src.pyipums.tabulate import pt
+from src.pyipums.variance import (
+    replicate_weight_columns,
+    replicate_se,
+    weighted_mean,
+    weighted_ratio,
+    weighted_total,
+)
+
+
+class TestReplicateVariance(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        n_rows, self.n_reps = 500, 8
+        self.repwts = [f"REPWTP{i}" for i in range(1, self.n_reps + 1)]
+        self.df = pd.DataFrame(
+            rng.integers(1, 100, size=(n_rows, self.n_reps + 1)).astype(float),
+            columns=["PERWT"] + self.repwts,
+        )
+        self.df["STATEFIP"] = rng.choice([6, 36, 48], size=n_rows)
+        self.df["INCTOT"] = rng.normal(50000, 20000, size=n_rows)
+        self.df["HOURS"] = rng.integers(1, 60, size=n_rows).astype(float)
+
+    def _naive(self, estimator, method_factor):
+        full = estimator("PERWT")
+        reps = np.array([estimator(w) for w in self.repwts])
+        return full, np.sqrt(method_factor * ((reps - full) ** 2).sum())
+
+    def test_replicate_weight_columns(self):
+        columns = ["REPWTP", "REPWTP10", "REPWTP2", "REPWT1", "REPWTP1", "PERWT"]
+        self.assertEqual(
+            replicate_weight_columns(columns, "REPWTP"),
+            ["REPWTP1", "REPWTP2", "REPWTP10"],
+        )
+        self.assertEqual(replicate_weight_columns(columns, "REPWT"), ["REPWT1"])
+
+    def test_grouped_estimates_match_naive(self):
+        sdf = self.df[self.df["STATEFIP"] == 36]
+        checks = [
+            (
+                weighted_total(self.df, "INCTOT", "PERWT", self.repwts, by="STATEFIP"),
+                lambda w: (sdf["INCTOT"] * sdf[w]).sum(),
+            ),
+            (
+                weighted_mean(self.df, "INCTOT", "PERWT", self.repwts, by="STATEFIP"),
+                lambda w: np.average(sdf["INCTOT"], weights=sdf[w]),
+            ),
+            (
+                weighted_ratio(
+                    self.df, "INCTOT", "HOURS", "PERWT", self.repwts, by="STATEFIP"
+                ),
+                lambda w: (sdf["INCTOT"] * sdf[w]).sum() / (sdf["HOURS"] * sdf[w]).sum(),
+            ),
+        ]
+        for result, estimator in checks:
+            estimate, se = self._naive(estimator, 4.0 / self.n_reps)
+            self.assertAlmostEqual(result.loc[36, "estimate"] / estimate, 1.0)
+            self.assertAlmostEqual(result.loc[36, "se"] / se, 1.0)
+
+    def test_jk1_and_ungrouped(self):
+        result = weighted_mean(self.df, "INCTOT", "PERWT", self.repwts, method="jk1")
+        estimate, se = self._naive(
+            lambda w: np.average(self.df["INCTOT"], weights=self.df[w]),
+            (self.n_reps - 1.0) / self.n_reps,
+        )
+        self.assertAlmostEqual(result.loc["Total", "estimate"] / estimate, 1.0)
+        self.assertAlmostEqual(result.loc["Total", "se"] / se, 1.0)
+        with self.assertRaises(ValueError):
+            replicate_se(np.zeros((1, 3)), method="bootstrap")
+
+    def test_pt_standard_errors(self):
+        outdf = pt(None, self.df, "STATEFIP", "PERWT", repwts=self.repwts)
+        totals = weighted_total(
+            self.df.assign(one=1.0), "one", "PERWT", self.repwts, by="STATEFIP"
+        )
+        for code, count, count_se in zip(
+            outdf["STATEFIP"], outdf["count"], outdf["count_se"]
+        ):
+            self.assertAlmostEqual(count, totals.loc[code, "estimate"])
+            self.assertAlmostEqual(count_se, totals.loc[code, "se"])
+        self.assertTrue((outdf["Percent_se"] > 0).all())
+
+    def test_missing_replicate_weight(self):
+        df = self.df.copy()
+        row = int(np.flatnonzero(df["STATEFIP"] == 6)[0])
+        df.loc[row, "REPWTP1"] = np.nan
+        outdf = pt(None, df, "STATEFIP", "PERWT", repwts=self.repwts)
+        self.assertFalse(outdf[["count_se", "Percent_se"]].isna().any().any())
+
+        # the missing weight counts as zero, in its own group only
+        expected = pt(
+            None, df.fillna({"REPWTP1": 0}), "STATEFIP", "PERWT", repwts=self.repwts
+        )
+        pd.testing.assert_frame_equal(outdf, expected)
+        before = pt(None, self.df, "STATEFIP", "PERWT", repwts=self.repwts)
+        changed = outdf["count_se"] != before["count_se"]
+        self.assertEqual(outdf.loc[changed, "STATEFIP"].tolist(), [6])
@@ -0,0 +1,105 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from src.pyipums.columnar import convert_extract, read_columnar, read_manifest
+from src.pyipums.parse_xml import read_ipums_ddi
+from src.pyipums.read_data import read_ipums_micro
+from src.pyipums.zonemaps import (
+    block_may_match,
+    build_zone_map,
+    decode_bitsets,
+    evaluate,
+    filter_mask,
+)
+from tests.fixed_width import write_fixed_width
+
+
+class TestZoneMaps(TestCase):
+    def setUp(self):
+        absolute_path = os.path.dirname(__file__)
+        self.ddi = read_ipums_ddi(os.path.join(absolute_path, "metadata_acs.xml"))
+        df = pd.read_csv(
+            os.path.join(absolute_path, "acs_sample_data.csv.gz"), compression="gzip"
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_file_path = os.path.join(self.tmpdir.name, "usa_00001.dat.gz")
+        write_fixed_width(self.ddi, df, self.data_file_path)
+        self.columns = ["STATEFIP", "AGE", "PERWT", "INDNAICS"]
+        self.df = read_ipums_micro(self.ddi, self.data_file_path, self.columns)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_build_zone_map(self):
+        values = np.array([3, 1, 4, 1, 5, 9, 2, 6], dtype=np.uint8)
+        zones = build_zone_map(values, 3)
+        self.assertEqual(zones["min"], [1, 1, 2])
+        self.assertEqual(zones["max"], [4, 9, 6])
+        bits = decode_bitsets(zones["codes"])
+        self.assertEqual(np.flatnonzero(bits[1]).tolist(), [1, 5, 9])
+
+        zones = build_zone_map(np.array([np.nan, np.nan, 1.5, np.nan]), 2)
+        self.assertEqual((zones["min"], zones["max"]), ([None, 1.5], [None, 1.5]))
+        self.assertNotIn("codes", zones)
+
+        spec = {"kind": "numeric", "dtype": "<f8", "zones": zones}
+        self.assertEqual(block_may_match(spec, 2, "==", 1.5).tolist(), [False, True])
+        self.assertEqual(block_may_match(spec, 2, "!=", 1.5).tolist(), [True, False])
+
+        # text never equals a number, so it rules every block out
+        spec = {"kind": "numeric", "dtype": "|u1", "zones": build_zone_map(values, 3)}
+        self.assertEqual(block_may_match(spec, 3, "==", "4").tolist(), [False] * 3)
+        self.assertEqual(block_may_match(spec, 3, "in", ["4", 9]).tolist(), [0, 1, 0])
+        self.assertEqual(block_may_match(spec, 3, "!=", "4").tolist(), [True] * 3)
+        np.testing.assert_array_equal(evaluate(values, "in", ["4", 9]), values == 9)
+
+    def test_clustered_blocks_are_skipped(self):
+        path = os.path.join(self.tmpdir.name, "clustered")
+        convert_extract(
+            self.ddi,
+            self.data_file_path,
+            path,
+            self.columns,
+            chunksize=7,
+            cluster_by=["STATEFIP", "AGE"],
+            block_rows=8,
+        )
+        manifest = read_manifest(path)
+        self.assertEqual(manifest["cluster_by"], ["STATEFIP", "AGE"])
+        clustered = read_columnar(path)
+        expected = self.df.sort_values(["STATEFIP", "AGE"], kind="stable")
+        pd.testing.assert_frame_equal(clustered, expected.reset_index(drop=True))
+
+        filters = [
+            [("STATEFIP", "in", [6, 36]), ("AGE", ">=", 25)],
+            [("INDNAICS", "in", ["722Z", "814"])],
+        ]
+        stats = {}
+        df = read_columnar(path, ["AGE", "PERWT"], filters=filters, stats=stats)
+        expected = clustered[filter_mask(clustered, filters)][["AGE", "PERWT"]]
+        pd.testing.assert_frame_equal(df, expected.reset_index(drop=True))
+        self.assertEqual(stats["blocks"], 13)
+        self.assertGreater(stats["blocks_skipped"], 0)
+        self.assertEqual(
+            stats["bytes_skipped"],
+            stats["rows_skipped"] * (1 + 8 + 1 + 4),
+        )
+
+    def test_unclustered_filters(self):
+        path = os.path.join(self.tmpdir.name, "usa_00001")
+        convert_extract(self.ddi, self.data_file_path, path, self.columns, block_rows=16)
+        for filters in (
+            [("AGE", "<", 18)],
+            [("STATEFIP", "not in", [6, 48]), ("PERWT", ">", 100.0)],
+            [("STATEFIP", "==", 99)],
+        ):
+            expected = self.df[filter_mask(self.df, filters)].reset_index(drop=True)
+            pd.testing.assert_frame_equal(
+                read_columnar(path, filters=filters), expected
+            )
+        stats = {}
+        read_columnar(path, filters=[("STATEFIP", "==", 99)], stats=stats)
+        self.assertEqual(stats["blocks_skipped"], stats["blocks"])